@@ -0,0 +1,595 @@
+"""
+Columnar analytics over submitted applications.
+
+compact() copies the applications from the application store into a
+directory of Parquet (or Arrow IPC) files partitioned by day:
+
+    analytics/
+        _manifest.json
+        day=2026-10-16/part-00000.parquet
+        day=2026-10-17/part-00000.parquet
+        day=2026-10-17/part-00004.parquet
+
+As with the column cache in validators.py, this relies on the stores being
+append-only. The manifest records how many applications were compacted and
+the id of the last one, so the next run reads only the applications added
+since then with ApplicationStore.iter_fields and writes them as new parts. A
+day with more than "max_parts_per_day" parts is merged back into one file.
+Readers only see the parts listed in the manifest, and the manifest is
+replaced after the parts are written, so a crash leaves the previous state.
+Identity numbers are not exported. The files only record whether a
+guarantor or a seller TCKN was given.
+
+ApplicationAnalytics answers aggregate queries on these files with pyarrow.
+It reads only the columns and day partitions a query needs:
+
+    daily_volume       applications and loan amount per day and type
+    loan_distribution  count, mean, min, max and quantiles of the loan amount
+    histogram          e.g. vehicle age, optionally per type
+    guarantor_rate     share of applications with a guarantor
+    aggregate          any group-by with pyarrow aggregate functions
+
+pyarrow is only needed here, so it is imported inside the functions and
+the rest of the app runs without it. compact() and ApplicationAnalytics
+check for it first and raise ImportError saying how to install it.
+
+Usage:
+    python analytics.py compact
+    python analytics.py daily --from 2026-10-01 --type new
+    python analytics.py loans --by type
+    python analytics.py histogram vehicle_age --by type
+    python analytics.py guarantor --by day --json guarantor.json
+"""
+import argparse
+import importlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from application_store import _FileLock
+
+
+DEFAULT_ANALYTICS_CONFIG = {
+    "path": "analytics",
+    "format": "parquet",
+    "compression": "zstd",
+    "batch_size": 100000,
+    "max_parts_per_day": 8
+}
+
+
+MANIFEST_NAME = "_manifest.json"
+MANIFEST_VERSION = 1
+FILE_EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+
+# column -> dotted path in the stored application
+SOURCE_PATHS = {
+    "type": "type",
+    "status": "status",
+    "timestamp": "timestamp",
+    "vehicle_value": "data.vehicle_value",
+    "vehicle_age": "data.vehicle_age",
+    "loan_amount": "data.loan_amount",
+    "vehicle_model": "data.vehicle_model",
+    "guarantor_tckn": "data.guarantor_tckn",
+    "seller_tckn": "data.seller_tckn"
+}
+NUMERIC_COLUMNS = ("vehicle_value", "vehicle_age", "loan_amount")
+DEFAULT_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+UNKNOWN_DAY = "unknown"
+
+
+def require_pyarrow() -> None:
+    """Raise ImportError with install instructions when pyarrow is missing"""
+    try:
+        importlib.import_module("pyarrow")
+    except ImportError as error:
+        raise ImportError("Application analytics needs pyarrow, which is not installed: "
+                          "pip install pyarrow") from error
+
+
+def analytics_settings(analytics_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    settings = {**DEFAULT_ANALYTICS_CONFIG, **(analytics_config or {})}
+    if settings["format"] not in FILE_EXTENSIONS:
+        raise ValueError(f"Unknown analytics format: {settings['format']} (use one of {list(FILE_EXTENSIONS)})")
+    return settings
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.string()),
+        ("type", pa.string()),
+        ("status", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("vehicle_value", pa.float64()),
+        ("vehicle_age", pa.float64()),
+        ("loan_amount", pa.float64()),
+        ("vehicle_model", pa.string()),
+        ("has_guarantor", pa.bool_()),
+        ("has_seller", pa.bool_())
+    ])
+
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+
+
+def read_manifest(root: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def _write_manifest(root: str, manifest: Dict[str, Any]) -> None:
+    path = os.path.join(root, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def _empty_manifest(settings: Dict[str, Any]) -> Dict[str, Any]:
+    return {"version": MANIFEST_VERSION, "format": settings["format"], "applications": 0,
+            "last_id": None, "next_part": 0, "parts": {}}
+
+
+def _is_prefix(store: Any, manifest: Dict[str, Any]) -> bool:
+    """True if the compacted applications are still the first ones in the store"""
+    if not manifest["applications"]:
+        return True
+    last = next(store.iter_fields((), manifest["applications"] - 1), None)
+    return last is not None and last[0] == manifest["last_id"]
+
+
+def _strings(values: Sequence[Any]):
+    import pyarrow as pa
+
+    try:
+        return pa.array(values, pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):  # a value of another type in a hand-edited record
+        return pa.array([value if isinstance(value, str) else None for value in values], pa.string())
+
+
+def _floats(values: Sequence[Any]):
+    import pyarrow as pa
+
+    if not any(isinstance(value, (bool, str)) for value in values):
+        try:
+            return pa.array(values, pa.float64())
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    return pa.array([float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+                     for value in values], pa.float64())
+
+
+def _timestamps(strings):
+    import pyarrow as pa
+
+    try:
+        return strings.cast(pa.timestamp("us"))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        parsed = []
+        for value in strings.to_pylist():
+            try:
+                parsed.append(datetime.fromisoformat(value).replace(tzinfo=None) if value else None)
+            except ValueError:
+                parsed.append(None)
+        return pa.array(parsed, pa.timestamp("us"))
+
+
+def _given(values: Sequence[Any]):
+    """True where a TCKN was entered"""
+    import pyarrow.compute as pc
+
+    strings = _strings(values)
+    return pc.fill_null(pc.greater(pc.utf8_length(strings), 0), False)
+
+
+def rows_to_table(rows: List[tuple]):
+    """iter_fields rows (id + SOURCE_PATHS) as a table with a "day" column"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    raw = dict(zip(["id", *SOURCE_PATHS], zip(*rows)))
+    timestamps = _strings(raw["timestamp"])
+    columns = [_strings(raw["id"]), _strings(raw["type"]), _strings(raw["status"]), _timestamps(timestamps),
+               *(_floats(raw[name]) for name in NUMERIC_COLUMNS), _strings(raw["vehicle_model"]),
+               _given(raw["guarantor_tckn"]), _given(raw["seller_tckn"])]
+    table = pa.Table.from_arrays(columns, schema=_schema())
+    day = pc.utf8_slice_codeunits(timestamps, 0, 10)
+    day = pc.if_else(pc.equal(pc.utf8_length(day), 10), day, UNKNOWN_DAY)
+    return table.append_column("day", pc.fill_null(day, UNKNOWN_DAY))
+
+
+def _split_by_day(table) -> Iterable[Tuple[str, Any]]:
+    """(day, rows of that day without the day column), rows kept in store order"""
+    import pyarrow.compute as pc
+
+    table = table.sort_by("day")  # stable
+    counts = pc.value_counts(table.column("day"))  # in order of appearance, i.e. sorted
+    day_table = table.drop_columns(["day"])
+    offset = 0
+    for day, count in zip(counts.field("values").to_pylist(), counts.field("counts").to_pylist()):
+        yield day, day_table.slice(offset, count)
+        offset += count
+
+
+def _write_part(path: str, table, settings: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    if settings["format"] == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, tmp_path, compression=settings["compression"])
+    else:
+        import pyarrow.feather as feather
+
+        feather.write_feather(table, tmp_path, compression=settings["compression"])
+    os.replace(tmp_path, path)
+
+
+def _part_path(root: str, day: str, name: str) -> str:
+    return os.path.join(root, f"day={day}", name)
+
+
+def _read_parts(root: str, day: str, names: List[str], settings: Dict[str, Any]):
+    import pyarrow.dataset as ds
+
+    fmt = "parquet" if settings["format"] == "parquet" else "ipc"
+    return ds.dataset([_part_path(root, day, name) for name in names], format=fmt, schema=_schema()).to_table()
+
+
+def _remove_unlisted(root: str, manifest: Dict[str, Any]) -> int:
+    """Delete part files the manifest does not list (merged, rebuilt or left by a crash)"""
+    removed = 0
+    for entry in os.scandir(root):
+        if not entry.is_dir() or not entry.name.startswith("day="):
+            continue
+        listed = set(manifest["parts"].get(entry.name[len("day="):], ()))
+        for part in os.scandir(entry.path):
+            if part.name not in listed:
+                os.remove(part.path)
+                removed += 1
+        if not listed:
+            os.rmdir(entry.path)
+    return removed
+
+
+def compact(store: Any, analytics_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Bring the columnar copy under analytics_config["path"] up to date with the
+    store. Only applications added since the last run are read, unless the
+    store is no longer the one that was compacted (or the format changed), in
+    which case everything is rewritten.
+    """
+    require_pyarrow()
+    settings = analytics_settings(analytics_config)
+    root = settings["path"]
+    os.makedirs(root, exist_ok=True)
+    started = time.perf_counter()
+    with _FileLock(os.path.join(root, ".lock")):
+        manifest = read_manifest(root)
+        rebuilt = manifest is None or manifest["format"] != settings["format"] or not _is_prefix(store, manifest)
+        if rebuilt:
+            next_part = manifest["next_part"] if manifest else 0
+            manifest = {**_empty_manifest(settings), "next_part": next_part}
+
+        extension = FILE_EXTENSIONS[settings["format"]]
+        added = 0
+        touched = set()
+        rows = store.iter_fields(SOURCE_PATHS.values(), manifest["applications"])
+        while True:
+            batch = [row for _, row in zip(range(settings["batch_size"]), rows)]
+            if not batch:
+                break
+            for day, table in _split_by_day(rows_to_table(batch)):
+                name = f"part-{manifest['next_part']:05d}.{extension}"
+                _write_part(_part_path(root, day, name), table, settings)
+                manifest["parts"].setdefault(day, []).append(name)
+                manifest["next_part"] += 1
+                touched.add(day)
+            added += len(batch)
+            manifest["applications"] += len(batch)
+            manifest["last_id"] = batch[-1][0]
+
+        merged = 0
+        for day in sorted(touched):
+            names = manifest["parts"][day]
+            if len(names) > settings["max_parts_per_day"]:
+                name = f"part-{manifest['next_part']:05d}.{extension}"
+                _write_part(_part_path(root, day, name), _read_parts(root, day, names, settings), settings)
+                manifest["parts"][day] = [name]
+                manifest["next_part"] += 1
+                merged += 1
+
+        if added or rebuilt or merged:
+            _write_manifest(root, manifest)
+        removed = _remove_unlisted(root, manifest)
+    return {"added": added, "applications": manifest["applications"], "days": len(manifest["parts"]),
+            "parts": sum(len(names) for names in manifest["parts"].values()), "merged_days": merged,
+            "removed_files": removed, "rebuilt": rebuilt, "seconds": time.perf_counter() - started}
+
+
+class ApplicationAnalytics:
+    """
+    Aggregate queries over the files written by compact()
+
+    With ``cache_columns`` the columns read for a query stay in memory until
+    the next compaction, so repeated queries only aggregate. A query limited
+    to some days that is not cached yet reads just those days from disk.
+    """
+
+    def __init__(self, path: str = "analytics", cache_columns: bool = True):
+        require_pyarrow()
+        self.path = path
+        self.cache_columns = cache_columns
+        self._manifest_version = None
+        self._dataset = None
+        self._columns = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "ApplicationAnalytics":
+        return cls(analytics_settings((config or {}).get("analytics"))["path"])
+
+    def dataset(self):
+        """pyarrow dataset over the parts listed in the manifest, re-opened after a compaction"""
+        import pyarrow.dataset as ds
+
+        manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        try:
+            stat = os.stat(manifest_path)
+            version = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            version = None
+        if self._dataset is None or version != self._manifest_version:
+            manifest = read_manifest(self.path)
+            if manifest is None:
+                raise FileNotFoundError(f"No compacted applications in {self.path} (run: python analytics.py compact)")
+            files = [_part_path(self.path, day, name)
+                     for day, names in sorted(manifest["parts"].items()) for name in names]
+            fmt = "parquet" if manifest["format"] == "parquet" else "ipc"
+            self._dataset = ds.dataset(files, format=fmt, schema=_schema().append(_partitioning().schema.field(0)),
+                                       partitioning=_partitioning(), partition_base_dir=self.path)
+            self._manifest_version = version
+            self._columns = None
+        return self._dataset
+
+    def table(self, columns: Iterable[str], start: Optional[str] = None, end: Optional[str] = None,
+              app_type: Optional[str] = None):
+        """
+        The given columns for applications from day ``start`` to ``end``
+        (inclusive, "YYYY-MM-DD") and of one type. Applications without a
+        valid timestamp are only included when no day bounds are given.
+        """
+        import pyarrow.dataset as ds
+
+        columns = list(dict.fromkeys(columns))
+        condition = None
+        for expression in (ds.field("day") != UNKNOWN_DAY if start or end else None,
+                           ds.field("day") >= start if start else None,
+                           ds.field("day") <= end if end else None,
+                           ds.field("type") == app_type if app_type else None):
+            if expression is not None:
+                condition = expression if condition is None else condition & expression
+        dataset = self.dataset()
+        needed = [*columns, *(["day"] if start or end else []), *(["type"] if app_type else [])]
+        cached = self._columns
+        if cached is None or not set(needed) <= set(cached.column_names):
+            if not self.cache_columns or start or end:
+                return dataset.to_table(columns=columns, filter=condition)  # only the partitions of those days
+            loaded = cached.column_names if cached is not None else []
+            cached = self._columns = dataset.to_table(columns=list(dict.fromkeys([*loaded, *needed])))
+        table = cached if condition is None else cached.filter(condition)
+        return table.select(columns)
+
+    def aggregate(self, by: Sequence[str] = (), metrics: Sequence[tuple] = (([], "count_all"),),
+                  start: Optional[str] = None, end: Optional[str] = None,
+                  app_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Rows of ``by`` values and metrics, sorted by ``by``. Metrics are pyarrow
+        aggregations, e.g. ("loan_amount", "sum"), ("has_guarantor", "mean") or
+        ([], "count_all"); result columns are named "<column>_<function>".
+        """
+        columns = [*by, *(metric[0] for metric in metrics if metric[0])]
+        table = self.table(columns or ["id"], start, end, app_type)
+        result = table.group_by(list(by)).aggregate(list(metrics))
+        if by:
+            result = result.sort_by([(name, "ascending") for name in by])
+        return result.to_pylist()
+
+    def daily_volume(self, start: Optional[str] = None, end: Optional[str] = None,
+                     app_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = self.aggregate(["day", "type"], [([], "count_all"), ("loan_amount", "sum")], start, end, app_type)
+        return [{"day": row["day"], "type": row["type"], "applications": row["count_all"],
+                 "loan_amount": row["loan_amount_sum"]} for row in rows]
+
+    def loan_distribution(self, by: Sequence[str] = ("type",), quantiles: Sequence[float] = DEFAULT_QUANTILES,
+                          start: Optional[str] = None, end: Optional[str] = None,
+                          app_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Loan amount statistics per group; quantiles are t-digest estimates"""
+        import pyarrow.compute as pc
+
+        digest = pc.TDigestOptions(q=list(quantiles))
+        metrics = [("loan_amount", name) for name in ("count", "mean", "min", "max")]
+        if by:
+            metrics.append(("loan_amount", "tdigest", digest))
+        rows = []
+        for row in self.aggregate(by, metrics, start, end, app_type):
+            if by:
+                estimates = row["loan_amount_tdigest"]
+            else:  # without groups the aggregation keeps only the first quantile
+                estimates = pc.tdigest(self.table(["loan_amount"], start, end, app_type).column("loan_amount"),
+                                       options=digest).to_pylist()
+            rows.append({**{name: row[name] for name in by}, "count": row["loan_amount_count"],
+                         "mean": row["loan_amount_mean"], "min": row["loan_amount_min"],
+                         "max": row["loan_amount_max"],
+                         "quantiles": {f"p{q * 100:g}": value for q, value in zip(quantiles, estimates)}})
+        return rows
+
+    def histogram(self, column: str = "vehicle_age", bins: Union[int, Sequence[float], None] = None,
+                  by: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                  app_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Counts of ``column`` values per bin (optionally per ``by`` value).
+        ``bins`` is a number of equal-width bins or the bin edges; by default
+        one bin per whole number for vehicle_age and 10 bins otherwise.
+        Missing values are left out.
+        """
+        import numpy as np
+        import pyarrow.compute as pc
+
+        table = self.table([column, *([by] if by else [])], start, end, app_type)
+        table = table.filter(pc.is_valid(table.column(column)))
+        values = table.column(column).to_numpy()
+        if bins is None and column == "vehicle_age" and len(values):
+            bins = np.arange(0, values.max() + 2)
+        edges = np.histogram_bin_edges(values, bins=10 if bins is None else bins)
+        index = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+        inside = (values >= edges[0]) & (values <= edges[-1])
+        result = {"column": column, "edges": edges.tolist()}
+        if not by:
+            result["counts"] = np.bincount(index[inside], minlength=len(edges) - 1).tolist()
+            return result
+        groups = pc.dictionary_encode(table.column(by)).combine_chunks()
+        codes = groups.indices.fill_null(-1).to_numpy()
+        keep = inside & (codes >= 0)
+        counts = np.bincount(codes[keep] * (len(edges) - 1) + index[keep],
+                             minlength=len(groups.dictionary) * (len(edges) - 1))
+        counts = counts.reshape(len(groups.dictionary), len(edges) - 1)
+        result["counts"] = {name: counts[i].tolist()
+                            for i, name in sorted(enumerate(groups.dictionary.to_pylist()), key=lambda item: item[1])}
+        return result
+
+    def guarantor_rate(self, by: Sequence[str] = ("type",), start: Optional[str] = None,
+                       end: Optional[str] = None, app_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = self.aggregate(by, [([], "count_all"), ("has_guarantor", "sum")], start, end, app_type)
+        return [{**{name: row[name] for name in by}, "applications": row["count_all"],
+                 "with_guarantor": row["has_guarantor_sum"],
+                 "rate": row["has_guarantor_sum"] / row["count_all"] if row["count_all"] else 0.0}
+                for row in rows]
+
+
+def _print_rows(rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        print("(no applications)")
+        return
+    flat = [{key: (" ".join(f"{k}={v:,.0f}" for k, v in value.items()) if isinstance(value, dict) else value)
+             for key, value in row.items()} for row in rows]
+    text = [[f"{value:,.3f}" if isinstance(value, float) and value < 1 else
+             f"{value:,.0f}" if isinstance(value, (int, float)) and not isinstance(value, bool) else str(value)
+             for value in row.values()] for row in flat]
+    widths = [max(len(key), *(len(line[i]) for line in text)) for i, key in enumerate(flat[0])]
+    print("  ".join(key.ljust(width) for key, width in zip(flat[0], widths)))
+    for line in text:
+        print("  ".join(value.rjust(width) for value, width in zip(line, widths)))
+
+
+def _print_histogram(result: Dict[str, Any]) -> None:
+    edges = result["edges"]
+    groups = result["counts"] if isinstance(result["counts"], dict) else {result["column"]: result["counts"]}
+    labels = [f"[{low:.10g}, {high:.10g})" for low, high in zip(edges, edges[1:])]
+    labels[-1] = labels[-1][:-1] + "]"
+    width = max(len(label) for label in labels)
+    print(" " * width + "".join(f"{name:>12}" for name in groups))
+    for i, label in enumerate(labels):
+        print(label.ljust(width) + "".join(f"{counts[i]:>12,}" for counts in groups.values()))
+
+
+def main():
+    from application_store import create_application_store
+    from resources import get_config
+
+    parser = argparse.ArgumentParser(description="Columnar export of stored applications and aggregate queries")
+    parser.add_argument("--config", default="chatbot_config.json")
+    parser.add_argument("--out", help="Directory of the columnar files (default: analytics.path from config)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = commands.add_parser("compact", help="Export applications added since the last run")
+    compact_parser.add_argument("--backend", help="Application store backend (default: from config)")
+    compact_parser.add_argument("--path", help="Application store path (default: from config)")
+    compact_parser.add_argument("--format", choices=list(FILE_EXTENSIONS), help="File format (default: from config)")
+
+    queries = {
+        "daily": commands.add_parser("daily", help="Applications and loan amount per day and type"),
+        "loans": commands.add_parser("loans", help="Loan amount distribution"),
+        "histogram": commands.add_parser("histogram", help="Histogram of a numeric column"),
+        "guarantor": commands.add_parser("guarantor", help="Share of applications with a guarantor")
+    }
+    queries["loans"].add_argument("--by", default="type", help="Comma-separated group columns, '' for all")
+    queries["loans"].add_argument("--quantiles", default=",".join(f"{q:g}" for q in DEFAULT_QUANTILES))
+    queries["histogram"].add_argument("column", nargs="?", default="vehicle_age", choices=NUMERIC_COLUMNS)
+    queries["histogram"].add_argument("--bins", help="Number of bins or comma-separated edges")
+    queries["histogram"].add_argument("--by", help="Group column, e.g. type")
+    queries["guarantor"].add_argument("--by", default="type", help="Comma-separated group columns, '' for all")
+    for query in queries.values():
+        query.add_argument("--from", dest="start", help="First day, YYYY-MM-DD")
+        query.add_argument("--to", dest="end", help="Last day, YYYY-MM-DD")
+        query.add_argument("--type", dest="app_type", choices=["new", "used"])
+        query.add_argument("--json", help="Write the result to this file")
+    args = parser.parse_args()
+    try:
+        require_pyarrow()
+    except ImportError as error:
+        parser.exit(1, f"{error}\n")
+
+    config = get_config(args.config)
+    settings = analytics_settings(config.get("analytics"))
+    if args.out:
+        settings["path"] = args.out
+
+    if args.command == "compact":
+        storage = dict(config.get("storage") or {})
+        if args.backend:
+            storage["backend"] = args.backend
+        if args.path:
+            storage["path"] = args.path
+        if args.format:
+            settings["format"] = args.format
+        summary = compact(create_application_store(storage), settings)
+        print(f"{summary['added']:,} applications added in {summary['seconds']:.2f}s"
+              f"{' (rebuilt)' if summary['rebuilt'] else ''}: {summary['applications']:,} applications, "
+              f"{summary['days']:,} days, {summary['parts']:,} files in {settings['path']}")
+        return
+
+    analytics = ApplicationAnalytics(settings["path"])
+    try:
+        analytics.dataset()
+    except FileNotFoundError as error:
+        parser.exit(1, f"{error}\n")
+    filters = {"start": args.start, "end": args.end, "app_type": args.app_type}
+    started = time.perf_counter()
+    if args.command == "daily":
+        result = analytics.daily_volume(**filters)
+    elif args.command == "loans":
+        quantiles = [float(q) for q in args.quantiles.split(",") if q]
+        result = analytics.loan_distribution([name for name in args.by.split(",") if name], quantiles, **filters)
+    elif args.command == "histogram":
+        bins = None
+        if args.bins:
+            bins = [float(edge) for edge in args.bins.split(",")] if "," in args.bins else int(args.bins)
+        result = analytics.histogram(args.column, bins, args.by, **filters)
+    else:
+        result = analytics.guarantor_rate([name for name in args.by.split(",") if name], **filters)
+    seconds = time.perf_counter() - started
+
+    if args.command == "histogram":
+        _print_histogram(result)
+    else:
+        _print_rows(result)
+    print(f"({seconds * 1000:.1f} ms)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,601 @@
+"""
+Append-only application stores for the vehicle finance chatbot.
+
+Every store keeps applications keyed by their ``id`` and appends new records
+without rewriting what is already on disk, so saving an application costs the
+same no matter how many applications exist. Stores also maintain aggregate
+statistics (counts and loan-amount sums by type, status and day) at write time
+so the sidebar never has to scan the applications.
+
+Backends:
+    sqlite - single SQLite database in WAL mode (default)
+    jsonl  - directory of rotating JSONL segments with an id index
+    memory - in-process dict, nothing persisted (replay harness, benchmarks)
+
+Usage (migrating an old applications.json):
+    python application_store.py migrate applications.json --backend sqlite --path applications.db
+"""
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on O_APPEND single-write atomicity
+    fcntl = None
+
+
+DEFAULT_STORAGE_CONFIG = {
+    "backend": "sqlite",
+    "path": "applications.db",
+    "legacy_json_path": "applications.json"
+}
+
+
+STATS_DIMENSIONS = ("type", "status", "day")
+
+
+class DuplicateApplicationError(Exception):
+    """Raised when an application id already exists in the store"""
+
+
+def empty_stats() -> Dict[str, Any]:
+    """Aggregate statistics with nothing counted yet"""
+    stats = {"total": {"count": 0, "loan_amount_sum": 0}}
+    for dimension in STATS_DIMENSIONS:
+        stats[f"by_{dimension}"] = {}
+    return stats
+
+
+def _stats_keys(application: Dict[str, Any]) -> list:
+    """(dimension, key) pairs an application is counted under"""
+    return [
+        ("total", ""),
+        ("type", application.get("type") or "unknown"),
+        ("status", application.get("status") or "unknown"),
+        ("day", (application.get("timestamp") or "unknown")[:10])
+    ]
+
+
+def _loan_amount(application: Dict[str, Any]) -> float:
+    return (application.get("data") or {}).get("loan_amount") or 0
+
+
+def add_to_stats(stats: Dict[str, Any], application: Dict[str, Any]) -> None:
+    """Count one application into an aggregate built by empty_stats()"""
+    amount = _loan_amount(application)
+    for dimension, key in _stats_keys(application):
+        bucket = stats["total"] if dimension == "total" else \
+            stats[f"by_{dimension}"].setdefault(key, {"count": 0, "loan_amount_sum": 0})
+        bucket["count"] += 1
+        bucket["loan_amount_sum"] += amount
+
+
+class ApplicationStore:
+    """Base class for application stores"""
+
+    def append(self, application: Dict[str, Any]) -> None:
+        """Append a single application"""
+        raise NotImplementedError
+
+    def append_many(self, applications: Iterable[Dict[str, Any]]) -> int:
+        """Append several applications, skipping ids that already exist"""
+        added = 0
+        for application in applications:
+            try:
+                self.append(application)
+                added += 1
+            except DuplicateApplicationError:
+                pass
+        return added
+
+    def get(self, application_id: str) -> Optional[Dict[str, Any]]:
+        """Look up an application by id"""
+        raise NotImplementedError
+
+    def iter_applications(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over all stored applications in insertion order"""
+        raise NotImplementedError
+
+    def iter_fields(self, paths: Iterable[str], start: int = 0) -> Iterator[tuple]:
+        """
+        (id, value at each dotted path) for every application in insertion
+        order, from the ``start``-th one on; e.g. paths ["type",
+        "data.loan_amount"]. Missing values are None.
+        """
+        keys = [path.split(".") for path in paths]
+        for application in itertools.islice(self.iter_applications(), start, None):
+            row = [application.get("id")]
+            for path in keys:
+                value = application
+                for key in path:
+                    value = value.get(key) if isinstance(value, dict) else None
+                row.append(value)
+            yield tuple(row)
+
+    def is_empty(self) -> bool:
+        for _ in self.iter_applications():
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Read the maintained aggregate statistics"""
+        raise NotImplementedError
+
+    def stats_version(self) -> Any:
+        """Cheap token that changes whenever the stored data may have changed"""
+        raise NotImplementedError
+
+    def cached_stats(self) -> Dict[str, Any]:
+        """Aggregate statistics, re-read only when stats_version() changes"""
+        version = self.stats_version()
+        cached = getattr(self, "_stats_cache", None)
+        if cached is None or cached[0] != version:
+            cached = (version, self.stats())
+            self._stats_cache = cached
+        return cached[1]
+
+    def rebuild_stats(self) -> Dict[str, Any]:
+        """Recompute the aggregate from every stored application"""
+        stats = empty_stats()
+        for application in self.iter_applications():
+            add_to_stats(stats, application)
+        return stats
+
+    def close(self) -> None:
+        pass
+
+
+def _file_version(*paths: str) -> tuple:
+    version = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            version.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+
+class SqliteApplicationStore(ApplicationStore):
+    """SQLite store in WAL mode; the id column is the primary key"""
+
+    def __init__(self, path: str = "applications.db", timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Streamlit serves every session on its own thread, so each thread
+        # gets its own connection; WAL lets readers run next to the writer.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS applications ("
+                " id TEXT PRIMARY KEY,"
+                " type TEXT,"
+                " status TEXT,"
+                " timestamp TEXT,"
+                " record TEXT NOT NULL)"
+            )
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stats_missing = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'application_stats'"
+                ).fetchone() is None
+                if stats_missing:
+                    conn.execute(
+                        "CREATE TABLE application_stats ("
+                        " dimension TEXT NOT NULL,"
+                        " key TEXT NOT NULL,"
+                        " count INTEGER NOT NULL,"
+                        " loan_amount_sum REAL NOT NULL,"
+                        " PRIMARY KEY (dimension, key))"
+                    )
+                    # Databases written before the aggregate existed
+                    self._local.conn = conn
+                    self._write_stats(conn, self.iter_applications())
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _write_stats(conn: sqlite3.Connection, applications: Iterable[Dict[str, Any]]) -> None:
+        """Fold applications into the stats table inside the caller's transaction"""
+        deltas = {}
+        for application in applications:
+            amount = _loan_amount(application)
+            for key in _stats_keys(application):
+                count, total = deltas.get(key, (0, 0))
+                deltas[key] = (count + 1, total + amount)
+        conn.executemany(
+            "INSERT INTO application_stats (dimension, key, count, loan_amount_sum) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (dimension, key) DO UPDATE SET"
+            " count = count + excluded.count,"
+            " loan_amount_sum = loan_amount_sum + excluded.loan_amount_sum",
+            [(dimension, key, count, total) for (dimension, key), (count, total) in deltas.items()]
+        )
+
+    @staticmethod
+    def _row(application: Dict[str, Any]) -> tuple:
+        return (
+            application["id"],
+            application.get("type"),
+            application.get("status"),
+            application.get("timestamp"),
+            json.dumps(application, ensure_ascii=False)
+        )
+
+    def append(self, application: Dict[str, Any]) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO applications (id, type, status, timestamp, record) VALUES (?, ?, ?, ?, ?)",
+                self._row(application)
+            )
+            self._write_stats(conn, [application])
+            conn.execute("COMMIT")
+        except sqlite3.IntegrityError:
+            conn.execute("ROLLBACK")
+            raise DuplicateApplicationError(application["id"])
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def append_many(self, applications: Iterable[Dict[str, Any]]) -> int:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            added = []
+            for application in applications:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO applications (id, type, status, timestamp, record) VALUES (?, ?, ?, ?, ?)",
+                    self._row(application)
+                )
+                if cursor.rowcount:
+                    added.append(application)
+            self._write_stats(conn, added)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(added)
+
+    def get(self, application_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT record FROM applications WHERE id = ?", (application_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_applications(self) -> Iterator[Dict[str, Any]]:
+        for (record,) in self._connect().execute("SELECT record FROM applications ORDER BY rowid"):
+            yield json.loads(record)
+
+    def iter_fields(self, paths: Iterable[str], start: int = 0) -> Iterator[tuple]:
+        # json_extract reads the fields in SQLite, no JSON decoding per record in Python
+        paths = list(paths)
+        columns = "".join(", json_extract(record, ?)" for _ in paths)
+        yield from self._connect().execute(
+            f"SELECT id{columns} FROM applications ORDER BY rowid LIMIT -1 OFFSET ?",
+            [f"$.{path}" for path in paths] + [start])
+
+    def is_empty(self) -> bool:
+        return self._connect().execute("SELECT 1 FROM applications LIMIT 1").fetchone() is None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = empty_stats()
+        rows = self._connect().execute("SELECT dimension, key, count, loan_amount_sum FROM application_stats")
+        for dimension, key, count, total in rows:
+            bucket = {"count": count, "loan_amount_sum": total}
+            if dimension == "total":
+                stats["total"] = bucket
+            else:
+                stats[f"by_{dimension}"][key] = bucket
+        return stats
+
+    def stats_version(self) -> Any:
+        # Every commit touches the WAL file; checkpoints touch the database file
+        return _file_version(self.path, self.path + "-wal")
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class JsonlApplicationStore(ApplicationStore):
+    """
+    Directory of JSONL segments (segment-00001.jsonl, ...).
+
+    Records are only ever appended to the newest segment, which rolls over once
+    it reaches ``segment_max_bytes``. An in-memory index maps each id to its
+    segment and byte offset; it is built on first use and kept current by
+    reading only the bytes other writers appended since the last look. The
+    aggregate statistics live in stats.json, replaced atomically on each write.
+    """
+
+    def __init__(self, path: str = "applications", segment_max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.segment_max_bytes = segment_max_bytes
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = {}
+        self._scanned = {}  # segment name -> bytes already indexed
+
+    def _segments(self) -> list:
+        return sorted(name for name in os.listdir(self.path)
+                      if name.startswith("segment-") and name.endswith(".jsonl"))
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _refresh_index(self) -> None:
+        """Index records appended since the last refresh"""
+        for name in self._segments():
+            start = self._scanned.get(name, 0)
+            segment_path = self._segment_path(name)
+            if os.path.getsize(segment_path) <= start:
+                continue
+            with open(segment_path, "rb") as f:
+                f.seek(start)
+                offset = start
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # a writer is still mid-line
+                    application_id = json.loads(line).get("id")
+                    self._index[application_id] = (name, offset)
+                    offset += len(line)
+            self._scanned[name] = offset
+
+    def _drop_torn_tail(self, name: str) -> None:
+        """
+        Cut a partial last line off the segment. Called under the store lock,
+        where no writer can be mid-line, so it is left over from a crash;
+        appending after it would glue the next record onto the fragment.
+        """
+        segment_path = self._segment_path(name)
+        complete = self._scanned.get(name, 0)
+        if os.path.exists(segment_path) and os.path.getsize(segment_path) > complete:
+            with open(segment_path, "r+b") as f:
+                f.truncate(complete)
+
+    def _active_segment(self) -> str:
+        segments = self._segments()
+        if not segments:
+            return "segment-00001.jsonl"
+        last = segments[-1]
+        if os.path.getsize(self._segment_path(last)) >= self.segment_max_bytes:
+            number = int(last[len("segment-"):-len(".jsonl")]) + 1
+            return f"segment-{number:05d}.jsonl"
+        return last
+
+    def _locked(self):
+        return _FileLock(os.path.join(self.path, ".lock"))
+
+    @property
+    def _stats_path(self) -> str:
+        return os.path.join(self.path, "stats.json")
+
+    def _read_stats(self) -> Dict[str, Any]:
+        try:
+            with open(self._stats_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return self.rebuild_stats()
+
+    def _write_stats(self, stats: Dict[str, Any]) -> None:
+        tmp_path = self._stats_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(stats, f, ensure_ascii=False)
+        os.replace(tmp_path, self._stats_path)
+
+    def append(self, application: Dict[str, Any]) -> None:
+        self.append_many([application], skip_duplicates=False)
+
+    def append_many(self, applications: Iterable[Dict[str, Any]], skip_duplicates: bool = True) -> int:
+        added = 0
+        with self._lock, self._locked():
+            self._refresh_index()
+            stats = self._read_stats()
+            name = self._active_segment()
+            segment_path = self._segment_path(name)
+            self._drop_torn_tail(name)
+            with open(segment_path, "ab") as f:
+                offset = f.tell()
+                for application in applications:
+                    if application["id"] in self._index:
+                        if skip_duplicates:
+                            continue
+                        raise DuplicateApplicationError(application["id"])
+                    line = (json.dumps(application, ensure_ascii=False) + "\n").encode("utf-8")
+                    f.write(line)
+                    self._index[application["id"]] = (name, offset)
+                    offset += len(line)
+                    add_to_stats(stats, application)
+                    added += 1
+                f.flush()
+                os.fsync(f.fileno())
+            self._scanned[name] = offset
+            if added:
+                self._write_stats(stats)
+        return added
+
+    def get(self, application_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if application_id not in self._index:
+                self._refresh_index()
+            location = self._index.get(application_id)
+        if location is None:
+            return None
+        name, offset = location
+        with open(self._segment_path(name), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def iter_applications(self) -> Iterator[Dict[str, Any]]:
+        for name in self._segments():
+            with open(self._segment_path(name), "rb") as f:
+                for line in f:
+                    if line.endswith(b"\n"):
+                        yield json.loads(line)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._read_stats()
+
+    def stats_version(self) -> Any:
+        return _file_version(self._stats_path)
+
+
+class _FileLock:
+    """Exclusive advisory lock shared by all processes writing to a store"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+class MemoryApplicationStore(ApplicationStore):
+    """Keeps applications in process memory; ``path`` is ignored"""
+
+    def __init__(self, path: Optional[str] = None):
+        self._applications = {}
+        self._stats = empty_stats()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def append(self, application: Dict[str, Any]) -> None:
+        with self._lock:
+            if application["id"] in self._applications:
+                raise DuplicateApplicationError(application["id"])
+            self._applications[application["id"]] = application
+            add_to_stats(self._stats, application)
+            self._version += 1
+
+    def get(self, application_id: str) -> Optional[Dict[str, Any]]:
+        return self._applications.get(application_id)
+
+    def iter_applications(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            applications = list(self._applications.values())
+        return iter(applications)
+
+    def is_empty(self) -> bool:
+        return not self._applications
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    def stats_version(self) -> Any:
+        return self._version
+
+
+STORE_BACKENDS = {
+    "sqlite": SqliteApplicationStore,
+    "jsonl": JsonlApplicationStore,
+    "memory": MemoryApplicationStore
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def create_application_store(storage_config: Optional[Dict[str, Any]] = None) -> ApplicationStore:
+    """Create a store from the "storage" section of chatbot_config.json"""
+    storage_config = {**DEFAULT_STORAGE_CONFIG, **(storage_config or {})}
+    backend = storage_config["backend"]
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"Unknown application store backend: {backend}")
+    return STORE_BACKENDS[backend](storage_config["path"])
+
+
+def get_application_store(storage_config: Optional[Dict[str, Any]] = None) -> ApplicationStore:
+    """
+    Return the process-wide store for this configuration.
+
+    The first time a store is opened and found empty, applications from the
+    legacy applications.json file are migrated into it.
+    """
+    storage_config = {**DEFAULT_STORAGE_CONFIG, **(storage_config or {})}
+    key = (storage_config["backend"], os.path.abspath(storage_config["path"]))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = create_application_store(storage_config)
+            legacy_path = storage_config.get("legacy_json_path")
+            if legacy_path and os.path.exists(legacy_path) and store.is_empty():
+                migrate_json_applications(legacy_path, store)
+            _stores[key] = store
+        return store
+
+
+def migrate_json_applications(json_path: str, store: ApplicationStore) -> Dict[str, int]:
+    """
+    Copy applications from a legacy applications.json list into a store.
+
+    Safe to run more than once: ids already in the store are skipped. Ids that
+    repeat inside the legacy file (two saves in the same second) are kept by
+    suffixing the later copies.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        applications = json.load(f)
+
+    seen = {}
+    records = []
+    for application in applications:
+        application = dict(application)
+        base_id = application["id"]
+        count = seen.get(base_id, 0) + 1
+        seen[base_id] = count
+        if count > 1:
+            application["id"] = f"{base_id}_{count}"
+        records.append(application)
+
+    added = store.append_many(records)
+    return {"total": len(records), "migrated": added, "skipped": len(records) - added}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Application store tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="Migrate a legacy applications.json file")
+    migrate.add_argument("json_path", help="Path to applications.json")
+    migrate.add_argument("--backend", default=DEFAULT_STORAGE_CONFIG["backend"], choices=sorted(STORE_BACKENDS))
+    migrate.add_argument("--path", default=DEFAULT_STORAGE_CONFIG["path"], help="Store path")
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        store = create_application_store({"backend": args.backend, "path": args.path})
+        result = migrate_json_applications(args.json_path, store)
+        print(f"Migrated {result['migrated']} of {result['total']} applications "
+              f"({result['skipped']} already present) into {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Analytics benchmark.
+
+Fills an application store with ``--size`` synthetic applications spread
+over ``--days`` days and measures:
+
+    compact          - first analytics.compact() of the whole store
+    compact, +1%     - the next run after 1% more applications were added
+    queries          - every ApplicationAnalytics query, median of ``--repeat``
+                       runs on an already opened dataset and on a fresh one
+    json scan        - daily volume computed by reading every stored
+                       application, which is what the queries replace
+
+The daily volumes from the columnar files must match the scan.
+
+Usage:
+    python bench_analytics.py
+    python bench_analytics.py --size 2000000 --days 730 --format arrow
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from analytics import ApplicationAnalytics, compact, require_pyarrow
+from application_store import create_application_store
+from bench_validators import make_application
+
+
+def fill(store, start: int, count: int, size: int, days: int, rng) -> None:
+    first_day = datetime(2025, 1, 1, 9)
+    for offset in range(start, start + count, 50_000):
+        batch = []
+        for i in range(offset, min(start + count, offset + 50_000)):
+            application = make_application(i, rng, 50)
+            moment = first_day + timedelta(days=min(i * days // size, days - 1), seconds=rng.randrange(36_000))
+            application["timestamp"] = moment.isoformat()
+            batch.append(application)
+        store.append_many(batch)
+
+
+def json_scan_daily(store) -> dict:
+    volumes = defaultdict(lambda: [0, 0.0])
+    for application in store.iter_applications():
+        volume = volumes[(application["timestamp"][:10], application["type"])]
+        volume[0] += 1
+        volume[1] += application["data"]["loan_amount"]
+    return volumes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics benchmark")
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "jsonl", "memory"])
+    parser.add_argument("--format", default="parquet", choices=["parquet", "arrow"])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    try:
+        require_pyarrow()
+    except ImportError as error:
+        parser.exit(1, f"{error}\n")
+
+    rng = random.Random(0)
+    workdir = tempfile.mkdtemp(prefix="bench_analytics_")
+    try:
+        path = os.path.join(workdir, "applications.db" if args.backend == "sqlite" else "applications")
+        store = create_application_store({"backend": args.backend, "path": path})
+        start = time.perf_counter()
+        fill(store, 0, args.size, args.size, args.days, rng)
+        print(f"filled {args.size:,} applications over {args.days} days ({args.backend}) "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        settings = {"path": os.path.join(workdir, "analytics"), "format": args.format}
+        summary = compact(store, settings)
+        print(f"{'compact':<18} {summary['seconds']:8.2f}s {summary['added'] / summary['seconds']:>12,.0f} records/s "
+              f"({summary['parts']} files)")
+        extra = args.size // 100
+        fill(store, args.size, extra, args.size + extra, args.days, rng)
+        summary = compact(store, settings)
+        size_mb = sum(os.path.getsize(os.path.join(folder, name))
+                      for folder, _, names in os.walk(settings["path"]) for name in names) / 1e6
+        print(f"{'compact, +1%':<18} {summary['seconds']:8.2f}s {summary['added'] / summary['seconds']:>12,.0f} records/s "
+              f"({summary['parts']} files, {summary['merged_days']} days merged, {size_mb:.1f} MB)")
+
+        last_month = (datetime(2025, 1, 1) + timedelta(days=args.days - 30)).date().isoformat()
+        queries = {
+            "daily volume": lambda a: a.daily_volume(),
+            "daily, last 30d": lambda a: a.daily_volume(start=last_month),
+            "loans by type": lambda a: a.loan_distribution(),
+            "age histogram": lambda a: a.histogram("vehicle_age", by="type"),
+            "guarantor by day": lambda a: a.guarantor_rate(by=["day"]),
+        }
+        total = args.size + extra
+        print(f"{'query':<18} {'open':>9} {'fresh':>9}   over {total:,} applications")
+        analytics = ApplicationAnalytics(settings["path"])
+        for name, query in queries.items():
+            warm, cold = [], []
+            for _ in range(args.repeat):
+                begin = time.perf_counter()
+                query(analytics)
+                warm.append(time.perf_counter() - begin)
+                begin = time.perf_counter()
+                query(ApplicationAnalytics(settings["path"]))
+                cold.append(time.perf_counter() - begin)
+            print(f"{name:<18} {statistics.median(warm) * 1000:7.1f}ms {statistics.median(cold) * 1000:7.1f}ms")
+
+        begin = time.perf_counter()
+        expected = json_scan_daily(store)
+        print(f"{'json scan':<18} {(time.perf_counter() - begin) * 1000:7.0f}ms")
+        daily = {(row["day"], row["type"]): [row["applications"], row["loan_amount"]]
+                 for row in analytics.daily_volume()}
+        print(f"daily volumes same as scan: {daily == {key: list(value) for key, value in expected.items()}}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
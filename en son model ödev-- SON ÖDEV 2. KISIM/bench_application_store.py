@@ -0,0 +1,107 @@
+"""
+Save latency benchmark for the application stores.
+
+Pre-fills each store to a given size and then times individual saves, the same
+way VehicleFinanceChatbot.save_application calls them. The legacy
+read-modify-write of applications.json is measured for comparison on the
+smaller sizes.
+
+Usage:
+    python bench_application_store.py
+    python bench_application_store.py --sizes 100 1000 10000 100000 1000000 --backends sqlite jsonl
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from application_store import create_application_store
+
+
+def make_application(i: int) -> dict:
+    app_type = "new" if i % 2 == 0 else "used"
+    data = {"vehicle_value": 1000000 + i, "loan_amount": 400000}
+    if app_type == "new":
+        data["vehicle_model"] = "Fiat Egea"
+    else:
+        data["vehicle_age"] = 3
+        data["seller_tckn"] = None
+    return {
+        "id": f"APP_BENCH_{i:08d}",
+        "type": app_type,
+        "data": data,
+        "timestamp": datetime.now().isoformat(),
+        "status": "pending"
+    }
+
+
+def prefill(store, size: int, batch: int = 50000):
+    for start in range(0, size, batch):
+        store.append_many(make_application(i) for i in range(start, min(size, start + batch)))
+
+
+def legacy_save(path: str, application: dict):
+    """The original applications.json read-modify-write"""
+    applications = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            applications = json.load(f)
+    applications.append(application)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(applications, f, ensure_ascii=False, indent=2)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def time_saves(save, size: int, saves: int) -> list:
+    samples = []
+    for i in range(saves):
+        application = make_application(size + i)
+        start = time.perf_counter()
+        save(application)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Application store save latency benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000, 1000000])
+    parser.add_argument("--backends", nargs="+", default=["sqlite", "jsonl", "legacy_json"])
+    parser.add_argument("--saves", type=int, default=200, help="Timed saves per size")
+    parser.add_argument("--legacy-max-size", type=int, default=10000,
+                        help="Largest size to run the legacy applications.json path at")
+    args = parser.parse_args()
+
+    print(f"{'backend':<12} {'stored':>10} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+    for backend in args.backends:
+        for size in args.sizes:
+            if backend == "legacy_json" and size > args.legacy_max_size:
+                continue
+            workdir = tempfile.mkdtemp(prefix="bench_store_")
+            try:
+                if backend == "legacy_json":
+                    path = os.path.join(workdir, "applications.json")
+                    with open(path, "w", encoding="utf-8") as f:
+                        json.dump([make_application(i) for i in range(size)], f, ensure_ascii=False, indent=2)
+                    samples = time_saves(lambda a: legacy_save(path, a), size, min(args.saves, 20))
+                else:
+                    path = os.path.join(workdir, "applications.db" if backend == "sqlite" else "applications")
+                    store = create_application_store({"backend": backend, "path": path})
+                    prefill(store, size)
+                    samples = time_saves(store.append, size, args.saves)
+                    store.close()
+                print(f"{backend:<12} {size:>10,} {percentile(samples, 50):>9.3f} "
+                      f"{percentile(samples, 95):>9.3f} {statistics.mean(samples):>9.3f}")
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Per-step latency and allocation benchmark for VehicleFinanceChatbot.process_message.
+
+Every case puts a chatbot into one conversation step (by replaying a short
+script once and restoring that state before each call) and times the message
+that step handles. The LLM is fake_llm.FakeGenerativeModel and applications
+go to the in-memory store, so the step numbers are pure Python: "route" is
+the intent router alone, the percentiles cover the whole process_message
+call. Allocations are measured in a separate tracemalloc pass (peak and
+retained bytes per call) so tracing does not distort the timings.
+
+The persistence section repeats the saving step (confirmation -> "evet")
+against each storage backend, including the legacy applications.json
+rewrite, and reports the I/O cost on top of the in-memory baseline.
+
+Results can be written as JSON and compared with an earlier run; the script
+exits with status 1 when a case got slower than the tolerance allows.
+
+Usage:
+    python bench_conversation_steps.py --json steps.json
+    python bench_conversation_steps.py --baseline steps.json --tolerance 0.25
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List
+
+from application_store import STORE_BACKENDS, ApplicationStore
+from bench_application_store import legacy_save, make_application, percentile, prefill
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel
+from replay_conversations import STUB_ANSWER, replay_config
+from session_store import SessionState
+
+
+NEW_SCRIPT = ["merhaba", "yeni araç", "1.000.000", "Fiat Egea", "500000", "evet", "hayır"]
+USED_SCRIPT = ["merhaba", "ikinci el", "800000", "3", "300000", "yok", "evet", "hayır"]
+
+# (case name, messages that lead into the step, measured message)
+CASES = [
+    ("greeting", [], "merhaba"),
+    ("greeting/llm_stub", [], "bugün hava nasıl"),
+    ("determine_type", NEW_SCRIPT[:1], "yeni araç"),
+    ("collect_new_vehicle_info/value", NEW_SCRIPT[:2], "1.000.000"),
+    ("collect_new_vehicle_info/model", NEW_SCRIPT[:3], "Fiat Egea"),
+    ("collect_new_vehicle_info/loan", NEW_SCRIPT[:4], "500000"),
+    ("collect_used_vehicle_info/value", USED_SCRIPT[:2], "800000"),
+    ("collect_used_vehicle_info/age", USED_SCRIPT[:3], "3"),
+    ("collect_used_vehicle_info/loan", USED_SCRIPT[:4], "300000"),
+    ("collect_used_vehicle_info/seller_tckn", USED_SCRIPT[:5], "yok"),
+    ("confirmation/accept", NEW_SCRIPT[:5], "evet"),
+    ("confirmation/update", NEW_SCRIPT[:5], "hayır"),
+    ("update_selection", NEW_SCRIPT[:5] + ["hayır"], "1"),
+    ("update_field_input", NEW_SCRIPT[:5] + ["hayır", "1"], "1200000"),
+    ("hgs_offer", NEW_SCRIPT[:6], "hayır"),
+]
+
+SAVE_CASE = "confirmation/accept"
+PERSISTENCE_BACKENDS = ["memory", "sqlite", "jsonl", "legacy_json"]
+
+
+class LegacyJsonStore(ApplicationStore):
+    """The original whole-file rewrite of applications.json, for comparison"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def append(self, application: Dict[str, Any]) -> None:
+        legacy_save(self.path, application)
+
+    def is_empty(self) -> bool:
+        return not os.path.exists(self.path)
+
+
+def _bot_at(state: SessionState, model, config) -> VehicleFinanceChatbot:
+    bot = VehicleFinanceChatbot("bench", model=model, config=config)
+    bot.restore_state(state)
+    return bot
+
+
+def prepare_state(script: List[str], model, config) -> SessionState:
+    bot = VehicleFinanceChatbot("bench", model=model, config=config)
+    for message in script:
+        bot.process_message(message)
+    return bot.export_state()
+
+
+def time_case(state: SessionState, message: str, model, config, iterations: int) -> Dict[str, List[float]]:
+    route_us, call_us = [], []
+    for _ in range(min(iterations, 100)):  # warm-up
+        _bot_at(state, model, config).process_message(message)
+    gc.collect()
+    for _ in range(iterations):
+        bot = _bot_at(state, model, config)
+        start = time.perf_counter_ns()
+        bot.router.route(message)
+        route_us.append((time.perf_counter_ns() - start) / 1000)
+        start = time.perf_counter_ns()
+        bot.process_message(message)
+        call_us.append((time.perf_counter_ns() - start) / 1000)
+    return {"route": route_us, "call": call_us}
+
+
+def measure_allocations(state: SessionState, message: str, model, config, iterations: int) -> Dict[str, float]:
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            bot = _bot_at(state, model, config)
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            bot.process_message(message)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+    return {"alloc_peak_bytes": statistics.median(peaks), "alloc_retained_bytes": statistics.median(retained)}
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {"p50_us": percentile(samples, 50), "p95_us": percentile(samples, 95),
+            "p99_us": percentile(samples, 99), "mean_us": statistics.mean(samples)}
+
+
+def run_steps(config, model, iterations: int, alloc_iterations: int) -> Dict[str, Any]:
+    results = {}
+    for name, script, message in CASES:
+        state = prepare_state(script, model, config)
+        expected_step = name.split("/")[0]
+        if state.current_step != expected_step:
+            raise RuntimeError(f"{name}: script ended in step {state.current_step!r}")
+        timings = time_case(state, message, model, config, iterations)
+        results[name] = {
+            "route_p50_us": percentile(timings["route"], 50),
+            **summarize(timings["call"]),
+            **measure_allocations(state, message, model, config, alloc_iterations)
+        }
+    return results
+
+
+def run_persistence(base_config, model, iterations: int, prefill_size: int) -> Dict[str, Any]:
+    """Time the saving step against every backend, prefilled with ``prefill_size`` applications"""
+    STORE_BACKENDS.setdefault("legacy_json", LegacyJsonStore)
+    _, script, message = next(case for case in CASES if case[0] == SAVE_CASE)
+    results = {}
+    for backend in PERSISTENCE_BACKENDS:
+        workdir = tempfile.mkdtemp(prefix="bench_steps_")
+        try:
+            path = os.path.join(workdir, {"sqlite": "applications.db", "jsonl": "applications",
+                                          "legacy_json": "applications.json"}.get(backend, "memory"))
+            # Inline jobs so the save cost lands in the timed step, as before the job queue
+            config = dict(base_config, storage={"backend": backend, "path": path, "legacy_json_path": None},
+                          jobs={"mode": "inline", "durable_path": None, "outbox_path": None})
+            if backend == "legacy_json":
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump([make_application(i) for i in range(prefill_size)], f, ensure_ascii=False, indent=2)
+            elif backend != "memory":
+                prefill(STORE_BACKENDS[backend](path), prefill_size)
+            state = prepare_state(script, model, config)
+            runs = min(iterations, 50) if backend == "legacy_json" else iterations
+            results[backend] = summarize(time_case(state, message, model, config, runs)["call"])
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = results["memory"]["p50_us"]
+    for backend, row in results.items():
+        row["io_p50_us"] = max(row["p50_us"] - baseline, 0.0)
+    return results
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+            min_delta_us: float = 2.0) -> List[str]:
+    """
+    Cases whose p50 or p95 grew by more than ``tolerance`` (0.25 = 25%).
+
+    Differences below ``min_delta_us`` are timer noise on microsecond steps and are ignored.
+    """
+    regressions = []
+    for name, row in report["steps"].items():
+        old = baseline.get("steps", {}).get(name)
+        if not old:
+            continue
+        for key in ("p50_us", "p95_us"):
+            if old[key] and row[key] > old[key] * (1 + tolerance) and row[key] - old[key] >= min_delta_us:
+                regressions.append(f"{name} {key}: {old[key]:.1f} -> {row[key]:.1f} us")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{'step':<40} {'route':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'peak B':>9} {'kept B':>8}")
+    for name, row in report["steps"].items():
+        print(f"{name:<40} {row['route_p50_us']:>8.1f} {row['p50_us']:>8.1f} {row['p95_us']:>8.1f} "
+              f"{row['p99_us']:>8.1f} {row['alloc_peak_bytes']:>9,.0f} {row['alloc_retained_bytes']:>8,.0f}")
+    print("(times in microseconds)")
+    print()
+    print(f"saving step with {report['meta']['prefill']:,} stored applications")
+    print(f"{'backend':<14} {'p50':>10} {'p95':>10} {'p99':>10} {'I/O p50':>10}")
+    for backend, row in report["persistence"].items():
+        print(f"{backend:<14} {row['p50_us']:>10.1f} {row['p95_us']:>10.1f} {row['p99_us']:>10.1f} "
+              f"{row['io_p50_us']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-step process_message latency benchmark")
+    parser.add_argument("--config", default="chatbot_config.json")
+    parser.add_argument("--iterations", type=int, default=2000, help="Timed calls per step")
+    parser.add_argument("--alloc-iterations", type=int, default=200, help="Traced calls per step")
+    parser.add_argument("--prefill", type=int, default=1000, help="Applications stored before the save timings")
+    parser.add_argument("--json", dest="json_path", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing")
+    parser.add_argument("--min-delta-us", type=float, default=2.0, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    config = replay_config(args.config)
+    model = FakeGenerativeModel(STUB_ANSWER)
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "alloc_iterations": args.alloc_iterations,
+            "prefill": args.prefill
+        },
+        "steps": run_steps(config, model, args.iterations, args.alloc_iterations),
+        "persistence": run_persistence(config, model, args.iterations, args.prefill)
+    }
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_delta_us)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"    {line}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Replays FAQ-style questions through the local FAQ index.
+
+Each line of the transcript file is {"message": ..., "expected": <faq key or null>}.
+A question counts as an LLM call under the old routing when neither the model
+nor the interest-rate keyword answers catch it. The report shows how many of
+those calls the BM25 index answers locally, how many local answers hit the
+expected FAQ entry, and the lookup latency.
+
+Usage:
+    python bench_faq_index.py
+    python bench_faq_index.py --transcripts faq_questions.jsonl --min-score 3.0
+"""
+import argparse
+import json
+import time
+
+from faq_index import get_faq_index
+from intent_router import IntentRouter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAQ index replay report")
+    parser.add_argument("--transcripts", default="faq_questions.jsonl")
+    parser.add_argument("--config", default="chatbot_config.json")
+    parser.add_argument("--min-score", type=float, help="Override faq_index.min_score")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if args.min_score is not None:
+        config.setdefault("faq_index", {})["min_score"] = args.min_score
+
+    start = time.perf_counter()
+    index = get_faq_index(config)
+    build_ms = (time.perf_counter() - start) * 1000
+    router = IntentRouter.from_config(config)
+
+    with open(args.transcripts, "r", encoding="utf-8") as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+
+    llm_calls_before = 0
+    answered_locally = 0
+    correct = 0
+    wrong = []
+    latencies = []
+    for question in questions:
+        message = question["message"]
+        intents = router.route(message)
+        if "faq_models" in intents or "faq_rates" in intents:
+            continue
+        llm_calls_before += 1
+
+        start = time.perf_counter()
+        results = index.search(message, limit=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if results and results[0][0] >= index.min_score:
+            answered_locally += 1
+            if results[0][1][1] == question.get("expected"):
+                correct += 1
+            else:
+                wrong.append((message, results[0][1][1]))
+
+    latencies.sort()
+    print(f"index build:           {build_ms:.2f} ms ({len(index.entries)} entries)")
+    print(f"questions replayed:    {len(questions)}")
+    print(f"LLM calls before:      {llm_calls_before}")
+    if llm_calls_before:
+        print(f"answered by index:     {answered_locally} "
+              f"({answered_locally / llm_calls_before:.0%} of LLM calls avoided)")
+    if answered_locally:
+        print(f"correct local answers: {correct} ({correct / answered_locally:.0%})")
+    if latencies:
+        print(f"lookup latency:        p50 {latencies[len(latencies) // 2] * 1000:.0f} us, "
+              f"max {latencies[-1] * 1000:.0f} us")
+    for message, key in wrong:
+        print(f"  wrong match: {message!r} -> {key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Flow dispatch benchmark: compiled FlowEngine table vs. a step-by-step chain.
+
+The config is extended with ``--products`` synthetic products (each one
+more collection step and one more transition out of determine_type), and
+for each size the same mix of (step, intents) pairs is dispatched by:
+
+    chain    - the old _handle_step shape: compare the step name with each
+               step in turn, then test its transitions in order
+    table    - FlowEngine.dispatch(): one lookup for the step, one per intent
+    turn     - a whole VehicleFinanceChatbot.process_message() (routing, slot
+               extraction, validation) over a conversation applying for the
+               last synthetic product, with a fake LLM and no persistence
+
+Both dispatchers must pick the same transition or handler for every pair.
+
+Usage:
+    python bench_flow_engine.py
+    python bench_flow_engine.py --products 0 10 100 1000 --rounds 200000
+"""
+import argparse
+import copy
+import random
+import statistics
+import time
+
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel
+from flow_engine import FlowEngine
+from replay_conversations import REPLAY_OVERRIDES
+from resources import get_config
+from validators import ApplicationValidator
+
+CONVERSATION = ["merhaba", "{keyword} için başvuru", "2.000.000 TL", "Togg T10X", "1.000.000", "evet", "hayır"]
+
+
+def synthetic_config(base_config: dict, products: int) -> dict:
+    """``base_config`` with ``products`` more products, each started by the keyword kodNNNNx"""
+    config = copy.deepcopy(base_config)
+    config.update(copy.deepcopy(REPLAY_OVERRIDES))
+    flow = config.setdefault("flow", {})
+    flow_products = dict(flow.get("products") or {name: {} for name in config["finance_rules"]})
+    for i in range(products):
+        name = f"p{i:04d}"
+        config["intents"][f"type_{name}"] = [f"kod{i:04d}x"]
+        config["finance_rules"][name] = {"max_vehicle_value": 7000000, "max_loan_percentage": 0.6,
+                                         "required_fields": ["vehicle_value", "vehicle_model", "loan_amount"]}
+        flow_products[name] = {"label": f"Ürün {i}", "start_message": f"Ürün {i} için araç değeri nedir?"}
+    flow["products"] = flow_products
+    return config
+
+
+def chain_dispatcher(flow: FlowEngine):
+    """Dispatch by walking the steps and their transitions in order, like an if/elif chain"""
+    chain = [(name, [(intent, transition) for intent, (_, transition)
+                     in sorted(step.on.items(), key=lambda item: item[1][0])], step.handler, step.otherwise)
+             for name, step in flow.steps.items()]
+    default = [(intent, transition) for intent, (_, transition)
+               in sorted(flow.default.on.items(), key=lambda item: item[1][0])]
+
+    def dispatch(step_name, intents):
+        for name, transitions, handler, otherwise in chain:
+            if name == step_name:
+                for intent, transition in transitions:
+                    if intent in intents:
+                        return transition, None
+                if handler is not None:
+                    return None, handler
+                return otherwise, None
+        for intent, transition in default:
+            if intent in intents:
+                return transition, None
+        return None, None
+
+    return dispatch
+
+
+def workload(flow: FlowEngine, size: int, rng: random.Random) -> list:
+    steps = list(flow.steps) + ["end"]
+    product_intents = [product.intent for product in flow.products.values()]
+    intent_sets = [(), ("greeting",), ("confirm_accept",), ("confirm_update",), ("hgs_decline", "faq_rates"),
+                   ("update_accept",), ("model_question",), ("exit",), ("cancel", "greeting")]
+    pairs = []
+    for _ in range(size):
+        intents = rng.choice(intent_sets)
+        if rng.random() < 0.2:
+            intents = (rng.choice(product_intents),)
+        pairs.append((rng.choice(steps), frozenset(intents)))
+    return pairs
+
+
+def ns_per_dispatch(dispatch, pairs: list, rounds: int) -> float:
+    repeat = max(1, rounds // len(pairs))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for step, intents in pairs:
+            dispatch(step, intents)
+    return (time.perf_counter() - start) / (repeat * len(pairs)) * 1e9
+
+
+def ms_per_turn(config: dict, keyword: str, conversations: int) -> float:
+    model = FakeGenerativeModel("Bu bir test yanıtıdır.")
+    samples = []
+    for _ in range(conversations):
+        bot = VehicleFinanceChatbot("bench", config=config, model=model)
+        for message in CONVERSATION:
+            start = time.perf_counter()
+            bot.process_message(message.format(keyword=keyword))
+            samples.append((time.perf_counter() - start) * 1000)
+        assert bot.current_step == "end", bot.current_step
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flow dispatch benchmark")
+    parser.add_argument("--config", default="chatbot_config.json")
+    parser.add_argument("--products", type=int, nargs="+", default=[0, 10, 100, 1000],
+                        help="Synthetic products added to the config, one run per value")
+    parser.add_argument("--rounds", type=int, default=500_000, help="Dispatches timed per run")
+    parser.add_argument("--conversations", type=int, default=50)
+    args = parser.parse_args()
+
+    base_config = get_config(args.config, VehicleFinanceChatbot._create_default_config)
+    rng = random.Random(0)
+    print(f"{'products':>8} {'steps':>6} {'compile':>9} {'chain':>10} {'table':>10} {'turn':>9}")
+    for products in args.products:
+        config = synthetic_config(base_config, products)
+        start = time.perf_counter()
+        flow = FlowEngine.from_config(config, ApplicationValidator.from_config(config).rules)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        pairs = workload(flow, 10_000, rng)
+        chain = chain_dispatcher(flow)
+        mismatches = sum(chain(step, intents) != flow.dispatch(step, intents) for step, intents in pairs)
+        if mismatches:
+            raise SystemExit(f"{mismatches} dispatches differ between the chain and the table")
+        chain_ns = ns_per_dispatch(chain, pairs, args.rounds)
+        table_ns = ns_per_dispatch(flow.dispatch, pairs, args.rounds)
+
+        keyword = f"kod{products - 1:04d}x" if products else "yeni araç"
+        turn_ms = ms_per_turn(config, keyword, args.conversations)
+        print(f"{len(flow.products):>8} {len(flow.steps):>6} {compile_ms:7.1f}ms {chain_ns:8.0f}ns {table_ns:8.0f}ns "
+              f"{turn_ms:7.3f}ms")
+    print("(chain and table: mean per dispatch; turn: median process_message)")
+
+
+if __name__ == "__main__":
+    main()
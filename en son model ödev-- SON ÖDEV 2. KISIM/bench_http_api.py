@@ -0,0 +1,162 @@
+"""
+Throughput benchmark: HTTP API (http_api.py) vs. the Streamlit rerun path.
+
+The API server is started as a subprocess with the stub LLM backend and
+in-memory sessions. ``--connections`` keep-alive clients then replay synthetic
+conversations (replay_conversations.generate_conversations), each one
+creating a session and posting its messages. The benchmark reports requests
+per second and latency percentiles.
+
+The Streamlit path runs chatbot.py under streamlit.testing's AppTest. Every
+message is a full script rerun (CSS, sidebar, stats, history), which is what
+a Streamlit process pays per message. Both sides use the same config with
+the "stub" LLM backend, so nothing leaves the machine. Script runs hold the
+GIL, so one process serves about 1 / mean rerun time messages per second.
+
+Usage:
+    python bench_http_api.py
+    python bench_http_api.py --connections 128 --conversations 5000 --streamlit-messages 0
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_application_store import percentile
+from replay_conversations import generate_conversations
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+async def http_request(reader, writer, method: str, path: str, payload=None):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length)) if length else None
+
+
+async def run_clients(host: str, port: int, conversations, connections: int) -> dict:
+    queue = asyncio.Queue()
+    for conversation in conversations:
+        queue.put_nowait(conversation)
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while not queue.empty():
+                conversation = queue.get_nowait()
+                start = time.perf_counter()
+                status, body = await http_request(reader, writer, "POST", "/sessions")
+                latencies.append((time.perf_counter() - start) * 1000)
+                if status != 201:
+                    errors += 1
+                    continue
+                token = body["session_token"]
+                for message in conversation["messages"]:
+                    start = time.perf_counter()
+                    status, body = await http_request(reader, writer, "POST", f"/sessions/{token}/messages",
+                                                      {"message": message})
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if status != 200:
+                        errors += 1
+                    elif body["session_token"]:
+                        token = body["session_token"]
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return {"requests": len(latencies), "errors": errors, "elapsed": elapsed, "latencies": latencies}
+
+
+def bench_api(conversations, connections: int, workdir: str) -> dict:
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "http_api.py"), "--config", os.path.join(workdir, "chatbot_config.json"),
+         "--port", "0", "--session-backend", "memory"],
+        cwd=workdir, stdout=subprocess.PIPE, text=True)
+    try:
+        line = server.stdout.readline()
+        host, port = line.rsplit("//", 1)[1].strip().split(":")
+        return asyncio.run(run_clients(host, int(port), conversations, connections))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def bench_streamlit(messages, workdir: str) -> list:
+    from streamlit.testing.v1 import AppTest
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        app = AppTest.from_file(os.path.join(HERE, "chatbot.py"), default_timeout=60)
+        app.session_state.api_key_validated = True
+        app.session_state.api_key = "offline"
+        app.run()
+        latencies = []
+        for message in messages:
+            start = time.perf_counter()
+            app.chat_input[0].set_value(message).run()
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+    finally:
+        os.chdir(cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP API vs. Streamlit throughput benchmark")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--streamlit-messages", type=int, default=100,
+                        help="Messages sent through the Streamlit script (0 = skip)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_api_")
+    with open(os.path.join(HERE, "chatbot_config.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+    config["llm"] = {**config.get("llm", {}), "backend": "stub"}
+    config["rate_limits"] = {"enabled": False}
+    config["transcript_log"] = {"enabled": False}
+    with open(os.path.join(workdir, "chatbot_config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    try:
+        conversations = generate_conversations(args.conversations)
+        api = bench_api(conversations, args.connections, workdir)
+        samples = api["latencies"]
+        print(f"HTTP API: {api['requests']:,} requests over {args.connections} connections "
+              f"in {api['elapsed']:.2f}s ({api['errors']} errors)")
+        print(f"    {api['requests'] / api['elapsed']:,.0f} req/s, p50 {percentile(samples, 50):.2f} ms, "
+              f"p95 {percentile(samples, 95):.2f} ms, p99 {percentile(samples, 99):.2f} ms")
+
+        if args.streamlit_messages:
+            # "iptal" resets the finished conversation before the next one starts
+            messages = [m for c in conversations for m in ["iptal"] + c["messages"]][:args.streamlit_messages]
+            samples = bench_streamlit(messages, workdir)
+            mean = statistics.mean(samples)
+            print(f"Streamlit: {len(samples)} messages, one full script rerun each")
+            print(f"    ~{1000 / mean:,.0f} req/s per process, p50 {percentile(samples, 50):.2f} ms, "
+                  f"p95 {percentile(samples, 95):.2f} ms, p99 {percentile(samples, 99):.2f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
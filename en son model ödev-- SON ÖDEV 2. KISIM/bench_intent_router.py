@@ -0,0 +1,129 @@
+"""
+Routing throughput benchmark: compiled IntentRouter vs. the old keyword chain.
+
+The legacy function below repeats the ``any(word in message for word in [...])``
+checks process_message used to run for a message at a given step, which only
+looks at the lists relevant to that step. The router answers every intent at
+once, so it is also compared with running the old checks for all intents.
+Everything is timed over the same message/step mix in messages per second.
+
+Usage:
+    python bench_intent_router.py
+    python bench_intent_router.py --rounds 20000
+"""
+import argparse
+import json
+import time
+
+from intent_router import DEFAULT_EXACT_INTENTS, DEFAULT_INTENT_KEYWORDS, IntentRouter
+
+MESSAGES = [
+    ("greeting", "Merhaba, araç kredisi almak istiyorum"),
+    ("greeting", "selam"),
+    ("determine_type", "Yeni araç almak istiyorum"),
+    ("determine_type", "İkinci el bir araba bakıyorum"),
+    ("collect_new_vehicle_info", "Aracın fiyatı 1.250.000 TL"),
+    ("collect_new_vehicle_info", "Hangi modeller için kredi veriyorsunuz?"),
+    ("collect_used_vehicle_info", "kasko değeri 900 bin"),
+    ("confirmation", "Evet, bilgiler doğru onaylıyorum"),
+    ("confirmation", "hayır bir şeyi değiştirmek istiyorum"),
+    ("update_selection", "evet"),
+    ("update_selection", "2"),
+    ("hgs_offer", "hayır istemem teşekkürler"),
+    ("end", "faiz oranları ne kadar, vade kaç ay olabiliyor?"),
+    ("end", "görüşürüz"),
+]
+
+
+def legacy_route(message: str, step: str) -> set:
+    """The keyword checks process_message used to run for one message"""
+    lower = message.strip().lower()
+    intents = set()
+    if any(word in lower for word in ['çık', 'çıkış', 'quit', 'exit', 'bye', 'görüşürüz', 'hoşça kal', 'bitir', 'kapat']):
+        return {"exit"}
+    if any(word in lower for word in ['iptal', 'sıfırla', 'yeniden başla', 'restart', 'baştan', 'temizle']):
+        return {"cancel"}
+    if step == "greeting":
+        if any(word in lower for word in ["merhaba", "selam", "iyi", "başla"]):
+            intents.add("greeting")
+    elif step == "determine_type":
+        if "yeni" in lower:
+            intents.add("type_new")
+        elif any(word in lower for word in ["ikinci", "2.", "eski", "kullanılmış"]):
+            intents.add("type_used")
+    elif step == "collect_new_vehicle_info":
+        if any(word in message for word in ["hangi", "model", "marka", "tür", "neler"]):
+            intents.add("model_question")
+        if any(word in message for word in ["ticari", "kamyon", "minibüs", "otobüs"]):
+            intents.add("commercial_vehicle")
+    elif step == "collect_used_vehicle_info":
+        if any(word in message for word in ["hayır", "yok", "istemiyorum", "gerek yok"]):
+            intents.add("tckn_decline")
+    elif step == "confirmation":
+        if any(word in lower for word in ["hayır", "hayir", "güncelle", "guncelle", "değiştir", "degistir"]):
+            intents.add("confirm_update")
+        elif any(word in lower for word in ["evet", "onayla", "tamam"]):
+            intents.add("confirm_accept")
+    elif step == "hgs_offer":
+        if any(word in lower for word in ["evet", "isterim", "almak", "olsun"]):
+            intents.add("hgs_accept")
+        elif any(word in lower for word in ["hayır", "hayir", "istemem", "olmasın", "yok"]):
+            intents.add("hgs_decline")
+    elif step == "update_selection":
+        if lower in ["hayır", "hayir", "yok", "istemiyorum"]:
+            intents.add("update_decline")
+        elif lower in ["evet", "yes", "istiyorum"]:
+            intents.add("update_accept")
+    else:
+        if any(word in lower for word in ["hangi model", "model", "marka", "araç türü"]):
+            intents.add("faq_models")
+        if any(word in lower for word in ["faiz", "oran", "vade"]):
+            intents.add("faq_rates")
+    return intents
+
+
+def legacy_all_intents(message: str, keywords: dict, exact: dict) -> set:
+    """The old substring/equality checks evaluated for every intent"""
+    lower = message.strip().lower()
+    intents = {intent for intent, words in keywords.items() if any(word in lower for word in words)}
+    intents.update(intent for intent, phrases in exact.items() if lower in phrases)
+    return intents
+
+
+def throughput(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for step, message in MESSAGES:
+            func(message, step)
+    return rounds * len(MESSAGES) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent routing throughput benchmark")
+    parser.add_argument("--rounds", type=int, default=5000)
+    parser.add_argument("--config", default="chatbot_config.json")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    start = time.perf_counter()
+    router = IntentRouter.from_config(config)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    keywords = {**DEFAULT_INTENT_KEYWORDS, **config.get("intents", {})}
+    exact = {**DEFAULT_EXACT_INTENTS, **config.get("exact_intents", {})}
+
+    legacy = throughput(legacy_route, args.rounds)
+    legacy_all = throughput(lambda message, step: legacy_all_intents(message, keywords, exact), args.rounds)
+    compiled = throughput(lambda message, step: router.route(message), args.rounds)
+
+    print(f"router build time:          {build_ms:.2f} ms")
+    print(f"legacy chain (step lists):  {legacy:>12,.0f} msg/s")
+    print(f"legacy chain (all intents): {legacy_all:>12,.0f} msg/s")
+    print(f"compiled router:            {compiled:>12,.0f} msg/s "
+          f"({compiled / legacy:.2f}x step lists, {compiled / legacy_all:.2f}x all intents)")
+
+
+if __name__ == "__main__":
+    main()
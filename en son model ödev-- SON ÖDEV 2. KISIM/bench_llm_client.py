@@ -0,0 +1,101 @@
+"""
+Traffic-spike benchmark for the resilient LLM client against the local stub server.
+
+Fires ``--requests`` simultaneous questions from a thread pool (one thread per
+Streamlit session) at a stub backend that injects slow responses and errors,
+first calling the model directly as generate_response used to, then through
+llm_client with deadlines, retries, the concurrency limit and the circuit
+breaker. A final phase takes the backend fully down to show the breaker
+failing fast.
+
+Usage:
+    python bench_llm_client.py
+    python bench_llm_client.py --requests 300 --slow-rate 0.1 --error-rate 0.2
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_client import LLMUnavailableError, get_llm_client
+from stub_llm_server import StubLLMServer, StubServerModel, StubSettings
+
+
+def run_spike(call, requests: int) -> dict:
+    outcomes = {"ok": 0, "fallback": 0, "error": 0}
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            call(f"soru {i}")
+            outcome = "ok"
+        except LLMUnavailableError:
+            outcome = "fallback"
+        except Exception:
+            outcome = "error"
+        return outcome, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        for outcome, latency in pool.map(one, range(requests)):
+            outcomes[outcome] += 1
+            latencies.append(latency)
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+    return {**outcomes, "p50": pct(50), "p95": pct(95), "p99": pct(99), "max": latencies[-1] * 1000}
+
+
+def report(name: str, result: dict):
+    print(f"{name:<18} ok={result['ok']:<4} fallback={result['fallback']:<4} error={result['error']:<4} "
+          f"p50={result['p50']:8.0f} ms  p95={result['p95']:8.0f} ms  "
+          f"p99={result['p99']:8.0f} ms  max={result['max']:8.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM client traffic-spike benchmark")
+    parser.add_argument("--requests", type=int, default=150)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=8000)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    settings = StubSettings(args.latency_ms, args.jitter_ms, args.slow_rate, args.slow_ms, args.error_rate)
+    with StubLLMServer(settings) as server:
+        model = StubServerModel(server.url)
+        client = get_llm_client(model, {
+            "timeout_seconds": 1.0,
+            "total_timeout_seconds": 2.5,
+            "max_retries": 2,
+            "backoff_base_seconds": 0.05,
+            "backoff_max_seconds": 0.5,
+            "max_concurrency": args.max_concurrency,
+            "breaker_failure_threshold": 50,
+            "breaker_reset_seconds": 5.0
+        })
+
+        print(f"stub: {args.latency_ms:.0f}+{args.jitter_ms:.0f} ms, {args.slow_rate:.0%} take {args.slow_ms:.0f} ms, "
+              f"{args.error_rate:.0%} fail; {args.requests} simultaneous requests")
+        report("direct call", run_spike(lambda p: model.generate_content(p).text, args.requests))
+        report("llm_client", run_spike(client.generate, args.requests))
+
+        settings.error_rate = 1.0
+        outage_client = get_llm_client(model, {
+            "timeout_seconds": 1.0,
+            "total_timeout_seconds": 2.5,
+            "max_retries": 1,
+            "backoff_base_seconds": 0.05,
+            "max_concurrency": args.max_concurrency,
+            "breaker_failure_threshold": 5,
+            "breaker_reset_seconds": 30.0
+        })
+        report("outage, breaker", run_spike(outage_client.generate, args.requests))
+        print(f"breaker state after outage: {outage_client.gate.breaker.state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Load test for single-flight coalescing of identical LLM requests.
+
+Simulates a campaign spike: ``--requests`` sessions (one thread each, like
+Streamlit script threads) ask the same opening questions at the same moment.
+Each question is sent in a few spellings ("Kredi kartı borcum var, başvurabilir
+miyim?", "kredi karti borcum var basvurabilir miyim", ...), which normalize to
+the same key. Every session runs VehicleFinanceChatbot.generate_response
+against the "stub" LLM backend with ``--latency-ms`` before the first token
+and the response cache switched off, once with coalescing disabled and once
+enabled. The report shows upstream model calls, coalesced requests and
+latency percentiles.
+
+Usage:
+    python bench_single_flight.py
+    python bench_single_flight.py --requests 500 --questions 3 --latency-ms 800 --stream
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_application_store import percentile
+from chatbot_engine import VehicleFinanceChatbot
+from llm_client import coalescing_stats
+from resources import get_config
+
+
+QUESTIONS = [
+    ["Kredi kartı borcum var, başvurabilir miyim?", "kredi kartı borcum var başvurabilir miyim",
+     "KREDİ KARTI BORCUM VAR, BAŞVURABİLİR MİYİM??"],
+    ["Emekliyim, araç kredisi alabilir miyim?", "emekliyim araç kredisi alabilir miyim",
+     "Emekliyim araç kredisi alabilir miyim ?"],
+    ["Başka bankada kredim varsa sorun olur mu?", "başka bankada kredim varsa sorun olur mu",
+     "Başka bankada kredim varsa, sorun olur mu?"],
+    ["Elektrikli araçlar için farklı koşullar var mı?", "elektrikli araçlar için farklı koşullar var mı",
+     "ELEKTRİKLİ ARAÇLAR İÇİN FARKLI KOŞULLAR VAR MI?"],
+    ["Başvurum reddedilirse tekrar başvurabilir miyim?", "başvurum reddedilirse tekrar başvurabilir miyim",
+     "Başvurum reddedilirse, tekrar başvurabilir miyim?"]
+]
+
+
+def bench_config(base_config: dict, latency_ms: float, coalesce: bool) -> dict:
+    return dict(
+        base_config,
+        llm={**base_config.get("llm", {}), "backend": "stub", "stub_first_token_delay": latency_ms / 1000,
+             "stub_response": "Değerlendirme gelir ve kredi geçmişinize göre yapılır; başvurunuzu yapabilirsiniz."},
+        llm_client={**base_config.get("llm_client", {}), "coalesce": coalesce, "max_concurrency": 64,
+                    "timeout_seconds": 30.0, "total_timeout_seconds": 60.0},
+        response_cache={"enabled": False},
+        rate_limits={"enabled": False},
+        transcript_log={"enabled": False},
+        faq_index={**base_config.get("faq_index", {}), "enabled": False}
+    )
+
+
+def run_spike(config: dict, messages: list, stream: bool) -> dict:
+    bot = VehicleFinanceChatbot("bench", config=config)
+    backend = bot.model
+    calls_before = backend.stats()["calls"]
+    flights_before = coalescing_stats()
+    start_barrier = threading.Barrier(len(messages))
+
+    def one(message):
+        chatbot = VehicleFinanceChatbot("bench", config=config)
+        start_barrier.wait()
+        start = time.perf_counter()
+        if stream:
+            "".join(chatbot.generate_response_stream(message))
+        else:
+            chatbot.generate_response(message)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(messages)) as pool:
+        latencies = list(pool.map(one, messages))
+    elapsed = time.perf_counter() - start
+    flights = coalescing_stats()
+    return {
+        "requests": len(messages),
+        "upstream_calls": backend.stats()["calls"] - calls_before,
+        "coalesced": flights["coalesced"] - flights_before["coalesced"],
+        "max_waiters": flights["max_waiters"],
+        "elapsed": elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies)
+    }
+
+
+def report(name: str, result: dict) -> None:
+    print(f"{name:<14} requests={result['requests']:<5} upstream={result['upstream_calls']:<5} "
+          f"coalesced={result['coalesced']:<5} wall={result['elapsed']:6.2f}s  "
+          f"p50={result['p50']:7.0f} ms  p99={result['p99']:7.0f} ms  max={result['max']:7.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-flight LLM coalescing load test")
+    parser.add_argument("--config", default="chatbot_config.json")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=len(QUESTIONS), help="Distinct questions in the spike")
+    parser.add_argument("--latency-ms", type=float, default=500, help="Stub time to first token")
+    parser.add_argument("--stream", action="store_true", help="Use generate_response_stream")
+    args = parser.parse_args()
+
+    base_config = get_config(args.config, VehicleFinanceChatbot._create_default_config)
+    variants = [spelling for question in QUESTIONS[:args.questions] for spelling in question]
+    messages = [variants[i % len(variants)] for i in range(args.requests)]
+
+    print(f"{args.requests} simultaneous requests, {args.questions} distinct questions "
+          f"({len(variants)} spellings), stub latency {args.latency_ms:.0f} ms"
+          f"{', streaming' if args.stream else ''}")
+    report("no coalescing", run_spike(bench_config(base_config, args.latency_ms, False), messages, args.stream))
+    report("single flight", run_spike(bench_config(base_config, args.latency_ms, True), messages, args.stream))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Cold start benchmark for the Streamlit app (chatbot.py).
+
+Every run starts a fresh Python process in a scratch directory holding a
+copy of the config (stores, sessions and caches inside the scratch
+directory) and drives chatbot.py with streamlit.testing's AppTest:
+
+    import streamlit  - the Streamlit package itself
+    import app        - the modules chatbot.py imports at the top
+    first render      - first run of the script: the API key page
+    rerun             - the same page again
+    chat page         - ``--think-ms`` later the key is accepted and the chat
+                        page is shown
+    first answer      - the user sends "merhaba"; this builds the chatbot
+                        and its LLM backend (for Gemini: imports the SDK
+                        unless the background warm-up already did)
+
+It also reports whether the LLM SDK was already imported by the first
+render (it should not be). Run with ``--no-warm-up`` to see the first answer
+without resources.warm_up.
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py --runs 10 --think-ms 0 --no-warm-up --json startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from chatbot_engine import VehicleFinanceChatbot
+from resources import get_config
+
+
+CHILD = r"""
+import json, sys, time
+app_dir, think_ms = sys.argv[1], float(sys.argv[2])
+sys.path.insert(0, app_dir)
+timings = {}
+
+start = time.perf_counter()
+import streamlit
+timings["import streamlit"] = time.perf_counter() - start
+
+start = time.perf_counter()
+import resources, session_store, telemetry, ui_assets
+timings["import app"] = time.perf_counter() - start
+
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(app_dir + "/chatbot.py", default_timeout=120)
+start = time.perf_counter()
+app.run()
+timings["first render"] = time.perf_counter() - start
+sdk_at_first_render = "google.generativeai" in sys.modules
+
+start = time.perf_counter()
+app.run()
+timings["rerun"] = time.perf_counter() - start
+
+time.sleep(think_ms / 1000)
+app.session_state.api_key_validated = True
+app.session_state.api_key = "bench-key"
+start = time.perf_counter()
+app.run()
+timings["chat page"] = time.perf_counter() - start
+
+start = time.perf_counter()
+app.chat_input[0].set_value("merhaba").run()
+timings["first answer"] = time.perf_counter() - start
+
+errors = [str(e.value) for e in app.exception]
+print(json.dumps({"timings": timings, "sdk_at_first_render": sdk_at_first_render, "errors": errors}))
+"""
+
+
+def scratch_config(base_config: dict, workdir: str, warm_up: bool, llm_backend: str) -> dict:
+    config = json.loads(json.dumps(base_config))
+    for section, key in [("storage", "path"), ("storage", "legacy_json_path"), ("sessions", "path"),
+                         ("jobs", "durable_path"), ("jobs", "outbox_path"),
+                         ("response_cache", "persist_path"), ("resources", "api_key_cache_path"),
+                         ("transcript_log", "path")]:
+        if config.get(section, {}).get(key):
+            config[section][key] = os.path.join(workdir, os.path.basename(config[section][key]))
+    config["resources"] = {**config.get("resources", {}), "warm_up": warm_up}
+    if llm_backend:
+        config["llm"] = {**config.get("llm", {}), "backend": llm_backend}
+    return config
+
+
+def run_once(app_dir: str, base_config: dict, warm_up: bool, llm_backend: str, think_ms: float) -> dict:
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        with open(os.path.join(workdir, "chatbot_config.json"), "w", encoding="utf-8") as f:
+            json.dump(scratch_config(base_config, workdir, warm_up, llm_backend), f, ensure_ascii=False, indent=2)
+        proc = subprocess.run([sys.executable, "-c", CHILD, app_dir, str(think_ms)], cwd=workdir,
+                              capture_output=True, text=True, check=True)
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark for chatbot.py")
+    parser.add_argument("--config", default="chatbot_config.json")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to measure")
+    parser.add_argument("--think-ms", type=float, default=1500, help="Pause before the first message")
+    parser.add_argument("--no-warm-up", action="store_true", help="Disable resources.warm_up")
+    parser.add_argument("--llm-backend", help="Override the llm backend (default: as configured)")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file")
+    args = parser.parse_args()
+
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    base_config = get_config(args.config, VehicleFinanceChatbot._create_default_config)
+    runs = [run_once(app_dir, base_config, not args.no_warm_up, args.llm_backend, args.think_ms)
+            for _ in range(args.runs)]
+
+    backend = args.llm_backend or base_config.get("llm", {}).get("backend", "gemini")
+    print(f"{args.runs} cold starts, llm backend {backend}, warm-up {'off' if args.no_warm_up else 'on'}, "
+          f"first message after {args.think_ms:.0f} ms")
+    print(f"{'phase':<18} {'median':>9} {'min':>9} {'max':>9}")
+    summary = {}
+    for phase in runs[0]["timings"]:
+        values = [run["timings"][phase] * 1000 for run in runs]
+        summary[phase] = {"median_ms": statistics.median(values), "min_ms": min(values), "max_ms": max(values)}
+        print(f"{phase:<18} {statistics.median(values):9.1f} {min(values):9.1f} {max(values):9.1f}")
+    print("(times in milliseconds)")
+    sdk_loaded = sum(run["sdk_at_first_render"] for run in runs)
+    print(f"LLM SDK imported by the first render: {sdk_loaded}/{args.runs} runs")
+    errors = [error for run in runs for error in run["errors"]]
+    if errors:
+        print(f"app errors: {errors[:3]}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"backend": backend, "warm_up": not args.no_warm_up, "think_ms": args.think_ms,
+                       "phases": summary, "sdk_at_first_render": sdk_loaded, "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
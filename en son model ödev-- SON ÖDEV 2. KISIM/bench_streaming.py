@@ -0,0 +1,62 @@
+"""
+Time-to-first-token benchmark for streamed vs. blocking responses.
+
+Runs VehicleFinanceChatbot against fake_llm.FakeGenerativeModel, which waits
+``--first-token-ms`` before the first word and ``--token-ms`` between words,
+and compares when the user sees the first text: after the whole completion
+(generate_response) or after the first chunk (generate_response_stream).
+
+Usage:
+    python bench_streaming.py
+    python bench_streaming.py --first-token-ms 400 --token-ms 30 --words 120
+"""
+import argparse
+import statistics
+import time
+
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming time-to-first-token benchmark")
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--words", type=int, default=80)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    model = FakeGenerativeModel(
+        response=" ".join(["kelime"] * args.words),
+        first_token_delay=args.first_token_ms / 1000,
+        token_delay=args.token_ms / 1000
+    )
+    bot = VehicleFinanceChatbot("offline", model=model)
+    bot.response_cache = None  # every run has to reach the model
+    message = "Elektrikli araçlar için kampanyanız var mı?"
+
+    blocking, first_chunk, streamed_total = [], [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        bot.generate_response(message)
+        blocking.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        first = None
+        for _chunk in bot.generate_response_stream(message):
+            if first is None:
+                first = time.perf_counter() - start
+        streamed_total.append(time.perf_counter() - start)
+        first_chunk.append(first)
+
+    def ms(samples):
+        return statistics.median(samples) * 1000
+
+    print(f"model: {args.first_token_ms:.0f} ms to first token, {args.token_ms:.0f} ms/token, {args.words} words")
+    print(f"blocking  first text after: {ms(blocking):8.1f} ms")
+    print(f"streaming first text after: {ms(first_chunk):8.1f} ms")
+    print(f"streaming complete after:   {ms(streamed_total):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Transcript log benchmark.
+
+    chat turns     - per-turn latency of process_message() over generated
+                     conversations (fake LLM, no persistence) with the
+                     transcript log off and on; the exported conversations
+                     must replay the same messages
+    request path   - cost of TranscriptLog.log() for ``--turns`` turns,
+                     against writing each turn to a JSONL file as it happens
+                     (with and without fsync)
+    writer         - turns per second flush() serializes, compresses and
+                     writes, and bytes per turn on disk and as plain JSON
+    backpressure   - the writer is stalled while turns keep coming: the
+                     buffer must stay at ``max_buffer`` and log() must not
+                     slow down; the rest is dropped and counted
+    reader         - turns per second read_turns() streams back, and what is
+                     left of a segment cut in the middle of a batch
+
+Usage:
+    python bench_transcript_log.py
+    python bench_transcript_log.py --turns 2000000 --conversations 5000 --compression none
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel
+from replay_conversations import REPLAY_OVERRIDES, STUB_ANSWER, generate_conversations, percentile
+from resources import get_config
+from transcript_log import (TranscriptLog, conversations, get_transcript_log, read_segment, read_turns,
+                            segment_paths)
+
+
+def run_chat(config: dict, generated: list) -> list:
+    """Per-turn latencies (ms) of every generated conversation, one session each"""
+    model = FakeGenerativeModel(STUB_ANSWER)
+    latencies = []
+    for conversation in generated:
+        bot = VehicleFinanceChatbot("bench", config=config, model=model, session_id=conversation["id"])
+        for message in conversation["messages"]:
+            start = time.perf_counter()
+            bot.process_message(message)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def naive_us_per_turn(path: str, turns: list, fsync: bool) -> float:
+    """Open, append one line and close for every turn, as a logger without a buffer would"""
+    start = time.perf_counter()
+    for turn in turns:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+    return (time.perf_counter() - start) / len(turns) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcript log benchmark")
+    parser.add_argument("--config", default="chatbot_config.json")
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=1_000_000)
+    parser.add_argument("--compression", default="gzip", choices=["gzip", "none"])
+    parser.add_argument("--max-buffer", type=int, default=20000)
+    args = parser.parse_args()
+
+    base_config = dict(get_config(args.config, VehicleFinanceChatbot._create_default_config))
+    base_config.update(REPLAY_OVERRIDES)
+    workdir = tempfile.mkdtemp(prefix="bench_transcripts_")
+    try:
+        # --- chat turns ---
+        generated = generate_conversations(args.conversations)
+        log_dir = os.path.join(workdir, "chat")
+        # Unredacted, so the exported conversations can be compared with the generated ones
+        logged_config = dict(base_config, transcript_log={"enabled": True, "path": log_dir,
+                                                         "compression": args.compression, "redact_tckn": False})
+        off = run_chat(base_config, generated)
+        on = run_chat(logged_config, generated)
+        get_transcript_log(logged_config["transcript_log"]).close()
+        # An exit splits a session into several exported conversations
+        received = {}
+        for conversation in conversations(read_turns(log_dir)):
+            received.setdefault(conversation["id"].rsplit("-", 1)[0], []).extend(conversation["messages"])
+        same = received == {conversation["id"]: conversation["messages"] for conversation in generated}
+        print(f"chat turns: {len(on):,} over {len(generated):,} conversations")
+        for name, samples in [("log off", off), ("log on", on)]:
+            print(f"  {name:<8} median {statistics.median(samples):.3f} ms, p99 {percentile(samples, 99):.3f} ms")
+        print(f"  exported conversations same as sent: {same}")
+
+        turns = list(read_turns(log_dir))
+        turns = (turns * (args.turns // len(turns) + 1))[:args.turns]
+
+        # --- request path and writer ---
+        # Without the writer thread, so log() and the batch writes are timed apart
+        transcript_log = TranscriptLog(os.path.join(workdir, "log"), compression=args.compression,
+                                       max_buffer=len(turns), background=False)
+        start = time.perf_counter()
+        for turn in turns:
+            transcript_log.log(turn)
+        request_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        transcript_log.flush()
+        writer_seconds = time.perf_counter() - start
+        transcript_log.close()
+        stats = transcript_log.stats()
+        sample = turns[:100_000]
+        raw_bytes = sum(len(json.dumps(turn, ensure_ascii=False, separators=(",", ":")).encode("utf-8")) + 1
+                        for turn in sample)
+        print(f"request path: {len(turns):,} turns")
+        print(f"  log()          {request_seconds / len(turns) * 1e6:8.2f} us/turn")
+        print(f"  append+close   {naive_us_per_turn(os.path.join(workdir, 'naive.jsonl'), turns[:20_000], False):8.2f} us/turn")
+        print(f"  append+fsync   {naive_us_per_turn(os.path.join(workdir, 'fsync.jsonl'), turns[:2_000], True):8.2f} us/turn")
+        print(f"writer: {stats['written'] / writer_seconds:,.0f} turns/s, {stats['batches']:,} batches, "
+              f"{len(segment_paths(transcript_log.path))} segments")
+        print(f"  {stats['bytes'] / stats['written']:.0f} bytes/turn on disk, {raw_bytes / len(sample):.0f} as JSON "
+              f"(synthetic conversations repeat a lot; expect less with real ones)")
+
+        # --- backpressure ---
+        stalled = TranscriptLog(os.path.join(workdir, "stalled"), compression=args.compression,
+                                max_buffer=args.max_buffer)
+        burst = turns[:args.max_buffer * 5]
+        with stalled._write_lock:  # the disk stops answering
+            start = time.perf_counter()
+            accepted = sum(stalled.log(turn) for turn in burst)
+            stalled_us = (time.perf_counter() - start) / len(burst) * 1e6
+            buffered = stalled.stats()["buffered"]
+        stalled.close()
+        print(f"backpressure: {len(burst):,} turns while the writer is stalled: {accepted:,} kept, "
+              f"{stalled.stats()['dropped']:,} dropped, buffer {buffered:,}/{args.max_buffer:,}, "
+              f"log() {stalled_us:.2f} us/turn")
+
+        # --- reader ---
+        start = time.perf_counter()
+        count = sum(1 for _ in read_turns(transcript_log.path))
+        seconds = time.perf_counter() - start
+        print(f"reader: {count:,} turns in {seconds:.2f}s ({count / seconds:,.0f} turns/s)")
+        segment = segment_paths(transcript_log.path)[-1]
+        cut = os.path.join(workdir, "cut" + segment[segment.index("."):])
+        with open(segment, "rb") as source, open(cut, "wb") as target:
+            data = source.read()
+            target.write(data[:len(data) - 100])
+        complete = sum(1 for _ in read_segment(segment))
+        print(f"  segment cut 100 bytes short: {sum(1 for _ in read_segment(cut)):,} of {complete:,} turns readable")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 import streamlit as st
+import hmac
+import importlib
 import json
-import re
 import os
-import google.generativeai as genai
-from datetime import datetime
-from typing import Dict, Any, Optional
-import time
+from typing import Iterator
+
+from resources import get_config, warm_up
+from resources import validate_api_key as validate_api_key_cached
+from session_store import SessionBusy, get_session_store, new_session_id, session_from_token, session_token
+from telemetry import get_telemetry, telemetry_settings
+from ui_assets import (API_KEY_HELP, COMMANDS_INFO, FEATURES_HTML, HEADER_HTML, NEW_VEHICLE_INFO, PAGE_CSS,
+                       USED_VEHICLE_INFO, chat_message_html)
 
 # Page configuration
 st.set_page_config(
@@ -15,925 +20,216 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        background: #2c3e50;
-        padding: 2rem;
-        border-radius: 10px;
-        color: #ffffff;
-        text-align: center;
-        margin-bottom: 2rem;
-        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
-        font-weight: 600;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-    }
-
-    .main-header h1 {
-        color: #ffffff;
-        margin-bottom: 0.5rem;
-        font-size: 2.5rem;
-    }
-
-    .main-header p {
-        color: #ecf0f1;
-        font-size: 1.1rem;
-        margin: 0;
-    }
-
-    .chat-message {
-        padding: 1rem 1.5rem;
-        border-radius: 10px;
-        margin: 1rem 0;
-        border-left: 4px solid #3498db;
-        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
-        font-size: 1rem;
-        line-height: 1.5;
-        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
-    }
-
-    .user-message {
-        background-color: #ffffff;
-        border-left-color: #3498db;
-        color: #2c3e50;
-    }
-
-    .user-message strong {
-        color: #2980b9;
-    }
-
-    .bot-message {
-        background-color: #f8f9fa;
-        border-left-color: #27ae60;
-        color: #2c3e50;
-    }
-
-    .bot-message strong {
-        color: #27ae60;
-    }
-
-    .info-card {
-        background: #ffffff;
-        padding: 2rem;
-        border-radius: 10px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        margin: 1rem 0;
-        border: 1px solid #e9ecef;
-    }
-
-    .info-card h3 {
-        color: #2c3e50;
-        margin-bottom: 1rem;
-        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
-    }
-
-    .info-card ul {
-        color: #495057;
-        line-height: 1.6;
-    }
-
-    .info-card li {
-        margin-bottom: 0.5rem;
-    }
-
-    .status-success {
-        background-color: #d4edda;
-        border: 1px solid #c3e6cb;
-        color: #155724;
-        padding: 1rem;
-        border-radius: 8px;
-        margin: 1rem 0;
-        font-weight: 500;
-    }
-
-    .status-error {
-        background-color: #f8d7da;
-        border: 1px solid #f5c6cb;
-        color: #721c24;
-        padding: 1rem;
-        border-radius: 8px;
-        margin: 1rem 0;
-        font-weight: 500;
-    }
-
-    .metric-card {
-        background: #3498db;
-        color: #ffffff;
-        padding: 1rem;
-        border-radius: 8px;
-        text-align: center;
-        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
-        font-weight: 600;
-    }
-
-    /* Streamlit component styling */
-    .stButton > button {
-        background-color: #3498db;
-        color: #ffffff;
-        border: none;
-        border-radius: 6px;
-        padding: 0.5rem 1rem;
-        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
-        font-weight: 500;
-        transition: all 0.3s ease;
-    }
-
-    .stButton > button:hover {
-        background-color: #2980b9;
-        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.2);
-    }
-
-    .stTextInput > div > div > input {
-        border-radius: 6px;
-        border: 2px solid #e9ecef;
-        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
-    }
-
-    .stTextInput > div > div > input:focus {
-        border-color: #3498db;
-        box-shadow: 0 0 0 0.2rem rgba(52, 152, 219, 0.25);
-    }
-
-    /* Sidebar styling */
-    .css-1d391kg {
-        background-color: #f8f9fa;
-    }
-
-    /* Main content area */
-    .css-18e3th9 {
-        padding-top: 2rem;
-    }
-
-    /* Chat input styling */
-    .stChatInput > div {
-        background-color: #ffffff;
-        border: 2px solid #e9ecef;
-        border-radius: 25px;
-    }
-
-    .stChatInput > div:focus-within {
-        border-color: #3498db;
-        box-shadow: 0 0 0 0.2rem rgba(52, 152, 219, 0.25);
-    }
-
-    .stChatInput input {
-        color: #2c3e50 !important;
-        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif !important;
-        background-color: #ffffff !important;
-        font-size: 16px !important;
-    }
-
-    .stChatInput input::placeholder {
-        color: #6c757d !important;
-    }
-
-    .stChatInput textarea {
-        color: #2c3e50 !important;
-        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif !important;
-        background-color: #ffffff !important;
-        font-size: 16px !important;
-    }
-
-    .stChatInput textarea::placeholder {
-        color: #6c757d !important;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-
-class VehicleFinanceChatbot:
-    def __init__(self, api_key: str, config_file: str = "chatbot_config.json"):
-        """Initialize the chatbot"""
-        # Configure Gemini API
-        genai.configure(api_key=api_key)
-        # Changed to free model: gemini-2.5-flash-preview-05-20
-        self.model = genai.GenerativeModel('gemini-2.5-flash-preview-05-20')
-
-        # Load configuration file
-        try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
-        except FileNotFoundError:
-            # Create default config if file doesn't exist
-            self.config = self._create_default_config()
-            self._save_config(config_file)
-
-        # Store user data
-        self.user_data = {}
-        self.current_step = "greeting"
-        self.application_type = None  # "new" or "used"
-
-    def _create_default_config(self):
-        """Create default configuration"""
-        return {
-            "finance_rules": {
-                "new": {
-                    "max_vehicle_value": 7000000,
-                    "max_financing_ratio": 0.6,
-                    "guarantor_threshold": 5000000
-                },
-                "used": {
-                    "max_vehicle_age": 5,
-                    "max_financing_ratio": 0.4,
-                    "max_loan_amount": 3000000
-                }
-            },
-            "faq": {
-                "supported_brands": "Tüm marka ve modeller (ticari araçlar hariç)",
-                "interest_rates": "Güncel piyasa koşullarına göre belirlenir",
-                "loan_terms": "12-60 ay vade seçenekleri"
-            }
-        }
+# Custom CSS for better styling (built once per process in ui_assets)
+st.markdown(PAGE_CSS, unsafe_allow_html=True)
 
-    def _save_config(self, config_file: str):
-        """Save configuration to file"""
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=2)
-
-    def get_system_prompt(self) -> str:
-        """
-        Generate system prompt for the AI model
-
-        🔧 SYSTEM PROMPT CUSTOMIZATION POINT:
-        Modify this method to change how the AI responds to users.
-        You can adjust the personality, rules, or response style here.
-        """
-        return f"""
-        # ARAÇ FİNANSMANI UZMANI SİSTEM PROMPT
-
-        ## ROL VE KİMLİK
-        Sen profesyonel bir banka araç finansmanı uzmanısın. İsmin "Araç Finansman Asistanı" ve müşterilere araç kredisi konusunda kapsamlı yardım sağlıyorsun. Deneyimli, güvenilir ve çözüm odaklı bir yaklaşımın var.
-
-        ## TEMEL İLKELER
-        ### İletişim Tarzı:
-        - Her zaman Türkçe konuş ve saygılı bir dil kullan
-        - Samimi ama profesyonel bir ton benimse
-        - Müşterinin seviyesine uygun açıklamalar yap
-        - Emojileri uygun yerlerde kullan (💡, ✅, ❌, 🚗, 💰)
-
-        ### Yanıt Kalitesi:
-        - Kısa, net ve anlaşılır yanıtlar ver
-        - Teknik terimleri basit Türkçe ile açıkla
-        - Her yanıtta bir sonraki adımı belirt
-        - Belirsizlik durumunda soru sor
-
-        ## GÖREV KAPSAMI
-        ### ANA SORUMLULUKLARIN:
-        1. **Araç finansmanı başvuru süreci** - Adım adım rehberlik
-        2. **Kredi koşulları bilgilendirme** - Faiz, vade, teminat açıklamaları
-        3. **Uygunluk değerlendirmesi** - Gerçek zamanlı kontroller
-        4. **Dokümantasyon rehberliği** - Gerekli evrak listesi
-        5. **Çapraz satış fırsatları** - HGS, sigorta vb. ürün önerileri
-
-        ### KONU DIŞI DURUMLAR:
-        Araç finansmanı dışındaki konularda:
-        - Kibar bir şekilde konu dışı olduğunu belirt
-        - Mümkünse araç finansmanı ile bağlantı kur
-        - Genel sohbette samimi ama odakta kal
-        - Örnek: "Bu konu uzmanlık alanım dışında ama araç finansmanı için size nasıl yardımcı olabilirim? 🚗"
-
-        ## FİNANSMAN KURALLARI VE LİMİTLER
-        {json.dumps(self.config['finance_rules'], ensure_ascii=False, indent=2)}
-
-        ## SIK SORULAN SORULAR VE YANITLAR
-        {json.dumps(self.config['faq'], ensure_ascii=False, indent=2)}
-
-        ## DOĞRULAMA VE GÜVENLİK
-        ### Kesinlikle YAPMA:
-        - Kişisel verileri (TCKN, telefon, adres) paylaşma veya kaydetme
-        - Gerçek faiz oranları ve kesin meblağlar vermek (güncel değişken bilgiler)
-        - Müşteri adına karar vermek
-        - Yanıltıcı veya yanlış bilgi vermek
-
-        ### Her Zaman YAP:
-        - Girilen verileri anında doğrula
-        - Hata durumunda net açıklama yap
-        - Güvenlik uyarılarını belirt
-        - Şüpheli durumlarda şubeye yönlendir
-
-        ## KONUŞMA AKIŞI YÖNETİMİ
-        ### Başlangıç:
-        - Sıcak karşılama ve kendini tanıt
-        - Hizmet seçeneklerini sun (yeni/ikinci el)
-        - Süreci kısaca açıkla
-
-        ### Bilgi Toplama:
-        - Her seferinde tek bilgi iste
-        - Girilen bilgiyi onaylayarak tekrarla
-        - Doğrulama hatalarını anında bildir
-        - İlerleme durumunu göster
-
-        ### Sonlandırma:
-        - Başvuru özetini detaylı sun
-        - Çapraz satış teklifi yap
-        - Teşekkür et ve yeni başvuru için davet et
-
-        ## HATA YÖNETİMİ
-        Teknik sorun durumunda:
-        "Üzgünüm, sistemde geçici bir sorun yaşanıyor. Lütfen şu bilgiyi tekrar girebilir misiniz? Sorun devam ederse şubelerimizden destek alabilirsiniz. 🔧"
-
-        Kural ihlali durumunda:
-        "Bu işlem kurallarımıza uymuyor. [Sebep açıklaması]. Alternatif çözüm: [Öneri] 💡"
-
-        ## PERFORMANS HEDEFLERİ
-        - Müşteri memnuniyeti odaklı yaklaşım
-        - Hızlı ve doğru bilgi sağlama
-        - Başvuru tamamlama oranını artırma
-        - Çapraz satış fırsatlarını değerlendirme
-
-        Şimdi müşteriyle doğal, yardımsever ve profesyonel bir sohbet başlat!
-        """
-
-    def validate_data(self, field: str, value: Any, app_type: str) -> tuple[bool, str]:
-        """Validate input data"""
-        rules = self.config['finance_rules'][app_type]
-
-        if field == "vehicle_value":
-            if app_type == "new":
-                if value > 7000000:
-                    return False, "7M TL üzeri araçlar için başvuru yapılamaz"
-            return True, ""
-
-        elif field == "vehicle_age":
-            if app_type == "used" and value > 5:
-                return False, "5 yaş üstü araçlar için başvuru oluşturulamaz"
-            return True, ""
-
-        elif field == "loan_amount":
-            vehicle_value = self.user_data.get('vehicle_value', 0)
-            if app_type == "new":
-                max_amount = vehicle_value * 0.6
-                if value > max_amount:
-                    return False, f"Araç fiyatının en fazla %60'ı ({max_amount:,.0f} TL) talep edilebilir"
-            else:  # used
-                max_amount = min(vehicle_value * 0.4, 3000000)
-                if value > max_amount:
-                    return False, f"Araç kasko değerinin en fazla %40'ı veya 3M TL ({max_amount:,.0f} TL) talep edilebilir"
-            return True, ""
-
-        elif field == "tckn":
-            if not re.match(r'^\d{11}$', str(value)):
-                return False, "TCKN 11 haneli olmalıdır"
-            return True, ""
-
-        return True, ""
-
-    def extract_info_from_text(self, text: str, expected_type: str) -> Optional[Any]:
-        """Extract information from text"""
-        if expected_type == "number":
-            # Find numbers
-            numbers = re.findall(r'\b\d+(?:\.\d+)?\b', text.replace(',', '').replace('.', ''))
-            return int(numbers[0]) if numbers else None
-        elif expected_type == "tckn":
-            # Find TCKN
-            tckn = re.findall(r'\b\d{11}\b', text)
-            return tckn[0] if tckn else None
-        elif expected_type == "text":
-            return text.strip()
-        return None
-
-    def generate_response(self, user_message: str) -> str:
-        """Generate response using AI - only when needed"""
-        try:
-            # Simple FAQ responses without LLM
-            if any(word in user_message.lower() for word in ["hangi model", "model", "marka", "araç türü"]):
-                return "Bankamızda tüm marka ve modeller için finansman sağlıyoruz. Sadece ticari araçlar (kamyon, minibüs, otobüs) hariçtir. Hangi araç modelini tercih ediyorsunuz?"
 
-            if any(word in user_message.lower() for word in ["faiz", "oran", "vade"]):
-                return "Faiz oranları güncel piyasa koşullarına göre belirlenir. 12-60 ay vade seçenekleri mevcuttur. Detaylı bilgi için şubelerimize başvurabilirsiniz."
+def init_session_state():
+    """Initialize session state variables"""
+    if 'api_key' not in st.session_state:
+        st.session_state.api_key = None
+    if 'messages' not in st.session_state:
+        clear_messages()
+    if 'api_key_validated' not in st.session_state:
+        st.session_state.api_key_validated = False
+    if 'pending_jobs' not in st.session_state:
+        st.session_state.pending_jobs = {}  # job id -> label
+    if 'session_id' not in st.session_state:
+        # A reload, a restart or another app process resumes the conversation
+        # only with the signed token in the URL, never with a bare session id
+        session_id = session_from_token(st.query_params.get("session", ""), session_config())
+        st.session_state.session_id = session_id or new_session_id()
+        if session_id is not None:
+            restore_messages(session_id)
+        remember_session()
 
-            # Use AI for complex responses
-            prompt = self.get_system_prompt() + f"\n\nKullanıcı mesajı: {user_message}"
-            response = self.model.generate_content(prompt)
-            return response.text
 
-        except Exception as e:
-            return "Üzgünüm, teknik bir sorun yaşandı. Lütfen tekrar deneyin."
-
-    def _get_update_options(self) -> str:
-        """Güncellenebilir alanları listeler"""
-        options = []
-        if self.application_type == "new":
-            options = [
-                "1. Araç Değeri",
-                "2. Araç Modeli",
-                "3. Finansman Tutarı"
-            ]
-            if 'guarantor_tckn' in self.user_data:
-                options.append("4. Kefil TCKN")
-        else:  # used
-            options = [
-                "1. Kasko Değeri",
-                "2. Araç Yaşı",
-                "3. Finansman Tutarı"
-            ]
-            if 'seller_tckn' in self.user_data:
-                options.append("4. Satıcı TCKN")
-        
-        return "\n".join(options)
-
-    def _handle_update_selection(self, user_message: str) -> Dict[str, Any]:
-        """Kullanıcının güncelleme seçimini işler"""
-        try:
-            # Eğer kullanıcı evet/hayır gibi bir cevap verdiyse burada kontrol et
-            if user_message.strip().lower() in ["hayır", "hayir", "yok", "istemiyorum"]:
-                self.current_step = "confirmation"
-                return {
-                    "response": self._generate_confirmation_message(),
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
-            elif user_message.strip().lower() in ["evet", "yes", "istiyorum"]:
-                return {
-                    "response": "Hangi bilgiyi güncellemek istersiniz?\n" + self._get_update_options(),
-                    "step": "update_selection",
-                    "data": self.user_data
-                }
-            # Seçim numarası girildiyse
-            choice = int(user_message.strip())
-            if self.application_type == "new":
-                if choice == 1:
-                    self.user_data.pop('vehicle_value', None)
-                    self.current_step = "update_field_input"
-                    self._last_update_field = 'vehicle_value'
-                    return {
-                        "response": "Yeni araç değerini giriniz:",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                elif choice == 2:
-                    self.user_data.pop('vehicle_model', None)
-                    self.current_step = "update_field_input"
-                    self._last_update_field = 'vehicle_model'
-                    return {
-                        "response": "Yeni araç modelini giriniz:",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                elif choice == 3:
-                    self.user_data.pop('loan_amount', None)
-                    self.current_step = "update_field_input"
-                    self._last_update_field = 'loan_amount'
-                    return {
-                        "response": "Yeni finansman tutarını giriniz:",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                elif choice == 4 and 'guarantor_tckn' in self.user_data:
-                    self.user_data.pop('guarantor_tckn', None)
-                    self.current_step = "update_field_input"
-                    self._last_update_field = 'guarantor_tckn'
-                    return {
-                        "response": "Yeni kefil TCKN giriniz:",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-            else:  # used
-                if choice == 1:
-                    self.user_data.pop('vehicle_value', None)
-                    self.current_step = "update_field_input"
-                    self._last_update_field = 'vehicle_value'
-                    return {
-                        "response": "Yeni kasko değerini giriniz:",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                elif choice == 2:
-                    self.user_data.pop('vehicle_age', None)
-                    self.current_step = "update_field_input"
-                    self._last_update_field = 'vehicle_age'
-                    return {
-                        "response": "Yeni araç yaşını giriniz:",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                elif choice == 3:
-                    self.user_data.pop('loan_amount', None)
-                    self.current_step = "update_field_input"
-                    self._last_update_field = 'loan_amount'
-                    return {
-                        "response": "Yeni finansman tutarını giriniz:",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                elif choice == 4 and 'seller_tckn' in self.user_data:
-                    self.user_data.pop('seller_tckn', None)
-                    self.current_step = "update_field_input"
-                    self._last_update_field = 'seller_tckn'
-                    return {
-                        "response": "Yeni satıcı TCKN giriniz:",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-            
-            return {
-                "response": "Geçersiz seçim. Lütfen tekrar deneyiniz:\n" + self._get_update_options(),
-                "step": "update_selection",
-                "data": self.user_data
-            }
-        except ValueError:
-            return {
-                "response": "Lütfen bir sayı giriniz:\n" + self._get_update_options(),
-                "step": "update_selection",
-                "data": self.user_data
-            }
+def session_config():
+    return get_config("chatbot_config.json").get('sessions')
 
-    def _handle_update_field_input(self, user_message: str) -> Dict[str, Any]:
-        """Güncellenecek alan için yeni değeri alır ve tekrar güncelleme isteyip istemediğini sorar"""
-        field = getattr(self, '_last_update_field', None)
-        if not field:
-            return {"response": "Bir hata oluştu. Lütfen tekrar deneyin.", "step": "confirmation", "data": self.user_data}
-        # Alan tipine göre veri çek
-        if field in ["vehicle_value", "loan_amount", "vehicle_age"]:
-            value = self.extract_info_from_text(user_message, "number")
-            if value is None:
-                return {"response": "Lütfen geçerli bir değer giriniz:", "step": "update_field_input", "data": self.user_data}
-            # Doğrulama
-            app_type = self.application_type
-            is_valid, error = self.validate_data(field, value, app_type)
-            if not is_valid:
-                return {"response": error, "step": "update_field_input", "data": self.user_data}
-            self.user_data[field] = value
-        elif field in ["vehicle_model"]:
-            self.user_data[field] = user_message.strip()
-        elif field in ["guarantor_tckn", "seller_tckn"]:
-            tckn = self.extract_info_from_text(user_message, "tckn")
-            if not tckn:
-                return {"response": "Lütfen geçerli bir TCKN giriniz:", "step": "update_field_input", "data": self.user_data}
-            is_valid, error = self.validate_data('tckn', tckn, self.application_type)
-            if not is_valid:
-                return {"response": error, "step": "update_field_input", "data": self.user_data}
-            self.user_data[field] = tckn
-        else:
-            return {"response": "Bir hata oluştu. Lütfen tekrar deneyin.", "step": "confirmation", "data": self.user_data}
-        # Güncelleme sonrası tekrar sor
-        self.current_step = "update_selection"
-        return {
-            "response": "Başka bir değişiklik yapmak ister misiniz? (Evet/Hayır)",
-            "step": self.current_step,
-            "data": self.user_data
-        }
 
-    def process_message(self, user_message: str) -> Dict[str, Any]:
-        """Process message and update state"""
-        user_message_lower = user_message.strip().lower()
-
-        # Exit controls - valid at every step
-        if any(word in user_message_lower for word in
-               ['çık', 'çıkış', 'quit', 'exit', 'bye', 'görüşürüz', 'hoşça kal', 'bitir', 'kapat']):
-            return {
-                "response": "Başvuru işleminiz yarıda kesildi. Teşekkürler, iyi günler! 👋",
-                "step": "exit",
-                "data": self.user_data,
-                "should_exit": True
-            }
+def session_store():
+    """Shared store holding the conversation state of every session"""
+    return get_session_store(session_config())
 
-        # Cancel/restart controls
-        if any(word in user_message_lower for word in
-               ['iptal', 'sıfırla', 'yeniden başla', 'restart', 'baştan', 'temizle']):
-            self.user_data = {}
-            self.current_step = "greeting"
-            self.application_type = None
-            return {
-                "response": "Başvuru sıfırlandı. Yeniden başlamak için 'merhaba' yazabilirsiniz.",
-                "step": self.current_step,
-                "data": self.user_data
-            }
 
-        # Initial greeting
-        if self.current_step == "greeting":
-            if any(word in user_message_lower for word in ["merhaba", "selam", "iyi", "başla"]):
-                self.current_step = "determine_type"
-                return {
-                    "response": "Merhaba! Araç finansmanı konusunda size yardımcı olmaktan mutluluk duyarım. Yeni araç mı yoksa ikinci el araç finansmanı mı istiyorsunuz?",
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
+def remember_session():
+    """Put a fresh resume token for this session into the URL"""
+    st.query_params["session"] = session_token(st.session_state.session_id, session_config())
 
-        # Determine application type
-        elif self.current_step == "determine_type":
-            if "yeni" in user_message_lower:
-                self.application_type = "new"
-                self.current_step = "collect_new_vehicle_info"
-                return {
-                    "response": "Yeni araç finansmanı için başvurunuzu alıyorum. Öncelikle aracın proforma fatura değerini öğrenebilir miyim? \n💡 İpucu: İstediğiniz zaman 'çık' yazarak çıkabilirsiniz.",
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
-            elif any(word in user_message_lower for word in ["ikinci", "2.", "eski", "kullanılmış"]):
-                self.application_type = "used"
-                self.current_step = "collect_used_vehicle_info"
-                return {
-                    "response": "İkinci el araç finansmanı için başvurunuzu alıyorum. Öncelikle aracın kasko değerini öğrenebilir miyim? \n💡 İpucu: İstediğiniz zaman 'çık' yazarak çıkabilirsiniz.",
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
 
-        # Collect new vehicle info
-        elif self.current_step == "collect_new_vehicle_info":
-            return self._handle_new_vehicle_collection(user_message)
-
-        # Collect used vehicle info
-        elif self.current_step == "collect_used_vehicle_info":
-            return self._handle_used_vehicle_collection(user_message)
-
-        # Handle confirmation step
-        elif self.current_step == "confirmation":
-            if any(word in user_message_lower for word in ["hayır", "hayir", "güncelle", "guncelle", "değiştir", "degistir"]):
-                self.current_step = "update_selection"
-                return {
-                    "response": "Hangi bilgiyi güncellemek istersiniz?\n" + self._get_update_options(),
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
-            elif any(word in user_message_lower for word in ["evet", "onayla", "tamam"]):
-                # Save application
-                save_result = self.save_application()
-                if save_result["success"]:
-                    self.current_step = "hgs_offer"
-                    return {
-                        "response": "🎉 Başvurunuz kaydedildi! Başvuru No: {}\n\nHGS ürünümüzü de almak ister misiniz? (Evet/Hayır)".format(save_result['application_id']),
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                else:
-                    return {"response": f"❌ Başvuru kaydedilemedi: {save_result['error']}", "step": self.current_step, "data": self.user_data}
-        # Handle HGS offer step
-        elif self.current_step == "hgs_offer":
-            if any(word in user_message_lower for word in ["evet", "isterim", "almak", "olsun"]):
-                self.current_step = "end"
-                return {
-                    "response": "✅ HGS başvurunuz da alınmıştır. Tüm başvurularınız başarıyla tamamlandı! Yeni bir başvuru için 'merhaba' yazabilirsiniz. 👋",
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
-            elif any(word in user_message_lower for word in ["hayır", "hayir", "istemem", "olmasın", "yok"]):
-                self.current_step = "end"
-                return {
-                    "response": "Anlaşıldı, HGS başvurusu alınmadı. Tüm başvurularınız başarıyla tamamlandı! Yeni bir başvuru için 'merhaba' yazabilirsiniz. 👋",
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
-            else:
-                return {
-                    "response": "Lütfen 'Evet' veya 'Hayır' şeklinde yanıt veriniz. HGS ürünümüzü almak ister misiniz?",
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
+def restore_messages(session_id: str):
+    """Show the turns the session store kept (the LLM context) again after a resume"""
+    state = session_store().load(session_id)
+    if state is not None and state.history:
+        add_messages(*({"role": role, "content": text} for role, text in state.history))
 
-        # Handle update selection
-        elif self.current_step == "update_selection":
-            return self._handle_update_selection(user_message)
 
-        # Handle update field input
-        elif self.current_step == "update_field_input":
-            return self._handle_update_field_input(user_message)
+def load_chatbot():
+    """Rebuild this session's chatbot from its stored conversation state"""
+    # Imported on first use, so the login page renders without the engine and its dependencies
+    from chatbot_engine import VehicleFinanceChatbot
 
-        # General AI response
-        response = self.generate_response(user_message)
-        return {
-            "response": response,
-            "step": self.current_step,
-            "data": self.user_data
-        }
+    chatbot = VehicleFinanceChatbot(st.session_state.api_key, session_id=st.session_state.session_id)
+    state = session_store().load(st.session_state.session_id)
+    if state is not None:
+        chatbot.restore_state(state)
+    return chatbot
 
-    def _handle_new_vehicle_collection(self, user_message: str) -> Dict[str, Any]:
-        """Handle new vehicle information collection"""
-        # Vehicle value
-        if 'vehicle_value' not in self.user_data:
-            value = self.extract_info_from_text(user_message, "number")
-            if value:
-                is_valid, error = self.validate_data('vehicle_value', value, 'new')
-                if is_valid:
-                    self.user_data['vehicle_value'] = value
-                    return {
-                        "response": f"Araç değeri {value:,} TL olarak kaydedildi. Şimdi araç modelini belirtir misiniz?",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                else:
-                    return {"response": error, "step": self.current_step, "data": self.user_data}
-
-        # Vehicle model
-        elif 'vehicle_model' not in self.user_data:
-            if any(word in user_message for word in ["hangi", "model", "marka", "tür", "neler"]):
-                return {
-                    "response": "Bankamızda tüm marka ve modeller için finansman sağlıyoruz (Toyota, Volkswagen, BMW, Mercedes, Renault, Ford vb.). Sadece ticari araçlar (kamyon, minibüs, otobüs) hariçtir. Hangi araç modelini seçtiniz?",
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
 
-            if any(word in user_message for word in ["ticari", "kamyon", "minibüs", "otobüs"]):
-                return {
-                    "response": "Üzgünüm, ticari modeller için başvuru yapılamaz. Farklı bir araç modeli var mı?",
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
+def save_chatbot(chatbot):
+    session_store().save(st.session_state.session_id, chatbot.export_state())
+    remember_session()  # the token expires idle_seconds after the last message, like the session
 
-            self.user_data['vehicle_model'] = user_message
 
-            if self.user_data['vehicle_value'] >= 5000000:
-                return {
-                    "response": f"Araç modeli kaydedildi. Araç fiyatı 5M ve üzeri olduğu için kefil TCKN'i gereklidir. Kefil TCKN'ini giriniz:",
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
-            else:
-                return {
-                    "response": "Araç modeli kaydedildi. Son olarak istediğiniz finansman tutarını belirtiniz:",
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
+def reset_chatbot():
+    session_store().delete(st.session_state.session_id)
 
-        # Guarantor TCKN
-        elif self.user_data['vehicle_value'] >= 5000000 and 'guarantor_tckn' not in self.user_data:
-            tckn = self.extract_info_from_text(user_message, "tckn")
-            if tckn:
-                is_valid, error = self.validate_data('tckn', tckn, 'new')
-                if is_valid:
-                    self.user_data['guarantor_tckn'] = tckn
-                    return {
-                        "response": "Kefil TCKN kaydedildi. Son olarak istediğiniz finansman tutarını belirtiniz:",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                else:
-                    return {"response": error, "step": self.current_step, "data": self.user_data}
-
-        # Loan amount
-        elif 'loan_amount' not in self.user_data:
-            amount = self.extract_info_from_text(user_message, "number")
-            if amount:
-                is_valid, error = self.validate_data('loan_amount', amount, 'new')
-                if is_valid:
-                    self.user_data['loan_amount'] = amount
-                    self.current_step = "confirmation"
-                    return {
-                        "response": self._generate_confirmation_message(),
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                else:
-                    return {"response": error, "step": self.current_step, "data": self.user_data}
-
-        return {"response": "Lütfen geçerli bir değer giriniz.", "step": self.current_step, "data": self.user_data}
-
-    def _handle_used_vehicle_collection(self, user_message: str) -> Dict[str, Any]:
-        """Handle used vehicle information collection"""
-        # Kasko value
-        if 'vehicle_value' not in self.user_data:
-            value = self.extract_info_from_text(user_message, "number")
-            if value:
-                self.user_data['vehicle_value'] = value
-                return {
-                    "response": f"Araç kasko değeri {value:,} TL olarak kaydedildi. Aracın yaşını belirtir misiniz?",
-                    "step": self.current_step,
-                    "data": self.user_data
-                }
 
-        # Vehicle age
-        elif 'vehicle_age' not in self.user_data:
-            age = self.extract_info_from_text(user_message, "number")
-            if age:
-                is_valid, error = self.validate_data('vehicle_age', age, 'used')
-                if is_valid:
-                    self.user_data['vehicle_age'] = age
-                    return {
-                        "response": "Araç yaşı kaydedildi. İstediğiniz finansman tutarını belirtiniz:",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                else:
-                    return {"response": error, "step": self.current_step, "data": self.user_data}
-
-        # Loan amount
-        elif 'loan_amount' not in self.user_data:
-            amount = self.extract_info_from_text(user_message, "number")
-            if amount:
-                is_valid, error = self.validate_data('loan_amount', amount, 'used')
-                if is_valid:
-                    self.user_data['loan_amount'] = amount
-                    return {
-                        "response": "Finansman tutarı kaydedildi. Satıcı T.C. kimlik numarası var mı? (İsteğe bağlı - 'hayır' veya 'yok' diyebilirsiniz)",
-                        "step": self.current_step,
-                        "data": self.user_data
-                    }
-                else:
-                    return {"response": error, "step": self.current_step, "data": self.user_data}
-
-        # Seller TCKN (optional)
-        elif 'seller_tckn' not in self.user_data:
-            if any(word in user_message for word in ["hayır", "yok", "istemiyorum", "gerek yok"]):
-                self.user_data['seller_tckn'] = None
-            else:
-                tckn = self.extract_info_from_text(user_message, "tckn")
-                if tckn:
-                    is_valid, error = self.validate_data('tckn', tckn, 'used')
-                    if is_valid:
-                        self.user_data['seller_tckn'] = tckn
-                    else:
-                        return {"response": error, "step": self.current_step, "data": self.user_data}
-                else:
-                    self.user_data['seller_tckn'] = None
+def job_queue():
+    """Queue running application saves and notifications in the background"""
+    from job_queue import get_job_queue
+
+    importlib.import_module("chatbot_engine")  # registers the job handlers before any worker starts
+
+    return get_job_queue(get_config("chatbot_config.json").get('jobs'))
 
-            self.current_step = "confirmation"
-            return {
-                "response": self._generate_confirmation_message(),
-                "step": self.current_step,
-                "data": self.user_data
-            }
 
-        return {"response": "Lütfen geçerli bir değer giriniz.", "step": self.current_step, "data": self.user_data}
+def track_job(result: dict, label: str):
+    if result.get("job_id"):
+        st.session_state.pending_jobs[result["job_id"]] = label
 
-    def _generate_confirmation_message(self) -> str:
-        """Generate confirmation message"""
-        msg = "Başvuru bilgilerinizi kontrol ediniz:\n\n"
 
-        if self.application_type == "new":
-            msg += f"• Başvuru Türü: Yeni Araç\n"
-            msg += f"• Araç Değeri: {self.user_data['vehicle_value']:,} TL\n"
-            msg += f"• Araç Modeli: {self.user_data['vehicle_model']}\n"
-            if 'guarantor_tckn' in self.user_data:
-                msg += f"• Kefil TCKN: {self.user_data['guarantor_tckn']}\n"
-            msg += f"• Finansman Tutarı: {self.user_data['loan_amount']:,} TL\n"
+def show_job_status():
+    """Report background jobs of this session as they finish, without blocking the chat"""
+    pending = st.session_state.pending_jobs
+    for job_id, label in list(pending.items()):
+        status = job_queue().status(job_id)
+        if status is None or status["state"] == "done":
+            del pending[job_id]
+            if status is not None:
+                st.toast(f"✅ {label} tamamlandı")
+        elif status["state"] == "failed":
+            del pending[job_id]
+            st.error(f"❌ {label} başarısız oldu: {status['error']}")
         else:
-            msg += f"• Başvuru Türü: İkinci El Araç\n"
-            msg += f"• Kasko Değeri: {self.user_data['vehicle_value']:,} TL\n"
-            msg += f"• Araç Yaşı: {self.user_data['vehicle_age']} yıl\n"
-            msg += f"• Finansman Tutarı: {self.user_data['loan_amount']:,} TL\n"
-            if self.user_data.get('seller_tckn'):
-                msg += f"• Satıcı TCKN: {self.user_data['seller_tckn']}\n"
-
-        msg += "\nBilgiler doğru mu? 'Evet' derseniz başvurunuzu tamamlarım, 'Hayır' derseniz güncelleyebilirsiniz."
-        return msg
-
-    def save_application(self) -> Dict[str, Any]:
-        """Save application to file"""
-        application = {
-            "id": f"APP_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            "type": self.application_type,
-            "data": self.user_data.copy(),
-            "timestamp": datetime.now().isoformat(),
-            "status": "pending"
-        }
+            st.caption(f"⏳ {label} işleniyor...")
+
+
+if hasattr(st, "fragment"):
+    # Poll on its own so pending jobs update without rerunning the whole page
+    show_job_status = st.fragment(run_every=1)(show_job_status)
+
+
+def telemetry():
+    """Process-wide spans and metrics (see telemetry.py)"""
+    return get_telemetry(get_config("chatbot_config.json").get('telemetry'))
+
+
+def is_admin() -> bool:
+    """Diagnostics are shown only with ?admin=<telemetry.admin_token> in the URL"""
+    token = telemetry_settings(get_config("chatbot_config.json").get('telemetry'))["admin_token"]
+    return bool(token) and hmac.compare_digest(st.query_params.get("admin", ""), token)
+
+
+def show_diagnostics():
+    """Admin-only sidebar view of span timings, counters and the latest traces"""
+    with st.expander("🩺 Tanılama"):
+        metrics = telemetry()
+        if not metrics.enabled:
+            st.info("Telemetri kapalı")
+            return
+        snapshot = metrics.snapshot()
+        spans = metrics.span_summary()
+        if not spans:
+            st.caption("Henüz ölçüm yok")
+            return
+        st.markdown("**Adım süreleri**")
+        st.dataframe(spans, hide_index=True)
+        st.markdown("**Sayaçlar**")
+        st.dataframe([{"metric": c["name"], "labels": ", ".join(f"{k}={v}" for k, v in c["labels"].items()),
+                       "value": c["value"]} for c in snapshot["counters"]], hide_index=True)
+        llm = [h for h in snapshot["histograms"] if h["name"].startswith("chatbot_llm_")]
+        if llm:
+            st.markdown("**LLM**")
+            st.dataframe([{"metric": h["name"], "count": h["count"], "mean": round(h["mean"], 3),
+                           "p95": round(h["p95"], 3)} for h in llm], hide_index=True)
+        st.markdown("**Son izler**")
+        st.json(snapshot["traces"][-5:], expanded=False)
+        st.download_button("⬇️ metrics.prom", metrics.prometheus_text(), file_name="metrics.prom", mime="text/plain")
 
-        try:
-            applications = []
-            if os.path.exists("applications.json"):
-                with open("applications.json", "r", encoding="utf-8") as f:
-                    applications = json.load(f)
 
-            applications.append(application)
+def validate_api_key(api_key: str) -> bool:
+    """Validate the API key for the configured LLM backend (cached, no generation call)"""
+    try:
+        return validate_api_key_cached(api_key, get_config("chatbot_config.json"))
+    except Exception:
+        return False
 
-            with open("applications.json", "w", encoding="utf-8") as f:
-                json.dump(applications, f, ensure_ascii=False, indent=2)
 
-            return {"success": True, "application_id": application["id"]}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+DEFAULT_TRANSCRIPT_CONFIG = {
+    "window": 20,
+    "page_size": 20,
+    "max_history": 200
+}
 
 
-def init_session_state():
-    """Initialize session state variables"""
-    if 'chatbot' not in st.session_state:
-        st.session_state.chatbot = None
-    if 'messages' not in st.session_state:
-        st.session_state.messages = []
-    if 'api_key_validated' not in st.session_state:
-        st.session_state.api_key_validated = False
-    if 'current_step' not in st.session_state:
-        st.session_state.current_step = "greeting"
+def transcript_settings() -> dict:
+    return {**DEFAULT_TRANSCRIPT_CONFIG, **get_config("chatbot_config.json").get('transcript', {})}
 
 
-def validate_api_key(api_key: str) -> bool:
-    """Validate Google Gemini API key"""
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        # Test with a simple prompt
-        response = model.generate_content("Test")
-        return True
-    except Exception:
-        return False
+def clear_messages():
+    st.session_state.messages = []
+    st.session_state.dropped_messages = 0
+    st.session_state.transcript_window = transcript_settings()["window"]
+
+
+def add_messages(*messages: dict):
+    """Append to the transcript, keeping at most max_history messages in session memory"""
+    history = st.session_state.messages
+    history.extend(messages)
+    excess = len(history) - transcript_settings()["max_history"]
+    if excess > 0:
+        del history[:excess]
+        st.session_state.dropped_messages += excess
+
+
+def add_message(role: str, content: str):
+    add_messages({"role": role, "content": content})
+
+
+def load_earlier_messages():
+    st.session_state.transcript_window += transcript_settings()["page_size"]
 
 
 def display_chat_message(role: str, content: str):
     """Display a chat message with styling"""
-    if role == "user":
-        st.markdown(f"""
-        <div class="chat-message user-message">
-            <strong>👤 Siz:</strong><br>
-            {content}
-        </div>
-        """, unsafe_allow_html=True)
-    else:
-        st.markdown(f"""
-        <div class="chat-message bot-message">
-            <strong>🤖 Bot:</strong><br>
-            {content}
-        </div>
-        """, unsafe_allow_html=True)
+    st.markdown(chat_message_html(role, content), unsafe_allow_html=True)
+
+
+def render_transcript():
+    """Show the most recent messages as one HTML block, with paging to older ones"""
+    messages = st.session_state.messages
+    window = st.session_state.transcript_window
+    hidden = max(len(messages) - window, 0)
+    if hidden:
+        st.button(f"⬆️ Önceki mesajları yükle ({hidden})", on_click=load_earlier_messages)
+    elif st.session_state.dropped_messages:
+        st.caption(f"Daha eski {st.session_state.dropped_messages} mesaj artık saklanmıyor.")
+    if messages:
+        st.markdown("".join(chat_message_html(m["role"], m["content"]) for m in messages[hidden:]),
+                    unsafe_allow_html=True)
+
+
+def display_chat_message_stream(chunks: Iterator[str]) -> str:
+    """Render a bot message chunk by chunk as it streams in and return the full text"""
+    placeholder = st.empty()
+    content = ""
+    for chunk in chunks:
+        content += chunk
+        placeholder.markdown(chat_message_html("bot", content + " ▌"), unsafe_allow_html=True)
+    placeholder.markdown(chat_message_html("bot", content), unsafe_allow_html=True)
+    return content
 
 
 def main():
@@ -941,12 +237,7 @@ def main():
     init_session_state()
 
     # Header
-    st.markdown("""
-    <div class="main-header">
-        <h1>🚗 Araç Finansmanı Chatbot</h1>
-        <p>Yeni ve ikinci el araç finansmanı başvuruları için akıllı asistan</p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(HEADER_HTML, unsafe_allow_html=True)
 
     # Sidebar for API key and controls
     with st.sidebar:
@@ -966,7 +257,7 @@ def main():
                     with st.spinner("API Key doğrulanıyor..."):
                         if validate_api_key(api_key):
                             st.session_state.api_key_validated = True
-                            st.session_state.chatbot = VehicleFinanceChatbot(api_key)
+                            st.session_state.api_key = api_key
                             st.success("✅ API Key başarıyla doğrulandı!")
                             st.rerun()
                         else:
@@ -975,14 +266,7 @@ def main():
                     st.warning("⚠️ Lütfen API Key giriniz.")
 
             # Instructions
-            st.markdown("""
-            #### 📖 API Key Nasıl Alınır?
-            1. [Google AI Studio](https://aistudio.google.com/app/apikey) adresine gidin
-            2. "Create API Key" butonuna tıklayın
-            3. API Key'i kopyalayın ve yukarıya yapıştırın
-
-            **Not**: Gemini 1.5 Flash modeli ücretsizdir!
-            """)
+            st.markdown(API_KEY_HELP)
 
         else:
             st.success("✅ API Key aktif")
@@ -990,26 +274,29 @@ def main():
             # Chat controls
             st.markdown("#### 🎮 Kontroller")
             if st.button("🔄 Sohbeti Yeniden Başlat"):
-                st.session_state.messages = []
-                st.session_state.chatbot = VehicleFinanceChatbot(st.session_state.chatbot.model.model_name)
+                clear_messages()
+                reset_chatbot()
                 st.rerun()
 
             if st.button("🚪 Çıkış Yap"):
                 st.session_state.api_key_validated = False
-                st.session_state.chatbot = None
-                st.session_state.messages = []
+                st.session_state.api_key = None
+                clear_messages()
+                reset_chatbot()
                 st.rerun()
 
             # Statistics
             st.markdown("#### 📊 İstatistikler")
             try:
-                if os.path.exists("applications.json"):
-                    with open("applications.json", "r", encoding="utf-8") as f:
-                        apps = json.load(f)
+                from application_store import get_application_store
+
+                store = get_application_store(get_config("chatbot_config.json").get('storage'))
+                stats = store.cached_stats()
 
-                    total_apps = len(apps)
-                    new_apps = len([a for a in apps if a['type'] == 'new'])
-                    used_apps = len([a for a in apps if a['type'] == 'used'])
+                if stats['total']['count']:
+                    total_apps = stats['total']['count']
+                    new_apps = stats['by_type'].get('new', {}).get('count', 0)
+                    used_apps = stats['by_type'].get('used', {}).get('count', 0)
 
                     col1, col2, col3 = st.columns(3)
                     with col1:
@@ -1023,22 +310,12 @@ def main():
             except:
                 st.info("İstatistik yüklenemedi")
 
+        if is_admin():
+            show_diagnostics()
+
     # Main chat interface
     if not st.session_state.api_key_validated:
-        st.markdown("""
-        <div class="info-card">
-            <h3>🎯 Chatbot Özellikleri</h3>
-            <ul>
-                <li>✅ Yeni ve ikinci el araç finansmanı</li>
-                <li>✅ Otomatik veri doğrulama</li>
-                <li>✅ Türkçe doğal dil işleme</li>
-                <li>✅ Adım adım başvuru süreci</li>
-                <li>✅ Çapraz satış fırsatları</li>
-                <li>✅ Güvenli veri saklama</li>
-            </ul>
-            <p><strong>👈 Başlamak için soldaki panelden API Key giriniz!</strong></p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(FEATURES_HTML, unsafe_allow_html=True)
         return
 
     # Chat interface
@@ -1046,93 +323,90 @@ def main():
 
     # Display chat messages
     chat_container = st.container()
-    with chat_container:
-        for message in st.session_state.messages:
-            display_chat_message(message["role"], message["content"])
+    with chat_container, telemetry().span("render"):
+        render_transcript()
+
+    if st.session_state.pending_jobs:
+        show_job_status()
 
     # Chat input
     user_input = st.chat_input("Mesajınızı yazın... (Başlamak için 'merhaba' yazın)")
 
     if user_input:
         # Add user message to chat
-        st.session_state.messages.append({"role": "user", "content": user_input})
+        add_message("user", user_input)
+        with chat_container:
+            display_chat_message("user", user_input)
 
         # Process message with chatbot
         try:
             with st.spinner("Bot yanıt hazırlıyor..."):
-                result = st.session_state.chatbot.process_message(user_input)
-                bot_response = result["response"]
-
-                # Add bot response to chat
-                st.session_state.messages.append({"role": "bot", "content": bot_response})
+                # Another tab or app process may be answering a message of this
+                # session; the lease makes this turn wait for it (see session_store.py)
+                with session_store().lease(st.session_state.session_id):
+                    chatbot = load_chatbot()
+                    result = chatbot.process_message(user_input, stream=True)
+                    bot_response = result["response"]
+                    if not isinstance(bot_response, str):
+                        # Show the AI answer as it is generated instead of after it completes
+                        with chat_container, telemetry().span("render", streamed=True):
+                            bot_response = display_chat_message_stream(bot_response)
+
+                    # Add bot response to chat
+                    add_message("bot", bot_response)
+                    save_chatbot(chatbot)
+                track_job(result, "Başvuru kaydı" if chatbot.current_step == "hgs_offer" else "HGS kaydı")
 
                 # Handle special cases
                 if result.get("should_exit", False):
                     st.balloons()
-                    time.sleep(2)
-                    st.session_state.messages = []
-                    st.session_state.chatbot = VehicleFinanceChatbot(st.session_state.chatbot.model._model_name)
+                    clear_messages()
+                    reset_chatbot()
 
                 # Handle confirmation step
-                elif st.session_state.chatbot.current_step == "confirmation":
+                elif chatbot.current_step == "confirmation":
                     # Show current application data
-                    if st.session_state.chatbot.user_data:
+                    if chatbot.user_data:
                         with st.expander("📋 Başvuru Detayları", expanded=True):
-                            data = st.session_state.chatbot.user_data
-                            app_type = st.session_state.chatbot.application_type
+                            product = chatbot.flow.product(chatbot.application_type)
+                            # Required fields first, split over the two columns
+                            lines = product.summary(chatbot.user_data, product.update_fields)
+                            half = (len(lines) + 1) // 2
 
                             col1, col2 = st.columns(2)
                             with col1:
                                 st.markdown("**Başvuru Türü:**")
-                                st.write("Yeni Araç" if app_type == "new" else "İkinci El Araç")
-
-                                if app_type == "new":
-                                    st.markdown("**Araç Değeri:**")
-                                    st.write(f"{data.get('vehicle_value', 0):,} TL")
-                                    st.markdown("**Araç Modeli:**")
-                                    st.write(data.get('vehicle_model', 'Belirtilmedi'))
-                                else:
-                                    st.markdown("**Kasko Değeri:**")
-                                    st.write(f"{data.get('vehicle_value', 0):,} TL")
-                                    st.markdown("**Araç Yaşı:**")
-                                    st.write(f"{data.get('vehicle_age', 0)} yıl")
+                                st.write(product.label)
+                                for label, value in lines[:half]:
+                                    st.markdown(f"**{label}:**")
+                                    st.write(value)
 
                             with col2:
-                                st.markdown("**Finansman Tutarı:**")
-                                st.write(f"{data.get('loan_amount', 0):,} TL")
-
-                                if data.get('guarantor_tckn'):
-                                    st.markdown("**Kefil TCKN:**")
-                                    st.write(data['guarantor_tckn'])
-
-                                if data.get('seller_tckn'):
-                                    st.markdown("**Satıcı TCKN:**")
-                                    st.write(data['seller_tckn'])
+                                for label, value in lines[half:]:
+                                    st.markdown(f"**{label}:**")
+                                    st.write(value)
 
                     # Confirmation buttons
                     col1, col2 = st.columns(2)
                     with col1:
                         if st.button("✅ Evet, Onayla", type="primary", use_container_width=True):
                             # Save application
-                            save_result = st.session_state.chatbot.save_application()
+                            save_result = chatbot.save_application()
                             if save_result["success"]:
+                                track_job(save_result, "Başvuru kaydı")
                                 st.success(f"🎉 Başvurunuz kaydedildi! ID: {save_result['application_id']}")
 
                                 # Cross-selling opportunity
                                 st.info("💡 HGS ürünümüzü de almak ister misiniz?")
 
                                 # Reset for new application
-                                time.sleep(3)
-                                st.session_state.messages.append({
-                                    "role": "bot",
-                                    "content": f"Başvurunuz başarıyla kaydedildi! Başvuru No: {save_result['application_id']}\n\nYeni bir başvuru için 'merhaba' yazabilirsiniz."
-                                })
+                                add_message(
+                                    "bot",
+                                    f"Başvurunuz başarıyla kaydedildi! Başvuru No: {save_result['application_id']}\n\nYeni bir başvuru için 'merhaba' yazabilirsiniz."
+                                )
 
                                 # Reset chatbot
-                                api_key = st.session_state.chatbot.model._api_key if hasattr(
-                                    st.session_state.chatbot.model, '_api_key') else None
-                                if api_key:
-                                    st.session_state.chatbot = VehicleFinanceChatbot(api_key)
+                                reset_chatbot()
 
                                 st.balloons()
                             else:
@@ -1140,18 +414,17 @@ def main():
 
                     with col2:
                         if st.button("❌ Hayır, Güncelle", use_container_width=True):
-                            st.session_state.messages.append({
-                                "role": "bot",
-                                "content": "Hangi bilgiyi güncellemek istiyorsunuz? Lütfen metin olarak belirtin."
-                            })
+                            add_message(
+                                "bot",
+                                "Hangi bilgiyi güncellemek istiyorsunuz? Lütfen metin olarak belirtin."
+                            )
                             st.rerun()
 
+        except SessionBusy:
+            add_message("bot", "Bu oturumda başka bir mesaj hâlâ işleniyor. Lütfen biraz sonra tekrar deneyin.")
         except Exception as e:
             st.error(f"❌ Hata oluştu: {str(e)}")
-            st.session_state.messages.append({
-                "role": "bot",
-                "content": "Üzgünüm, bir hata oluştu. Lütfen tekrar deneyin."
-            })
+            add_message("bot", "Üzgünüm, bir hata oluştu. Lütfen tekrar deneyin.")
 
         st.rerun()
 
@@ -1162,23 +435,23 @@ def main():
 
         with col1:
             if st.button("👋 Merhaba", use_container_width=True):
-                st.session_state.messages.append({"role": "user", "content": "Merhaba"})
+                add_message("user", "Merhaba")
                 st.rerun()
 
         with col2:
             if st.button("🆕 Yeni Araç", use_container_width=True):
-                st.session_state.messages.extend([
+                add_messages(
                     {"role": "user", "content": "Merhaba"},
                     {"role": "user", "content": "Yeni araç"}
-                ])
+                )
                 st.rerun()
 
         with col3:
             if st.button("🔄 İkinci El Araç", use_container_width=True):
-                st.session_state.messages.extend([
+                add_messages(
                     {"role": "user", "content": "Merhaba"},
                     {"role": "user", "content": "İkinci el araç"}
-                ])
+                )
                 st.rerun()
 
     # Footer information
@@ -1186,29 +459,12 @@ def main():
         col1, col2 = st.columns(2)
 
         with col1:
-            st.markdown("""
-            **Yeni Araç Finansmanı:**
-            - Maksimum araç değeri: 7M TL
-            - Finansman oranı: %60'a kadar
-            - 5M TL üzeri için kefil gerekli
-            - Ticari araçlar hariç
-            """)
+            st.markdown(NEW_VEHICLE_INFO)
 
         with col2:
-            st.markdown("""
-            **İkinci El Araç Finansmanı:**
-            - Maksimum araç yaşı: 5 yıl
-            - Finansman oranı: %40'a kadar
-            - Maksimum tutar: 3M TL
-            - Kasko değeri baz alınır
-            """)
-
-        st.markdown("""
-        **Komutlar:**
-        - `çık` - Uygulamadan çıkış
-        - `iptal` - Başvuruyu sıfırla
-        - `yeniden başla` - Baştan başla
-        """)
+            st.markdown(USED_VEHICLE_INFO)
+
+        st.markdown(COMMANDS_INFO)
 
 
 # Create default config file if it doesn't exist
@@ -1241,4 +497,6 @@ def create_default_config():
 
 if __name__ == "__main__":
     create_default_config()
-    main()
\ No newline at end of file
+    main()
+    # Import the engine and the LLM SDK in the background once the first page is out
+    warm_up(get_config("chatbot_config.json"))
\ No newline at end of file
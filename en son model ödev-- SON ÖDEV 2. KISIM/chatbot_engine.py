@@ -0,0 +1,829 @@
+"""
+Conversation engine of the vehicle finance chatbot.
+
+VehicleFinanceChatbot holds the dialog state machine (greeting, application
+type, data collection, confirmation, updates, HGS offer) and has no Streamlit
+dependency, so it can be driven from the Streamlit UI, the replay harness,
+benchmarks or any other front end.
+"""
+import json
+import secrets
+import time
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+
+from application_store import DuplicateApplicationError, get_application_store
+from faq_index import get_faq_index
+from flow_engine import FIELD_KINDS, FlowEngine, Transition
+from intent_router import IntentRouter
+from job_queue import get_job_queue, job_handler, jobs_settings, notify
+from llm_backends import get_llm_backend
+from llm_client import LLMUnavailableError, get_llm_client
+from prompt_builder import PromptBuilder, count_tokens, summarize_user_data
+from rate_limiter import ADMITTED, SESSION_LIMITED, get_admission_controller
+from resources import config_resource, get_config
+from response_cache import get_response_cache, normalize_message, prompt_version
+from session_store import SessionState
+from slot_extractor import SlotExtractor
+from telemetry import get_telemetry
+from transcript_log import get_transcript_log
+from validators import ApplicationValidator
+
+
+class VehicleFinanceChatbot:
+    def __init__(self, api_key: str, config_file: str = "chatbot_config.json", model: Any = None,
+                 config: Optional[Dict[str, Any]] = None, session_id: Optional[str] = None):
+        """
+        Initialize the chatbot; the LLM backend comes from the "llm" config section
+        (see llm_backends.py). Pass ``model`` to use any other object with
+        ``generate_content`` (e.g. fake_llm) and ``config`` to use an already
+        loaded config instead of ``config_file``. ``session_id`` selects the
+        per-session LLM rate limit; without it only the global limit applies.
+
+        Model handles, the parsed config and everything derived from it are
+        shared process-wide (see resources.py), so construction is cheap.
+        """
+        self.api_key = api_key
+
+        # Load configuration file (created with defaults if it doesn't exist)
+        if config is None:
+            config = get_config(config_file, self._create_default_config)
+        self.config = config
+
+        # Keyword lists are compiled once into a single matcher
+        self.router = config_resource(self.config, "intent_router", IntentRouter.from_config)
+
+        # Limits and the TCKN check are compiled from finance_rules / validation_rules
+        self.validator = config_resource(self.config, "validator", ApplicationValidator.from_config)
+
+        # Application fields are pulled from free text in one pass, several per message
+        self.slots = config_resource(self.config, "slot_extractor", SlotExtractor.from_config)
+
+        # Steps, transitions and products are compiled once into a lookup table
+        self.flow = config_resource(
+            self.config, "flow", lambda config: FlowEngine.from_config(config, self.validator.rules))
+
+        # FAQ entries are answered locally when the index is confident
+        self.faq_index = config_resource(self.config, "faq_index", get_faq_index)
+
+        # Spans, counters and histograms for the diagnostics view and /metrics
+        self.telemetry = get_telemetry(self.config.get('telemetry'))
+
+        # LLM answers are shared across sessions through the response cache
+        self.response_cache = get_response_cache(self.config.get('response_cache'))
+
+        # The static system prompt is compiled once per config; calls add context within a token budget
+        self.prompts = config_resource(
+            self.config, "prompt_builder",
+            lambda config: PromptBuilder.from_config(self.get_system_prompt(), config.get('prompt')))
+
+        # Backends that support it keep the static prompt prefix cached between calls
+        if model is None:
+            model = get_llm_backend(api_key, self.config, self.prompts.system_prompt)
+        self.model = model
+
+        # Model calls go through the shared client (deadlines, retries, breaker)
+        self.llm = get_llm_client(self.model, self.config.get('llm_client'))
+
+        # Token buckets per session and per process in front of the LLM (see rate_limiter.py)
+        self.session_id = session_id
+        self.admission = get_admission_controller(self.config.get('rate_limits'))
+
+        # Finished turns are queued for the batched transcript log (see transcript_log.py)
+        self.transcript_log = get_transcript_log(self.config.get('transcript_log'))
+
+        # Saving and cross-sell recording run as background jobs
+        self.jobs = get_job_queue(self.config.get('jobs'))
+
+        # Store user data
+        self.user_data = {}
+        self.current_step = "greeting"
+        self.application_type = None  # a product of the flow config, e.g. "new" or "used"
+        self.application_id = None  # last saved application, for the HGS offer
+
+        # Recent turns and a summary of older ones, given to the LLM as context
+        self.history = []
+        self.history_summary = ""
+        self.llm_calls = 0  # LLM calls since the last completed application
+
+    def export_state(self) -> SessionState:
+        """Compact conversation state to keep in a session store"""
+        return SessionState(self.current_step, self.application_type, self.user_data,
+                            getattr(self, '_last_update_field', None), self.application_id,
+                            self.history, self.history_summary, self.llm_calls)
+
+    def restore_state(self, state: SessionState) -> None:
+        """Resume a conversation from a state produced by export_state()"""
+        self.current_step = state.current_step
+        self.application_type = state.application_type
+        self.user_data = dict(state.user_data)
+        self._last_update_field = state.last_update_field
+        self.application_id = state.application_id
+        self.history = [list(turn) for turn in state.history]
+        self.history_summary = state.history_summary
+        self.llm_calls = state.llm_calls
+
+    @staticmethod
+    def _create_default_config():
+        """Create default configuration"""
+        return {
+            "finance_rules": {
+                "new": {
+                    "max_vehicle_value": 7000000,
+                    "max_financing_ratio": 0.6,
+                    "guarantor_threshold": 5000000
+                },
+                "used": {
+                    "max_vehicle_age": 5,
+                    "max_financing_ratio": 0.4,
+                    "max_loan_amount": 3000000
+                }
+            },
+            "faq": {
+                "supported_brands": "Tüm marka ve modeller (ticari araçlar hariç)",
+                "interest_rates": "Güncel piyasa koşullarına göre belirlenir",
+                "loan_terms": "12-60 ay vade seçenekleri"
+            }
+        }
+
+    def get_system_prompt(self) -> str:
+        """
+        Generate system prompt for the AI model
+
+        🔧 SYSTEM PROMPT CUSTOMIZATION POINT:
+        Modify this method to change how the AI responds to users.
+        You can adjust the personality, rules, or response style here.
+        """
+        return f"""
+        # ARAÇ FİNANSMANI UZMANI SİSTEM PROMPT
+
+        ## ROL VE KİMLİK
+        Sen profesyonel bir banka araç finansmanı uzmanısın. İsmin "Araç Finansman Asistanı" ve müşterilere araç kredisi konusunda kapsamlı yardım sağlıyorsun. Deneyimli, güvenilir ve çözüm odaklı bir yaklaşımın var.
+
+        ## TEMEL İLKELER
+        ### İletişim Tarzı:
+        - Her zaman Türkçe konuş ve saygılı bir dil kullan
+        - Samimi ama profesyonel bir ton benimse
+        - Müşterinin seviyesine uygun açıklamalar yap
+        - Emojileri uygun yerlerde kullan (💡, ✅, ❌, 🚗, 💰)
+
+        ### Yanıt Kalitesi:
+        - Kısa, net ve anlaşılır yanıtlar ver
+        - Teknik terimleri basit Türkçe ile açıkla
+        - Her yanıtta bir sonraki adımı belirt
+        - Belirsizlik durumunda soru sor
+
+        ## GÖREV KAPSAMI
+        ### ANA SORUMLULUKLARIN:
+        1. **Araç finansmanı başvuru süreci** - Adım adım rehberlik
+        2. **Kredi koşulları bilgilendirme** - Faiz, vade, teminat açıklamaları
+        3. **Uygunluk değerlendirmesi** - Gerçek zamanlı kontroller
+        4. **Dokümantasyon rehberliği** - Gerekli evrak listesi
+        5. **Çapraz satış fırsatları** - HGS, sigorta vb. ürün önerileri
+
+        ### KONU DIŞI DURUMLAR:
+        Araç finansmanı dışındaki konularda:
+        - Kibar bir şekilde konu dışı olduğunu belirt
+        - Mümkünse araç finansmanı ile bağlantı kur
+        - Genel sohbette samimi ama odakta kal
+        - Örnek: "Bu konu uzmanlık alanım dışında ama araç finansmanı için size nasıl yardımcı olabilirim? 🚗"
+
+        ## FİNANSMAN KURALLARI VE LİMİTLER
+        {json.dumps(self.config['finance_rules'], ensure_ascii=False, indent=2)}
+
+        ## SIK SORULAN SORULAR VE YANITLAR
+        {json.dumps(self.config['faq'], ensure_ascii=False, indent=2)}
+
+        ## DOĞRULAMA VE GÜVENLİK
+        ### Kesinlikle YAPMA:
+        - Kişisel verileri (TCKN, telefon, adres) paylaşma veya kaydetme
+        - Gerçek faiz oranları ve kesin meblağlar vermek (güncel değişken bilgiler)
+        - Müşteri adına karar vermek
+        - Yanıltıcı veya yanlış bilgi vermek
+
+        ### Her Zaman YAP:
+        - Girilen verileri anında doğrula
+        - Hata durumunda net açıklama yap
+        - Güvenlik uyarılarını belirt
+        - Şüpheli durumlarda şubeye yönlendir
+
+        ## KONUŞMA AKIŞI YÖNETİMİ
+        ### Başlangıç:
+        - Sıcak karşılama ve kendini tanıt
+        - Hizmet seçeneklerini sun (yeni/ikinci el)
+        - Süreci kısaca açıkla
+
+        ### Bilgi Toplama:
+        - Her seferinde tek bilgi iste
+        - Girilen bilgiyi onaylayarak tekrarla
+        - Doğrulama hatalarını anında bildir
+        - İlerleme durumunu göster
+
+        ### Sonlandırma:
+        - Başvuru özetini detaylı sun
+        - Çapraz satış teklifi yap
+        - Teşekkür et ve yeni başvuru için davet et
+
+        ## HATA YÖNETİMİ
+        Teknik sorun durumunda:
+        "Üzgünüm, sistemde geçici bir sorun yaşanıyor. Lütfen şu bilgiyi tekrar girebilir misiniz? Sorun devam ederse şubelerimizden destek alabilirsiniz. 🔧"
+
+        Kural ihlali durumunda:
+        "Bu işlem kurallarımıza uymuyor. [Sebep açıklaması]. Alternatif çözüm: [Öneri] 💡"
+
+        ## PERFORMANS HEDEFLERİ
+        - Müşteri memnuniyeti odaklı yaklaşım
+        - Hızlı ve doğru bilgi sağlama
+        - Başvuru tamamlama oranını artırma
+        - Çapraz satış fırsatlarını değerlendirme
+
+        Şimdi müşteriyle doğal, yardımsever ve profesyonel bir sohbet başlat!
+        """
+
+    def validate_data(self, field: str, value: Any, app_type: str) -> tuple[bool, str]:
+        """Validate input data against the configured finance and validation rules"""
+        with self.telemetry.span("validate", field=field):
+            return self.validator.validate_field(field, value, app_type, self.user_data)
+
+    def extract_info_from_text(self, text: str, expected_type: str) -> Optional[Any]:
+        """Extract information from text"""
+        with self.telemetry.span("extract"):
+            if expected_type == "number":
+                # Turkish separators, units and number words ("1.250.000,50", "1,5 milyon")
+                return self.slots.first_number(text)
+            elif expected_type == "tckn":
+                tckns = self.slots.extract(text)["tckns"]
+                return tckns[0] if tckns else None
+            elif expected_type == "text":
+                return text.strip()
+            return None
+
+    def _answer_without_llm(self, user_message: str, intents: Optional[frozenset]) -> tuple[Optional[str], Optional[str]]:
+        """
+        Answer from keyword rules, the FAQ index or the response cache.
+
+        Returns (answer, cache_key); answer is None when the LLM has to be called.
+        """
+        if intents is None:
+            intents = self.router.route(user_message)
+
+        # Simple FAQ responses without LLM
+        if "faq_models" in intents:
+            self.telemetry.inc("chatbot_answers_total", source="rule")
+            return "Bankamızda tüm marka ve modeller için finansman sağlıyoruz. Sadece ticari araçlar (kamyon, minibüs, otobüs) hariçtir. Hangi araç modelini tercih ediyorsunuz?", None
+
+        if "faq_rates" in intents:
+            self.telemetry.inc("chatbot_answers_total", source="rule")
+            return "Faiz oranları güncel piyasa koşullarına göre belirlenir. 12-60 ay vade seçenekleri mevcuttur. Detaylı bilgi için şubelerimize başvurabilirsiniz.", None
+
+        if self.faq_index is not None:
+            faq_answer = self.faq_index.answer(user_message)
+            if faq_answer is not None:
+                self.telemetry.inc("chatbot_answers_total", source="faq")
+                return faq_answer, None
+
+        cache_key = None
+        if self.response_cache is not None:
+            # Shared by every session and persisted, so the key holds what the answer
+            # depends on: the message (normalized in make_key), the prompt version,
+            # the backend, the step and the collected data (TCKNs only as "alındı").
+            # The recent turns are left out on purpose, or no second message of a
+            # session could ever hit; they only hold masked TCKNs (see remember()).
+            data_summary = summarize_user_data(self.application_type, self.user_data)
+            backend = getattr(self.model, "identity", None) or ""
+            version = prompt_version(f"{self.prompts.version}|{backend}|{self.current_step}|{data_summary}")
+            cache_key = self.response_cache.make_key(user_message, version)
+            cached = self.response_cache.get(cache_key)
+            self.telemetry.inc("chatbot_response_cache_total", result="miss" if cached is None else "hit")
+            if cached is not None:
+                self.telemetry.inc("chatbot_answers_total", source="cache")
+                return cached, cache_key
+        return None, cache_key
+
+    def generate_response(self, user_message: str, intents: Optional[frozenset] = None) -> str:
+        """Generate response using AI - only when needed"""
+        try:
+            answer, cache_key = self._answer_without_llm(user_message, intents)
+            if answer is not None:
+                return answer
+
+            # Use AI for complex responses
+            refused = self._admit()
+            if refused:
+                return self._fallback_answer(user_message, refused)
+            prompt = self.build_prompt(user_message)
+            start = time.perf_counter()
+            try:
+                with self.telemetry.span("llm"):
+                    text = self.llm.generate(prompt, key=self._coalescing_key(prompt, user_message))
+            except LLMUnavailableError:
+                self.telemetry.inc("chatbot_llm_requests_total", outcome="unavailable")
+                return self._fallback_answer(user_message)
+            self._record_llm(prompt, text, time.perf_counter() - start)
+            if cache_key is not None:
+                self.response_cache.put(cache_key, text)
+            return text
+
+        except Exception as e:
+            self.telemetry.inc("chatbot_answers_total", source="error")
+            return "Üzgünüm, teknik bir sorun yaşandı. Lütfen tekrar deneyin."
+
+    def generate_response_stream(self, user_message: str, intents: Optional[frozenset] = None) -> Iterator[str]:
+        """Like generate_response, but yields the AI answer in chunks as the model produces them"""
+        try:
+            answer, cache_key = self._answer_without_llm(user_message, intents)
+            if answer is not None:
+                yield answer
+                return
+
+            refused = self._admit()
+            if refused:
+                yield self._fallback_answer(user_message, refused)
+                return
+            prompt = self.build_prompt(user_message)
+            parts = []
+            start = time.perf_counter()
+            first_chunk = None
+            try:
+                for chunk in self.llm.stream(prompt, key=self._coalescing_key(prompt, user_message)):
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - start
+                    parts.append(chunk)
+                    yield chunk
+            except LLMUnavailableError:
+                self.telemetry.inc("chatbot_llm_requests_total", outcome="unavailable")
+                if not parts:
+                    yield self._fallback_answer(user_message)
+                else:
+                    yield "\n\nÜzgünüm, yanıtın devamı alınamadı. Lütfen tekrar deneyin."
+                return
+            text = "".join(parts)
+            self._record_llm(prompt, text, time.perf_counter() - start, first_chunk)
+            if cache_key is not None:
+                self.response_cache.put(cache_key, text)
+
+        except Exception:
+            self.telemetry.inc("chatbot_answers_total", source="error")
+            yield "Üzgünüm, teknik bir sorun yaşandı. Lütfen tekrar deneyin."
+
+    def _admit(self) -> Optional[str]:
+        """None if this session may call the LLM now, otherwise the limit that refused it"""
+        if self.admission is None:
+            return None
+        result = self.admission.admit(self.session_id)
+        self.telemetry.inc("chatbot_admission_total", result=result)
+        if result == ADMITTED:
+            return None
+        self.telemetry.inc("chatbot_llm_requests_total", outcome="rate_limited")
+        return result
+
+    def _record_llm(self, prompt: str, answer: str, seconds: float, first_chunk: Optional[float] = None) -> None:
+        """LLM latency and token metrics for one answered request"""
+        telemetry = self.telemetry
+        if not telemetry.enabled:
+            return
+        prompt_tokens, answer_tokens = count_tokens(prompt), count_tokens(answer)
+        telemetry.inc("chatbot_answers_total", source="llm")
+        telemetry.inc("chatbot_llm_requests_total", outcome="ok")
+        telemetry.observe("chatbot_llm_seconds", seconds)
+        if first_chunk is not None:
+            telemetry.observe("chatbot_llm_first_chunk_seconds", first_chunk)
+        telemetry.inc("chatbot_llm_tokens_total", prompt_tokens, kind="prompt")
+        telemetry.inc("chatbot_llm_tokens_total", answer_tokens, kind="response")
+        telemetry.observe("chatbot_llm_prompt_tokens", prompt_tokens)
+        telemetry.observe("chatbot_llm_response_tokens", answer_tokens)
+
+    def build_prompt(self, user_message: str) -> str:
+        """Prompt for one LLM call: system prompt, collected data, recent turns, the message"""
+        self.llm_calls += 1
+        return self.prompts.build(user_message, self.application_type, self.user_data,
+                                  self.history, self.history_summary)
+
+    @staticmethod
+    def _coalescing_key(prompt: str, user_message: str) -> str:
+        """The prompt with the trailing user message normalized, so near-identical questions share a call"""
+        return prompt[:len(prompt) - len(user_message)] + normalize_message(user_message)
+
+    def _remember(self, role: str, text: str) -> None:
+        self.history_summary = self.prompts.remember(self.history, self.history_summary, role, text)
+
+    def _remember_stream(self, chunks: Iterator[str], turn: Optional[Dict[str, Any]] = None,
+                         started: Optional[float] = None) -> Iterator[str]:
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        answer = "".join(parts)
+        self._remember("bot", answer)
+        self._log_turn(turn, answer, started)
+
+    def _fallback_answer(self, user_message: str, refused: Optional[str] = None) -> str:
+        """Best local answer while the LLM backend is slow, failing, switched off or rate limited"""
+        if self.faq_index is not None:
+            min_score = self.llm.settings["fallback_faq_min_score"]
+            results = self.faq_index.search(user_message, limit=1)
+            if results and results[0][0] >= min_score:
+                return results[0][1][2]
+        if refused == SESSION_LIMITED:
+            return ("Kısa sürede çok sayıda soru sordunuz. ⏳ Lütfen biraz bekleyip tekrar deneyin; "
+                    "bu sırada başvurunuza devam edebilir veya gerekli belgeler, vade seçenekleri gibi konuları sorabilirsiniz.")
+        return ("Şu anda asistanımız yoğunluk nedeniyle bu soruyu yanıtlayamıyor. 🔧 "
+                "Başvurunuza devam etmek için 'merhaba' yazabilir veya gerekli belgeler, vade seçenekleri, "
+                "kefil koşulları gibi konuları sorabilirsiniz.")
+
+    def _update_options(self) -> List[str]:
+        """Fields the user can change from the confirmation, in menu order"""
+        return self.flow.product(self.application_type).update_options(self.user_data)
+
+    def _get_update_options(self) -> str:
+        """Güncellenebilir alanları listeler"""
+        titles = self.flow.product(self.application_type).titles
+        return "\n".join(f"{number}. {titles[field]}" for number, field in enumerate(self._update_options(), 1))
+
+    def _handle_update_selection(self, user_message: str, intents: frozenset) -> Dict[str, Any]:
+        """Kullanıcının güncelleme seçimini işler (evet/hayır cevapları flow tablosunda)"""
+        try:
+            # Seçim numarası girildiyse
+            choice = int(user_message.strip())
+        except ValueError:
+            return {
+                "response": "Lütfen bir sayı giriniz:\n" + self._get_update_options(),
+                "step": "update_selection",
+                "data": self.user_data
+            }
+        options = self._update_options()
+        if not 1 <= choice <= len(options):
+            return {
+                "response": "Geçersiz seçim. Lütfen tekrar deneyiniz:\n" + self._get_update_options(),
+                "step": "update_selection",
+                "data": self.user_data
+            }
+        field = options[choice - 1]
+        self.user_data.pop(field, None)
+        self.current_step = "update_field_input"
+        self._last_update_field = field
+        return {
+            "response": self.flow.product(self.application_type).update_prompts[field],
+            "step": self.current_step,
+            "data": self.user_data
+        }
+
+    def _handle_update_field_input(self, user_message: str, intents: frozenset) -> Dict[str, Any]:
+        """Güncellenecek alan için yeni değeri alır ve tekrar güncelleme isteyip istemediğini sorar"""
+        field = getattr(self, '_last_update_field', None)
+        kind = FIELD_KINDS.get(field)
+        if kind is None:
+            return {"response": "Bir hata oluştu. Lütfen tekrar deneyin.", "step": "confirmation", "data": self.user_data}
+        # Alan tipine göre veri çek
+        if kind in ("amount", "number"):
+            value = self.extract_info_from_text(user_message, "number")
+            if value is None:
+                return {"response": "Lütfen geçerli bir değer giriniz:", "step": "update_field_input", "data": self.user_data}
+            # Doğrulama
+            app_type = self.application_type
+            is_valid, error = self.validate_data(field, value, app_type)
+            if not is_valid:
+                return {"response": error, "step": "update_field_input", "data": self.user_data}
+            self.user_data[field] = value
+        elif kind == "text":
+            self.user_data[field] = user_message.strip()
+        else:
+            tckn = self.extract_info_from_text(user_message, "tckn")
+            if not tckn:
+                return {"response": "Lütfen geçerli bir TCKN giriniz:", "step": "update_field_input", "data": self.user_data}
+            is_valid, error = self.validate_data('tckn', tckn, self.application_type)
+            if not is_valid:
+                return {"response": error, "step": "update_field_input", "data": self.user_data}
+            self.user_data[field] = tckn
+        # Güncelleme sonrası tekrar sor
+        self.current_step = "update_selection"
+        return {
+            "response": "Başka bir değişiklik yapmak ister misiniz? (Evet/Hayır)",
+            "step": self.current_step,
+            "data": self.user_data
+        }
+
+    def process_message(self, user_message: str, stream: bool = False) -> Dict[str, Any]:
+        """
+        Process message and update state
+
+        With ``stream=True`` an AI answer is returned as an iterator of text
+        chunks instead of a string; rule-based answers are always strings.
+        Both sides of the exchange are added to the conversation history and
+        to the transcript log (a streamed answer once it has been consumed).
+        """
+        started = time.perf_counter()
+        step_before = self.current_step
+        with self.telemetry.span("process_message", step=self.current_step):
+            result = self._process_message(user_message, stream)
+            turn = self._turn(user_message, step_before, result)
+            if result.get("should_exit"):
+                self._log_turn(turn, result["response"], started)
+            else:
+                self._remember("user", user_message)
+                if isinstance(result["response"], str):
+                    self._remember("bot", result["response"])
+                    self._log_turn(turn, result["response"], started)
+                else:
+                    result["response"] = self._remember_stream(result["response"], turn, started)
+        return result
+
+    def _turn(self, user_message: str, step_before: str, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Transcript record of this turn, without the answer (None when the transcript log is off)"""
+        if self.transcript_log is None:
+            return None
+        turn = {"time": round(time.time(), 3), "session": self.session_id, "step_before": step_before,
+                "step": result["step"], "application_type": self.application_type, "user": user_message}
+        if result.get("should_exit"):
+            turn["exit"] = True
+        return turn
+
+    def _log_turn(self, turn: Optional[Dict[str, Any]], answer: str, started: float) -> None:
+        """Hand the finished turn to the transcript log; this only queues it in memory"""
+        if turn is None:
+            return
+        turn["bot"] = answer
+        turn["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        logged = self.transcript_log.log(turn)
+        self.telemetry.inc("chatbot_transcript_turns_total", result="queued" if logged else "dropped")
+
+    def _process_message(self, user_message: str, stream: bool) -> Dict[str, Any]:
+        with self.telemetry.span("route"):
+            intents = self.router.route(user_message)
+        with self.telemetry.span("handle", step=self.current_step):
+            return self._handle_step(user_message, intents, stream)
+
+    def _handle_step(self, user_message: str, intents: frozenset, stream: bool) -> Dict[str, Any]:
+        # One lookup in the compiled flow table (see flow_engine.py): a
+        # transition, an input handler of the step, or the LLM
+        transition, handler = self.flow.dispatch(self.current_step, intents)
+        if transition is not None:
+            return self._apply_transition(transition)
+        if handler is not None:
+            return self.FLOW_HANDLERS[handler](self, user_message, intents)
+
+        # General AI response
+        if stream:
+            response = self.generate_response_stream(user_message, intents)
+        else:
+            response = self.generate_response(user_message, intents)
+        return {
+            "response": response,
+            "step": self.current_step,
+            "data": self.user_data
+        }
+
+    def _apply_transition(self, transition: Transition) -> Dict[str, Any]:
+        """Run the transition's action, then move to its step with its answer"""
+        result = {"response": transition.say}
+        if transition.action is not None:
+            final = self.FLOW_ACTIONS[transition.action](self, transition, result)
+            if final is not None:
+                return final
+        if transition.to is not None:
+            self.current_step = transition.to
+        result["step"] = self.current_step
+        result["data"] = self.user_data
+        return result
+
+    # Flow actions: update ``result`` in place, or return the whole result to stay where we are
+
+    def _exit_action(self, transition: Transition, result: Dict[str, Any]) -> Dict[str, Any]:
+        return {"response": transition.say, "step": "exit", "data": self.user_data, "should_exit": True}
+
+    def _reset_action(self, transition: Transition, result: Dict[str, Any]) -> None:
+        self.user_data = {}
+        self.application_type = None
+        self.history = []
+        self.history_summary = ""
+
+    def _start_application_action(self, transition: Transition, result: Dict[str, Any]) -> None:
+        self.application_type = transition.arg
+
+    def _update_options_action(self, transition: Transition, result: Dict[str, Any]) -> None:
+        result["response"] = f"{transition.say}\n{self._get_update_options()}"
+
+    def _confirmation_action(self, transition: Transition, result: Dict[str, Any]) -> None:
+        result["response"] = self._generate_confirmation_message()
+
+    def _submit_action(self, transition: Transition, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        save_result = self.save_application()
+        if not save_result["success"]:
+            return {"response": f"❌ Başvuru kaydedilemedi: {save_result['error']}", "step": self.current_step,
+                    "data": self.user_data}
+        result["response"] = transition.say.format(application_id=save_result['application_id'])
+        result["job_id"] = save_result["job_id"]
+        return None
+
+    def _record_hgs_action(self, transition: Transition, result: Dict[str, Any]) -> None:
+        result["job_id"] = self.record_hgs_answer(transition.arg)
+
+    def _next_field(self) -> Optional[str]:
+        """First field of the current flow that is still missing"""
+        product = self.flow.product(self.application_type)
+        for field in product.fields:
+            if field not in self.user_data and product.needed(field, self.validator, self.user_data):
+                return field
+        return None
+
+    def _slot_candidates(self, slots: Dict[str, Any], user_message: str, intents: frozenset,
+                         expected: str) -> Dict[str, Any]:
+        """Values for the fields of the current flow among the extracted slots"""
+        product = self.flow.product(self.application_type)
+        candidates = {field: slots[field] for field in product.money_fields if field in slots}
+        if "vehicle_age" in product.kinds:
+            if "vehicle_age" in slots:
+                candidates["vehicle_age"] = slots["vehicle_age"]
+            elif "model_year" in slots:
+                candidates["vehicle_age"] = self.slots.age_from_year(slots["model_year"])
+        if "vehicle_model" in product.kinds and "vehicle_model" in slots and "commercial_vehicle" not in intents:
+            candidates["vehicle_model"] = slots["vehicle_model"]
+        if slots["tckns"] and product.tckn_field:
+            candidates[product.tckn_field] = slots["tckns"][0]
+
+        # Amounts without a keyword: a plain number answers the question just
+        # asked, further amounts in TL fill the remaining amount fields in order
+        amounts = slots["amounts"]
+        if product.kinds.get(expected) in ("amount", "number") and expected not in candidates and amounts:
+            value, _ = amounts.pop(0)
+            if expected == "vehicle_age" and value >= 100:
+                value = self.slots.age_from_year(value)
+            if value is not None:
+                candidates[expected] = value
+        for field in product.money_fields:
+            if field not in self.user_data and field not in candidates:
+                money = [amount for amount in amounts if amount[1]]
+                if money:
+                    amounts.remove(money[0])
+                    candidates[field] = money[0][0]
+
+        if expected == "vehicle_model" and "vehicle_model" not in candidates and "commercial_vehicle" not in intents:
+            if not candidates and not slots["numbers"]:
+                candidates["vehicle_model"] = user_message
+            elif slots["free_text"]:
+                candidates["vehicle_model"] = slots["free_text"][0]
+        elif expected in product.skippable and expected not in candidates:
+            # Optional: anything but a value skips it
+            candidates[expected] = None
+        return candidates
+
+    def _handle_collection(self, user_message: str, intents: frozenset) -> Dict[str, Any]:
+        """
+        Fill every field of the current flow the message mentions, then ask
+        for the next missing one (or show the confirmation when none is left)
+        """
+        app_type = self.application_type
+        product = self.flow.product(app_type)
+        expected = self._next_field()
+        with self.telemetry.span("extract"):
+            slots = self.slots.extract(user_message)
+        mentions_slots = "vehicle_model" in slots or slots["numbers"] or slots["tckns"]
+        if expected == "vehicle_model" and "model_question" in intents and not mentions_slots:
+            return {
+                "response": "Bankamızda tüm marka ve modeller için finansman sağlıyoruz (Toyota, Volkswagen, BMW, Mercedes, Renault, Ford vb.). Sadece ticari araçlar (kamyon, minibüs, otobüs) hariçtir. Hangi araç modelini seçtiniz?",
+                "step": self.current_step,
+                "data": self.user_data
+            }
+
+        candidates = self._slot_candidates(slots, user_message, intents, expected)
+        saved = {}
+        error = None
+        for field in product.fields:
+            if field not in candidates or field in self.user_data:
+                continue
+            value = candidates[field]
+            if not product.needed(field, self.validator, self.user_data):
+                continue
+            if field == "loan_amount" and 'vehicle_value' not in self.user_data:
+                continue
+            if not value and field not in product.skippable:
+                continue
+            if value is not None:
+                is_valid, error = self.validate_data('tckn' if product.kinds[field] == "tckn" else field, value, app_type)
+                if not is_valid:
+                    break
+                error = None
+            self.user_data[field] = value
+            saved[field] = value
+
+        next_field = self._next_field()
+        if next_field is None and error is None:
+            self.current_step = "confirmation"
+            return {"response": self._generate_confirmation_message(), "step": self.current_step, "data": self.user_data}
+
+        if error:
+            follow_up = error
+        elif next_field == "vehicle_model" and "commercial_vehicle" in intents:
+            follow_up = "Üzgünüm, ticari modeller için başvuru yapılamaz. Farklı bir araç modeli var mı?"
+        elif saved:
+            threshold = self.validator.guarantor_threshold(app_type)
+            follow_up = product.questions[next_field].format(
+                threshold=f"{threshold / 1_000_000:g}M" if threshold else "")
+        else:
+            follow_up = "Lütfen geçerli bir değer giriniz."
+        if not saved:
+            return {"response": follow_up, "step": self.current_step, "data": self.user_data}
+
+        if len(saved) == 1:
+            field, value = next(iter(saved.items()))
+            acknowledgement = product.saved_message(field, value)
+        else:
+            acknowledgement = f"Şu bilgiler kaydedildi: {summarize_user_data(None, saved)}."
+        return {"response": f"{acknowledgement} {follow_up}", "step": self.current_step, "data": self.user_data}
+
+    def _generate_confirmation_message(self) -> str:
+        """Generate confirmation message"""
+        product = self.flow.product(self.application_type)
+        msg = "Başvuru bilgilerinizi kontrol ediniz:\n\n"
+        msg += f"• Başvuru Türü: {product.label}\n"
+        for label, value in product.summary(self.user_data):
+            msg += f"• {label}: {value}\n"
+        msg += "\nBilgiler doğru mu? 'Evet' derseniz başvurunuzu tamamlarım, 'Hayır' derseniz güncelleyebilirsiniz."
+        return msg
+
+    def save_application(self) -> Dict[str, Any]:
+        """
+        Queue the application for saving to the configured application store
+
+        The id is assigned right away; the returned ``job_id`` can be polled on
+        the job queue to see when the application has been written.
+        """
+        now = datetime.now()
+        application = {
+            "id": f"APP_{now.strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(6)}",
+            "type": self.application_type,
+            "data": self.user_data.copy(),
+            "timestamp": now.isoformat(),
+            "status": "pending"
+        }
+
+        try:
+            with self.telemetry.span("save"):
+                job_id = self.jobs.submit("save_application", {
+                    "application": application,
+                    "storage": self.config.get('storage'),
+                    "outbox_path": jobs_settings(self.config.get('jobs'))["outbox_path"],
+                    "telemetry": self.config.get('telemetry')
+                })
+            if self.jobs.inline:
+                status = self.jobs.status(job_id)
+                if status and status["state"] == "failed":
+                    self.telemetry.inc("chatbot_applications_total", result="failed")
+                    return {"success": False, "error": status["error"]}
+            self.telemetry.inc("chatbot_applications_total", result="queued")
+            self.application_id = application["id"]
+            self.prompts.record_application(self.llm_calls)
+            self.llm_calls = 0
+            return {"success": True, "application_id": application["id"], "job_id": job_id}
+        except Exception as e:
+            self.telemetry.inc("chatbot_applications_total", result="failed")
+            return {"success": False, "error": str(e)}
+
+    def record_hgs_answer(self, accepted: bool) -> Optional[str]:
+        """Queue the HGS cross-sell answer for the last saved application; returns the job id"""
+        try:
+            return self.jobs.submit("record_hgs", {
+                "application_id": self.application_id,
+                "accepted": accepted,
+                "timestamp": datetime.now().isoformat(),
+                "outbox_path": jobs_settings(self.config.get('jobs'))["outbox_path"]
+            })
+        except Exception:
+            return None
+
+    # Names used in the flow table (flow_engine.ACTIONS / HANDLERS) -> methods
+    FLOW_ACTIONS = {
+        "exit": _exit_action,
+        "reset": _reset_action,
+        "start_application": _start_application_action,
+        "update_options": _update_options_action,
+        "confirmation": _confirmation_action,
+        "submit": _submit_action,
+        "record_hgs": _record_hgs_action
+    }
+
+    FLOW_HANDLERS = {
+        "collect": _handle_collection,
+        "update_selection": _handle_update_selection,
+        "update_field_input": _handle_update_field_input
+    }
+
+
+@job_handler("save_application")
+def _save_application_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    application = payload["application"]
+    try:
+        with get_telemetry(payload.get("telemetry")).span("store_append"):
+            get_application_store(payload["storage"]).append(application)
+    except DuplicateApplicationError:
+        pass  # an earlier attempt got as far as the store
+    notify("application_saved", {"application_id": application["id"], "type": application["type"]},
+           payload.get("outbox_path"))
+    return {"application_id": application["id"]}
+
+
+@job_handler("record_hgs")
+def _record_hgs_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    notify("hgs_offer", {"application_id": payload["application_id"], "accepted": payload["accepted"],
+                         "timestamp": payload["timestamp"]}, payload.get("outbox_path"))
+    return {"application_id": payload["application_id"], "accepted": payload["accepted"]}
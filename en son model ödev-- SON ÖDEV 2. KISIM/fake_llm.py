@@ -0,0 +1,71 @@
+"""
+Offline stand-in for google.generativeai.GenerativeModel.
+
+FakeGenerativeModel answers ``generate_content`` with a canned (or
+prompt-derived) text and simulates model timing: a delay before the first
+token and a delay per token after that. With ``stream=True`` it yields the
+answer in word-sized chunks exactly like the Gemini SDK does, so the
+streaming UI and benchmarks can run without an API key or network.
+"""
+import time
+from typing import Callable, Iterator, Optional, Union
+
+
+class FakeResponse:
+    """Mimics the ``.text`` attribute of a Gemini response or stream chunk"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStreamResponse:
+    """Iterable of chunks; ``.text`` is the full answer once consumed"""
+
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = chunks
+        self._parts = []
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            self._parts.append(chunk)
+            yield FakeResponse(chunk)
+
+    @property
+    def text(self) -> str:
+        for _ in self:
+            pass
+        return "".join(self._parts)
+
+
+class FakeGenerativeModel:
+    """Deterministic local model with configurable latency"""
+
+    def __init__(self, response: Union[str, Callable[[str], str]] = "Bu bir test yanıtıdır.",
+                 first_token_delay: float = 0.0, token_delay: float = 0.0,
+                 model_name: str = "fake-model", sleep: Optional[Callable[[float], None]] = None):
+        self.response = response
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.model_name = model_name
+        self.calls = 0
+        self._sleep = sleep or time.sleep
+
+    def _text_for(self, prompt: str) -> str:
+        return self.response(prompt) if callable(self.response) else self.response
+
+    def _chunks(self, text: str) -> Iterator[str]:
+        words = text.split(" ")
+        self._sleep(self.first_token_delay)
+        for i, word in enumerate(words):
+            if i:
+                self._sleep(self.token_delay)
+            yield word if i == len(words) - 1 else word + " "
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        self.calls += 1
+        text = self._text_for(prompt)
+        if stream:
+            return FakeStreamResponse(self._chunks(text))
+        for _ in self._chunks(text):
+            pass
+        return FakeResponse(text)
@@ -0,0 +1,124 @@
+"""
+BM25 retrieval over the "faq" section of chatbot_config.json.
+
+Every FAQ answer becomes one document made of its key (or question, in
+"sss_yanitlari") and the answer text. Turkish words are cut to their first
+five letters, a cheap stemmer that copes well with suffixes ("belgeler",
+"belgesi" -> "belge"), and the key is counted twice so it outweighs
+the answer body. A question whose best match scores above ``min_score`` is
+answered locally; anything else is left for the LLM.
+"""
+import hashlib
+import json
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from intent_router import turkish_lower
+
+
+DEFAULT_FAQ_INDEX_CONFIG = {
+    "enabled": True,
+    "min_score": 3.5,
+    "k1": 1.5,
+    "b": 0.75
+}
+
+STEM_LENGTH = 5
+
+STOPWORDS = {
+    "ve", "ile", "bir", "bu", "şu", "da", "de", "mi", "mı", "mu", "mü", "ne", "nedir", "neler",
+    "nasıl", "için", "ben", "biz", "siz", "sizin", "benim", "var", "acaba", "lütfen", "kaç",
+    "hangi", "olur", "olarak", "gibi", "çok", "daha", "en", "ya", "veya", "ki", "the"
+}
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case, drop stopwords and stem Turkish words to STEM_LENGTH letters"""
+    return [word[:STEM_LENGTH] for word in _WORD.findall(turkish_lower(text))
+            if word not in STOPWORDS and not word.isdigit()]
+
+
+class FaqIndex:
+    """Okapi BM25 index over the FAQ answers"""
+
+    def __init__(self, faq: Dict[str, Any], min_score: float = 3.5, k1: float = 1.5, b: float = 0.75):
+        self.min_score = min_score
+        self.k1 = k1
+        self.b = b
+        self.entries = []  # (section, key, answer)
+        for section, items in faq.items():
+            if isinstance(items, dict):
+                for key, answer in items.items():
+                    self.entries.append((section, key, str(answer)))
+            else:
+                self.entries.append(("", section, str(items)))
+
+        self._postings = {}  # term -> [(entry index, term frequency)]
+        self._lengths = []
+        for i, (_, key, answer) in enumerate(self.entries):
+            title = key.replace("_", " ")
+            terms = Counter(tokenize(title) * 2 + tokenize(answer))
+            self._lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self._postings.setdefault(term, []).append((i, tf))
+
+        count = len(self.entries)
+        self._avg_length = sum(self._lengths) / count if count else 0.0
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def search(self, query: str, limit: int = 3) -> List[Tuple[float, Tuple[str, str, str]]]:
+        """Return the best (score, (section, key, answer)) matches"""
+        scores = {}
+        k1, b, avg_length = self.k1, self.b, self._avg_length
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for i, tf in postings:
+                norm = k1 * (1 - b + b * self._lengths[i] / avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(score, self.entries[i]) for i, score in best]
+
+    def answer(self, query: str) -> Optional[str]:
+        """Answer text of the best match, or None when it is not confident enough"""
+        results = self.search(query, limit=1)
+        if results and results[0][0] >= self.min_score:
+            return results[0][1][2]
+        return None
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_faq_index(config: Dict[str, Any]) -> Optional[FaqIndex]:
+    """
+    Return the process-wide index for this config's FAQ entries.
+
+    Indexes are keyed on a hash of the FAQ content and settings, so editing
+    chatbot_config.json builds a fresh index the next time a chatbot loads it.
+    """
+    index_config = {**DEFAULT_FAQ_INDEX_CONFIG, **config.get("faq_index", {})}
+    if not index_config["enabled"]:
+        return None
+    faq = config.get("faq", {})
+    key = hashlib.sha1(json.dumps([faq, index_config], sort_keys=True, ensure_ascii=False)
+                       .encode("utf-8")).hexdigest()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = FaqIndex(faq, min_score=index_config["min_score"],
+                             k1=index_config["k1"], b=index_config["b"])
+            _indexes.clear()
+            _indexes[key] = index
+        return index
@@ -0,0 +1,296 @@
+"""
+Conversation flow of the chatbot, compiled from config into a transition table.
+
+A flow is made of steps. Each step has transitions keyed by intent (see
+intent_router.py), an optional handler for free input (data collection,
+update selection) and an optional ``otherwise`` answer. The "global"
+transitions (exit, cancel) are merged into every step, ahead of the step's
+own ones. FlowEngine.dispatch() is one dict lookup for the step and one per
+routed intent, however many steps and products the flow has.
+
+Products (application types) come from the "flow" config section together
+with "finance_rules". finance_rules[<product>] lists the fields to collect
+(``required_fields`` and ``optional_fields``), and flow.products[<product>]
+in chatbot_config.json adds the wording:
+
+    intent         - intent (keywords in "intents") that starts the product
+    step           - name of its collection step
+    label          - shown in the confirmation, e.g. "Yeni Araç"
+    start_message  - answer when the product is chosen (default: its first question)
+    fields         - order in which fields are asked (default: required, then optional)
+    questions      - question per field (default: "prompts" config section)
+    labels         - confirmation and update menu labels that differ from FIELD_TITLES
+    update_prompts - question when a field is changed from the update menu
+    saved_messages - acknowledgement when a field is filled ({value} is the value)
+
+An optional field is skippable, unless it has a condition in
+FIELD_CONDITIONS (the guarantor is needed from a vehicle value on), in
+which case it is asked for, and required, only when the condition holds.
+Adding a product made of the known fields is a config change: finance_rules,
+an intent and a flow.products entry. Without a flow.products section every
+finance_rules product gets the defaults above. The steps and the global
+transitions come from DEFAULT_FLOW_CONFIG unless "flow" overrides them.
+
+Actions and handlers named in the table are implemented by
+VehicleFinanceChatbot; unknown names are rejected when the flow is compiled.
+"""
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from prompt_builder import FIELD_LABELS
+
+
+# How a field is read from a message: amounts in TL, plain numbers, free text or a TCKN
+FIELD_KINDS = {
+    "vehicle_value": "amount",
+    "loan_amount": "amount",
+    "vehicle_age": "number",
+    "vehicle_model": "text",
+    "guarantor_tckn": "tckn",
+    "seller_tckn": "tckn"
+}
+
+FIELD_TITLES = {
+    "vehicle_value": "Araç Değeri",
+    "vehicle_model": "Araç Modeli",
+    "vehicle_age": "Araç Yaşı",
+    "loan_amount": "Finansman Tutarı",
+    "guarantor_tckn": "Kefil TCKN",
+    "seller_tckn": "Satıcı TCKN"
+}
+
+DEFAULT_UPDATE_PROMPTS = {
+    "vehicle_value": "Yeni araç değerini giriniz:",
+    "vehicle_model": "Yeni araç modelini giriniz:",
+    "vehicle_age": "Yeni araç yaşını giriniz:",
+    "loan_amount": "Yeni finansman tutarını giriniz:",
+    "guarantor_tckn": "Yeni kefil TCKN giriniz:",
+    "seller_tckn": "Yeni satıcı TCKN giriniz:"
+}
+
+# Optional fields that become required when the condition holds: (validator, product, user_data) -> bool
+FIELD_CONDITIONS = {
+    "guarantor_tckn": lambda validator, product, data: validator.guarantor_required(
+        product, data.get("vehicle_value", 0))
+}
+
+ACTIONS = ("exit", "reset", "start_application", "update_options", "confirmation", "submit", "record_hgs")
+HANDLERS = ("collect", "update_selection", "update_field_input")
+
+UPDATE_OPTIONS_QUESTION = "Hangi bilgiyi güncellemek istersiniz?"
+
+DEFAULT_FLOW_CONFIG = {
+    "start_step": "greeting",
+    "product_step": "determine_type",
+    "global": [
+        {"intent": "exit", "action": "exit",
+         "say": "Başvuru işleminiz yarıda kesildi. Teşekkürler, iyi günler! 👋"},
+        {"intent": "cancel", "action": "reset", "to": "greeting",
+         "say": "Başvuru sıfırlandı. Yeniden başlamak için 'merhaba' yazabilirsiniz."}
+    ],
+    "steps": {
+        "greeting": {
+            "on": [{"intent": "greeting", "to": "determine_type",
+                    "say": "Merhaba! Araç finansmanı konusunda size yardımcı olmaktan mutluluk duyarım. "
+                           "Yeni araç mı yoksa ikinci el araç finansmanı mı istiyorsunuz?"}]
+        },
+        "determine_type": {"on": []},
+        "confirmation": {
+            "on": [{"intent": "confirm_update", "action": "update_options", "to": "update_selection",
+                    "say": UPDATE_OPTIONS_QUESTION},
+                   {"intent": "confirm_accept", "action": "submit", "to": "hgs_offer",
+                    "say": "🎉 Başvurunuz kaydedildi! Başvuru No: {application_id}\n\n"
+                           "HGS ürünümüzü de almak ister misiniz? (Evet/Hayır)"}]
+        },
+        "hgs_offer": {
+            "on": [{"intent": "hgs_accept", "action": "record_hgs", "arg": True, "to": "end",
+                    "say": "✅ HGS başvurunuz da alınmıştır. Tüm başvurularınız başarıyla tamamlandı! "
+                           "Yeni bir başvuru için 'merhaba' yazabilirsiniz. 👋"},
+                   {"intent": "hgs_decline", "action": "record_hgs", "arg": False, "to": "end",
+                    "say": "Anlaşıldı, HGS başvurusu alınmadı. Tüm başvurularınız başarıyla tamamlandı! "
+                           "Yeni bir başvuru için 'merhaba' yazabilirsiniz. 👋"}],
+            "otherwise": {"say": "Lütfen 'Evet' veya 'Hayır' şeklinde yanıt veriniz. HGS ürünümüzü almak ister misiniz?"}
+        },
+        "update_selection": {
+            "on": [{"intent": "update_decline", "action": "confirmation", "to": "confirmation"},
+                   {"intent": "update_accept", "action": "update_options", "say": UPDATE_OPTIONS_QUESTION}],
+            "handler": "update_selection"
+        },
+        "update_field_input": {"handler": "update_field_input"}
+    }
+}
+
+
+class Transition:
+    """Move to ``to`` (None: stay) and answer ``say``, or run ``action`` with ``arg``"""
+
+    __slots__ = ("to", "say", "action", "arg")
+
+    def __init__(self, to: Optional[str] = None, say: str = "", action: Optional[str] = None, arg: Any = None):
+        if action is not None and action not in ACTIONS:
+            raise ValueError(f"Unknown flow action: {action} (use one of {list(ACTIONS)})")
+        self.to = to
+        self.say = say
+        self.action = action
+        self.arg = arg
+
+    @classmethod
+    def from_config(cls, spec: Dict[str, Any]) -> "Transition":
+        return cls(spec.get("to"), spec.get("say", ""), spec.get("action"), spec.get("arg"))
+
+    def __repr__(self):
+        return f"Transition(to={self.to!r}, action={self.action!r})"
+
+
+class Step:
+    """Transitions of one step by intent (with their priority), its input handler and fallback answer"""
+
+    __slots__ = ("name", "on", "handler", "otherwise")
+
+    def __init__(self, name: str, on: Dict[str, Tuple[int, Transition]], handler: Optional[str] = None,
+                 otherwise: Optional[Transition] = None):
+        if handler is not None and handler not in HANDLERS:
+            raise ValueError(f"Unknown flow handler: {handler} (use one of {list(HANDLERS)})")
+        self.name = name
+        self.on = on
+        self.handler = handler
+        self.otherwise = otherwise
+
+
+class Product:
+    """One application type: the fields it collects and how they are asked, confirmed and updated"""
+
+    def __init__(self, name: str, spec: Dict[str, Any], rules: Dict[str, Any], prompts: Dict[str, str]):
+        self.name = name
+        self.intent = spec.get("intent", f"type_{name}")
+        self.step = spec.get("step", f"collect_{name}")
+        self.label = spec.get("label", name)
+        required = list(rules.get("required_fields") or ())
+        optional = [field for field in rules.get("optional_fields") or () if field not in required]
+        # Update menu and confirmation show required fields first; collection follows "fields"
+        self.update_fields = required + optional
+        self.fields = list(spec.get("fields") or self.update_fields)
+        unknown = [field for field in set(self.fields) | set(self.update_fields) if field not in FIELD_KINDS]
+        if unknown:
+            raise ValueError(f"Unknown fields for product {name}: {unknown} (use {list(FIELD_KINDS)})")
+        missing = [field for field in self.update_fields if field not in self.fields]
+        if missing:
+            raise ValueError(f"Product {name} never asks for {missing}")
+        self.conditions = {field: FIELD_CONDITIONS[field] for field in optional if field in FIELD_CONDITIONS}
+        self.skippable = frozenset(field for field in optional if field not in self.conditions)
+        self.kinds = {field: FIELD_KINDS[field] for field in self.fields}
+        self.money_fields = tuple(field for field in self.fields if self.kinds[field] == "amount")
+        self.tckn_field = next((field for field in self.fields if self.kinds[field] == "tckn"), None)
+        questions = spec.get("questions") or {}
+        self.questions = {field: questions.get(field) or prompts.get(f"{field}_{name}") or prompts.get(field)
+                          or f"{FIELD_LABELS[field]}:" for field in self.fields}
+        self.start_message = spec.get("start_message") or self.questions[self.fields[0]]
+        self.titles = {**FIELD_TITLES, **(spec.get("labels") or {})}
+        self.update_prompts = {**DEFAULT_UPDATE_PROMPTS, **(spec.get("update_prompts") or {})}
+        self.saved_messages = spec.get("saved_messages") or {}
+
+    def needed(self, field: str, validator: Any, data: Dict[str, Any]) -> bool:
+        condition = self.conditions.get(field)
+        return condition is None or condition(validator, self.name, data)
+
+    def update_options(self, data: Dict[str, Any]) -> List[str]:
+        """Fields offered in the update menu: required ones and optional ones that were answered"""
+        return [field for field in self.update_fields if field not in self.skippable and field not in self.conditions
+                or field in data]
+
+    def summary(self, data: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+        """(label, formatted value) of the collected fields, in ``fields`` order (default: asking order)"""
+        lines = []
+        for field in fields if fields is not None else self.fields:
+            value = data.get(field)
+            if value is None or value == "":
+                continue
+            if self.kinds[field] == "amount":
+                text = f"{value:,} TL"
+            elif field == "vehicle_age":
+                text = f"{value} yıl"
+            else:
+                text = str(value)
+            lines.append((self.titles[field], text))
+        return lines
+
+    def saved_message(self, field: str, value: Any) -> str:
+        template = self.saved_messages.get(field)
+        return template.format(value=value) if template else f"{FIELD_LABELS[field]} kaydedildi."
+
+
+class FlowEngine:
+    """Transition table of the conversation, compiled once per config"""
+
+    def __init__(self, steps: Dict[str, Step], default: Step, products: Dict[str, Product], start_step: str):
+        self.steps = steps
+        self.default = default  # steps outside the table (e.g. "end"): global transitions only
+        self.products = products
+        self.start_step = start_step
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], finance_rules: Optional[Dict[str, Dict[str, Any]]] = None
+                    ) -> "FlowEngine":
+        """
+        Compile the "flow" config section; ``finance_rules`` are the merged
+        rules per product (ApplicationValidator.rules), by default the
+        "finance_rules" section as is
+        """
+        settings = {**DEFAULT_FLOW_CONFIG, **(config.get("flow") or {})}
+        rules = finance_rules if finance_rules is not None else config.get("finance_rules") or {}
+        prompts = config.get("prompts") or {}
+        products = {}
+        for name, spec in (settings.get("products") or {name: {} for name in rules}).items():
+            if name not in rules:
+                raise ValueError(f"Flow product {name} has no finance_rules")
+            products[name] = Product(name, spec, rules[name], prompts)
+
+        global_on = [Transition.from_config(spec) for spec in settings["global"]]
+        global_intents = [spec["intent"] for spec in settings["global"]]
+        step_specs = {name: dict(spec) for name, spec in settings["steps"].items()}
+        product_on = step_specs.setdefault(settings["product_step"], {}).setdefault("on", [])
+        step_specs[settings["product_step"]]["on"] = list(product_on) + [
+            {"intent": product.intent, "action": "start_application", "to": product.step,
+             "say": product.start_message, "arg": product.name} for product in products.values()]
+        for product in products.values():
+            if product.step in step_specs:
+                raise ValueError(f"Step {product.step} of product {product.name} is already defined")
+            step_specs[product.step] = {"handler": "collect"}
+
+        def compile_step(name: str, spec: Dict[str, Any]) -> Step:
+            on = {}
+            ordered = list(zip(global_intents, global_on))
+            ordered += [(item["intent"], Transition.from_config(item)) for item in spec.get("on", ())]
+            for priority, (intent, transition) in enumerate(ordered):
+                on.setdefault(intent, (priority, transition))
+            otherwise = Transition.from_config(spec["otherwise"]) if spec.get("otherwise") else None
+            return Step(name, on, spec.get("handler"), otherwise)
+
+        steps = {name: compile_step(name, spec) for name, spec in step_specs.items()}
+        return cls(steps, compile_step("", {}), products, settings["start_step"])
+
+    def dispatch(self, step: str, intents: FrozenSet[str]) -> Tuple[Optional[Transition], Optional[str]]:
+        """
+        (transition, None) for the highest-priority transition the intents
+        trigger, else (None, handler) when the step reads free input, else
+        (otherwise, None); (None, None) leaves the message to the LLM
+        """
+        compiled = self.steps.get(step, self.default)
+        on = compiled.on
+        best = None
+        for intent in intents:
+            found = on.get(intent)
+            if found is not None and (best is None or found[0] < best[0]):
+                best = found
+        if best is not None:
+            return best[1], None
+        if compiled.handler is not None:
+            return None, compiled.handler
+        return compiled.otherwise, None
+
+    def product(self, name: Optional[str]) -> Product:
+        return self.products[name]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"steps": len(self.steps), "products": len(self.products),
+                "transitions": sum(len(step.on) for step in self.steps.values())}
+
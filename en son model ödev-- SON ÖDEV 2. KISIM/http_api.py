@@ -0,0 +1,303 @@
+"""
+Asyncio HTTP/JSON API serving VehicleFinanceChatbot without Streamlit.
+
+Streamlit re-runs the whole UI script for every message; this server only
+does the work a message needs: load the session state, run process_message,
+save the state. Conversation state lives in the session store from the
+"sessions" config section, so several API processes (and the Streamlit app)
+can run side by side. Messages of one session are handled one at a time:
+an asyncio lock per session inside a process, and a lease on the session
+(see session_store.py) across processes, so with the memory backend run a
+single process. Different sessions run concurrently on a thread pool, so a
+slow LLM call never blocks the event loop. A message that waited
+``lease_seconds`` for another process gets 409.
+
+A session is addressed by the signed token from session_token(), never by
+its bare id: the state holds TCKNs and phone numbers. A forged, expired or
+bare-id token gets 404. Tokens expire idle_seconds after they are issued, so
+every message answer carries a fresh one; use the latest.
+
+Endpoints:
+    POST   /sessions                  -> 201 {"session_token": ...}
+    POST   /sessions/<token>/messages {"message": "..."} -> {"response", "step", "data", "should_exit", "job_id",
+                                                             "session_token"}
+    GET    /sessions/<token>          -> {"session_id", "step", "type", "data"}
+    DELETE /sessions/<token>          -> {"deleted": true}
+    GET    /jobs/<id>                 -> {"id", "kind", "state", "attempts", "result", "error"}
+    GET    /health                    -> {"status": "ok", "sessions": N, "prompt": {...}, "llm": {...}, "coalescing": {...},
+                                          "admission": {...}, "transcript_log": {...}}
+    GET    /metrics                   -> Prometheus text format (see telemetry.py)
+
+Usage:
+    GEMINI_API_KEY=... python http_api.py --port 8080
+    python http_api.py --port 8080 --llm-backend stub --session-backend memory
+"""
+import argparse
+import asyncio
+import json
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict, Optional, Tuple, Union
+
+from chatbot_engine import VehicleFinanceChatbot
+from job_queue import get_job_queue
+from llm_backends import LLM_BACKENDS, backend_class
+from llm_client import coalescing_stats
+from resources import get_config, warm_up
+from session_store import (SessionBusy, SessionState, get_session_store, new_session_id, session_from_token,
+                           session_token)
+from telemetry import get_telemetry
+
+
+DEFAULT_HTTP_API_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8080,
+    "workers": 16,
+    "max_body_bytes": 65536
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ChatbotAPI:
+    """Request handling and the HTTP/1.1 connection loop"""
+
+    def __init__(self, config: Dict[str, Any], api_key: str, model: Any = None):
+        self.config = config
+        self.settings = {**DEFAULT_HTTP_API_CONFIG, **config.get("http_api", {})}
+        self.api_key = api_key
+        self.model = model
+        self.sessions = get_session_store(config.get("sessions"))
+        self.jobs = get_job_queue(config.get("jobs"))
+        self.executor = ThreadPoolExecutor(self.settings["workers"], thread_name_prefix="chatbot-api")
+        self._session_locks = weakref.WeakValueDictionary()
+
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session_id] = lock
+        return lock
+
+    # --- chatbot work (runs on the thread pool) ---
+
+    def _health(self) -> Dict[str, Any]:
+        chatbot = VehicleFinanceChatbot(self.api_key, model=self.model, config=self.config)
+        llm_stats = chatbot.model.stats() if hasattr(chatbot.model, "stats") else None
+        admission = chatbot.admission.stats() if chatbot.admission is not None else None
+        transcripts = chatbot.transcript_log.stats() if chatbot.transcript_log is not None else None
+        return {"status": "ok", "sessions": len(self.sessions), "prompt": chatbot.prompts.stats(), "llm": llm_stats,
+                "coalescing": coalescing_stats(), "admission": admission, "transcript_log": transcripts}
+
+    def _create_session(self) -> str:
+        session_id = new_session_id()
+        self.sessions.save(session_id, SessionState())
+        return session_token(session_id, self.config.get("sessions"))
+
+    def _session_id(self, token: str) -> str:
+        session_id = session_from_token(token, self.config.get("sessions"))
+        if session_id is None:
+            raise HTTPError(404, "unknown or expired session")
+        return session_id
+
+    def _load(self, session_id: str) -> SessionState:
+        state = self.sessions.load(session_id)
+        if state is None:
+            raise HTTPError(404, "unknown or expired session")
+        return state
+
+    def _chat(self, session_id: str, message: str) -> Dict[str, Any]:
+        try:
+            with self.sessions.lease(session_id):
+                state = self._load(session_id)
+                chatbot = VehicleFinanceChatbot(self.api_key, model=self.model, config=self.config,
+                                                session_id=session_id)
+                chatbot.restore_state(state)
+                result = chatbot.process_message(message)
+                should_exit = result.get("should_exit", False)
+                if should_exit:
+                    self.sessions.delete(session_id)
+                else:
+                    self.sessions.save(session_id, chatbot.export_state())
+        except SessionBusy:
+            raise HTTPError(409, "session is busy with another message")
+        token = None if should_exit else session_token(session_id, self.config.get("sessions"))
+        return {"session_id": session_id, "response": result["response"], "step": result["step"],
+                "data": result["data"], "should_exit": should_exit, "job_id": result.get("job_id"),
+                "session_token": token}
+
+    def _job(self, job_id: str) -> Dict[str, Any]:
+        status = self.jobs.status(job_id)
+        if status is None:
+            raise HTTPError(404, "unknown job")
+        return status
+
+    # --- routing ---
+
+    async def dispatch(self, method: str, path: str,
+                       body: bytes) -> Tuple[int, Optional[Union[Dict[str, Any], str]]]:
+        loop = asyncio.get_running_loop()
+        parts = [part for part in path.split("/") if part]
+
+        if parts == ["health"]:
+            if method != "GET":
+                raise HTTPError(405, "method not allowed")
+            return 200, await loop.run_in_executor(self.executor, self._health)
+
+        if parts == ["metrics"]:
+            if method != "GET":
+                raise HTTPError(405, "method not allowed")
+            return 200, get_telemetry(self.config.get("telemetry")).prometheus_text()
+
+        if parts == ["sessions"]:
+            if method != "POST":
+                raise HTTPError(405, "method not allowed")
+            token = await loop.run_in_executor(self.executor, self._create_session)
+            return 201, {"session_token": token}
+
+        if len(parts) == 2 and parts[0] == "sessions":
+            session_id = self._session_id(parts[1])
+            if method == "GET":
+                state = await loop.run_in_executor(self.executor, self._load, session_id)
+                return 200, {"session_id": session_id, "step": state.current_step,
+                             "type": state.application_type, "data": state.user_data}
+            if method == "DELETE":
+                await loop.run_in_executor(self.executor, self.sessions.delete, session_id)
+                return 200, {"deleted": True}
+            raise HTTPError(405, "method not allowed")
+
+        if len(parts) == 2 and parts[0] == "jobs":
+            if method != "GET":
+                raise HTTPError(405, "method not allowed")
+            return 200, await loop.run_in_executor(self.executor, self._job, parts[1])
+
+        if len(parts) == 3 and parts[0] == "sessions" and parts[2] == "messages":
+            if method != "POST":
+                raise HTTPError(405, "method not allowed")
+            try:
+                message = json.loads(body or b"{}").get("message")
+            except (ValueError, AttributeError):
+                raise HTTPError(400, "body must be a JSON object")
+            if not isinstance(message, str) or not message.strip():
+                raise HTTPError(400, "'message' must be a non-empty string")
+            session_id = self._session_id(parts[1])
+            async with self._session_lock(session_id):
+                return 200, await loop.run_in_executor(self.executor, self._chat, session_id, message)
+
+        raise HTTPError(404, "not found")
+
+    # --- HTTP/1.1 ---
+
+    @staticmethod
+    def _write(writer: asyncio.StreamWriter, status: int, payload: Optional[Union[Dict[str, Any], str]],
+               keep_alive: bool) -> None:
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+            content_type = "application/json; charset=utf-8"
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    self._write(writer, 431, {"error": "request headers too large"}, False)
+                    break
+
+                request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    self._write(writer, 400, {"error": "malformed request line"}, False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > self.settings["max_body_bytes"]:
+                    self._write(writer, 413 if length > 0 else 400, {"error": "invalid request body size"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, payload = await self.dispatch(method, target.split("?", 1)[0], body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"internal error: {e.__class__.__name__}"}
+                self._write(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: Optional[str] = None, port: Optional[int] = None) -> asyncio.AbstractServer:
+        host = self.settings["host"] if host is None else host
+        port = self.settings["port"] if port is None else port
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for the vehicle finance chatbot")
+    parser.add_argument("--config", default="chatbot_config.json")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int, help="0 picks a free port")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"))
+    parser.add_argument("--llm-backend", choices=sorted(LLM_BACKENDS), help="Override the llm backend")
+    parser.add_argument("--fake-llm", action="store_true", help="Same as --llm-backend stub")
+    parser.add_argument("--session-backend", choices=["memory", "sqlite"], help="Override the sessions backend")
+    args = parser.parse_args()
+
+    config = get_config(args.config, VehicleFinanceChatbot._create_default_config)
+    if args.session_backend:
+        config = dict(config, sessions={**config.get("sessions", {}), "backend": args.session_backend})
+
+    backend = "stub" if args.fake_llm else args.llm_backend
+    if backend:
+        config = dict(config, llm={**config.get("llm", {}), "backend": backend})
+    if backend_class(config).needs_api_key and not args.api_key:
+        parser.error("--api-key or GEMINI_API_KEY is required for this llm backend")
+
+    api = ChatbotAPI(config, args.api_key or "offline")
+
+    async def run():
+        server = await api.serve(args.host, args.port)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"Chatbot API listening on http://{host}:{port}", flush=True)
+        warm_up(config)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Keyword intent router for the vehicle finance chatbot.
+
+All keyword lists from the "intents" section of chatbot_config.json are
+compiled into one trie-shaped regular expression, so a single pass over the
+message finds every intent it mentions. Keywords keep the substring semantics
+of the old ``any(word in message for word in [...])`` checks; "exact_intents"
+only match when the whole message is one of the listed phrases. Matching
+folds dotted and dotless i together, so "İKİNCİ", "IKINCI" and "ikinci" are
+the same keyword: an ASCII "I" is "ı" in Turkish but "i" in English text and
+in Turkish typed on an English keyboard ("EXIT", "Ikinci el").
+
+Folding makes substrings match more than they used to ("çık" would find
+"çikolata"), so the keywords of WHOLE_WORD_INTENTS (exit, cancel: the ones
+that throw the application away) only match as whole words.
+"""
+import re
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+
+DEFAULT_INTENT_KEYWORDS = {
+    "exit": ["çık", "çıkış", "quit", "exit", "bye", "görüşürüz", "hoşça kal", "bitir", "kapat"],
+    "cancel": ["iptal", "sıfırla", "yeniden başla", "restart", "baştan", "temizle"],
+    "greeting": ["merhaba", "selam", "iyi", "başla"],
+    "type_new": ["yeni"],
+    "type_used": ["ikinci", "2.", "eski", "kullanılmış"],
+    "confirm_update": ["hayır", "hayir", "güncelle", "guncelle", "değiştir", "degistir"],
+    "confirm_accept": ["evet", "onayla", "tamam"],
+    "hgs_accept": ["evet", "isterim", "almak", "olsun"],
+    "hgs_decline": ["hayır", "hayir", "istemem", "olmasın", "yok"],
+    "model_question": ["hangi", "model", "marka", "tür", "neler"],
+    "commercial_vehicle": ["ticari", "kamyon", "minibüs", "otobüs"],
+    "tckn_decline": ["hayır", "yok", "istemiyorum", "gerek yok"],
+    "faq_models": ["hangi model", "model", "marka", "araç türü"],
+    "faq_rates": ["faiz", "oran", "vade"]
+}
+
+# Intents whose keywords only match as whole words ("çık", not "açıklama" or "çikolata")
+WHOLE_WORD_INTENTS = frozenset(["exit", "cancel"])
+
+DEFAULT_EXACT_INTENTS = {
+    "update_decline": ["hayır", "hayir", "yok", "istemiyorum"],
+    "update_accept": ["evet", "yes", "istiyorum"]
+}
+
+
+def turkish_lower(text: str) -> str:
+    """Lower-case text with Turkish dotted/dotless i rules (İ -> i, I -> ı)"""
+    return text.replace("İ", "i").replace("I", "ı").lower()
+
+
+def fold_intent_text(text: str) -> str:
+    """Lower-case text with every i/ı/I/İ folded to "i", for keyword matching"""
+    return text.replace("İ", "i").lower().replace("ı", "i")
+
+
+def _whole_word(word: str) -> str:
+    """Lookarounds that let ``word``, just matched, count only as a whole word"""
+    return rf"(?<![^\W_][\s\S]{{{len(word)}}})(?![^\W_])"
+
+
+def _trie_pattern(words: Iterable[str], whole_words: Iterable[str] = ()) -> str:
+    """
+    Regex alternation of words with shared prefixes factored out.
+
+    The regex engine then only follows branches whose next character matches
+    instead of trying every keyword at every position. ``whole_words`` only
+    match with no letter or digit right before or after them.
+    """
+    whole_words = frozenset(whole_words)
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = _whole_word(word) if word in whole_words else ""
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return node.get("", "")
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" not in node:
+            return body
+        # Greedy optional tail: the longest keyword at a position wins
+        return f"(?:{body}|{node['']})" if node[""] else f"(?:{body})?"
+
+    return emit(trie)
+
+
+class IntentRouter:
+    """Finds every configured intent in a message with one regex scan"""
+
+    def __init__(self, keywords: Dict[str, Iterable[str]],
+                 exact: Optional[Dict[str, Iterable[str]]] = None,
+                 whole_word_intents: Iterable[str] = WHOLE_WORD_INTENTS):
+        keyword_intents = {}
+        for intent, words in keywords.items():
+            for word in words:
+                keyword_intents.setdefault(fold_intent_text(word), set()).add(intent)
+        # A keyword shared with another intent is a whole word for both
+        whole_words = {word for word, intents in keyword_intents.items() if intents & set(whole_word_intents)}
+
+        def contains(word: str, other: str) -> bool:
+            if other in whole_words:
+                return re.search(re.escape(other) + _whole_word(other), word) is not None
+            return other in word
+
+        # The scan reports the longest keyword starting at each position, so a
+        # keyword also carries the intents of every keyword it contains.
+        self._intents_by_keyword = {
+            word: frozenset().union(*(intents for other, intents in keyword_intents.items() if contains(word, other)))
+            for word in keyword_intents
+        }
+        self._pattern = re.compile(_trie_pattern(keyword_intents, whole_words)) if keyword_intents else None
+
+        self._exact = {}
+        for intent, phrases in (exact or {}).items():
+            for phrase in phrases:
+                self._exact.setdefault(fold_intent_text(phrase).strip(), set()).add(intent)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "IntentRouter":
+        """Build a router from chatbot_config.json, falling back to the defaults"""
+        keywords = {**DEFAULT_INTENT_KEYWORDS, **config.get("intents", {})}
+        excluded_models = config.get("finance_rules", {}).get("new", {}).get("excluded_models")
+        if excluded_models:
+            keywords["commercial_vehicle"] = excluded_models
+        exact = {**DEFAULT_EXACT_INTENTS, **config.get("exact_intents", {})}
+        return cls(keywords, exact)
+
+    def route(self, message: str) -> FrozenSet[str]:
+        """Return every intent whose keywords occur in the message"""
+        text = fold_intent_text(message).strip()
+        intents = set(self._exact.get(text, ()))
+        if self._pattern is not None:
+            # Restart one character after each match instead of a lookahead at
+            # every position: search() skips to the keywords' first characters
+            # in C, so only the matches cost a Python iteration.
+            intents_by_keyword = self._intents_by_keyword
+            search = self._pattern.search
+            match = search(text)
+            while match is not None:
+                intents |= intents_by_keyword[match.group()]
+                match = search(text, match.start() + 1)
+        return frozenset(intents)
@@ -0,0 +1,377 @@
+"""
+Background jobs for work that should not hold up a chat turn.
+
+Saving an application, recording the HGS cross-sell answer and notification
+hooks run on worker threads; the conversation only waits for the job to be
+queued and can poll ``status(job_id)`` afterwards. Failed jobs are retried
+with exponential backoff up to ``max_attempts``.
+
+Queues:
+    memory - jobs live in process memory (lost if the process dies)
+    sqlite - jobs are written to a local SQLite file first ("durable_path"),
+             so queued work survives a restart; several processes can share
+             the file, each job is claimed by one worker under a lease
+
+With "mode": "inline" a job runs on the caller's thread inside submit(),
+which keeps scripts and benchmarks deterministic.
+"""
+import json
+import logging
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_CONFIG = {
+    "mode": "background",
+    "workers": 2,
+    "durable_path": "jobs.db",
+    "max_attempts": 3,
+    "retry_backoff_seconds": 1.0,
+    "poll_seconds": 2.0,
+    "lease_seconds": 60.0,
+    "keep_finished": 1000,
+    "outbox_path": "outbox.jsonl"
+}
+
+JOB_HANDLERS = {}          # kind -> handler(payload) -> JSON-serializable result
+NOTIFICATION_HOOKS = []    # callables(event, data)
+
+
+def job_handler(kind: str) -> Callable:
+    """Decorator registering the function that runs jobs of this kind"""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def add_notification_hook(hook: Callable[[str, Dict[str, Any]], None]) -> None:
+    """Call ``hook(event, data)`` for every notification sent by a job"""
+    NOTIFICATION_HOOKS.append(hook)
+
+
+def notify(event: str, data: Dict[str, Any], outbox_path: Optional[str] = None) -> None:
+    """
+    Append the event to the JSONL outbox and run the notification hooks.
+
+    Each event is one write() to a file opened with O_APPEND, so lines from
+    several workers or processes do not interleave.
+    """
+    if outbox_path:
+        line = json.dumps({"event": event, "time": time.time(), **data}, ensure_ascii=False) + "\n"
+        with open(outbox_path, "a", encoding="utf-8") as f:
+            f.write(line)
+    for hook in NOTIFICATION_HOOKS:
+        try:
+            hook(event, data)
+        except Exception:
+            logger.exception("Notification hook failed for %s", event)
+
+
+class JobQueue:
+    """Base class: worker threads, retries and inline execution"""
+
+    def __init__(self, workers: int = 2, max_attempts: int = 3, retry_backoff_seconds: float = 1.0,
+                 poll_seconds: float = 2.0, inline: bool = False):
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.poll_seconds = poll_seconds
+        self.inline = inline
+        self._ready = queue.Queue()
+        self._closed = threading.Event()
+        self._threads = []
+        if not inline:
+            for i in range(workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    # --- job records, implemented by the backends ---
+
+    def _insert(self, job_id: str, kind: str, payload: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def _claim(self, job_id: str) -> Optional[tuple]:
+        """Mark a queued job as running; returns (kind, payload, attempts) or None"""
+        raise NotImplementedError
+
+    def _retry_later(self, job_id: str, error: str, delay: float) -> None:
+        raise NotImplementedError
+
+    def _finish(self, job_id: str, state: str, result: Any, error: Optional[str]) -> None:
+        raise NotImplementedError
+
+    def _claimable(self) -> List[str]:
+        """Jobs a worker may pick up that are not in the in-process queue (retries, restarts)"""
+        return []
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """{"id", "kind", "state", "attempts", "result", "error"}; state is queued, running, done or failed"""
+        raise NotImplementedError
+
+    # --- public API ---
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job_id = secrets.token_hex(8)
+        self._insert(job_id, kind, payload)
+        if self.inline:
+            while True:
+                claimed = self._claim(job_id)
+                if claimed is None or self._execute(job_id, *claimed, schedule_retry=False):
+                    break
+        else:
+            self._ready.put(job_id)
+        return job_id
+
+    def wait(self, job_id: str, timeout: float = 10.0) -> Optional[Dict[str, Any]]:
+        """Poll until the job is done or failed (for scripts and tests)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.status(job_id)
+            if status is None or status["state"] in ("done", "failed") or time.monotonic() >= deadline:
+                return status
+            time.sleep(0.01)
+
+    def close(self) -> None:
+        self._closed.set()
+
+    # --- workers ---
+
+    def _work(self) -> None:
+        while not self._closed.is_set():
+            try:
+                job_id = self._ready.get(timeout=self.poll_seconds)
+            except queue.Empty:
+                for job_id in self._claimable():
+                    self._ready.put(job_id)
+                continue
+            claimed = self._claim(job_id)
+            if claimed is not None:
+                self._execute(job_id, *claimed)
+
+    def _execute(self, job_id: str, kind: str, payload: Dict[str, Any], attempts: int,
+                 schedule_retry: bool = True) -> bool:
+        """Run one attempt; returns True once the job is finished (done or failed for good)"""
+        try:
+            result = JOB_HANDLERS[kind](payload)
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {e}"
+            if attempts >= self.max_attempts:
+                logger.error("Job %s (%s) failed after %d attempts: %s", job_id, kind, attempts, error)
+                self._finish(job_id, "failed", None, error)
+                return True
+            delay = self.retry_backoff_seconds * 2 ** (attempts - 1) if schedule_retry else 0.0
+            self._retry_later(job_id, error, delay)
+            if schedule_retry:
+                timer = threading.Timer(delay, self._ready.put, (job_id,))
+                timer.daemon = True
+                timer.start()
+            return False
+        self._finish(job_id, "done", result, None)
+        return True
+
+
+class MemoryJobQueue(JobQueue):
+    """Job records in a dict; only the last ``keep_finished`` finished jobs are kept"""
+
+    def __init__(self, keep_finished: int = 1000, **kwargs):
+        self.keep_finished = keep_finished
+        self._jobs = {}
+        self._finished = deque()
+        self._lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def _insert(self, job_id, kind, payload):
+        with self._lock:
+            self._jobs[job_id] = {"id": job_id, "kind": kind, "payload": payload, "state": "queued",
+                                  "attempts": 0, "result": None, "error": None}
+
+    def _claim(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["state"] != "queued":
+                return None
+            job["state"] = "running"
+            job["attempts"] += 1
+            return job["kind"], job["payload"], job["attempts"]
+
+    def _retry_later(self, job_id, error, delay):
+        with self._lock:
+            self._jobs[job_id].update(state="queued", error=error)
+
+    def _finish(self, job_id, state, result, error):
+        with self._lock:
+            self._jobs[job_id].update(state=state, result=result, error=error, payload=None)
+            self._finished.append(job_id)
+            while len(self._finished) > self.keep_finished:
+                self._jobs.pop(self._finished.popleft(), None)
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return {k: v for k, v in job.items() if k != "payload"} if job else None
+
+
+class SqliteJobQueue(JobQueue):
+    """Durable queue in a SQLite file (WAL); survives restarts and can be shared by processes"""
+
+    # UPDATE ... RETURNING needs SQLite 3.35; older libraries claim with UPDATE then SELECT
+    returning = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+    def __init__(self, path: str = "jobs.db", lease_seconds: float = 60.0, keep_finished: int = 1000, **kwargs):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.keep_finished = keep_finished
+        self._local = threading.local()
+        self._trim_lock = threading.Lock()
+        self._finished_since_trim = 0
+        self._connect()
+        super().__init__(**kwargs)
+        # Jobs left queued (or running under an expired lease) by an earlier process
+        for job_id in self._claimable():
+            self._ready.put(job_id)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " payload TEXT,"
+                " state TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " result TEXT,"
+                " error TEXT,"
+                " available_at REAL NOT NULL,"
+                " lease_until REAL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, available_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated_at)")
+            self._local.conn = conn
+        return conn
+
+    def _insert(self, job_id, kind, payload):
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, payload, state, available_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, kind, json.dumps(payload, ensure_ascii=False), now, now))
+
+    def _claim(self, job_id):
+        conn = self._connect()
+        now = time.time()
+        claim = ("UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ?"
+                 " WHERE id = ? AND ((state = 'queued' AND available_at <= ?)"
+                 " OR (state = 'running' AND lease_until < ?))")
+        params = (now + self.lease_seconds, now, job_id, now, now)
+        if self.returning:
+            row = conn.execute(claim + " RETURNING kind, payload, attempts", params).fetchone()
+        else:
+            # One write transaction, so no other worker claims the job between the two statements
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = None
+                if conn.execute(claim, params).rowcount:
+                    row = conn.execute("SELECT kind, payload, attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        kind, payload, attempts = row
+        return kind, json.loads(payload), attempts
+
+    def _retry_later(self, job_id, error, delay):
+        now = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET state = 'queued', error = ?, available_at = ?, lease_until = NULL, updated_at = ?"
+            " WHERE id = ?", (error, now + delay, now, job_id))
+
+    def _finish(self, job_id, state, result, error):
+        conn = self._connect()
+        conn.execute(
+            "UPDATE jobs SET state = ?, result = ?, error = ?, payload = NULL, lease_until = NULL, updated_at = ?"
+            " WHERE id = ?", (state, json.dumps(result, ensure_ascii=False), error, time.time(), job_id))
+        # Trimming scans the finished jobs, so it runs once per tenth of keep_finished instead of per job
+        with self._trim_lock:
+            self._finished_since_trim += 1
+            if self._finished_since_trim < max(1, self.keep_finished // 10):
+                return
+            self._finished_since_trim = 0
+        conn.execute(
+            "DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE state IN ('done', 'failed')"
+            " ORDER BY updated_at DESC LIMIT -1 OFFSET ?)", (self.keep_finished,))
+
+    def _claimable(self):
+        now = time.time()
+        rows = self._connect().execute(
+            "SELECT id FROM jobs WHERE (state = 'queued' AND available_at <= ?)"
+            " OR (state = 'running' AND lease_until < ?) ORDER BY available_at LIMIT 100", (now, now))
+        return [job_id for (job_id,) in rows]
+
+    def status(self, job_id):
+        row = self._connect().execute(
+            "SELECT id, kind, state, attempts, result, error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job_id, kind, state, attempts, result, error = row
+        return {"id": job_id, "kind": kind, "state": state, "attempts": attempts,
+                "result": json.loads(result) if result else None, "error": error}
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    # Worker threads do not survive fork(); children (process pools) start their own
+    global _queues, _queues_lock
+    _queues = {}
+    _queues_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def jobs_settings(jobs_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {**DEFAULT_JOBS_CONFIG, **(jobs_config or {})}
+
+
+def get_job_queue(jobs_config: Optional[Dict[str, Any]] = None) -> JobQueue:
+    """Return the process-wide queue for the "jobs" config section"""
+    settings = jobs_settings(jobs_config)
+    durable_path = settings["durable_path"]
+    key = (settings["mode"], os.path.abspath(durable_path) if durable_path else None)
+    with _queues_lock:
+        job_queue = _queues.get(key)
+        if job_queue is None:
+            options = {
+                "workers": settings["workers"],
+                "max_attempts": settings["max_attempts"],
+                "retry_backoff_seconds": settings["retry_backoff_seconds"],
+                "poll_seconds": settings["poll_seconds"],
+                "inline": settings["mode"] == "inline",
+                "keep_finished": settings["keep_finished"]
+            }
+            if durable_path:
+                job_queue = SqliteJobQueue(durable_path, lease_seconds=settings["lease_seconds"], **options)
+            else:
+                job_queue = MemoryJobQueue(**options)
+            _queues[key] = job_queue
+        return job_queue
@@ -0,0 +1,297 @@
+"""
+LLM backends selectable from the "llm" section of chatbot_config.json.
+
+A backend is the model object LLMClient wraps: ``generate_content(prompt,
+stream=False)`` returns a response with ``.text``, or an iterable of chunks
+with ``.text`` when streaming. Backends:
+
+    gemini   - Google Gemini via google.generativeai (needs an API key)
+    stub     - fake_llm.FakeGenerativeModel: a fixed answer with optional
+               simulated latency, for tests and benchmarks
+    template - local responder: best FAQ match for the user message, or a
+               template that points back to the application flow
+
+Every prompt starts with the same compiled system prompt (see
+prompt_builder.py). The backend is created with that ``static_prefix``;
+Gemini puts it into a context cache once and afterwards only sends the part
+of the prompt that follows it. When the cache cannot be created (the prefix
+is below the model's minimum, the model does not support caching, ...) the
+full prompt is sent as before; after any other error (quota, network) the
+full prompt is sent for ``prefix_cache_retry_seconds`` and then creating the
+cache is tried again.
+"""
+import hashlib
+import importlib
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from fake_llm import FakeGenerativeModel
+
+
+DEFAULT_LLM_CONFIG = {
+    "backend": "gemini",
+    "model": "gemini-2.5-flash-preview-05-20",
+    "prefix_cache": True,
+    "prefix_cache_ttl_seconds": 3600,
+    "prefix_cache_retry_seconds": 60,
+    "stub_response": "Bu bir test yanıtıdır.",
+    "stub_first_token_delay": 0.0,
+    "stub_token_delay": 0.0,
+    "template_min_score": 1.0
+}
+
+MESSAGE_MARKER = "Kullanıcı mesajı:"
+DATA_MARKER = "## TOPLANAN BİLGİLER\n"
+
+TEMPLATE_FALLBACK = ("Bu soruyu şu anda yanıtlayamıyorum, ancak başvurunuzda size yardımcı olabilirim. 🚗 "
+                     "Yeni bir başvuru için 'merhaba' yazabilir, gerekli belgeler, vade seçenekleri veya "
+                     "kefil koşulları hakkında soru sorabilirsiniz.")
+
+
+def _prefix_cache_unsupported(error: Exception) -> bool:
+    """True for cache creation errors that every retry would repeat"""
+    if isinstance(error, (AttributeError, ImportError, NotImplementedError)):
+        return True  # an SDK without context caching
+    try:
+        from google.api_core import exceptions
+    except ImportError:
+        return True
+    return isinstance(error, (exceptions.InvalidArgument, exceptions.NotFound, exceptions.FailedPrecondition,
+                              exceptions.PermissionDenied))
+
+
+class LLMBackend:
+    """Base class: a model object for LLMClient that knows the static prompt prefix"""
+
+    name = "base"
+    needs_api_key = False
+
+    def __init__(self, settings: Dict[str, Any], static_prefix: Optional[str] = None):
+        self.settings = settings
+        self.static_prefix = static_prefix
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prefix_hits = 0
+
+    @property
+    def identity(self) -> str:
+        """What the answers depend on besides the prompt; part of the response cache key"""
+        return self.name
+
+    def _count(self, prefix_hit: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            if prefix_hit:
+                self.prefix_hits += 1
+
+    @staticmethod
+    def preload() -> None:
+        """Import what the first call would otherwise import (e.g. the SDK); see resources.warm_up"""
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": self.identity, "calls": self.calls, "prefix_hits": self.prefix_hits}
+
+
+class GeminiBackend(LLMBackend):
+    """Gemini model with the static prompt prefix kept in a context cache"""
+
+    name = "gemini"
+    needs_api_key = True
+
+    def __init__(self, settings: Dict[str, Any], static_prefix: Optional[str] = None, api_key: str = ""):
+        super().__init__(settings, static_prefix)
+        from resources import get_model
+        self.api_key = api_key
+        self.model = get_model(api_key, settings["model"])
+        self._prefix_model = None
+        self._prefix_expires_at = 0.0
+        self._prefix_retry_at = 0.0
+        self._prefix_creating = False
+        self._prefix_unavailable = not (settings["prefix_cache"] and static_prefix)
+
+    @property
+    def identity(self) -> str:
+        return f"{self.name}:{self.settings['model']}"
+
+    @staticmethod
+    def preload() -> None:
+        # About 0.6 s; long enough to notice on the first key check or message
+        importlib.import_module("google.generativeai")
+
+    @staticmethod
+    def check_key(api_key: str, settings: Dict[str, Any]) -> None:
+        """Raise if the key cannot see the configured model (metadata lookup, no tokens generated)"""
+        import google.generativeai as genai
+        from google.ai import generativelanguage as glm
+        # A client of its own: genai.configure() would switch the key of every session in the process
+        client = glm.ModelServiceClient(client_options={"api_key": api_key})
+        genai.get_model(f"models/{settings['model']}", client=client)
+
+    def _cached_prefix_model(self) -> Optional[Any]:
+        if self._prefix_unavailable:
+            return None
+        now = time.time()
+        with self._lock:
+            if self._prefix_model is not None and now < self._prefix_expires_at:
+                return self._prefix_model
+            if self._prefix_creating or now < self._prefix_retry_at:
+                # Another call is creating the cache (the old one is still live
+                # on the server for the last tenth of its TTL) or the last try
+                # failed recently
+                return self._prefix_model
+            self._prefix_creating = True
+
+        # Created outside the lock, so calls do not queue up behind the request
+        ttl = self.settings["prefix_cache_ttl_seconds"]
+        model = None
+        try:
+            import google.generativeai as genai
+            from resources import bind_gemini_model, get_gemini_client
+            # CachedContent.create() would use the genai.configure() key; send it with this backend's key
+            request = genai.caching.CachedContent._prepare_create_request(
+                model=f"models/{self.settings['model']}", system_instruction=self.static_prefix,
+                ttl=timedelta(seconds=ttl))
+            response = get_gemini_client(self.api_key, "cache").create_cached_content(request)
+            cached = genai.caching.CachedContent._from_obj(response)
+            model = bind_gemini_model(genai.GenerativeModel.from_cached_content(cached), self.api_key)
+        except Exception as e:
+            with self._lock:
+                if _prefix_cache_unsupported(e):
+                    # Not cacheable for this model or prefix size; send full prompts from now on
+                    self._prefix_unavailable = True
+                else:
+                    self._prefix_retry_at = time.time() + self.settings["prefix_cache_retry_seconds"]
+        with self._lock:
+            self._prefix_creating = False
+            self._prefix_model = model
+            # Renew a little before the server drops the cache
+            self._prefix_expires_at = now + ttl * 0.9
+        return model
+
+    def _split(self, prompt: str):
+        if self.static_prefix and prompt.startswith(self.static_prefix):
+            model = self._cached_prefix_model()
+            if model is not None:
+                self._count(True)
+                return model, prompt[len(self.static_prefix):].lstrip()
+        self._count(False)
+        return self.model, prompt
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        model, contents = self._split(prompt)
+        return model.generate_content(contents, stream=stream, **kwargs)
+
+    async def generate_content_async(self, prompt: str, **kwargs):
+        model, contents = self._split(prompt)
+        if model._async_client is None:
+            from resources import bind_gemini_model
+            bind_gemini_model(model, self.api_key, asynchronous=True)
+        return await model.generate_content_async(contents, **kwargs)
+
+
+class StubBackend(LLMBackend):
+    """Deterministic offline answers with configurable latency"""
+
+    name = "stub"
+
+    def __init__(self, settings: Dict[str, Any], static_prefix: Optional[str] = None, api_key: str = ""):
+        super().__init__(settings, static_prefix)
+        self.model = FakeGenerativeModel(settings["stub_response"], settings["stub_first_token_delay"],
+                                         settings["stub_token_delay"], model_name="stub")
+
+    @property
+    def identity(self) -> str:
+        return f"{self.name}:{self.settings['stub_response']}"
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        # Nothing is sent anywhere; the prefix check keeps the hit rate comparable with Gemini
+        self._count(bool(self.static_prefix) and prompt.startswith(self.static_prefix))
+        return self.model.generate_content(prompt, stream=stream)
+
+
+class TemplateBackend(LLMBackend):
+    """Rule-based local responder built on the FAQ index"""
+
+    name = "template"
+
+    def __init__(self, settings: Dict[str, Any], static_prefix: Optional[str] = None, api_key: str = "",
+                 faq_index: Any = None):
+        super().__init__(settings, static_prefix)
+        self.faq_index = faq_index
+        self.model = FakeGenerativeModel(self.answer, model_name="template")
+
+    def answer(self, prompt: str) -> str:
+        message = prompt.rpartition(MESSAGE_MARKER)[2].strip()
+        if self.faq_index is not None and message:
+            results = self.faq_index.search(message, limit=1)
+            if results and results[0][0] >= self.settings["template_min_score"]:
+                return results[0][1][2]
+        _, found, rest = prompt.partition(DATA_MARKER)
+        if found:
+            collected = rest.split("\n", 1)[0]
+            return f"Şu ana kadar aldığım bilgiler: {collected}. Başvurunuza kaldığımız yerden devam edebiliriz. 🚗"
+        return TEMPLATE_FALLBACK
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        self._count(bool(self.static_prefix) and prompt.startswith(self.static_prefix))
+        return self.model.generate_content(prompt, stream=stream)
+
+
+LLM_BACKENDS = {
+    "gemini": GeminiBackend,
+    "stub": StubBackend,
+    "template": TemplateBackend
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def llm_settings(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The "llm" section of a full chatbot config, with defaults"""
+    return {**DEFAULT_LLM_CONFIG, **((config or {}).get("llm") or {})}
+
+
+def backend_class(config: Optional[Dict[str, Any]] = None) -> type:
+    backend = llm_settings(config)["backend"]
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {backend}")
+    return LLM_BACKENDS[backend]
+
+
+def get_llm_backend(api_key: str, config: Dict[str, Any], static_prefix: Optional[str] = None) -> LLMBackend:
+    """
+    Return the process-wide backend for this config, API key and prompt prefix
+
+    Sharing it keeps one context cache (and one set of counters) per prefix.
+    """
+    from resources import config_resource
+
+    # Chatbots are built per request; skip the hashing below for a config seen before
+    known = config_resource(config, "llm_backends", lambda _: {})
+    backend = known.get((api_key, static_prefix))
+    if backend is not None:
+        return backend
+
+    settings = llm_settings(config)
+    cls = backend_class(config)
+    digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest() if cls.needs_api_key else None
+    prefix_digest = hashlib.sha1(static_prefix.encode("utf-8")).hexdigest() if static_prefix else None
+    key = (cls.name, digest, tuple(sorted(settings.items())), prefix_digest)
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            if cls is TemplateBackend:
+                from faq_index import get_faq_index
+                backend = cls(settings, static_prefix, api_key, faq_index=config_resource(config, "faq_index", get_faq_index))
+            else:
+                backend = cls(settings, static_prefix, api_key)
+            _backends[key] = backend
+    known[(api_key, static_prefix)] = backend
+    return backend
@@ -0,0 +1,433 @@
+"""
+Asynchronous LLM client used under VehicleFinanceChatbot.generate_response.
+
+All model calls run on one background asyncio loop shared by every session in
+the process. Each call gets:
+    - a per-attempt deadline and an overall deadline (including queueing),
+    - retries with full-jitter exponential backoff,
+    - a slot from its backend's semaphore (one per backend in the process)
+      that caps in-flight requests,
+    - its backend's circuit breaker, which fails fast while that backend
+      is degraded.
+
+Identical requests in flight at the same time are coalesced (single flight):
+the first one calls the model, later ones with the same key wait for and
+share its answer, streamed or not. The chatbot passes a key with the user
+message normalized, so "Faiz oranı nedir?" and "faiz orani nedir" share a
+call when their context matches.
+
+When a call cannot be served, LLMUnavailableError is raised so the chatbot
+can fall back to its local FAQ and rule answers instead of hanging the
+Streamlit script thread.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+DEFAULT_LLM_CLIENT_CONFIG = {
+    "timeout_seconds": 15.0,
+    "total_timeout_seconds": 30.0,
+    "max_retries": 2,
+    "backoff_base_seconds": 0.5,
+    "backoff_max_seconds": 4.0,
+    "max_concurrency": 8,
+    "breaker_failure_threshold": 5,
+    "breaker_reset_seconds": 30.0,
+    "fallback_faq_min_score": 1.0,
+    "coalesce": True
+}
+
+
+class LLMUnavailableError(Exception):
+    """The LLM could not answer within the configured limits"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """The circuit breaker is open; the backend is not being called"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed    - calls go through; ``failure_threshold`` failures in a row open it
+    open      - calls fail fast for ``reset_seconds``
+    half_open - one trial call; success closes the breaker, failure reopens it
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def _refuse_if_open(self) -> str:
+        state = self._state()
+        if state == "open" or (state == "half_open" and self._trial_running):
+            raise CircuitOpenError("LLM backend circuit is open")
+        return state
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if a call would be refused, without claiming the trial"""
+        with self._lock:
+            self._refuse_if_open()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self._refuse_if_open() == "half_open":
+                self._trial_running = True
+
+    def abandon(self) -> None:
+        """The caller gave up on a call that neither succeeded nor failed"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+
+class _Flight:
+    """One upstream call and the answer chunks it has produced so far (loop thread only)"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.waiters = 0
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def follow(self, deadline: float):
+        """Yield the leader's chunks, including those produced before joining"""
+        loop = asyncio.get_running_loop()
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.chunks):
+                sent += 1
+                yield self.chunks[sent - 1]
+            if self.done:
+                if self.error is not None:
+                    raise LLMUnavailableError(f"Coalesced LLM request failed: {self.error!r}")
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                raise LLMUnavailableError("Coalesced LLM request exceeded its deadline")
+
+
+class SingleFlight:
+    """In-flight requests by key, with counters of how many calls were saved"""
+
+    def __init__(self):
+        self.flights = {}
+        self.upstream = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def join(self, key: Any):
+        """(flight, True) for the caller that has to make the call, (flight, False) for followers"""
+        flight = self.flights.get(key)
+        if flight is not None:
+            flight.waiters += 1
+            self.coalesced += 1
+            self.max_waiters = max(self.max_waiters, flight.waiters)
+            return flight, False
+        flight = _Flight()
+        self.flights[key] = flight
+        self.upstream += 1
+        return flight, True
+
+    def land(self, key: Any, flight: _Flight, error: Optional[BaseException] = None) -> None:
+        flight.finish(error)
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.upstream + self.coalesced
+        return {"upstream_calls": self.upstream, "coalesced": self.coalesced,
+                "coalesced_ratio": self.coalesced / total if total else 0.0,
+                "max_waiters": self.max_waiters, "in_flight": len(self.flights)}
+
+
+class _BackgroundLoop:
+    """Event loop running on a daemon thread, plus an executor for blocking SDK calls"""
+
+    def __init__(self, max_workers: int = 32):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self.single_flight = SingleFlight()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-client-loop", daemon=True)
+        self.thread.start()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+class LLMGate:
+    """Concurrency limit and circuit breaker shared by every client of one backend"""
+
+    def __init__(self, max_concurrency: int, breaker: CircuitBreaker):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.breaker = breaker
+
+
+_DONE = object()
+
+
+class LLMClient:
+    """Wraps a model object (anything with ``generate_content``) with resilience limits"""
+
+    def __init__(self, model: Any, settings: Dict[str, Any], gate: LLMGate, background: _BackgroundLoop):
+        self.model = model
+        self.settings = settings
+        self.gate = gate
+        self._background = background
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(self.settings["backoff_max_seconds"],
+                      self.settings["backoff_base_seconds"] * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    async def _call_model(self, *args, **kwargs):
+        if not kwargs.get("stream") and hasattr(self.model, "generate_content_async"):
+            return await self.model.generate_content_async(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._background.executor, lambda: self.model.generate_content(*args, **kwargs))
+
+    def _flight_key(self, prompt: str, key: Optional[str]) -> Optional[tuple]:
+        if not self.settings["coalesce"]:
+            return None
+        return (self.model, key if key is not None else prompt)
+
+    async def agenerate(self, prompt: str, key: Optional[str] = None) -> str:
+        """
+        Generate the full answer text, retrying within the overall deadline
+
+        Concurrent calls with the same ``key`` (default: the prompt) share one model call.
+        """
+        flight_key = self._flight_key(prompt, key)
+        if flight_key is None:
+            return await self._agenerate(prompt)
+        single_flight = self._background.single_flight
+        flight, leader = single_flight.join(flight_key)
+        if not leader:
+            deadline = asyncio.get_running_loop().time() + self.settings["total_timeout_seconds"]
+            return "".join([chunk async for chunk in flight.follow(deadline)])
+        try:
+            text = await self._agenerate(prompt)
+        except BaseException as e:
+            single_flight.land(flight_key, flight, e)
+            raise
+        flight.publish(text)
+        single_flight.land(flight_key, flight)
+        return text
+
+    async def _agenerate(self, prompt: str) -> str:
+        breaker = self.gate.breaker
+        breaker.check()
+        try:
+            return await asyncio.wait_for(self._attempts(prompt), self.settings["total_timeout_seconds"])
+        except asyncio.TimeoutError:
+            breaker.record_failure()
+            raise LLMUnavailableError("LLM request exceeded its deadline")
+
+    async def _attempts(self, prompt: str) -> str:
+        breaker = self.gate.breaker
+        last_error = None
+        for attempt in range(self.settings["max_retries"] + 1):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt - 1))
+            try:
+                async with self.gate.semaphore:
+                    # Re-checked once a slot is free: the breaker may have opened while queued
+                    breaker.before_call()
+                    response = await asyncio.wait_for(self._call_model(prompt),
+                                                      self.settings["timeout_seconds"])
+                    text = response.text
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                breaker.record_failure()
+                last_error = e
+                continue
+            breaker.record_success()
+            return text
+        raise LLMUnavailableError(f"LLM request failed after retries: {last_error!r}")
+
+    async def _astream(self, prompt: str, key: Optional[str] = None):
+        """Yield answer chunks, sharing one model call between identical concurrent requests"""
+        flight_key = self._flight_key(prompt, key)
+        if flight_key is None:
+            async for chunk in self._astream_upstream(prompt):
+                yield chunk
+            return
+        single_flight = self._background.single_flight
+        flight, leader = single_flight.join(flight_key)
+        if not leader:
+            deadline = asyncio.get_running_loop().time() + self.settings["total_timeout_seconds"]
+            async for chunk in flight.follow(deadline):
+                yield chunk
+            return
+        error = None
+        try:
+            async for chunk in self._astream_upstream(prompt):
+                flight.publish(chunk)
+                yield chunk
+        except BaseException as e:
+            # Includes the leader's reader going away (GeneratorExit): followers cannot get the rest
+            error = e
+            raise
+        finally:
+            single_flight.land(flight_key, flight, error)
+
+    async def _astream_upstream(self, prompt: str):
+        """Yield answer chunks; retries only happen before the first chunk"""
+        breaker = self.gate.breaker
+        timeout = self.settings["timeout_seconds"]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.settings["total_timeout_seconds"]
+        breaker.check()
+        for attempt in range(self.settings["max_retries"] + 1):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt - 1))
+            yielded = False
+            try:
+                async with self.gate.semaphore:
+                    breaker.before_call()
+                    response = await asyncio.wait_for(self._call_model(prompt, stream=True),
+                                                      min(timeout, max(deadline - loop.time(), 0)))
+                    chunks = iter(response)
+                    while True:
+                        remaining = min(timeout, deadline - loop.time())
+                        chunk = await asyncio.wait_for(
+                            loop.run_in_executor(self._background.executor, next, chunks, _DONE),
+                            max(remaining, 0))
+                        if chunk is _DONE:
+                            break
+                        if chunk.text:
+                            yielded = True
+                            yield chunk.text
+            except CircuitOpenError:
+                raise
+            except (GeneratorExit, asyncio.CancelledError):
+                breaker.abandon()
+                raise
+            except Exception as e:
+                breaker.record_failure()
+                if yielded or loop.time() >= deadline:
+                    raise LLMUnavailableError(f"LLM stream failed: {e!r}")
+                continue
+            breaker.record_success()
+            return
+        raise LLMUnavailableError("LLM stream failed after retries")
+
+    def generate(self, prompt: str, key: Optional[str] = None) -> str:
+        """Blocking wrapper around agenerate() for the Streamlit script thread"""
+        return self._background.run(self.agenerate(prompt, key))
+
+    def stream(self, prompt: str, key: Optional[str] = None) -> Iterator[str]:
+        """Blocking iterator over the streamed answer chunks"""
+        agen = self._astream(prompt, key)
+        try:
+            while True:
+                try:
+                    yield self._background.run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._background.run(agen.aclose())
+
+
+_background = None
+_gates = {}  # (backend identity, gate settings) -> LLMGate
+_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    # The loop thread does not survive fork(); children (process pools) start fresh
+    global _background, _gates, _lock
+    _background = None
+    _gates = {}
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def coalescing_stats() -> Dict[str, Any]:
+    """Single-flight counters of this process (all backends)"""
+    background = _background
+    return background.single_flight.stats() if background is not None else SingleFlight().stats()
+
+
+def get_llm_client(model: Any, client_config: Optional[Dict[str, Any]] = None) -> LLMClient:
+    """
+    Wrap ``model`` in a client that shares the process-wide loop, and the
+    semaphore and circuit breaker of its backend, configured by the
+    "llm_client" config section.
+
+    Backends are told apart by ``model.identity`` (see llm_backends.py; the
+    class name for other model objects), so an outage of one backend does
+    not open the breaker of another.
+    """
+    global _background
+    settings = {**DEFAULT_LLM_CLIENT_CONFIG, **(client_config or {})}
+    backend = getattr(model, "identity", None) or type(model).__name__
+    key = (backend, settings["max_concurrency"], settings["breaker_failure_threshold"],
+           settings["breaker_reset_seconds"])
+    with _lock:
+        if _background is None:
+            _background = _BackgroundLoop(max_workers=max(32, settings["max_concurrency"] * 4))
+        gate = _gates.get(key)
+        if gate is None:
+            gate = LLMGate(settings["max_concurrency"],
+                           CircuitBreaker(settings["breaker_failure_threshold"], settings["breaker_reset_seconds"]))
+            _gates[key] = gate
+    return LLMClient(model, settings, gate, _background)
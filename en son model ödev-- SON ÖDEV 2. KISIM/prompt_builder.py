@@ -0,0 +1,226 @@
+"""
+Token-budgeted prompt assembly for the LLM calls of the chatbot.
+
+The static system prompt is compiled once per config (source indentation and
+runs of blank lines removed). Each call then adds, in this order:
+
+    - a one-line summary of the collected user_data (TCKNs are masked)
+    - a summary of older turns, folded in when the history grows (TCKNs
+      typed by the user or repeated by the bot are masked when a turn is
+      remembered, so they are not in the session store either)
+    - the most recent turns, oldest first
+    - the user message (TCKNs masked as well)
+
+The whole prompt has to fit into ``max_prompt_tokens``; the oldest turns and
+then the summary are dropped when it does not.
+count_tokens() is an offline estimate (about four characters per word
+piece, one token per punctuation mark or emoji), so no tokenizer call is
+needed. The builder also counts tokens per call and LLM calls per completed
+application (see stats()).
+"""
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from response_cache import prompt_version
+
+
+DEFAULT_PROMPT_CONFIG = {
+    "max_prompt_tokens": 2500,
+    "history_turns": 6,
+    "max_turn_chars": 400,
+    "max_summary_tokens": 150
+}
+
+FIELD_LABELS = {
+    "vehicle_value": "Araç değeri",
+    "vehicle_model": "Araç modeli",
+    "vehicle_age": "Araç yaşı",
+    "loan_amount": "Finansman tutarı",
+    "guarantor_tckn": "Kefil TCKN",
+    "seller_tckn": "Satıcı TCKN"
+}
+
+ROLE_LABELS = {"user": "Kullanıcı", "bot": "Asistan"}
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+_TCKN = re.compile(r"(?<!\d)\d{11}(?!\d)")
+_LEADING_SPACE = re.compile(r"^[ \t]+", re.MULTILINE)
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+def count_tokens(text: str) -> int:
+    """Offline token estimate used for the prompt budget"""
+    total = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        if piece[0].isalnum() or piece[0] == "_":
+            total += (len(piece) + 3) // 4
+        else:
+            total += 1
+    return total
+
+
+@lru_cache(maxsize=4096)
+def _line_tokens(line: str) -> int:
+    # Summary lines are re-counted on every fold; most of them repeat across sessions
+    return count_tokens(line)
+
+
+def compile_prompt(prompt: str) -> str:
+    """Drop the source indentation and repeated blank lines of a prompt template"""
+    return _BLANK_RUNS.sub("\n\n", _LEADING_SPACE.sub("", prompt)).strip()
+
+
+def summarize_user_data(application_type: Optional[str], user_data: Dict[str, Any]) -> str:
+    """Compact one-line view of the application collected so far"""
+    parts = []
+    if application_type:
+        parts.append("Başvuru: " + ("yeni araç" if application_type == "new" else "ikinci el araç"))
+    for field, value in user_data.items():
+        label = FIELD_LABELS.get(field, field)
+        if field.endswith("_tckn"):
+            value = "alındı"
+        elif isinstance(value, int) and field != "vehicle_age":
+            value = f"{value:,} TL".replace(",", ".")
+        parts.append(f"{label}: {value}")
+    return "; ".join(parts)
+
+
+def mask_tckns(text: str) -> str:
+    """Replace every 11-digit number (a TCKN) with its first two digits and asterisks"""
+    return _TCKN.sub(lambda match: match.group()[:2] + "*" * 9, text)
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class PromptBuilder:
+    """Builds the prompt of one LLM call and keeps the shared prompt metrics"""
+
+    def __init__(self, system_prompt: str, max_prompt_tokens: int = 2500, history_turns: int = 6,
+                 max_turn_chars: int = 400, max_summary_tokens: int = 150):
+        self.system_prompt = compile_prompt(system_prompt)
+        self.system_tokens = count_tokens(self.system_prompt)
+        self.version = prompt_version(self.system_prompt)
+        self.max_prompt_tokens = max_prompt_tokens
+        self.history_turns = history_turns
+        self.max_turn_chars = max_turn_chars
+        self.max_summary_tokens = max_summary_tokens
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.max_tokens_seen = 0
+        self.compactions = 0
+        self.applications = 0
+        self.application_calls = 0
+
+    @classmethod
+    def from_config(cls, system_prompt: str, prompt_config: Optional[Dict[str, Any]] = None) -> "PromptBuilder":
+        settings = {**DEFAULT_PROMPT_CONFIG, **(prompt_config or {})}
+        return cls(system_prompt, settings["max_prompt_tokens"], settings["history_turns"],
+                   settings["max_turn_chars"], settings["max_summary_tokens"])
+
+    # --- conversation history ---
+
+    def remember(self, history: List[List[str]], summary: str, role: str, text: str) -> str:
+        """
+        Append a turn (TCKNs masked) to ``history`` in place and return the updated summary
+
+        Turns beyond ``history_turns`` are folded into the summary: user turns
+        are kept as short lines, assistant turns are dropped since the state
+        machine can reproduce them. The oldest lines go once the summary is
+        over ``max_summary_tokens``.
+        """
+        history.append([role, _clip(mask_tckns(text), self.max_turn_chars)])
+        excess = len(history) - self.history_turns
+        if excess <= 0:
+            return summary
+        folded = [f"- {_clip(' '.join(turn_text.split()), 80)}"
+                  for turn_role, turn_text in history[:excess] if turn_role == "user"]
+        del history[:excess]
+        lines = (summary.split("\n") if summary else []) + folded
+        tokens = sum(map(_line_tokens, lines))
+        while lines and tokens > self.max_summary_tokens:
+            tokens -= _line_tokens(lines.pop(0))
+        with self._lock:
+            self.compactions += 1
+        return "\n".join(lines)
+
+    # --- prompt ---
+
+    def context(self, application_type: Optional[str], user_data: Dict[str, Any],
+                history: List[List[str]], summary: str, budget: int) -> Tuple[List[str], int]:
+        """Context sections that fit into ``budget`` tokens, and their token count"""
+        sections = []
+        used = 0
+        data_summary = summarize_user_data(application_type, user_data)
+        if data_summary:
+            section = f"## TOPLANAN BİLGİLER\n{data_summary}"
+            used += count_tokens(section)
+            sections.append(section)
+
+        turns = []
+        for role, text in reversed(history):
+            line = f"{ROLE_LABELS.get(role, role)}: {text}"
+            cost = count_tokens(line)
+            if used + cost > budget:
+                break
+            turns.append(line)
+            used += cost
+        dropped = len(history) - len(turns)
+
+        if summary:
+            section = f"## ÖNCEKİ KONUŞMA ÖZETİ\n{summary}"
+            cost = count_tokens(section)
+            if used + cost <= budget:
+                sections.append(section)
+                used += cost
+            else:
+                dropped += 1
+        if turns:
+            sections.append("## SON MESAJLAR\n" + "\n".join(reversed(turns)))
+        if dropped:
+            with self._lock:
+                self.compactions += 1
+        return sections, used
+
+    def build(self, user_message: str, application_type: Optional[str] = None,
+              user_data: Optional[Dict[str, Any]] = None, history: Optional[List[List[str]]] = None,
+              summary: str = "") -> str:
+        """Full prompt for one LLM call; records its token count"""
+        message = f"Kullanıcı mesajı: {mask_tckns(user_message)}"
+        budget = self.max_prompt_tokens - self.system_tokens - count_tokens(message)
+        sections, used = self.context(application_type, user_data or {}, history or [], summary or "", budget)
+        prompt = "\n\n".join([self.system_prompt, *sections, message])
+
+        tokens = self.system_tokens + used + count_tokens(message)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += tokens
+            self.max_tokens_seen = max(self.max_tokens_seen, tokens)
+        return prompt
+
+    # --- metrics ---
+
+    def record_application(self, llm_calls: int) -> None:
+        """Count a completed application and the LLM calls its conversation needed"""
+        with self._lock:
+            self.applications += 1
+            self.application_calls += llm_calls
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "system_tokens": self.system_tokens,
+                "prompt_tokens_total": self.prompt_tokens,
+                "prompt_tokens_mean": self.prompt_tokens / self.calls if self.calls else 0.0,
+                "prompt_tokens_max": self.max_tokens_seen,
+                "compactions": self.compactions,
+                "applications": self.applications,
+                "application_calls": self.application_calls,
+                "calls_per_application": self.application_calls / self.applications if self.applications else 0.0
+            }
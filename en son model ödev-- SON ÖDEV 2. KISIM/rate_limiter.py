@@ -0,0 +1,152 @@
+"""
+Token-bucket admission control for LLM calls.
+
+Every answer that would reach the LLM (after the rule, FAQ and response
+cache lookups) first asks AdmissionController.admit() for a token:
+
+    session bucket - ``session_requests_per_minute`` per session id, up to
+                     ``session_burst`` in a row
+    global bucket  - ``global_requests_per_second`` shared by every session
+                     in the process, up to ``global_burst`` in a row
+
+A request takes a token from both buckets or from neither, so a session
+refused by the global limit keeps its own allowance. A rate of 0 switches
+that bucket off. Refused requests get the local FAQ and rule answers
+(VehicleFinanceChatbot._fallback_answer) and every decision is counted in
+chatbot_admission_total{result}.
+
+Buckets live in process memory: with several app processes the global limit
+applies to each of them. Per-session buckets are kept for at most
+``max_tracked_sessions`` sessions; a bucket idle long enough to be full again
+is dropped, since a fresh one is the same.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+DEFAULT_RATE_LIMITS_CONFIG = {
+    "enabled": True,
+    "session_requests_per_minute": 10,
+    "session_burst": 5,
+    "global_requests_per_second": 5.0,
+    "global_burst": 20,
+    "max_tracked_sessions": 10000
+}
+
+
+ADMITTED = "admitted"
+SESSION_LIMITED = "session_limited"
+GLOBAL_LIMITED = "global_limited"
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``capacity``; starts full"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> float:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        return self.tokens
+
+    def idle_until_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class AdmissionController:
+    """Per-session and global token buckets in front of the LLM"""
+
+    def __init__(self, session_rate: float, session_burst: float, global_rate: float, global_burst: float,
+                 max_tracked_sessions: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.session_rate = session_rate
+        self.session_burst = max(1.0, session_burst)
+        self.max_tracked_sessions = max_tracked_sessions
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._global = TokenBucket(global_rate, max(1.0, global_burst), clock()) if global_rate > 0 else None
+        self._sessions = OrderedDict()  # session id -> TokenBucket, least recently used first
+        self._decisions = {ADMITTED: 0, SESSION_LIMITED: 0, GLOBAL_LIMITED: 0}
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "AdmissionController":
+        return cls(settings["session_requests_per_minute"] / 60.0, settings["session_burst"],
+                   settings["global_requests_per_second"], settings["global_burst"],
+                   settings["max_tracked_sessions"])
+
+    def admit(self, session_id: Optional[str] = None) -> str:
+        """
+        ADMITTED (one token taken from each bucket), SESSION_LIMITED or
+        GLOBAL_LIMITED. Without a session id only the global limit applies.
+        """
+        with self._lock:
+            now = self._clock()
+            bucket = None
+            if session_id is not None and self.session_rate > 0:
+                bucket = self._session_bucket(session_id, now)
+                if bucket.refill(now) < 1.0:
+                    return self._decide(SESSION_LIMITED)
+            if self._global is not None:
+                if self._global.refill(now) < 1.0:
+                    return self._decide(GLOBAL_LIMITED)
+                self._global.tokens -= 1.0
+            if bucket is not None:
+                bucket.tokens -= 1.0
+            return self._decide(ADMITTED)
+
+    def _decide(self, result: str) -> str:
+        self._decisions[result] += 1
+        return result
+
+    def _session_bucket(self, session_id: str, now: float) -> TokenBucket:
+        sessions = self._sessions
+        bucket = sessions.get(session_id)
+        if bucket is not None:
+            sessions.move_to_end(session_id)
+            return bucket
+        while sessions:
+            oldest = next(iter(sessions.values()))
+            if len(sessions) < self.max_tracked_sessions and not oldest.idle_until_full(now):
+                break
+            sessions.popitem(last=False)
+        bucket = sessions[session_id] = TokenBucket(self.session_rate, self.session_burst, now)
+        return bucket
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = self._clock()
+            return {
+                "global_tokens": round(self._global.refill(now), 2) if self._global is not None else None,
+                "tracked_sessions": len(self._sessions),
+                **self._decisions
+            }
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def rate_limit_settings(rate_limits_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {**DEFAULT_RATE_LIMITS_CONFIG, **(rate_limits_config or {})}
+
+
+def get_admission_controller(rate_limits_config: Optional[Dict[str, Any]] = None) -> Optional[AdmissionController]:
+    """Process-wide controller for the "rate_limits" config section, or None when disabled"""
+    settings = rate_limit_settings(rate_limits_config)
+    if not settings["enabled"]:
+        return None
+    key = (settings["session_requests_per_minute"], settings["session_burst"],
+           settings["global_requests_per_second"], settings["global_burst"], settings["max_tracked_sessions"])
+    with _controllers_lock:
+        controller = _controllers.get(key)
+        if controller is None:
+            controller = _controllers[key] = AdmissionController.from_settings(settings)
+        return controller
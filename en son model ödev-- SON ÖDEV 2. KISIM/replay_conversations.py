@@ -0,0 +1,382 @@
+"""
+Headless replay of scripted conversations through VehicleFinanceChatbot.
+
+Each line of the transcript file is one conversation:
+
+    {"id": "new-1", "messages": ["merhaba", "yeni araç", "1.000.000", ...],
+     "expected": {"step": "end", "application_type": "new",
+                  "user_data": {"vehicle_value": 1000000, ...},
+                  "steps": ["determine_type", "collect_new_vehicle_info", ...]}}
+
+Every key under "expected" is optional; "steps" lists the step returned for
+each message. Conversations are spread over a process pool, the LLM is
+replaced by fake_llm.FakeGenerativeModel and applications are saved to the
+in-memory store, so nothing leaves the machine. The report shows
+conversations per second, per-step latency percentiles (keyed on the step
+that handled the message), how many conversations ended in the expected
+state, the messages a completed application took and the prompt metrics
+(tokens per LLM call, LLM calls per completed application). The exit status is 1 when any conversation does not match.
+
+Usage:
+    python replay_conversations.py --generate 5000 --out conversations.jsonl
+    python replay_conversations.py conversations.jsonl --workers 8 --repeat 4 --json replay_report.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel
+from resources import get_config
+
+
+STUB_ANSWER = "Bu konuda size yardımcı olmaktan memnuniyet duyarım. Başvurunuza devam etmek ister misiniz?"
+
+REPLAY_OVERRIDES = {
+    "storage": {"backend": "memory", "path": ":memory:", "legacy_json_path": None},
+    "response_cache": {"enabled": False},
+    "jobs": {"mode": "inline", "durable_path": None, "outbox_path": None},
+    "rate_limits": {"enabled": False},
+    "transcript_log": {"enabled": False}
+}
+
+_config = None
+_model = None
+
+
+def replay_config(config_file: str) -> Dict[str, Any]:
+    """The app config with persistence and shared caches switched off"""
+    config = dict(get_config(config_file, VehicleFinanceChatbot._create_default_config))
+    config.update(REPLAY_OVERRIDES)
+    return config
+
+
+def _init_worker(config_file: str, llm_delay: float) -> None:
+    global _config, _model
+    _config = replay_config(config_file)
+    _model = FakeGenerativeModel(STUB_ANSWER, first_token_delay=llm_delay)
+
+
+def _mismatches(bot: VehicleFinanceChatbot, expected: Dict[str, Any], steps: List[str]) -> List[str]:
+    errors = []
+    if "step" in expected and bot.current_step != expected["step"]:
+        errors.append(f"step {bot.current_step!r} != {expected['step']!r}")
+    if "application_type" in expected and bot.application_type != expected["application_type"]:
+        errors.append(f"application_type {bot.application_type!r} != {expected['application_type']!r}")
+    if "user_data" in expected and bot.user_data != expected["user_data"]:
+        errors.append(f"user_data {bot.user_data!r} != {expected['user_data']!r}")
+    if "steps" in expected and steps != expected["steps"]:
+        errors.append(f"steps {steps!r} != {expected['steps']!r}")
+    return errors
+
+
+def replay_conversation(conversation: Dict[str, Any], latencies: Dict[str, List[float]],
+                        turns: Optional[List[int]] = None) -> List[str]:
+    """
+    Run one conversation; per-message latencies (ms) are added to ``latencies``
+    and, when the application gets saved, the messages it took to ``turns``
+    """
+    bot = VehicleFinanceChatbot("replay", model=_model, config=_config)
+    steps = []
+    for message in conversation["messages"]:
+        handled_by = bot.current_step
+        start = time.perf_counter()
+        result = bot.process_message(message)
+        latencies.setdefault(handled_by, []).append((time.perf_counter() - start) * 1000)
+        steps.append(result["step"])
+        if turns is not None and result["step"] == "hgs_offer" and handled_by == "confirmation":
+            turns.append(len(steps))
+        if result.get("should_exit"):
+            break
+    return _mismatches(bot, conversation.get("expected", {}), steps)
+
+
+PROMPT_COUNTERS = ("calls", "prompt_tokens_total", "applications", "application_calls")
+
+
+def _replay_chunk(conversations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = {}
+    failures = []
+    messages = 0
+    turns = []
+    prompts = VehicleFinanceChatbot("replay", model=_model, config=_config).prompts
+    before = prompts.stats()
+    for conversation in conversations:
+        errors = replay_conversation(conversation, latencies, turns)
+        messages += len(conversation["messages"])
+        if errors:
+            failures.append({"id": conversation.get("id"), "errors": errors})
+    after = prompts.stats()
+    prompt = {name: after[name] - before[name] for name in PROMPT_COUNTERS}
+    prompt["prompt_tokens_max"] = after["prompt_tokens_max"]
+    return {"conversations": len(conversations), "messages": messages, "application_turns": turns,
+            "latencies": latencies, "failures": failures, "prompt": prompt}
+
+
+def load_conversations(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def replay(conversations: List[Dict[str, Any]], config_file: str = "chatbot_config.json",
+           workers: int = 0, chunk_size: int = 200, llm_delay: float = 0.0) -> Dict[str, Any]:
+    """
+    Replay conversations and return the report.
+
+    ``workers=0`` runs everything in this process, which is easier to profile.
+    """
+    start = time.perf_counter()
+    if workers:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(config_file, llm_delay)) as pool:
+            results = list(pool.map(_replay_chunk, _chunks(conversations, chunk_size)))
+    else:
+        _init_worker(config_file, llm_delay)
+        results = [_replay_chunk(chunk) for chunk in _chunks(conversations, chunk_size)]
+    elapsed = time.perf_counter() - start
+
+    latencies = {}
+    failures = []
+    turns = []
+    prompt = dict.fromkeys(PROMPT_COUNTERS, 0)
+    prompt["prompt_tokens_max"] = 0
+    for result in results:
+        for step, samples in result["latencies"].items():
+            latencies.setdefault(step, []).extend(samples)
+        failures.extend(result["failures"])
+        turns.extend(result["application_turns"])
+        for name in PROMPT_COUNTERS:
+            prompt[name] += result["prompt"][name]
+        prompt["prompt_tokens_max"] = max(prompt["prompt_tokens_max"], result["prompt"]["prompt_tokens_max"])
+    total_messages = sum(result["messages"] for result in results)
+
+    return {
+        "conversations": len(conversations),
+        "messages": total_messages,
+        "workers": workers,
+        "elapsed_seconds": elapsed,
+        "conversations_per_second": len(conversations) / elapsed if elapsed else 0.0,
+        "messages_per_second": total_messages / elapsed if elapsed else 0.0,
+        "passed": len(conversations) - len(failures),
+        "failed": len(failures),
+        "failures": failures,
+        "messages_per_application": sum(turns) / len(turns) if turns else 0.0,
+        "prompt": {
+            "llm_calls": prompt["calls"],
+            "tokens_per_call_mean": prompt["prompt_tokens_total"] / prompt["calls"] if prompt["calls"] else 0.0,
+            "tokens_per_call_max": prompt["prompt_tokens_max"],
+            "applications": prompt["applications"],
+            "calls_per_application": (prompt["application_calls"] / prompt["applications"]
+                                      if prompt["applications"] else 0.0)
+        },
+        "step_latency_ms": {
+            step: {"count": len(samples), "p50": percentile(samples, 50),
+                   "p95": percentile(samples, 95), "p99": percentile(samples, 99)}
+            for step, samples in sorted(latencies.items())
+        }
+    }
+
+
+def print_report(report: Dict[str, Any], show_failures: int = 10) -> None:
+    print(f"{report['conversations']:,} conversations, {report['messages']:,} messages "
+          f"in {report['elapsed_seconds']:.2f}s with {report['workers'] or 'no'} workers")
+    print(f"{report['conversations_per_second']:,.0f} conversations/s, "
+          f"{report['messages_per_second']:,.0f} messages/s")
+    print(f"correct final state: {report['passed']:,}/{report['conversations']:,}")
+    print(f"messages per completed application: {report['messages_per_application']:.2f}")
+    prompt = report["prompt"]
+    print(f"LLM calls: {prompt['llm_calls']:,}, {prompt['tokens_per_call_mean']:,.0f} prompt tokens/call "
+          f"(max {prompt['tokens_per_call_max']:,}), {prompt['calls_per_application']:.2f} calls per "
+          f"completed application ({prompt['applications']:,})")
+    print()
+    print(f"{'step':<28} {'count':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for step, row in report["step_latency_ms"].items():
+        print(f"{step:<28} {row['count']:>9,} {row['p50']:>9.3f} {row['p95']:>9.3f} {row['p99']:>9.3f}")
+    for failure in report["failures"][:show_failures]:
+        print(f"\nFAILED {failure['id']}:")
+        for error in failure["errors"]:
+            print(f"    {error}")
+
+
+# --- synthetic transcripts -------------------------------------------------
+
+VEHICLE_MODELS = ["Toyota Corolla", "Fiat Egea", "Renault Clio", "Honda Civic", "Volkswagen Golf",
+                  "Hyundai i20", "Ford Focus", "Peugeot 308", "Skoda Octavia", "Dacia Duster"]
+NEW_TYPE_MESSAGES = ["yeni araç", "Yeni", "yeni araç finansmanı istiyorum"]
+USED_TYPE_MESSAGES = ["ikinci el", "İkinci el araç", "kullanılmış araç"]
+GREETINGS = ["merhaba", "Merhaba", "selam"]
+
+
+def random_tckn(rng: random.Random) -> str:
+    """Random 11-digit TCKN with valid check digits"""
+    digits = [rng.randint(1, 9)] + [rng.randint(0, 9) for _ in range(8)]
+    digits.append(((sum(digits[0:9:2]) * 7) - sum(digits[1:8:2])) % 10)
+    digits.append(sum(digits) % 10)
+    return "".join(map(str, digits))
+
+
+def _amount_text(rng: random.Random, amount: int) -> str:
+    formats = [str(amount), f"{amount:,}".replace(",", "."), f"{amount:,} TL".replace(",", ".")]
+    return rng.choice(formats)
+
+
+def _spoken_amount(rng: random.Random, amount: int) -> str:
+    """Amount as people type it in a sentence: 1.250.000 TL, 900 bin, 1,5 milyon"""
+    formats = [f"{amount:,} TL".replace(",", "."), f"{amount // 1000} bin"]
+    if amount % 100_000 == 0 and amount >= 1_000_000:
+        formats.append(f"{amount / 1_000_000:g} milyon".replace(".", ","))
+    return rng.choice(formats)
+
+
+def _new_conversation(rng: random.Random) -> Dict[str, Any]:
+    value = rng.randrange(300_000, 7_000_001, 1000)
+    model = rng.choice(VEHICLE_MODELS)
+    loan = rng.randrange(50_000, int(value * 0.6) + 1, 1000)
+    messages = [rng.choice(GREETINGS), rng.choice(NEW_TYPE_MESSAGES), _amount_text(rng, value), model]
+    steps = ["determine_type"] + ["collect_new_vehicle_info"] * 3
+    user_data = {"vehicle_value": value, "vehicle_model": model}
+    if value >= 5_000_000:
+        tckn = random_tckn(rng)
+        messages.append(tckn)
+        steps.append("collect_new_vehicle_info")
+        user_data["guarantor_tckn"] = tckn
+    user_data["loan_amount"] = loan
+    messages += [_amount_text(rng, loan), "evet", rng.choice(["evet", "hayır"])]
+    steps += ["confirmation", "hgs_offer", "end"]
+    return {"messages": messages,
+            "expected": {"step": "end", "application_type": "new", "user_data": user_data, "steps": steps}}
+
+
+def _used_conversation(rng: random.Random) -> Dict[str, Any]:
+    value = rng.randrange(200_000, 5_000_001, 1000)
+    age = rng.randint(1, 5)
+    loan = rng.randrange(50_000, int(min(value * 0.4, 3_000_000)) + 1, 1000)
+    seller_tckn = random_tckn(rng) if rng.random() < 0.5 else None
+    messages = [rng.choice(GREETINGS), rng.choice(USED_TYPE_MESSAGES), _amount_text(rng, value),
+                rng.choice([str(age), f"{age} yaşında"]), _amount_text(rng, loan),
+                seller_tckn or "yok", "Evet", rng.choice(["evet", "hayır"])]
+    steps = ["determine_type"] + ["collect_used_vehicle_info"] * 4 + ["confirmation", "hgs_offer", "end"]
+    user_data = {"vehicle_value": value, "vehicle_age": age, "loan_amount": loan, "seller_tckn": seller_tckn}
+    return {"messages": messages,
+            "expected": {"step": "end", "application_type": "used", "user_data": user_data, "steps": steps}}
+
+
+def _multi_slot_conversation(rng: random.Random) -> Dict[str, Any]:
+    """Several fields in one message, like: 2023 model Egea, kasko 900 bin, 400 bin kredi"""
+    if rng.random() < 0.5:
+        value = rng.randrange(300_000, 5_000_000, 100_000)
+        model = rng.choice(VEHICLE_MODELS)
+        loan = rng.randrange(50_000, int(value * 0.6) + 1, 10_000)
+        details = [model, f"fiyatı {_spoken_amount(rng, value)}", f"{_spoken_amount(rng, loan)} kredi"]
+        rng.shuffle(details)
+        messages = [rng.choice(GREETINGS), rng.choice(NEW_TYPE_MESSAGES), ", ".join(details)]
+        steps = ["determine_type", "collect_new_vehicle_info", "confirmation"]
+        user_data = {"vehicle_value": value, "vehicle_model": model, "loan_amount": loan}
+        application_type = "new"
+    else:
+        value = rng.randrange(200_000, 5_000_000, 100_000)
+        year = datetime.now().year - rng.randint(1, 5)
+        loan = rng.randrange(50_000, int(min(value * 0.4, 3_000_000)) + 1, 10_000)
+        details = [f"{year} model", f"kasko {_spoken_amount(rng, value)}", f"{_spoken_amount(rng, loan)} kredi"]
+        rng.shuffle(details)
+        messages = [rng.choice(GREETINGS), rng.choice(USED_TYPE_MESSAGES), ", ".join(details), "yok"]
+        steps = ["determine_type", "collect_used_vehicle_info", "collect_used_vehicle_info", "confirmation"]
+        user_data = {"vehicle_value": value, "vehicle_age": datetime.now().year - year, "loan_amount": loan,
+                     "seller_tckn": None}
+        application_type = "used"
+    messages += ["evet", rng.choice(["evet", "hayır"])]
+    steps += ["hgs_offer", "end"]
+    return {"messages": messages,
+            "expected": {"step": "end", "application_type": application_type, "user_data": user_data,
+                         "steps": steps}}
+
+
+def _cancelled_conversation(rng: random.Random) -> Dict[str, Any]:
+    messages = [rng.choice(GREETINGS), rng.choice(NEW_TYPE_MESSAGES), _amount_text(rng, 1_000_000), "iptal"]
+    steps = ["determine_type", "collect_new_vehicle_info", "collect_new_vehicle_info", "greeting"]
+    return {"messages": messages,
+            "expected": {"step": "greeting", "application_type": None, "user_data": {}, "steps": steps}}
+
+
+def _question_conversation(rng: random.Random) -> Dict[str, Any]:
+    messages = [rng.choice(GREETINGS), rng.choice(["faiz oranları nedir", "Kampanyalı araçlar hangileri?",
+                                                   "Gerekli belgeler nelerdir?"])]
+    steps = ["determine_type", "determine_type"]
+    return {"messages": messages,
+            "expected": {"step": "determine_type", "application_type": None, "user_data": {}, "steps": steps}}
+
+
+CONVERSATION_KINDS = [
+    ("new", _new_conversation, 0.45),
+    ("used", _used_conversation, 0.35),
+    ("multi", _multi_slot_conversation, 0.1),
+    ("cancel", _cancelled_conversation, 0.1),
+    ("question", _question_conversation, 0.1)
+]
+
+
+def generate_conversations(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Synthetic transcripts covering the main flows, with their expected end state"""
+    rng = random.Random(seed)
+    names = [name for name, _, _ in CONVERSATION_KINDS]
+    weights = [weight for _, _, weight in CONVERSATION_KINDS]
+    builders = {name: builder for name, builder, _ in CONVERSATION_KINDS}
+    conversations = []
+    for i in range(count):
+        name = rng.choices(names, weights)[0]
+        conversation = builders[name](rng)
+        conversations.append({"id": f"{name}-{i}", **conversation})
+    return conversations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay conversation transcripts through the chatbot")
+    parser.add_argument("transcripts", nargs="?", help="JSONL transcript file")
+    parser.add_argument("--config", default="chatbot_config.json")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (0 = run in this process)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Conversations per task")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the file this many times")
+    parser.add_argument("--llm-delay-ms", type=float, default=0.0, help="Simulated LLM latency")
+    parser.add_argument("--json", dest="json_path", help="Write the report as JSON to this path")
+    parser.add_argument("--generate", type=int, metavar="N", help="Write N synthetic transcripts and exit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="conversations.jsonl", help="Output path for --generate")
+    args = parser.parse_args()
+
+    if args.generate:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for conversation in generate_conversations(args.generate, args.seed):
+                f.write(json.dumps(conversation, ensure_ascii=False) + "\n")
+        print(f"Wrote {args.generate:,} conversations to {args.out}")
+        return
+
+    if not args.transcripts:
+        parser.error("a transcript file is required unless --generate is used")
+
+    conversations = load_conversations(args.transcripts) * args.repeat
+    report = replay(conversations, args.config, args.workers, args.chunk_size, args.llm_delay_ms / 1000)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    sys.exit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Process-wide resources shared by every chatbot session.
+
+Streamlit re-executes chatbot.py on each rerun and builds a new
+VehicleFinanceChatbot on every login, reset and exit, but imported modules
+stay loaded, so anything cached here lives for the whole process:
+
+    - parsed chatbot_config.json, re-read only when the file changes
+    - objects derived from one config (intent router, ...) via config_resource
+    - Gemini model handles per API key and model name, each talking to
+      Gemini through service clients bound to its own key (see llm_backends.py)
+    - API key validation results, with a TTL and an optional file so they
+      survive restarts (only SHA-256 digests of the keys are stored)
+
+warm_up() loads the expensive modules (the chatbot engine, the LLM SDK) on
+a background thread after the first page has been served, so a fresh
+replica answers its first request without paying for them.
+"""
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+DEFAULT_RESOURCES_CONFIG = {
+    "api_key_cache_ttl_seconds": 3600,
+    "api_key_cache_path": ".api_key_cache.json",
+    "warm_up": True
+}
+
+_lock = threading.RLock()
+_configs = {}           # abspath -> (file version, config)
+_config_resources = {}  # id(config) -> (config, {name: resource})
+_models = {}            # (key digest, model name) -> model
+_clients = {}           # (key digest, service) -> Gemini service client for that key
+_validated_keys = {}    # key digest -> expires_at
+_validated_keys_loaded = False
+_warm_up_thread = None
+
+
+def _key_digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def get_config(config_file: str, default_factory: Optional[Callable[[], Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Parsed config shared by all sessions; treat it as read-only.
+
+    The file is re-parsed only when its mtime or size changes. If it does not
+    exist, ``default_factory`` builds a config that is written to disk.
+    """
+    path = os.path.abspath(config_file)
+    with _lock:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            if default_factory is None:
+                raise
+            config = default_factory()
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(config, f, ensure_ascii=False, indent=2)
+            st = os.stat(path)
+            _configs[path] = ((st.st_mtime_ns, st.st_size), config)
+            return config
+
+        version = (st.st_mtime_ns, st.st_size)
+        cached = _configs.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        if cached is not None:
+            _config_resources.pop(id(cached[1]), None)
+        _configs[path] = (version, config)
+        return config
+
+
+def config_resource(config: Dict[str, Any], name: str, factory: Callable[[Dict[str, Any]], Any]) -> Any:
+    """Build ``factory(config)`` once per config object and reuse it afterwards"""
+    with _lock:
+        entry = _config_resources.get(id(config))
+        if entry is None or entry[0] is not config:
+            entry = (config, {})
+            _config_resources[id(config)] = entry
+        resources = entry[1]
+        if name not in resources:
+            resources[name] = factory(config)
+        return resources[name]
+
+
+_GEMINI_SERVICES = {
+    "generative": "GenerativeServiceClient",
+    "generative_async": "GenerativeServiceAsyncClient",
+    "cache": "CacheServiceClient"
+}
+
+
+def get_gemini_client(api_key: str, service: str) -> Any:
+    """
+    Shared Gemini service client ("generative", "generative_async", "cache")
+    bound to this key.
+
+    genai.configure() keeps one key for the whole process, so switching it
+    for one session would send every other session's calls with that key.
+    """
+    from google.ai import generativelanguage as glm
+
+    digest = _key_digest(api_key)
+    with _lock:
+        client = _clients.get((digest, service))
+        if client is None:
+            client = getattr(glm, _GEMINI_SERVICES[service])(client_options={"api_key": api_key})
+            _clients[(digest, service)] = client
+        return client
+
+
+def bind_gemini_model(model: Any, api_key: str, asynchronous: bool = False) -> Any:
+    """
+    Make a GenerativeModel call Gemini with this key's clients; returns the model.
+
+    The async client belongs to the event loop it is created on, so bind it
+    (``asynchronous=True``) from inside that loop, before the first async call.
+    """
+    # The SDK only falls back to its process-wide clients while these are unset
+    if asynchronous:
+        model._async_client = get_gemini_client(api_key, "generative_async")
+    else:
+        model._client = get_gemini_client(api_key, "generative")
+    return model
+
+
+def get_model(api_key: str, model_name: str) -> Any:
+    """Shared Gemini model handle for this key and model name"""
+    import google.generativeai as genai
+
+    digest = _key_digest(api_key)
+    with _lock:
+        model = _models.get((digest, model_name))
+        if model is None:
+            model = bind_gemini_model(genai.GenerativeModel(model_name), api_key)
+            _models[(digest, model_name)] = model
+        return model
+
+
+def _resources_settings(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {**DEFAULT_RESOURCES_CONFIG, **((config or {}).get("resources", {}))}
+
+
+def _load_validated_keys(path: Optional[str]) -> None:
+    global _validated_keys_loaded
+    if _validated_keys_loaded:
+        return
+    _validated_keys_loaded = True
+    if not path:
+        return
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            _validated_keys.update(json.load(f))
+    except (FileNotFoundError, ValueError):
+        pass
+
+
+def _save_validated_keys(path: Optional[str]) -> None:
+    if not path:
+        return
+    now = time.time()
+    live = {digest: expires for digest, expires in _validated_keys.items() if expires > now}
+    try:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(live, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def validate_api_key(api_key: str, config: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Check an API key for the configured LLM backend without spending a generation call.
+
+    A key that validated within the TTL is accepted straight from the cache;
+    otherwise a model metadata lookup (no tokens generated) confirms it,
+    through a client of its own, so the key the process talks to Gemini with
+    stays as it is. Offline backends (stub, template) accept any key.
+    """
+    from llm_backends import backend_class, llm_settings
+
+    backend = backend_class(config)
+    if not backend.needs_api_key:
+        return True
+
+    settings = _resources_settings(config)
+    path = settings["api_key_cache_path"]
+    digest = _key_digest(api_key)
+    with _lock:
+        _load_validated_keys(path)
+        if _validated_keys.get(digest, 0) > time.time():
+            return True
+
+    try:
+        backend.check_key(api_key, llm_settings(config))
+    except Exception:
+        return False
+
+    with _lock:
+        _validated_keys[digest] = time.time() + settings["api_key_cache_ttl_seconds"]
+        _save_validated_keys(path)
+    return True
+
+
+def warm_up(config: Optional[Dict[str, Any]] = None) -> Optional[threading.Thread]:
+    """
+    Import the chatbot engine and the configured LLM backend's SDK on a
+    daemon thread, once per process ("resources": {"warm_up": false} to skip)
+
+    Returns the thread (the one started earlier on repeated calls).
+    """
+    global _warm_up_thread
+    if not _resources_settings(config)["warm_up"]:
+        return None
+
+    def run():
+        try:
+            importlib.import_module("chatbot_engine")
+            from llm_backends import backend_class
+            backend_class(config).preload()
+        except Exception:
+            pass  # the first real request imports and reports the problem
+
+    with _lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=run, name="warm-up", daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
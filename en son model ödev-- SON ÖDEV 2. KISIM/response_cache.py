@@ -0,0 +1,189 @@
+"""
+Response cache for LLM answers in the vehicle finance chatbot.
+
+Answers are keyed on the normalized user message plus a prompt version (a hash
+of the system prompt), so a config or prompt change never serves stale
+answers. Entries are evicted least-recently-used once ``max_entries`` is
+reached and expire after ``ttl_seconds``. With ``persist_path`` set, entries
+are also written to a small SQLite file so every session and process on the
+box shares them.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from intent_router import turkish_lower
+
+
+DEFAULT_CACHE_CONFIG = {
+    "enabled": True,
+    "max_entries": 1000,
+    "ttl_seconds": 3600,
+    "persist_path": "response_cache.db",
+    "max_persisted_entries": 10000
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Fold case, punctuation and spacing so near-identical questions share a key"""
+    text = _PUNCTUATION.sub(" ", turkish_lower(message))
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def prompt_version(prompt: str) -> str:
+    """Short hash identifying a system prompt"""
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class ResponseCache:
+    """Thread-safe LRU + TTL cache with optional SQLite persistence"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600,
+                 persist_path: Optional[str] = None, max_persisted_entries: int = 10000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.max_persisted_entries = max_persisted_entries
+        self._entries = OrderedDict()  # key -> (created_at, response)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(message: str, version: str) -> str:
+        return f"{version}:{normalize_message(message)}"
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not self.persist_path:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.persist_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        entry = self._load(key)
+        with self._lock:
+            if entry is not None and not self._expired(entry[0], now):
+                self._remember(key, entry)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        entry = (time.time(), response)
+        with self._lock:
+            self._remember(key, entry)
+        self._store(key, entry)
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key: str) -> Optional[tuple]:
+        try:
+            conn = self._connect()
+            if conn is None:
+                return None
+            row = conn.execute("SELECT created_at, response FROM responses WHERE key = ?", (key,)).fetchone()
+            return tuple(row) if row else None
+        except sqlite3.Error:
+            return None
+
+    def _store(self, key: str, entry: tuple) -> None:
+        try:
+            conn = self._connect()
+            if conn is None:
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, entry[1], entry[0])
+            )
+            # Trim the shared file now and then rather than on every write
+            if self.max_persisted_entries and hash(key) % 64 == 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key NOT IN ("
+                    " SELECT key FROM responses ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_persisted_entries,)
+                )
+        except sqlite3.Error:
+            pass  # The disk copy is best effort; the in-memory cache still works
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        conn = self._connect()
+        if conn is not None:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(cache_config: Optional[Dict[str, Any]] = None) -> Optional[ResponseCache]:
+    """Return the process-wide cache for the "response_cache" config section"""
+    cache_config = {**DEFAULT_CACHE_CONFIG, **(cache_config or {})}
+    if not cache_config["enabled"]:
+        return None
+    persist_path = cache_config.get("persist_path")
+    key = (cache_config["max_entries"], cache_config["ttl_seconds"],
+           os.path.abspath(persist_path) if persist_path else None)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = ResponseCache(
+                max_entries=cache_config["max_entries"],
+                ttl_seconds=cache_config["ttl_seconds"],
+                persist_path=persist_path,
+                max_persisted_entries=cache_config["max_persisted_entries"]
+            )
+            _caches[key] = cache
+        return cache
@@ -0,0 +1,392 @@
+"""
+Compact, serializable conversation state and the stores that keep it.
+
+A session is only the fields the dialog state machine needs (current_step,
+application_type, user_data, last_update_field and the id of the
+application saved last, for the HGS offer that follows it) plus the short
+LLM context: the last few turns, a summary of older ones and the number of
+LLM calls since the last completed application. The
+chatbot object itself is rebuilt per request from the shared config and
+model handles (see resources.py) and restored from the session store, so
+nothing heavy is pinned to one process.
+
+Backends:
+    memory - in-process dict, lost on restart (tests, single process)
+    sqlite - local SQLite file in WAL mode, shared by every app process on
+             the host and kept across restarts (default)
+
+Sessions that see no message for ``idle_seconds`` are evicted.
+
+A message is handled under lease(session_id), both in the Streamlit app and
+in http_api.py: the SQLite store marks the session row as taken for
+``lease_seconds``, so two processes (or two browser tabs resuming the same
+session) never run turns of it at the same time; the later one waits. The
+memory store does not lease: http_api.py serializes turns with a lock per
+session, while Streamlit tabs sharing a session may interleave.
+
+A client resumes a session with a token from session_token(), not with the
+bare session id (ids show up in logs and transcripts). The token carries
+an expiry and an HMAC over the id under ``resume_secret``; left empty, a
+random secret is created once in "<path>.key" and shared by every app
+process on the host (per process for the memory backend).
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+DEFAULT_SESSION_CONFIG = {
+    "backend": "sqlite",
+    "path": "sessions.db",
+    "idle_seconds": 1800,
+    "evict_interval_seconds": 60,
+    "lease_seconds": 60,
+    "resume_secret": ""
+}
+
+
+class SessionState:
+    """Everything VehicleFinanceChatbot needs to resume a conversation"""
+
+    __slots__ = ("current_step", "application_type", "user_data", "last_update_field", "application_id",
+                 "history", "history_summary", "llm_calls")
+
+    def __init__(self, current_step: str = "greeting", application_type: Optional[str] = None,
+                 user_data: Optional[Dict[str, Any]] = None, last_update_field: Optional[str] = None,
+                 application_id: Optional[str] = None, history: Optional[List[List[str]]] = None,
+                 history_summary: str = "", llm_calls: int = 0):
+        self.current_step = current_step
+        self.application_type = application_type
+        self.user_data = user_data if user_data is not None else {}
+        self.last_update_field = last_update_field
+        self.application_id = application_id
+        self.history = history if history is not None else []  # [role, text] pairs
+        self.history_summary = history_summary
+        self.llm_calls = llm_calls
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {"step": self.current_step, "type": self.application_type,
+                  "data": self.user_data, "field": self.last_update_field}
+        if self.application_id:
+            record["app"] = self.application_id
+        if self.history:
+            record["hist"] = self.history
+        if self.history_summary:
+            record["sum"] = self.history_summary
+        if self.llm_calls:
+            record["calls"] = self.llm_calls
+        return record
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "SessionState":
+        return cls(record.get("step", "greeting"), record.get("type"),
+                   record.get("data") or {}, record.get("field"), record.get("app"),
+                   record.get("hist") or [], record.get("sum", ""), record.get("calls", 0))
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: str) -> "SessionState":
+        return cls.from_dict(json.loads(text))
+
+    def __eq__(self, other):
+        return isinstance(other, SessionState) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"SessionState({self.to_dict()!r})"
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+class SessionBusy(Exception):
+    """Another process kept the session for longer than the caller would wait"""
+
+
+class SessionStore:
+    """Base class for session stores"""
+
+    def __init__(self, idle_seconds: float = 1800, evict_interval_seconds: float = 60, lease_seconds: float = 60):
+        self.idle_seconds = idle_seconds
+        self.evict_interval_seconds = evict_interval_seconds
+        self.lease_seconds = lease_seconds
+        self._next_eviction = 0.0
+
+    def load(self, session_id: str) -> Optional[SessionState]:
+        """State of a live session, or None if it is unknown or idle too long"""
+        raise NotImplementedError
+
+    def save(self, session_id: str, state: SessionState) -> None:
+        """Store the state and mark the session as active now"""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def evict_idle(self) -> int:
+        """Drop every session idle for longer than idle_seconds; returns how many"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    @contextmanager
+    def lease(self, session_id: str, wait_seconds: Optional[float] = None) -> Iterator[None]:
+        """Hold the session for one load/process/save; a no-op for single-process stores"""
+        yield
+
+    def _maybe_evict(self, now: float) -> None:
+        if now >= self._next_eviction:
+            self._next_eviction = now + self.evict_interval_seconds
+            self.evict_idle()
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions kept as JSON strings in an OrderedDict ordered by last activity"""
+
+    def __init__(self, path: Optional[str] = None, idle_seconds: float = 1800, evict_interval_seconds: float = 60,
+                 lease_seconds: float = 60):
+        super().__init__(idle_seconds, evict_interval_seconds, lease_seconds)
+        self._sessions = OrderedDict()  # session id -> (last seen, state json)
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[SessionState]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+        if entry is None or entry[0] < time.time() - self.idle_seconds:
+            return None
+        return SessionState.from_json(entry[1])
+
+    def save(self, session_id: str, state: SessionState) -> None:
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = (now, state.to_json())
+            self._sessions.move_to_end(session_id)
+        self._maybe_evict(now)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self) -> int:
+        cutoff = time.time() - self.idle_seconds
+        evicted = 0
+        with self._lock:
+            while self._sessions:
+                session_id, (last_seen, _) = next(iter(self._sessions.items()))
+                if last_seen >= cutoff:
+                    break
+                del self._sessions[session_id]
+                evicted += 1
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SqliteSessionStore(SessionStore):
+    """SQLite table of sessions; safe to share between processes on one host"""
+
+    def __init__(self, path: str = "sessions.db", idle_seconds: float = 1800,
+                 evict_interval_seconds: float = 60, lease_seconds: float = 60, timeout: float = 30.0):
+        super().__init__(idle_seconds, evict_interval_seconds, lease_seconds)
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id TEXT PRIMARY KEY,"
+                " last_seen REAL NOT NULL,"
+                " state TEXT NOT NULL,"
+                " lease_until REAL NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+            # Tables created before leases existed
+            if "lease_until" not in {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}:
+                try:
+                    conn.execute("ALTER TABLE sessions ADD COLUMN lease_until REAL NOT NULL DEFAULT 0")
+                except sqlite3.OperationalError:
+                    pass  # another process added it first
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> Optional[SessionState]:
+        row = self._connect().execute(
+            "SELECT state FROM sessions WHERE id = ? AND last_seen >= ?",
+            (session_id, time.time() - self.idle_seconds)
+        ).fetchone()
+        return SessionState.from_json(row[0]) if row else None
+
+    def save(self, session_id: str, state: SessionState) -> None:
+        now = time.time()
+        # Saving ends the turn, so it also gives up the lease (one write instead of two)
+        self._connect().execute(
+            "INSERT INTO sessions (id, last_seen, state) VALUES (?, ?, ?)"
+            " ON CONFLICT (id) DO UPDATE SET last_seen = excluded.last_seen, state = excluded.state,"
+            " lease_until = 0",
+            (session_id, now, state.to_json())
+        )
+        self._end_lease(session_id)
+        self._maybe_evict(now)
+
+    def delete(self, session_id: str) -> None:
+        self._connect().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        self._end_lease(session_id)
+
+    def _end_lease(self, session_id: str) -> None:
+        if getattr(self._local, "leased", None) == session_id:
+            self._local.leased = None
+
+    @contextmanager
+    def lease(self, session_id: str, wait_seconds: Optional[float] = None) -> Iterator[None]:
+        """
+        Mark the session row as taken while the caller handles one message.
+
+        Waits (up to ``wait_seconds``, default lease_seconds) while another
+        process holds it, then raises SessionBusy. A lease left behind by a
+        crashed process runs out after lease_seconds. Unknown sessions are
+        not leased; load() reports them.
+        """
+        conn = self._connect()
+        deadline = time.time() + (self.lease_seconds if wait_seconds is None else wait_seconds)
+        while True:
+            now = time.time()
+            taken = conn.execute(
+                "UPDATE sessions SET lease_until = ? WHERE id = ? AND lease_until < ?",
+                (now + self.lease_seconds, session_id, now)
+            ).rowcount
+            if taken or conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone() is None:
+                break
+            if now >= deadline:
+                raise SessionBusy(session_id)
+            time.sleep(0.02)
+        self._local.leased = session_id if taken else None
+        try:
+            yield
+        finally:
+            # Still held if the turn failed before save() or delete()
+            if self._local.leased == session_id:
+                self._local.leased = None
+                conn.execute("UPDATE sessions SET lease_until = 0 WHERE id = ?", (session_id,))
+
+    def evict_idle(self) -> int:
+        cursor = self._connect().execute(
+            "DELETE FROM sessions WHERE last_seen < ?", (time.time() - self.idle_seconds,))
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+SESSION_BACKENDS = {
+    "memory": MemorySessionStore,
+    "sqlite": SqliteSessionStore
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+_resume_secrets = {}  # key file path (or "memory") -> secret
+
+
+def _resume_secret(session_config: Dict[str, Any]) -> bytes:
+    if session_config["resume_secret"]:
+        return session_config["resume_secret"].encode("utf-8")
+    key = "memory" if session_config["backend"] == "memory" else os.path.abspath(session_config["path"]) + ".key"
+    with _stores_lock:
+        secret = _resume_secrets.get(key)
+        if secret is None:
+            secret = secrets.token_bytes(32)
+            if key != "memory":
+                # Linked into place whole, so a process racing us reads either nothing or all of it
+                tmp_path = f"{key}.{os.getpid()}.tmp"
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                try:
+                    os.write(fd, secret)
+                finally:
+                    os.close(fd)
+                try:
+                    os.link(tmp_path, key)
+                except FileExistsError:
+                    with open(key, "rb") as f:
+                        secret = f.read()
+                finally:
+                    os.unlink(tmp_path)
+            _resume_secrets[key] = secret
+        return secret
+
+
+def _token_signature(secret: bytes, payload: str) -> str:
+    digest = hmac.new(secret, payload.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode("ascii").rstrip("=")
+
+
+def session_token(session_id: str, session_config: Optional[Dict[str, Any]] = None) -> str:
+    """Signed token that resumes ``session_id`` until it has been idle for idle_seconds"""
+    session_config = {**DEFAULT_SESSION_CONFIG, **(session_config or {})}
+    payload = f"{session_id}.{int(time.time() + session_config['idle_seconds']):x}"
+    return f"{payload}.{_token_signature(_resume_secret(session_config), payload)}"
+
+
+def session_from_token(token: str, session_config: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """The session id a token from session_token() resumes, or None if it is forged or expired"""
+    session_config = {**DEFAULT_SESSION_CONFIG, **(session_config or {})}
+    payload, _, signature = (token or "").rpartition(".")
+    session_id, _, expires = payload.rpartition(".")
+    if not session_id or not signature:
+        return None
+    expected = _token_signature(_resume_secret(session_config), payload)
+    if not hmac.compare_digest(signature, expected):
+        return None
+    try:
+        if int(expires, 16) < time.time():
+            return None
+    except ValueError:
+        return None
+    return session_id
+
+
+def create_session_store(session_config: Optional[Dict[str, Any]] = None) -> SessionStore:
+    """Create a store from the "sessions" section of chatbot_config.json"""
+    session_config = {**DEFAULT_SESSION_CONFIG, **(session_config or {})}
+    backend = session_config["backend"]
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown session store backend: {backend}")
+    return SESSION_BACKENDS[backend](session_config["path"], session_config["idle_seconds"],
+                                     session_config["evict_interval_seconds"], session_config["lease_seconds"])
+
+
+def get_session_store(session_config: Optional[Dict[str, Any]] = None) -> SessionStore:
+    """Return the process-wide session store for this configuration"""
+    session_config = {**DEFAULT_SESSION_CONFIG, **(session_config or {})}
+    key = (session_config["backend"], os.path.abspath(session_config["path"]))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = create_session_store(session_config)
+            _stores[key] = store
+        return store
@@ -0,0 +1,315 @@
+"""
+Single-pass slot extractor for the application fields of the chatbot.
+
+One compiled regex splits the message into TCKNs, numbers, words and clause
+separators; a linear walk over those tokens then finds every slot the
+message mentions:
+
+    vehicle_value  - amount next to "kasko", "değer", "fiyat", "proforma", ...
+    loan_amount    - amount next to "kredi", "finansman", "borç", ...
+    vehicle_age    - "3 yaşında", "3 yıllık"
+    model_year     - "2023 model", "2021 yılı", "model yılı 2021", "Clio 2024"
+    vehicle_model  - a known brand and the model after it ("BMW 320i"), or a
+                     known model name on its own ("Egea")
+    tckns          - 11-digit numbers
+
+Numbers are read the Turkish way ("1.250.000,50", "1 250 000", "1,5 milyon",
+"900 bin", "2 milyon 300 bin", "900k") and also as Turkish number words ("bir
+buçuk milyon", "iki yüz elli bin", "yarım milyon"), and rounded half up to
+whole numbers ("1,5 yaşında" -> 2, "2,5" -> 3). An amount is labelled by the
+nearest value/loan keyword in its clause (clauses end at ",", ";", "ve", ...);
+amounts without one are returned in ``amounts`` so the dialog can give them
+to the field it just asked for.
+
+Brand and model names come from the "slot_extractor" section of
+chatbot_config.json.
+"""
+import re
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from intent_router import turkish_lower
+
+
+DEFAULT_SLOT_CONFIG = {
+    "brands": ["alfa", "audi", "bmw", "byd", "chery", "citroen", "cupra", "dacia", "fiat", "ford", "honda",
+               "hyundai", "jeep", "kia", "mazda", "mercedes", "mini", "mitsubishi", "nissan", "opel",
+               "peugeot", "porsche", "renault", "seat", "skoda", "suzuki", "tesla", "togg", "toyota",
+               "volkswagen", "volvo", "vw"],
+    "models": ["2008", "208", "3008", "308", "408", "500", "508", "5008", "astra", "c-hr", "c3", "c4",
+               "c5", "captur", "ceed", "chr", "civic", "clio", "corolla", "corsa", "duster", "egea", "focus",
+               "fiesta", "golf", "i10", "i20", "i30", "jogger", "jazz", "juke", "kamiq", "kuga", "megane",
+               "octavia", "passat", "polo", "puma", "qashqai", "sandero", "scala", "sportage", "superb",
+               "t-roc", "t10x", "taliant", "tiguan", "tucson", "bayon", "yaris", "zr-v", "hr-v", "x-trail",
+               "kona", "elantra", "stonic", "xceed", "arona", "ibiza", "leon", "tipo", "mokka"],
+    "min_model_year": 1980
+}
+
+VALUE_KEYWORDS = ("kasko", "değer", "fiyat", "proforma", "fatura", "bedel", "ekspertiz")
+LOAN_KEYWORDS = ("kredi", "finansman", "borç", "çekmek", "çekece", "talep")
+AGE_WORDS = ("yaş", "yıl", "sene")
+YEAR_WORDS = frozenset(["model", "modeli", "yılı", "yıl", "senesi"])
+CLAUSE_WORDS = frozenset(["ve", "ile", "ayrıca", "ama", "fakat"])
+CURRENCY_WORDS = frozenset(["tl", "lira", "try", "₺"])
+
+DIGIT_WORDS = {
+    "sıfır": 0, "bir": 1, "iki": 2, "üç": 3, "dört": 4, "beş": 5, "altı": 6, "yedi": 7, "sekiz": 8,
+    "dokuz": 9, "on": 10, "yirmi": 20, "otuz": 30, "kırk": 40, "elli": 50, "altmış": 60, "yetmiş": 70,
+    "seksen": 80, "doksan": 90
+}
+MULTIPLIERS = {
+    "bin": 1_000, "binlik": 1_000, "k": 1_000,
+    "milyon": 1_000_000, "milyonluk": 1_000_000, "m": 1_000_000, "mn": 1_000_000,
+    "milyar": 1_000_000_000
+}
+_QUANTITY_WORDS = frozenset(DIGIT_WORDS) | frozenset(MULTIPLIERS) | {"yüz", "buçuk", "yarım"}
+
+_UNITS = "|".join(sorted(MULTIPLIERS, key=len, reverse=True))
+_TOKENS = re.compile(
+    r"(?P<tckn>(?<![\d.,])\d{11}(?![\d.,]\d))"
+    r"|(?P<number>\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d{1,3}(?:,\d{3})+(?:\.\d+)?"
+    r"|\d{1,3}(?:[ \u00a0\u202f]\d{3}(?!\d))+(?:,\d+)?|\d+(?:[.,]\d+)?)"
+    rf"(?P<unit>{_UNITS}|tl)?(?![^\W_])"
+    r"|(?P<word>\d*[^\W\d_][^\W_]*(?:-[^\W_]+)*)"
+    r"|(?P<currency>₺)"
+    r"|(?P<sep>[;!?\n]|[.,](?!\d))",
+    re.IGNORECASE
+)
+
+
+def parse_number(text: str) -> float:
+    """
+    Value of a number written with Turkish or English separators
+
+    "1.250.000,50" -> 1250000.5, "1,5" -> 1.5, "1.500" -> 1500,
+    "1,250,000" -> 1250000, "1 250 000" -> 1250000. A single separator
+    followed by exactly three digits is a thousands separator.
+    """
+    text = re.sub(r"[ \u00a0\u202f]", "", text)
+    if "," in text and "." in text:
+        if text.rindex(",") > text.rindex("."):
+            return float(text.replace(".", "").replace(",", "."))
+        return float(text.replace(",", ""))
+    for separator in ".,":
+        if separator in text:
+            whole, _, fraction = text.rpartition(separator)
+            if text.count(separator) > 1 or len(fraction) == 3:
+                return float(text.replace(separator, ""))
+            return float(f"{whole.replace(separator, '')}.{fraction}")
+    return float(text)
+
+
+def whole_number(value: float) -> int:
+    """``value`` rounded half up ("2,5" -> 3), unlike round(), which rounds 2.5 down to 2"""
+    return int(Decimal(repr(value)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+class SlotExtractor:
+    """Finds every application slot in a message with one regex scan and one token walk"""
+
+    def __init__(self, brands: Iterable[str] = (), models: Iterable[str] = (), min_model_year: int = 1980):
+        self.brands = frozenset(turkish_lower(brand) for brand in brands)
+        self.models = frozenset(turkish_lower(model) for model in models)
+        self.min_model_year = min_model_year
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SlotExtractor":
+        settings = {**DEFAULT_SLOT_CONFIG, **config.get("slot_extractor", {})}
+        return cls(settings["brands"], settings["models"], settings["min_model_year"])
+
+    # --- tokens ---
+
+    @staticmethod
+    def _clauses(text: str) -> List[List[Tuple[str, str, int, int, Optional[str]]]]:
+        """(kind, lower-cased text, start, end, unit) tokens grouped by clause"""
+        clauses = [[]]
+        for match in _TOKENS.finditer(text):
+            kind = match.lastgroup
+            unit = None
+            if kind == "unit":
+                kind, unit = "number", match.group("unit").lower()
+            if kind == "sep":
+                if clauses[-1]:
+                    clauses.append([])
+                continue
+            value = "₺" if kind == "currency" else turkish_lower(match.group(kind))
+            if kind == "currency":
+                kind = "word"
+            elif kind == "word" and value in CLAUSE_WORDS:
+                if clauses[-1]:
+                    clauses.append([])
+                continue
+            clauses[-1].append((kind, value, match.start(), match.end(), unit))
+        return [clause for clause in clauses if clause]
+
+    @staticmethod
+    def _quantity(clause: List[Tuple[str, str, int, int, Optional[str]]], i: int) -> Tuple[Optional[float], int, bool]:
+        """
+        Read the amount starting at token ``i``
+
+        Returns (value, index after it, True if it is clearly an amount of
+        money: has a currency or a multiplier). Value is None when the tokens
+        are not a number, or only a small number word like "bir" (which is
+        also the indefinite article).
+        """
+        total = 0.0
+        current = None
+        last_multiplier = 0
+        money = digits = False
+        j = i
+        while j < len(clause):
+            kind, text, _, _, unit = clause[j]
+            if kind == "number":
+                if current is not None:
+                    break
+                current = parse_number(text)
+                digits = True
+                if unit == "tl":
+                    money = True
+                elif unit:
+                    total += current * MULTIPLIERS[unit]
+                    current = None
+                    last_multiplier = MULTIPLIERS[unit]
+                    money = True
+            elif kind != "word" or text not in _QUANTITY_WORDS and text not in CURRENCY_WORDS:
+                break
+            elif text in CURRENCY_WORDS:
+                if j == i:
+                    break
+                money = True
+                j += 1
+                break
+            elif text in DIGIT_WORDS:
+                if digits and current is not None:
+                    break
+                current = (current or 0) + DIGIT_WORDS[text]
+            elif text == "yüz":
+                current = (current or 1) * 100
+            elif text in MULTIPLIERS:
+                last_multiplier = MULTIPLIERS[text]
+                total += (1 if current is None else current) * last_multiplier
+                current = None
+                money = True
+            elif text == "buçuk":
+                if current is None:
+                    total += 0.5 * last_multiplier
+                else:
+                    current += 0.5
+            else:  # yarım
+                current = (current or 0) + 0.5
+            j += 1
+        if j == i:
+            return None, i, False
+        value = total + (current or 0)
+        if not digits and not money and value < 10:
+            return None, j, False
+        return value, j, money
+
+    # --- slots ---
+
+    def _model_end(self, text: str, clause: List[Tuple[str, str, int, int, Optional[str]]], i: int) -> int:
+        """Index after the model name that starts at token ``i``, or ``i`` when there is none"""
+        kind, word, _, _, _ = clause[i]
+        if kind != "word":
+            return i
+        if word in self.models:
+            return i + 1
+        if word not in self.brands:
+            return i
+        # Up to two tokens after the brand: known models, names with a digit
+        # ("320i", "T10X") or capitalized words ("Corolla Cross")
+        j = i + 1
+        while j < len(clause) and j < i + 3:
+            kind, word, start, _, _ = clause[j]
+            if word in self.models or (kind == "word" and not self._is_keyword(word)
+                                       and (text[start].isupper() or any(c.isdigit() for c in word))):
+                j += 1
+            else:
+                break
+        return j
+
+    @staticmethod
+    def _is_keyword(word: str) -> bool:
+        return (word in _QUANTITY_WORDS or word in CURRENCY_WORDS or word in YEAR_WORDS
+                or word.startswith(VALUE_KEYWORDS + LOAN_KEYWORDS + AGE_WORDS))
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        """
+        Every slot found in ``text``
+
+        Keys that were not found are missing, except "tckns", "amounts"
+        (unlabelled amounts as (value, is_money) pairs, in message order),
+        "numbers" (every number, in order) and "free_text" (clauses without
+        any slot, e.g. a model name the vocabulary does not know).
+        """
+        slots = {"tckns": [], "amounts": [], "numbers": [], "free_text": []}
+        this_year = datetime.now().year
+        for clause in self._clauses(text):
+            labels = []  # (token index, field)
+            quantities = []  # (first token index, last token index, value, is_money)
+            found = False
+            model_end = -1
+            i = 0
+            while i < len(clause):
+                kind, word, start, end, _ = clause[i]
+                if kind == "tckn":
+                    slots["tckns"].append(text[start:end])
+                    found = True
+                    i += 1
+                    continue
+                end_of_model = self._model_end(text, clause, i)
+                if end_of_model > i:
+                    slots.setdefault("vehicle_model", text[start:clause[end_of_model - 1][3]])
+                    found = True
+                    i = model_end = end_of_model
+                    continue
+                value, after, money = self._quantity(clause, i)
+                if value is None:
+                    if kind == "word":
+                        if word.startswith(VALUE_KEYWORDS):
+                            labels.append((i, "vehicle_value"))
+                        elif word.startswith(LOAN_KEYWORDS):
+                            labels.append((i, "loan_amount"))
+                    i = max(after, i + 1)
+                    continue
+                found = True
+                slots["numbers"].append(value)
+                following = clause[after][1] if after < len(clause) else ""
+                preceding = clause[i - 1][1] if i else ""
+                is_year = value == int(value) and self.min_model_year <= value <= this_year + 1 and not money
+                # A year right after the model name is its model year ("Renault Clio 2024")
+                if is_year and (following in YEAR_WORDS or preceding in YEAR_WORDS or i == model_end):
+                    slots.setdefault("model_year", int(value))
+                    after += following in YEAR_WORDS
+                elif not money and value < 100 and following.startswith(AGE_WORDS):
+                    slots.setdefault("vehicle_age", whole_number(value))
+                    after += 1
+                else:
+                    quantities.append((i, after - 1, value, money))
+                i = after
+            for first, last, value, money in quantities:
+                field = None
+                if labels:
+                    # Nearest keyword wins; on a tie the one before the amount
+                    field = min(labels, key=lambda label: (first - label[0] if label[0] < first else label[0] - last,
+                                                           label[0] > last))[1]
+                if field and field not in slots:
+                    slots[field] = whole_number(value)
+                else:
+                    slots["amounts"].append((whole_number(value), money))
+            if not found and not labels:
+                slots["free_text"].append(text[clause[0][2]:clause[-1][3]])
+        return slots
+
+    def first_number(self, text: str) -> Optional[int]:
+        """The first number in ``text`` (TCKNs and model names skipped), or None"""
+        numbers = self.extract(text)["numbers"]
+        return whole_number(numbers[0]) if numbers else None
+
+    def age_from_year(self, year: int) -> Optional[int]:
+        """Vehicle age for a model year, or None if it is not a plausible year"""
+        this_year = datetime.now().year
+        if self.min_model_year <= year <= this_year + 1:
+            return max(this_year - year, 0)
+        return None
@@ -0,0 +1,142 @@
+"""
+Local HTTP stub of an LLM backend for resilience and load testing.
+
+The server answers POST /generate {"prompt": ...} with {"text": ...} after a
+simulated delay, and can inject failures:
+    --latency-ms      base latency of every request
+    --jitter-ms       uniform extra latency added on top
+    --slow-rate       fraction of requests that take --slow-ms instead (tail)
+    --error-rate      fraction of requests answered with HTTP 503
+
+StubServerModel talks to the server with the same ``generate_content``
+interface as the Gemini SDK, so it can be passed to VehicleFinanceChatbot or
+llm_client.get_llm_client.
+
+Usage:
+    python stub_llm_server.py --port 8765 --latency-ms 200 --slow-rate 0.05 --slow-ms 20000 --error-rate 0.1
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from fake_llm import FakeResponse, FakeStreamResponse
+
+
+class StubSettings:
+    def __init__(self, latency_ms: float = 200, jitter_ms: float = 0, slow_rate: float = 0.0,
+                 slow_ms: float = 20000, error_rate: float = 0.0,
+                 text: str = "Stub sunucusundan gelen yanıt."):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.error_rate = error_rate
+        self.text = text
+
+
+def _make_handler(settings: StubSettings):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if random.random() < settings.slow_rate:
+                delay = settings.slow_ms
+            else:
+                delay = settings.latency_ms + random.uniform(0, settings.jitter_ms)
+            time.sleep(delay / 1000)
+
+            if random.random() < settings.error_rate:
+                self.send_response(503)
+                self.end_headers()
+                return
+            payload = json.dumps({"text": settings.text, "prompt_chars": len(body.get("prompt", ""))}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class StubLLMServer:
+    """Threaded stub server; usable as a context manager in tests and benchmarks"""
+
+    def __init__(self, settings: Optional[StubSettings] = None, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings or StubSettings()
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self.settings))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/generate"
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class StubServerModel:
+    """``generate_content`` client for StubLLMServer"""
+
+    def __init__(self, url: str, http_timeout: float = 120.0, model_name: str = "stub-server"):
+        self.url = url
+        self.http_timeout = http_timeout
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        request = urllib.request.Request(
+            self.url, data=json.dumps({"prompt": prompt}).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.http_timeout) as response:
+            text = json.loads(response.read())["text"]
+        if stream:
+            words = text.split(" ")
+            return FakeStreamResponse(w if i == len(words) - 1 else w + " " for i, w in enumerate(words))
+        return FakeResponse(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local LLM stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=20000)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    settings = StubSettings(args.latency_ms, args.jitter_ms, args.slow_rate, args.slow_ms, args.error_rate)
+    server = StubLLMServer(settings, args.host, args.port)
+    print(f"Stub LLM server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
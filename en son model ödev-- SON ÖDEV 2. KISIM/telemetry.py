@@ -0,0 +1,362 @@
+"""
+Tracing and metrics for the vehicle finance chatbot.
+
+Spans time the steps of a chat turn: ``process_message`` is the root, with
+``route`` (intent router), ``handle`` (the step handler, labelled with the
+step), ``extract``, ``validate``, ``llm`` and ``save`` nested inside it.
+The application store write (``store_append``, on a job worker) and the
+Streamlit ``render`` pass are spans of their own. Streamed LLM answers are
+consumed after the turn, so they only feed the LLM histograms.
+Every span is counted into the ``chatbot_span_seconds`` histogram; the last
+``recent_traces`` finished root spans are kept with their children for the
+admin diagnostics view.
+
+Besides spans there are plain counters (``inc``) and histograms
+(``observe``), e.g. LLM latency and tokens, answer sources (rule, FAQ,
+response cache, LLM, error) and response cache hits.
+
+Export:
+    prometheus_text()  - text exposition format, served at GET /metrics by
+                         http_api.py
+    "export_path"      - a snapshot rewritten at most every
+                         ``export_interval_seconds`` (JSON, or Prometheus
+                         text with "export_format": "prometheus")
+
+With "enabled": false every call is a no-op, so the instrumentation can stay
+in the code paths.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_TELEMETRY_CONFIG = {
+    "enabled": True,
+    "recent_traces": 20,
+    "export_path": None,
+    "export_format": "json",
+    "export_interval_seconds": 30,
+    "admin_token": ""
+}
+
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+# Histograms that are not latencies
+HISTOGRAM_BUCKETS = {
+    "chatbot_llm_prompt_tokens": TOKEN_BUCKETS,
+    "chatbot_llm_response_tokens": TOKEN_BUCKETS
+}
+
+HELP = {
+    "chatbot_span_seconds": "Duration of instrumented steps",
+    "chatbot_answers_total": "Free-text answers, by source",
+    "chatbot_response_cache_total": "Response cache lookups",
+    "chatbot_llm_requests_total": "LLM requests, by outcome",
+    "chatbot_admission_total": "LLM admission decisions of the rate limiter, by result",
+    "chatbot_transcript_turns_total": "Chat turns handed to the transcript log, queued or dropped",
+    "chatbot_llm_seconds": "LLM latency until the full answer",
+    "chatbot_llm_first_chunk_seconds": "Streamed LLM latency until the first chunk",
+    "chatbot_llm_tokens_total": "Estimated LLM tokens",
+    "chatbot_llm_prompt_tokens": "Estimated prompt tokens per LLM request",
+    "chatbot_llm_response_tokens": "Estimated answer tokens per LLM request",
+    "chatbot_applications_total": "Applications queued for saving, by result"
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _NoSpan:
+    """Span stand-in while telemetry is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Span:
+    """One timed step; nested spans on the same thread become its children"""
+
+    __slots__ = ("telemetry", "name", "labels", "stack", "start", "seconds", "children", "error")
+
+    def __init__(self, telemetry: "Telemetry", name: str, labels: Dict[str, str]):
+        self.telemetry = telemetry
+        self.name = name
+        self.labels = labels
+        self.children = []
+        self.seconds = 0.0
+        self.error = None
+
+    def __enter__(self):
+        local = self.telemetry._local
+        try:
+            stack = local.stack
+        except AttributeError:
+            stack = local.stack = []
+        stack.append(self)
+        self.stack = stack
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        self.telemetry._finish(self)
+        return False
+
+    def as_dict(self) -> Dict[str, Any]:
+        record = {"name": self.name, "ms": round(self.seconds * 1000, 3)}
+        if self.labels:
+            record["labels"] = dict(self.labels)
+        if self.error:
+            record["error"] = self.error
+        if self.children:
+            record["children"] = [child.as_dict() for child in self.children]
+        return record
+
+
+class Telemetry:
+    """Thread-safe registry of counters, histograms and recent traces"""
+
+    def __init__(self, enabled: bool = True, recent_traces: int = 20, export_path: Optional[str] = None,
+                 export_format: str = "json", export_interval_seconds: float = 30):
+        self.enabled = enabled
+        self.export_path = export_path
+        self.export_format = export_format
+        self.export_interval_seconds = export_interval_seconds
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._traces = deque(maxlen=recent_traces)
+        # Sorting labels per call would cost more than the recording itself, so
+        # series are also found by the label items as passed
+        self._keys = {}        # (name, label items) -> (name, sorted labels)
+        self._series = {}      # (name, label items) -> (buckets, histogram)
+        self._next_export = 0.0
+
+    # --- recording ---
+
+    def span(self, name: str, **labels):
+        """Context manager timing ``name``; ``labels`` become histogram labels"""
+        if not self.enabled:
+            return _NO_SPAN
+        return Span(self, name, labels)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        buckets, histogram = self._series.get((name, *labels.items())) or self._new_series(name, labels)
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            histogram[index] += 1
+            histogram[-1] += value
+
+    def _key(self, name: str, labels: Dict[str, Any]) -> Tuple[str, Labels]:
+        raw = (name, *labels.items())
+        key = self._keys.get(raw)
+        if key is None:
+            key = self._keys[raw] = (name, _label_key(labels))
+        return key
+
+    def _new_series(self, name: str, labels: Dict[str, Any],
+                    raw: Optional[tuple] = None) -> Tuple[Tuple[float, ...], List[float]]:
+        buckets = HISTOGRAM_BUCKETS.get(name, LATENCY_BUCKETS)
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(buckets) + 2)
+            series = self._series[raw or (name, *labels.items())] = (buckets, histogram)
+        return series
+
+    def _finish(self, span: Span) -> None:
+        stack = span.stack
+        if stack and stack[-1] is span:
+            stack.pop()
+        raw = ("chatbot_span_seconds", span.name, *span.labels.items())
+        buckets, histogram = (self._series.get(raw)
+                              or self._new_series("chatbot_span_seconds", {"span": span.name, **span.labels}, raw))
+        seconds = span.seconds
+        index = bisect.bisect_left(buckets, seconds)
+        with self._lock:
+            histogram[index] += 1
+            histogram[-1] += seconds
+            if not stack:
+                self._traces.append(span)
+        if stack:
+            stack[-1].children.append(span)
+        elif self.export_path and time.monotonic() >= self._next_export:
+            self.export()
+
+    # --- reading ---
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters, histograms and recent traces as plain JSON-serializable data"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+            traces = list(self._traces)
+        return {
+            "timestamp": time.time(),
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in counters],
+            "histograms": [{"name": name, "labels": dict(labels), **_histogram_summary(name, values)}
+                           for (name, labels), values in histograms],
+            "traces": [span.as_dict() for span in traces]
+        }
+
+    def span_summary(self) -> List[Dict[str, Any]]:
+        """Per span and label set: count, mean and bucket-estimated p50/p95 in milliseconds"""
+        rows = []
+        for histogram in self.snapshot()["histograms"]:
+            if histogram["name"] != "chatbot_span_seconds":
+                continue
+            labels = dict(histogram["labels"])
+            rows.append({
+                "span": labels.pop("span"),
+                "labels": ", ".join(f"{key}={value}" for key, value in labels.items()),
+                "count": histogram["count"],
+                "mean_ms": round(histogram["mean"] * 1000, 3),
+                "p50_ms": round(histogram["p50"] * 1000, 3),
+                "p95_ms": round(histogram["p95"] * 1000, 3),
+                "total_s": round(histogram["sum"], 3)
+            })
+        return sorted(rows, key=lambda row: -row["total_s"])
+
+    def prometheus_text(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                declared.add(name)
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} counter"]
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), values in histograms:
+            if name not in declared:
+                declared.add(name)
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} histogram"]
+            buckets = HISTOGRAM_BUCKETS.get(name, LATENCY_BUCKETS)
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), values[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-1])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    # --- export ---
+
+    def export(self, path: Optional[str] = None) -> None:
+        """Write a snapshot to ``path`` (default "export_path"), replacing the previous one"""
+        path = path or self.export_path
+        if not path:
+            return
+        self._next_export = time.monotonic() + self.export_interval_seconds
+        if self.export_format == "prometheus":
+            text = self.prometheus_text()
+        else:
+            text = json.dumps(self.snapshot(), ensure_ascii=False)
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._series.clear()
+            self._traces.clear()
+
+
+def _label_key(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _histogram_summary(name: str, values: List[float]) -> Dict[str, Any]:
+    buckets = HISTOGRAM_BUCKETS.get(name, LATENCY_BUCKETS)
+    counts = values[:-1]
+    count = sum(counts)
+    return {
+        "count": count,
+        "sum": values[-1],
+        "mean": values[-1] / count if count else 0.0,
+        "p50": _bucket_quantile(buckets, counts, 0.5),
+        "p95": _bucket_quantile(buckets, counts, 0.95),
+        "buckets": dict(zip([*map(str, buckets), "+Inf"], counts))
+    }
+
+
+def _bucket_quantile(buckets: Tuple[float, ...], counts: List[int], q: float) -> float:
+    """Quantile estimated by linear interpolation inside the bucket that holds it"""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= rank:
+            lower = buckets[i - 1] if i > 0 else 0.0
+            upper = buckets[i] if i < len(buckets) else buckets[-1]
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return float(buckets[-1])
+
+
+_telemetries = {}
+_telemetries_lock = threading.Lock()
+
+
+def telemetry_settings(telemetry_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {**DEFAULT_TELEMETRY_CONFIG, **(telemetry_config or {})}
+
+
+def get_telemetry(telemetry_config: Optional[Dict[str, Any]] = None) -> Telemetry:
+    """Return the process-wide telemetry registry for the "telemetry" config section"""
+    settings = telemetry_settings(telemetry_config)
+    export_path = settings["export_path"]
+    key = (settings["enabled"], settings["recent_traces"], os.path.abspath(export_path) if export_path else None,
+           settings["export_format"], settings["export_interval_seconds"])
+    with _telemetries_lock:
+        telemetry = _telemetries.get(key)
+        if telemetry is None:
+            telemetry = Telemetry(settings["enabled"], settings["recent_traces"], export_path,
+                                  settings["export_format"], settings["export_interval_seconds"])
+            _telemetries[key] = telemetry
+        return telemetry
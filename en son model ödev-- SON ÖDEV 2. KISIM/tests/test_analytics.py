@@ -0,0 +1,14 @@
+import sys
+
+import pytest
+
+from analytics import ApplicationAnalytics, compact
+from application_store import create_application_store
+
+
+def test_missing_pyarrow_is_reported_up_front(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)  # import pyarrow now raises ImportError
+    with pytest.raises(ImportError, match="pip install pyarrow"):
+        ApplicationAnalytics(str(tmp_path))
+    with pytest.raises(ImportError, match="pip install pyarrow"):
+        compact(create_application_store({"backend": "memory"}), {"path": str(tmp_path)})
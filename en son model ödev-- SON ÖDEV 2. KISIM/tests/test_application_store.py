@@ -0,0 +1,33 @@
+import json
+import os
+
+from application_store import JsonlApplicationStore
+
+
+def application(number):
+    return {"id": f"APP_{number}", "type": "new", "status": "pending", "timestamp": "2025-01-01T10:00:00",
+            "data": {"vehicle_value": 1000000, "vehicle_model": "Renault Clio", "loan_amount": 500000}}
+
+
+def test_append_after_torn_tail_keeps_every_record_readable(tmp_path):
+    store = JsonlApplicationStore(str(tmp_path))
+    store.append(application(1))
+    segment = os.path.join(str(tmp_path), "segment-00001.jsonl")
+    with open(segment, "ab") as f:
+        f.write(json.dumps(application(2)).encode("utf-8")[:40])  # the process died mid-write
+
+    reopened = JsonlApplicationStore(str(tmp_path))
+    reopened.append(application(3))
+
+    assert [a["id"] for a in reopened.iter_applications()] == ["APP_1", "APP_3"]
+    assert reopened.get("APP_3")["id"] == "APP_3"
+    with open(segment, "rb") as f:
+        for line in f:
+            json.loads(line)
+
+
+def test_complete_records_are_not_truncated(tmp_path):
+    store = JsonlApplicationStore(str(tmp_path))
+    store.append_many([application(1), application(2)])
+    JsonlApplicationStore(str(tmp_path)).append(application(3))
+    assert [a["id"] for a in store.iter_applications()] == ["APP_1", "APP_2", "APP_3"]
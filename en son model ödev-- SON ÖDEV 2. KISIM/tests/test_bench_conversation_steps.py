@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from bench_conversation_steps import CASES, PERSISTENCE_BACKENDS, compare, prepare_state, run_persistence, run_steps
+from fake_llm import FakeGenerativeModel
+from replay_conversations import STUB_ANSWER, replay_config
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chatbot_config.json")
+
+
+@pytest.fixture
+def config():
+    return replay_config(CONFIG_FILE)
+
+
+@pytest.mark.parametrize("name, script, message", CASES, ids=[case[0] for case in CASES])
+def test_every_case_script_reaches_its_step(config, name, script, message):
+    state = prepare_state(script, FakeGenerativeModel(STUB_ANSWER), config)
+    assert state.current_step == name.split("/")[0]
+
+
+def test_step_report_has_timings_and_allocations(config):
+    report = run_steps(config, FakeGenerativeModel(STUB_ANSWER), iterations=3, alloc_iterations=2)
+    assert list(report) == [case[0] for case in CASES]
+    row = report["greeting"]
+    assert row["p50_us"] <= row["p95_us"] <= row["p99_us"]
+    assert {"route_p50_us", "mean_us", "alloc_peak_bytes", "alloc_retained_bytes"} <= set(row)
+
+
+def test_persistence_timings_cover_every_backend(config):
+    report = run_persistence(config, FakeGenerativeModel(STUB_ANSWER), iterations=3, prefill_size=5)
+    assert list(report) == PERSISTENCE_BACKENDS
+    assert report["memory"]["io_p50_us"] == 0.0
+    assert all(row["io_p50_us"] >= 0.0 for row in report.values())
+
+
+def test_regressions_beyond_the_tolerance_are_reported():
+    baseline = {"steps": {"greeting": {"p50_us": 10.0, "p95_us": 20.0},
+                          "hgs_offer": {"p50_us": 100.0, "p95_us": 200.0}}}
+    report = {"steps": {"greeting": {"p50_us": 11.5, "p95_us": 21.0},  # +15%, and under 2 us
+                        "hgs_offer": {"p50_us": 130.0, "p95_us": 210.0},  # +30% on p50
+                        "new_case": {"p50_us": 1.0, "p95_us": 1.0}}}
+    assert compare(report, baseline, tolerance=0.25) == ["hgs_offer p50_us: 100.0 -> 130.0 us"]
+    assert compare(report, baseline, tolerance=0.1, min_delta_us=0.0) == [
+        "greeting p50_us: 10.0 -> 11.5 us", "hgs_offer p50_us: 100.0 -> 130.0 us"]
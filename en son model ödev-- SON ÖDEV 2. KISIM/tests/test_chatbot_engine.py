@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel
+from replay_conversations import replay_config
+from response_cache import get_response_cache
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chatbot_config.json")
+SELLER_TCKN = "69387784002"
+
+
+@pytest.fixture
+def config():
+    return replay_config(CONFIG_FILE)
+
+
+def chat(config, model, messages):
+    bot = VehicleFinanceChatbot("offline", config=config, model=model)
+    result = None
+    for message in messages:
+        result = bot.process_message(message)
+    return bot, result
+
+
+def test_tckns_are_masked_in_the_prompt_history(config):
+    prompts = []
+    model = FakeGenerativeModel(lambda prompt: prompts.append(prompt) or "Yanıt")
+    messages = ["selam", "ikinci el", "2904000", "4 yaşında", "256.000 TL", SELLER_TCKN]
+    bot, _ = chat(config, model, messages)
+    assert bot.current_step == "confirmation"
+    assert bot.user_data["seller_tckn"] == SELLER_TCKN  # the application keeps it
+
+    bot.process_message("bugün hava nasıl?")  # answered by the LLM, with the history in the prompt
+    assert prompts and "## SON MESAJLAR" in prompts[-1]
+    assert SELLER_TCKN not in prompts[-1]
+    assert "69*********" in prompts[-1]
+    assert all(SELLER_TCKN not in text for _, text in bot.export_state().history)  # nor in the session store
+
+
+def test_tckn_in_the_message_is_masked_in_the_prompt(config):
+    prompts = []
+    model = FakeGenerativeModel(lambda prompt: prompts.append(prompt) or "Yanıt")
+    chat(config, model, ["merhaba", f"kimlik numaram {SELLER_TCKN}, hava nasıl?"])
+    assert prompts and SELLER_TCKN not in prompts[-1]
+
+
+@pytest.fixture
+def cached_config(config):
+    config["response_cache"] = {"enabled": True, "persist_path": None, "max_entries": 10}
+    cache = get_response_cache(config["response_cache"])
+    cache.clear()  # the cache is process-wide, like in the app
+    yield config
+    cache.clear()
+
+
+def test_sessions_asking_the_same_question_share_cached_answers(cached_config):
+    cache = get_response_cache(cached_config["response_cache"])
+    before = cache.stats()
+    model = FakeGenerativeModel(lambda prompt: f"Yanıt {model.calls}")
+
+    # Different openings, so the two sessions have different histories
+    _, first = chat(cached_config, model, ["merhaba", "bugün hava nasıl?", "Bugün hava nasıl"])
+    _, second = chat(cached_config, model, ["selam", "bugün hava nasıl?"])
+    stats = cache.stats()
+    assert model.calls == 1
+    assert first["response"] == second["response"] == "Yanıt 1"
+    assert (stats["misses"] - before["misses"], stats["hits"] - before["hits"]) == (1, 2)
+
+
+def test_cached_answers_are_kept_apart_by_step(cached_config):
+    model = FakeGenerativeModel(lambda prompt: f"Yanıt {model.calls}")
+
+    _, greeting = chat(cached_config, model, ["bugün hava nasıl?"])
+    _, determine_type = chat(cached_config, model, ["merhaba", "bugün hava nasıl?"])
+    assert model.calls == 2
+    assert (greeting["response"], determine_type["response"]) == ("Yanıt 1", "Yanıt 2")
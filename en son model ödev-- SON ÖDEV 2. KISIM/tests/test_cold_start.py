@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+from ui_assets import PAGE_CSS, chat_message_html, minify_css
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["chatbot_engine", "application_store", "job_queue", "google.generativeai"]
+
+
+def run_python(code, cwd=APP_DIR):
+    env = {**os.environ, "PYTHONPATH": APP_DIR}
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_api_key_page_renders_without_the_engine_or_the_sdk(tmp_path):
+    with open(os.path.join(APP_DIR, "chatbot_config.json"), encoding="utf-8") as f:
+        config = json.load(f)
+    config["resources"] = {**config["resources"], "warm_up": False}
+    config["sessions"] = {**config["sessions"], "path": str(tmp_path / "sessions.db")}
+    (tmp_path / "chatbot_config.json").write_text(json.dumps(config), encoding="utf-8")
+    loaded = run_python(f"""
+import json, sys
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({os.path.join(APP_DIR, "chatbot.py")!r}, default_timeout=60).run()
+assert not app.exception, app.exception
+assert app.text_input[0].label
+print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))
+""", cwd=str(tmp_path))
+    assert loaded == []
+
+
+def test_warm_up_imports_the_engine_once_in_the_background():
+    result = run_python("""
+import json, sys
+from resources import warm_up
+skipped = warm_up({"resources": {"warm_up": False}})
+before = "chatbot_engine" in sys.modules
+config = {"llm": {"backend": "stub"}}
+thread = warm_up(config)
+same = warm_up(config) is thread
+thread.join(60)
+print(json.dumps([skipped, before, same, thread.daemon, "chatbot_engine" in sys.modules]))
+""")
+    assert result == [None, False, True, True, True]
+
+
+def test_page_css_is_minified_once():
+    assert PAGE_CSS.startswith("<style>") and PAGE_CSS.endswith("</style>")
+    assert "\n" not in PAGE_CSS and "/*" not in PAGE_CSS
+    assert minify_css("a  >  b {\n  color : red ;\n}\n/* note */") == "a>b{color:red}"
+
+
+def test_chat_message_html_is_memoized():
+    html = chat_message_html("user", "merhaba")
+    assert "👤 Siz:" in html and "merhaba" in html
+    assert chat_message_html("user", "merhaba") is html
+    assert "🤖 Bot:" in chat_message_html("bot", "merhaba")
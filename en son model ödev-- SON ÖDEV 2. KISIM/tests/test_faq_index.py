@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel
+from faq_index import FaqIndex, get_faq_index, tokenize
+from replay_conversations import replay_config
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chatbot_config.json")
+
+
+@pytest.fixture
+def config():
+    return replay_config(CONFIG_FILE)
+
+
+def test_tokens_are_stemmed_without_stopwords():
+    assert tokenize("Hangi belgeler gerekli?") == ["belge", "gerek"]
+    assert tokenize("belgesi") == tokenize("belgeler")
+
+
+def test_best_match_is_the_entry_asked_about(config):
+    index = get_faq_index(config)
+    for question, key in [("hangi belgeler gerekli", "gerekli_belgeler"),
+                          ("vade seçenekleri nelerdir", "vade_secenekleri"),
+                          ("gecikme faizi ne kadar", "gecikme_faizi")]:
+        score, (_, found, _) = index.search(question, limit=1)[0]
+        assert found == key and score >= index.min_score
+
+
+def test_only_confident_matches_are_answered():
+    index = FaqIndex({"belgeler": {"gerekli_belgeler": "Kimlik ve gelir belgesi."},
+                      "odeme": {"odeme_sekli": "Aylık eşit taksit."}}, min_score=1.0)
+    assert index.answer("gerekli belgeler") == "Kimlik ve gelir belgesi."
+    assert index.answer("hava nasıl") is None
+    score = index.search("gerekli belgeler", limit=1)[0][0]
+    index.min_score = score + 0.01  # just above the best score
+    assert index.answer("gerekli belgeler") is None
+
+
+def test_faq_questions_are_answered_without_the_llm(config):
+    prompts = []
+    bot = VehicleFinanceChatbot("offline", config=config,
+                                model=FakeGenerativeModel(lambda prompt: prompts.append(prompt) or "Yanıt"))
+    assert bot.generate_response("hangi belgeler gerekli") == config["faq"]["basvuru_sureci"]["gerekli_belgeler"]
+    assert prompts == []
+    bot.generate_response("bugün hava nasıl")
+    assert len(prompts) == 1
+
+
+def test_index_can_be_disabled(config):
+    config["faq_index"] = {"enabled": False}
+    assert get_faq_index(config) is None
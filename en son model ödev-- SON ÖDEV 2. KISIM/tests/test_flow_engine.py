@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel
+from flow_engine import FlowEngine
+from replay_conversations import replay_config
+from validators import ApplicationValidator
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chatbot_config.json")
+
+
+def compile_flow(config):
+    return FlowEngine.from_config(config, ApplicationValidator.from_config(config).rules)
+
+
+@pytest.fixture
+def flow():
+    return compile_flow(replay_config(CONFIG_FILE))
+
+
+def test_products_come_from_the_config_file(flow):
+    new = flow.product("new")
+    assert (new.step, new.label) == ("collect_new_vehicle_info", "Yeni Araç")
+    assert new.start_message.startswith("Yeni araç finansmanı için")
+
+
+def test_without_flow_products_every_finance_rules_product_gets_defaults():
+    config = {"finance_rules": {"new": {"required_fields": ["vehicle_value", "loan_amount"]}}}
+    product = compile_flow(config).product("new")
+    assert (product.intent, product.step, product.label) == ("type_new", "collect_new", "new")
+    assert product.start_message == product.questions["vehicle_value"]
+
+
+def test_exit_and_cancel_apply_at_every_step(flow):
+    for step in list(flow.steps) + ["end"]:
+        transition, _ = flow.dispatch(step, frozenset({"exit"}))
+        assert transition.action == "exit"
+        transition, _ = flow.dispatch(step, frozenset({"cancel"}))
+        assert (transition.action, transition.to) == ("reset", "greeting")
+
+
+def test_exit_wins_over_cancel_and_step_intents(flow):
+    # Like the original if/elif chain: exit is checked first, then cancel, then the step
+    assert flow.dispatch("confirmation", frozenset({"cancel", "exit", "confirm_accept"}))[0].action == "exit"
+    assert flow.dispatch("confirmation", frozenset({"confirm_accept", "cancel"}))[0].action == "reset"
+
+
+def test_step_transitions(flow):
+    transition, _ = flow.dispatch("greeting", frozenset({"greeting"}))
+    assert transition.to == "determine_type"
+    transition, _ = flow.dispatch("determine_type", frozenset({"type_used"}))
+    assert (transition.action, transition.arg, transition.to) == ("start_application", "used",
+                                                                  "collect_used_vehicle_info")
+    transition, _ = flow.dispatch("hgs_offer", frozenset({"hgs_accept"}))
+    assert (transition.action, transition.arg, transition.to) == ("record_hgs", True, "end")
+
+
+def test_free_input_goes_to_the_handler_or_the_fallback_answer(flow):
+    assert flow.dispatch("collect_new_vehicle_info", frozenset()) == (None, "collect")
+    assert flow.dispatch("update_selection", frozenset({"faq_rates"})) == (None, "update_selection")
+    otherwise, handler = flow.dispatch("hgs_offer", frozenset())
+    assert handler is None and otherwise.say.startswith("Lütfen 'Evet' veya 'Hayır'")
+    assert flow.dispatch("greeting", frozenset({"faq_rates"})) == (None, None)  # left to the LLM
+
+
+def test_unknown_actions_and_handlers_are_rejected():
+    config = replay_config(CONFIG_FILE)
+    config["flow"] = {**config["flow"], "global": [{"intent": "exit", "action": "explode"}]}
+    with pytest.raises(ValueError, match="Unknown flow action"):
+        compile_flow(config)
+    config["flow"] = {**config["flow"], "global": [], "steps": {"greeting": {"handler": "nope"}}}
+    with pytest.raises(ValueError, match="Unknown flow handler"):
+        compile_flow(config)
+
+
+def test_the_chatbot_exits_and_resets_like_before():
+    bot = VehicleFinanceChatbot("offline", config=replay_config(CONFIG_FILE), model=FakeGenerativeModel("Yanıt"))
+    for message in ("merhaba", "yeni", "900000"):
+        bot.process_message(message)
+    result = bot.process_message("iptal")
+    assert (result["step"], bot.application_type, bot.user_data) == ("greeting", None, {})
+    assert result["response"].startswith("Başvuru sıfırlandı")
+
+    result = bot.process_message("çıkış")
+    assert (result["step"], result["should_exit"]) == ("exit", True)
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from fake_llm import FakeGenerativeModel
+from http_api import ChatbotAPI, HTTPError
+from replay_conversations import replay_config
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chatbot_config.json")
+
+
+@pytest.fixture
+def api(tmp_path):
+    config = replay_config(CONFIG_FILE)
+    config["sessions"] = {"backend": "sqlite", "path": os.path.join(str(tmp_path), "sessions.db")}
+    api = ChatbotAPI(config, "offline", model=FakeGenerativeModel("Yanıt"))
+    yield api
+    api.executor.shutdown()
+
+
+def call(api, method, path, payload=None):
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    return asyncio.run(api.dispatch(method, path, body))
+
+
+def test_session_routes_take_the_token(api):
+    status, body = call(api, "POST", "/sessions")
+    assert status == 201 and set(body) == {"session_token"}
+    token = body["session_token"]
+
+    status, body = call(api, "POST", f"/sessions/{token}/messages", {"message": "merhaba"})
+    assert status == 200 and body["session_token"]
+    status, body = call(api, "GET", f"/sessions/{body['session_token']}")
+    assert status == 200 and body["step"] == "determine_type"
+    assert call(api, "DELETE", f"/sessions/{token}") == (200, {"deleted": True})
+
+
+def test_bare_ids_and_forged_tokens_are_refused(api):
+    _, body = call(api, "POST", "/sessions")
+    token = body["session_token"]
+    session_id = token.split(".", 1)[0]
+    for path in (f"/sessions/{session_id}", f"/sessions/{token[:-4]}AAAA"):
+        for method in ("GET", "DELETE"):
+            with pytest.raises(HTTPError) as error:
+                call(api, method, path)
+            assert error.value.status == 404
+        with pytest.raises(HTTPError) as error:
+            call(api, "POST", f"{path}/messages", {"message": "merhaba"})
+        assert error.value.status == 404
+    assert call(api, "GET", f"/sessions/{token}")[0] == 200  # still there
+
+
+def test_health_reports_the_stats(api):
+    call(api, "POST", "/sessions")
+    status, body = call(api, "GET", "/health")
+    assert status == 200 and body["status"] == "ok" and body["sessions"] == 1
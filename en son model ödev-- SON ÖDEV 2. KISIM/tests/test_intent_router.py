@@ -0,0 +1,64 @@
+import pytest
+
+from intent_router import IntentRouter
+
+
+@pytest.fixture
+def router():
+    return IntentRouter.from_config({})
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("Ikinci el", "type_used"),
+    ("IKINCI EL", "type_used"),
+    ("İKİNCİ EL", "type_used"),
+    ("ikinci el", "type_used"),
+    ("EXIT", "exit"),
+    ("QUIT", "exit"),
+    ("BITIR", "exit"),
+    ("ÇIKIŞ", "exit"),
+    ("HAYIR", "confirm_update"),
+])
+def test_ascii_and_turkish_capital_i_route_the_same(router, message, intent):
+    assert intent in router.route(message)
+
+
+def test_exact_intents_fold_capital_i(router):
+    assert "update_decline" in router.route("  HAYIR ")
+    assert "update_decline" in router.route("İSTEMİYORUM")
+    assert "update_decline" not in router.route("hayır değil")
+
+
+def test_overlapping_keywords_are_all_found(router):
+    intents = router.route("hangi model için faiz oranı")
+    assert {"faq_models", "model_question", "faq_rates"} <= intents
+
+
+@pytest.mark.parametrize("message", [
+    "çikolata",
+    "ÇIKOLATA",
+    "açıklama yapar mısınız",
+    "goodbye",
+    "kapatmak",
+    "temizlemek",
+    "yenidenbaşla",
+])
+def test_exit_and_cancel_keywords_do_not_match_inside_words(router, message):
+    assert not {"exit", "cancel"} & router.route(message)
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("çık", "exit"),
+    ("ÇIK lütfen", "exit"),
+    ("hesabı kapat.", "exit"),
+    ("Hoşça kal!", "exit"),
+    ("iptal et", "cancel"),
+    ("yeniden başla", "cancel"),
+])
+def test_exit_and_cancel_keywords_match_as_words(router, message, intent):
+    assert intent in router.route(message)
+
+
+def test_other_keywords_still_match_inside_words(router):
+    assert "greeting" in router.route("merhabalar")
+    assert "faq_rates" in router.route("faizler")
@@ -0,0 +1,68 @@
+import os
+import time
+
+import pytest
+
+from job_queue import MemoryJobQueue, SqliteJobQueue, job_handler
+
+_failures = {}
+
+
+@job_handler("test_flaky")
+def flaky(payload):
+    """Fails ``payload["fail"]`` times per key, then returns the key"""
+    count = _failures.get(payload["key"], 0)
+    if count < payload["fail"]:
+        _failures[payload["key"]] = count + 1
+        raise RuntimeError(f"attempt {count + 1} failed")
+    return payload["key"]
+
+
+@pytest.fixture(params=["memory", "sqlite", "sqlite-select"])
+def make_queue(request, tmp_path):
+    queues = []
+
+    def make(**options):
+        if request.param == "memory":
+            job_queue = MemoryJobQueue(**options)
+        else:
+            job_queue = SqliteJobQueue(os.path.join(str(tmp_path), "jobs.db"), **options)
+            # Claim as on SQLite < 3.35, which has no UPDATE ... RETURNING
+            job_queue.returning = request.param == "sqlite"
+        queues.append(job_queue)
+        return job_queue
+
+    yield make
+    for job_queue in queues:
+        job_queue.close()
+
+
+def test_failed_attempts_are_retried_until_done(make_queue, request):
+    job_queue = make_queue(inline=True, max_attempts=3)
+    job_id = job_queue.submit("test_flaky", {"key": request.node.name, "fail": 2})
+    status = job_queue.status(job_id)
+    assert (status["state"], status["attempts"], status["result"]) == ("done", 3, request.node.name)
+
+
+def test_job_fails_for_good_after_max_attempts(make_queue, request):
+    job_queue = make_queue(inline=True, max_attempts=2)
+    status = job_queue.status(job_queue.submit("test_flaky", {"key": request.node.name, "fail": 5}))
+    assert (status["state"], status["attempts"]) == ("failed", 2)
+    assert status["error"] == "RuntimeError: attempt 2 failed"
+
+
+def test_retries_back_off_exponentially(make_queue, request):
+    job_queue = make_queue(workers=1, max_attempts=3, retry_backoff_seconds=0.1, poll_seconds=0.05)
+    start = time.monotonic()
+    status = job_queue.wait(job_queue.submit("test_flaky", {"key": request.node.name, "fail": 2}), timeout=5)
+    assert status["state"] == "done"
+    assert time.monotonic() - start >= 0.1 + 0.2  # 0.1 s after the first failure, 0.2 s after the second
+
+
+def test_only_the_latest_finished_jobs_are_kept(make_queue, request):
+    job_queue = make_queue(inline=True, keep_finished=10)
+    job_ids = [job_queue.submit("test_flaky", {"key": f"{request.node.name}-{i}", "fail": 0}) for i in range(25)]
+    kept = [job_id for job_id in job_ids if job_queue.status(job_id) is not None]
+    # The SQLite queue trims once per keep_finished / 10 finished jobs, the memory one after each
+    assert 10 <= len(kept) <= 11
+    assert kept == job_ids[-len(kept):]
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from fake_llm import FakeResponse
+from llm_backends import StubBackend, TemplateBackend, llm_settings
+from llm_client import CircuitBreaker, CircuitOpenError, LLMUnavailableError, get_llm_client
+
+
+def test_each_backend_gets_its_own_gate():
+    settings = llm_settings({})
+    stub, other_stub = StubBackend(settings), StubBackend(settings)
+    template = TemplateBackend(settings)
+
+    assert get_llm_client(stub).gate is get_llm_client(other_stub).gate  # same identity, same backend
+    assert get_llm_client(stub).gate is not get_llm_client(template).gate
+    assert get_llm_client(stub).gate is not get_llm_client(stub, {"max_concurrency": 3}).gate
+
+
+class FlakyModel:
+    """Fails the first ``failures`` calls, then answers; one backend identity per instance"""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.identity = f"flaky:{id(self)}"
+        self.failures = failures
+        self.delay = delay
+        self.calls = []
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls.append(time.monotonic())
+        time.sleep(self.delay)
+        if len(self.calls) <= self.failures:
+            raise RuntimeError(f"failure {len(self.calls)}")
+        return FakeResponse("Yanıt")
+
+
+def client_for(model, **settings):
+    return get_llm_client(model, {"backoff_base_seconds": 0.05, "backoff_max_seconds": 0.1, **settings})
+
+
+def test_breaker_opens_after_consecutive_failures_and_resets():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 30.0
+    assert breaker.state == "half_open"
+    breaker.before_call()  # the one trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()  # failed trial: open again for reset_seconds
+    assert breaker.state == "open"
+
+    now[0] = 60.0
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_failed_calls_are_retried_with_backoff(monkeypatch):
+    monkeypatch.setattr("llm_client.random.uniform", lambda low, high: high)  # longest jittered pause
+    model = FlakyModel(failures=2)
+    client = client_for(model, max_retries=2)
+    assert client.generate("soru") == "Yanıt"
+    assert len(model.calls) == 3
+    pauses = [later - earlier for earlier, later in zip(model.calls, model.calls[1:])]
+    assert 0.05 <= pauses[0] < 0.1 and 0.1 <= pauses[1] < 0.2
+
+
+def test_backoff_ceiling_doubles_up_to_the_maximum(monkeypatch):
+    monkeypatch.setattr("llm_client.random.uniform", lambda low, high: high)
+    client = get_llm_client(FlakyModel(), {"backoff_base_seconds": 0.5, "backoff_max_seconds": 4.0})
+    assert [client._backoff(attempt) for attempt in range(5)] == [0.5, 1.0, 2.0, 4.0, 4.0]
+
+
+def test_retries_give_up_and_the_breaker_fails_fast():
+    model = FlakyModel(failures=10)
+    client = client_for(model, max_retries=1, breaker_failure_threshold=2, breaker_reset_seconds=60)
+    with pytest.raises(LLMUnavailableError):
+        client.generate("soru")
+    assert len(model.calls) == 2
+    assert client.gate.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.generate("soru")
+    assert len(model.calls) == 2  # not called while open
+
+
+def test_slow_calls_time_out():
+    model = FlakyModel(delay=0.5)
+    client = client_for(model, timeout_seconds=0.1, total_timeout_seconds=0.3, max_retries=5)
+    start = time.monotonic()
+    with pytest.raises(LLMUnavailableError):
+        client.generate("soru")
+    assert time.monotonic() - start < 0.45
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel
+from rate_limiter import (ADMITTED, GLOBAL_LIMITED, SESSION_LIMITED, AdmissionController, TokenBucket,
+                          get_admission_controller)
+from replay_conversations import replay_config
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chatbot_config.json")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refills_at_its_rate_up_to_capacity():
+    bucket = TokenBucket(rate=0.5, capacity=3, now=0.0)
+    bucket.tokens = 0.0
+    assert bucket.refill(2.0) == 1.0
+    assert bucket.refill(1.0) == 1.0  # a clock step back adds nothing
+    assert bucket.refill(100.0) == 3
+    bucket.tokens = 2.0
+    assert not bucket.idle_until_full(101.0) and bucket.idle_until_full(102.0)
+
+
+def test_session_burst_then_refill():
+    clock = Clock()
+    controller = AdmissionController(session_rate=1 / 6, session_burst=3, global_rate=0, global_burst=0, clock=clock)
+    assert [controller.admit("a") for _ in range(4)] == [ADMITTED] * 3 + [SESSION_LIMITED]
+    assert controller.admit("b") == ADMITTED  # each session has its own allowance
+    clock.now += 5.9
+    assert controller.admit("a") == SESSION_LIMITED
+    clock.now += 0.1
+    assert controller.admit("a") == ADMITTED
+    assert controller.admit("a") == SESSION_LIMITED
+    assert controller.stats() == {"global_tokens": None, "tracked_sessions": 2,
+                                  ADMITTED: 5, SESSION_LIMITED: 3, GLOBAL_LIMITED: 0}
+
+
+def test_global_limit_is_shared_and_keeps_the_session_allowance():
+    clock = Clock()
+    controller = AdmissionController(session_rate=1, session_burst=2, global_rate=2, global_burst=3, clock=clock)
+    assert [controller.admit(f"s{i}") for i in range(4)] == [ADMITTED] * 3 + [GLOBAL_LIMITED]
+    clock.now += 0.5
+    assert controller.admit("s3") == ADMITTED  # its own token was not spent on the refusal
+    assert controller.admit() == GLOBAL_LIMITED
+    clock.now += 1.0
+    assert controller.admit() == ADMITTED and controller.admit() == ADMITTED
+    assert controller.stats()["global_tokens"] == 0.0
+
+
+def test_idle_and_excess_session_buckets_are_dropped():
+    clock = Clock()
+    controller = AdmissionController(session_rate=1, session_burst=2, global_rate=0, global_burst=0,
+                                     max_tracked_sessions=3, clock=clock)
+    for session in "abc":
+        controller.admit(session)
+    controller.admit("d")
+    assert controller.stats()["tracked_sessions"] == 3  # "a", the least recently used, made room
+    clock.now += 1.0
+    controller.admit("e")
+    assert controller.stats()["tracked_sessions"] == 1  # the others are full again
+
+
+def test_disabled_or_shared_per_config():
+    assert get_admission_controller({"enabled": False}) is None
+    assert get_admission_controller({"session_burst": 7}) is get_admission_controller({"session_burst": 7})
+    assert get_admission_controller({"session_burst": 7}) is not get_admission_controller({"session_burst": 8})
+
+
+@pytest.fixture
+def limited_config():
+    config = replay_config(CONFIG_FILE)
+    config["rate_limits"] = {"enabled": True, "session_requests_per_minute": 0.001, "session_burst": 2,
+                             "global_requests_per_second": 0, "global_burst": 0, "max_tracked_sessions": 123}
+    return config
+
+
+def chatbot(config, session_id):
+    bot = VehicleFinanceChatbot("offline", config=config, model=FakeGenerativeModel("Yanıt"), session_id=session_id)
+    bot.process_message("merhaba")
+    return bot
+
+
+def test_limited_sessions_get_the_local_answer_without_the_llm(limited_config):
+    bot = chatbot(limited_config, "limited-a")
+    questions = ["kredi kartı aidatı ne kadar?", "hava nasıl?", "bugün hangi gün?"]
+    answers = [bot.process_message(question)["response"] for question in questions]
+    assert answers[:2] == ["Yanıt", "Yanıt"]
+    assert answers[2].startswith("Kısa sürede çok sayıda soru sordunuz.")
+    assert bot.current_step == "determine_type"
+    # Rule answers do not need a token
+    assert bot.process_message("faiz oranı nedir?")["response"].startswith("Faiz oranları")
+
+    assert bot.admission.stats()[SESSION_LIMITED] == 1
+    assert chatbot(limited_config, "limited-b").process_message("hava nasıl?")["response"] == "Yanıt"
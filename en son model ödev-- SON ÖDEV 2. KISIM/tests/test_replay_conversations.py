@@ -0,0 +1,52 @@
+import os
+import random
+import subprocess
+import sys
+
+from replay_conversations import generate_conversations, load_conversations, random_tckn, replay
+from validators import tckn_checksum_ok
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.path.join(APP_DIR, "chatbot_config.json")
+
+
+def test_generated_conversations_end_in_their_expected_state():
+    conversations = generate_conversations(300, seed=1)
+    assert {conversation["id"].split("-")[0] for conversation in conversations} == {
+        "new", "used", "multi", "cancel", "question"}
+    report = replay(conversations, CONFIG_FILE)
+    assert (report["passed"], report["failed"]) == (300, 0)
+    assert report["messages"] == sum(len(conversation["messages"]) for conversation in conversations)
+    assert {"greeting", "determine_type", "confirmation"} <= set(report["step_latency_ms"])
+
+
+def test_sample_transcripts_pass():
+    conversations = load_conversations(os.path.join(APP_DIR, "sample_conversations.jsonl"))
+    assert replay(conversations, CONFIG_FILE)["failed"] == 0
+
+
+def test_mismatches_are_reported():
+    conversation = {"id": "wrong", "messages": ["merhaba", "yeni"],
+                    "expected": {"step": "greeting", "steps": ["determine_type", "greeting"]}}
+    report = replay([conversation], CONFIG_FILE)
+    assert report["failed"] == 1
+    errors = report["failures"][0]["errors"]
+    assert errors[0] == "step 'collect_new_vehicle_info' != 'greeting'"
+    assert errors[1].startswith("steps ")
+
+
+def test_worker_processes_give_the_same_result():
+    conversations = generate_conversations(40, seed=2)
+    report = replay(conversations, CONFIG_FILE, workers=2, chunk_size=10)
+    assert (report["passed"], report["workers"]) == (40, 2)
+
+
+def test_generated_tckns_are_valid():
+    rng = random.Random(0)
+    assert all(tckn_checksum_ok(random_tckn(rng)) for _ in range(50))
+
+
+def test_the_engine_runs_without_streamlit():
+    code = "import sys, chatbot_engine, replay_conversations; print('streamlit' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from resources import get_gemini_client, get_model
+
+
+def test_each_key_gets_model_handles_on_its_own_clients():
+    first, second = get_model("key-a", "gemini-1.5-flash"), get_model("key-b", "gemini-1.5-flash")
+    assert first is get_model("key-a", "gemini-1.5-flash")
+    assert first is not second
+    assert first._client is get_gemini_client("key-a", "generative")
+    # The key travels with the client, not through genai.configure()
+    assert first._client._transport._credentials.token == "key-a"
+    assert second._client._transport._credentials.token == "key-b"
+
+
+def test_async_calls_bind_the_async_client_of_the_key():
+    import asyncio
+
+    from llm_backends import GeminiBackend, llm_settings
+
+    backend = GeminiBackend(llm_settings({"llm": {"prefix_cache": False}}), api_key="key-c")
+
+    async def call():
+        with pytest.raises(Exception):
+            await backend.generate_content_async("merhaba", request_options={"timeout": 0.01, "retry": None})
+        return backend.model._async_client
+
+    client = asyncio.run(call())
+    assert client is get_gemini_client("key-c", "generative_async")
+    assert client._client._transport._credentials.token == "key-c"
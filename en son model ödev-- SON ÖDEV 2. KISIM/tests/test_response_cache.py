@@ -0,0 +1,56 @@
+import os
+
+from response_cache import ResponseCache, normalize_message
+
+
+def test_near_identical_messages_share_a_key():
+    assert normalize_message("  Faiz   oranı NEDİR?? ") == normalize_message("faiz oranı nedir")
+    assert ResponseCache.make_key("Faiz?", "v1") != ResponseCache.make_key("Faiz?", "v2")
+
+
+def test_hits_and_misses_are_counted():
+    cache = ResponseCache()
+    assert cache.get("a") is None
+    cache.put("a", "cevap")
+    assert cache.get("a") == "cevap"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")  # b is now the oldest
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("response_cache.time.time", lambda: now[0])
+    cache = ResponseCache(ttl_seconds=60)
+    cache.put("a", "cevap")
+    now[0] += 59
+    assert cache.get("a") == "cevap"
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_persisted_entries_are_shared_and_expire_too(tmp_path, monkeypatch):
+    path = os.path.join(str(tmp_path), "cache.db")
+    ResponseCache(persist_path=path).put("a", "cevap")
+    assert ResponseCache(persist_path=path).get("a") == "cevap"  # another process
+
+    monkeypatch.setattr("response_cache.time.time", lambda: 10 ** 10)
+    assert ResponseCache(persist_path=path, ttl_seconds=60).get("a") is None
+
+
+def test_no_ttl_keeps_entries(monkeypatch):
+    cache = ResponseCache(ttl_seconds=None)
+    cache.put("a", "cevap")
+    monkeypatch.setattr("response_cache.time.time", lambda: 10 ** 10)
+    assert cache.get("a") == "cevap"
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from session_store import new_session_id, session_from_token, session_token
+
+
+def config(tmp_path, **overrides):
+    return {"backend": "sqlite", "path": os.path.join(str(tmp_path), "sessions.db"), **overrides}
+
+
+def test_token_resumes_its_session(tmp_path):
+    session_id = new_session_id()
+    assert session_from_token(session_token(session_id, config(tmp_path)), config(tmp_path)) == session_id
+
+
+def test_bare_forged_and_expired_tokens_resume_nothing(tmp_path):
+    session_id = new_session_id()
+    token = session_token(session_id, config(tmp_path))
+    assert session_from_token(session_id, config(tmp_path)) is None
+    assert session_from_token(token[:-4] + "AAAA", config(tmp_path)) is None
+    assert session_from_token(token, config(tmp_path, resume_secret="other")) is None
+    expired = session_token(session_id, config(tmp_path, idle_seconds=-1))
+    assert session_from_token(expired, config(tmp_path)) is None
+
+
+def test_generated_secret_is_shared_through_the_key_file(tmp_path):
+    import session_store
+
+    token = session_token("abc", config(tmp_path))
+    session_store._resume_secrets.clear()  # as seen from another process
+    assert session_from_token(token, config(tmp_path)) == "abc"
+
+
+def test_lease_keeps_other_processes_out_until_released(tmp_path):
+    from session_store import SessionBusy, SessionState, SqliteSessionStore
+
+    path = os.path.join(str(tmp_path), "sessions.db")
+    first, second = SqliteSessionStore(path), SqliteSessionStore(path)  # as two app processes
+    first.save("abc", SessionState())
+    with first.lease("abc"):
+        with pytest.raises(SessionBusy):
+            with second.lease("abc", wait_seconds=0.1):
+                pass
+    with second.lease("abc", wait_seconds=0.1):
+        second.save("abc", SessionState(current_step="determine_type"))
+    assert first.load("abc").current_step == "determine_type"
+
+
+def test_lease_of_a_crashed_process_runs_out(tmp_path):
+    from session_store import SessionState, SqliteSessionStore
+
+    path = os.path.join(str(tmp_path), "sessions.db")
+    crashed, other = SqliteSessionStore(path, lease_seconds=0.05), SqliteSessionStore(path)
+    crashed.save("abc", SessionState())
+    crashed.lease("abc").__enter__()  # never released
+    with other.lease("abc", wait_seconds=1):
+        pass
+
+
+def test_lease_is_released_when_the_turn_fails(tmp_path):
+    from session_store import SessionState, SqliteSessionStore
+
+    path = os.path.join(str(tmp_path), "sessions.db")
+    first, second = SqliteSessionStore(path), SqliteSessionStore(path)
+    first.save("abc", SessionState())
+    with pytest.raises(RuntimeError):
+        with first.lease("abc"):
+            raise RuntimeError("LLM call failed")
+    with second.lease("abc", wait_seconds=0.1):
+        pass
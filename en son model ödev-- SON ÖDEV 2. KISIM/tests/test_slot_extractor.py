@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel
+from replay_conversations import replay_config
+from slot_extractor import SlotExtractor, parse_number, whole_number
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chatbot_config.json")
+
+
+@pytest.fixture
+def slots():
+    return SlotExtractor.from_config({})
+
+
+@pytest.mark.parametrize("text, value", [
+    ("1.250.000,50", 1250000.5),
+    ("1,250,000", 1250000),
+    ("1 250 000", 1250000),
+    ("1 250 000,50", 1250000.5),
+    ("1.500", 1500),
+    ("1,5", 1.5),
+])
+def test_parse_number(text, value):
+    assert parse_number(text) == value
+
+
+@pytest.mark.parametrize("value, rounded", [(0.5, 1), (1.5, 2), (2.5, 3), (2.49, 2), (1250000.5, 1250001)])
+def test_whole_numbers_round_half_up(value, rounded):
+    assert whole_number(value) == rounded
+
+
+def test_decimal_answers_round_half_up(slots):
+    assert slots.first_number("2,5") == 3
+    assert slots.extract("1.5 yaşında")["vehicle_age"] == 2
+
+
+def test_space_grouped_thousands_are_one_number(slots):
+    assert slots.extract("1 000 000")["numbers"] == [1000000]
+    found = slots.extract("kasko değeri 1 000 000 TL, kredi 250 000")
+    assert (found["vehicle_value"], found["loan_amount"]) == (1000000, 250000)
+    assert slots.extract("1 0000")["numbers"] == [1, 0]  # not a thousands group
+
+
+def test_year_after_the_model_name_is_the_model_year(slots):
+    found = slots.extract("Renault Clio 2024")
+    assert (found["vehicle_model"], found["model_year"]) == ("Renault Clio", 2024)
+    assert found["amounts"] == []
+    found = slots.extract("Peugeot 2008 2021")
+    assert (found["vehicle_model"], found["model_year"]) == ("Peugeot 2008", 2021)
+
+
+def test_one_message_fills_several_slots(slots):
+    found = slots.extract("1.500.000 TL değerinde Toyota Corolla, 500 bin kredi")
+    assert (found["vehicle_value"], found["vehicle_model"], found["loan_amount"]) == (1500000, "Toyota Corolla", 500000)
+    found = slots.extract("3 yaşında BMW 320i, 10000000146")
+    assert (found["vehicle_age"], found["vehicle_model"], found["tckns"]) == (3, "BMW 320i", ["10000000146"])
+
+
+def test_number_words_and_units(slots):
+    found = slots.extract("bir buçuk milyon kasko değeri, iki yüz elli bin kredi")
+    assert (found["vehicle_value"], found["loan_amount"]) == (1500000, 250000)
+    assert slots.extract("2 milyon 300 bin")["amounts"] == [(2300000, True)]
+    assert slots.extract("900k")["amounts"] == [(900000, True)]
+    assert slots.extract("bir araba")["numbers"] == []  # "bir" is also the article
+
+
+def test_amounts_take_the_nearest_keyword_in_their_clause(slots):
+    found = slots.extract("kredi 200 bin, kasko 800 bin")
+    assert (found["vehicle_value"], found["loan_amount"]) == (800000, 200000)
+    found = slots.extract("800000 ve 200000")
+    assert found["amounts"] == [(800000, False), (200000, False)]
+    assert "vehicle_value" not in found
+
+
+def test_unknown_model_names_are_left_as_free_text(slots):
+    found = slots.extract("Lada Niva")
+    assert "vehicle_model" not in found
+    assert found["free_text"] == ["Lada Niva"]
+
+
+def test_a_message_fills_several_fields_of_the_flow():
+    bot = VehicleFinanceChatbot("offline", config=replay_config(CONFIG_FILE), model=FakeGenerativeModel("Yanıt"))
+    for message in ("merhaba", "yeni", "1.500.000 TL değerinde Toyota Corolla, 500 bin kredi"):
+        bot.process_message(message)
+    assert bot.current_step == "confirmation"
+    assert bot.user_data == {"vehicle_value": 1500000, "vehicle_model": "Toyota Corolla", "loan_amount": 500000}
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel, FakeResponse
+from replay_conversations import replay_config
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chatbot_config.json")
+
+
+@pytest.fixture
+def config():
+    return replay_config(CONFIG_FILE)
+
+
+class ScriptedStream(FakeGenerativeModel):
+    """Streams the given chunks, recording when each one is produced; an exception is raised in place"""
+
+    def __init__(self, chunks, events):
+        super().__init__()
+        self.chunks = chunks
+        self.events = events
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        def produce():
+            for i, chunk in enumerate(self.chunks):
+                if isinstance(chunk, Exception):
+                    raise chunk
+                self.events.append(("produced", i))
+                yield FakeResponse(chunk)
+        return produce()
+
+
+def test_ai_answers_stream_and_enter_the_history_once_consumed(config):
+    bot = VehicleFinanceChatbot("offline", config=config, model=FakeGenerativeModel("Bir iki üç dört"))
+    result = bot.process_message("bugün hava nasıl", stream=True)
+    assert not isinstance(result["response"], str)
+    assert bot.history == [["user", "bugün hava nasıl"]]
+    assert list(result["response"]) == ["Bir ", "iki ", "üç ", "dört"]
+    assert bot.history[-1] == ["bot", "Bir iki üç dört"]
+
+
+def test_first_chunk_arrives_before_the_answer_is_complete(config):
+    events = []
+    bot = VehicleFinanceChatbot("offline", config=config,
+                                model=ScriptedStream(["a ", "b ", "c ", "d"], events))
+    for i, _ in enumerate(bot.process_message("bugün hava nasıl", stream=True)["response"]):
+        events.append(("shown", i))
+    assert events.index(("shown", 0)) < events.index(("produced", 3))
+
+
+def test_rule_answers_stay_strings(config):
+    bot = VehicleFinanceChatbot("offline", config=config, model=FakeGenerativeModel("Yanıt"))
+    assert isinstance(bot.process_message("merhaba", stream=True)["response"], str)
+
+
+def test_a_broken_stream_keeps_the_partial_answer(config):
+    bot = VehicleFinanceChatbot("offline", config=config,
+                                model=ScriptedStream(["Yarım ", RuntimeError("connection reset")], []))
+    chunks = list(bot.process_message("bugün hava nasıl", stream=True)["response"])
+    assert chunks[0] == "Yarım "
+    assert "yanıtın devamı alınamadı" in chunks[-1]
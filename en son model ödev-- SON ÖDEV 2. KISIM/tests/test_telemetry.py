@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+
+import pytest
+
+from chatbot_engine import VehicleFinanceChatbot
+from fake_llm import FakeGenerativeModel
+from replay_conversations import replay_config
+from telemetry import Telemetry, get_telemetry
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chatbot_config.json")
+
+
+def counter(snapshot, name, **labels):
+    return sum(c["value"] for c in snapshot["counters"]
+               if c["name"] == name and c["labels"] == {k: str(v) for k, v in labels.items()})
+
+
+def histogram(snapshot, name, **labels):
+    return next(h for h in snapshot["histograms"]
+                if h["name"] == name and h["labels"] == {k: str(v) for k, v in labels.items()})
+
+
+def test_nested_spans_form_one_trace():
+    telemetry = Telemetry()
+    with telemetry.span("process_message", step="greeting"):
+        with telemetry.span("route"):
+            pass
+        with pytest.raises(ValueError):
+            with telemetry.span("handle", step="greeting"):
+                with telemetry.span("llm"):
+                    raise ValueError
+    snapshot = telemetry.snapshot()
+    [trace] = snapshot["traces"]
+    assert trace["name"] == "process_message" and trace["labels"] == {"step": "greeting"}
+    route, handle = trace["children"]
+    assert route["name"] == "route" and "children" not in route
+    assert handle["error"] == "ValueError" and handle["children"][0] == {**handle["children"][0], "error": "ValueError"}
+    assert histogram(snapshot, "chatbot_span_seconds", span="llm")["count"] == 1
+    assert histogram(snapshot, "chatbot_span_seconds", span="handle", step="greeting")["count"] == 1
+
+
+def test_spans_on_other_threads_are_separate_traces():
+    telemetry = Telemetry(recent_traces=3)
+    with telemetry.span("process_message"):
+        worker = threading.Thread(target=lambda: telemetry.span("store_append").__enter__().__exit__(None, None, None))
+        worker.start()
+        worker.join()
+    assert [trace["name"] for trace in telemetry.snapshot()["traces"]] == ["store_append", "process_message"]
+    for _ in range(5):
+        with telemetry.span("render"):
+            pass
+    assert len(telemetry.snapshot()["traces"]) == 3
+
+
+def test_counters_and_histograms():
+    telemetry = Telemetry()
+    telemetry.inc("chatbot_answers_total", source="rule")
+    telemetry.inc("chatbot_answers_total", source="rule")
+    telemetry.inc("chatbot_llm_tokens_total", 40, kind="prompt")
+    telemetry.inc("chatbot_x_total", 1, a="1", b="2")
+    telemetry.inc("chatbot_x_total", 1, b="2", a="1")  # label order does not matter
+    for seconds in (0.002, 0.002, 0.2, 40.0):
+        telemetry.observe("chatbot_llm_seconds", seconds)
+    telemetry.observe("chatbot_llm_prompt_tokens", 100)
+
+    snapshot = telemetry.snapshot()
+    assert counter(snapshot, "chatbot_answers_total", source="rule") == 2
+    assert counter(snapshot, "chatbot_llm_tokens_total", kind="prompt") == 40
+    assert counter(snapshot, "chatbot_x_total", a=1, b=2) == 2
+    latency = histogram(snapshot, "chatbot_llm_seconds")
+    assert latency["count"] == 4 and latency["sum"] == pytest.approx(40.204)
+    assert latency["buckets"]["0.0025"] == 2 and latency["buckets"]["0.25"] == 1 and latency["buckets"]["+Inf"] == 1
+    assert 0.001 < latency["p50"] <= 0.0025
+    assert histogram(snapshot, "chatbot_llm_prompt_tokens")["buckets"]["128"] == 1
+
+
+def test_prometheus_text():
+    telemetry = Telemetry()
+    telemetry.inc("chatbot_answers_total", source='f"aq')
+    telemetry.observe("chatbot_llm_seconds", 0.003)
+    telemetry.observe("chatbot_llm_seconds", 0.5)
+    lines = telemetry.prometheus_text().splitlines()
+    assert lines[:3] == ["# HELP chatbot_answers_total Free-text answers, by source",
+                         "# TYPE chatbot_answers_total counter",
+                         'chatbot_answers_total{source="f\\"aq"} 1']
+    assert "# TYPE chatbot_llm_seconds histogram" in lines
+    assert 'chatbot_llm_seconds_bucket{le="0.0025"} 0' in lines
+    assert 'chatbot_llm_seconds_bucket{le="0.005"} 1' in lines
+    assert 'chatbot_llm_seconds_bucket{le="+Inf"} 2' in lines
+    assert "chatbot_llm_seconds_sum 0.503" in lines and "chatbot_llm_seconds_count 2" in lines
+
+
+def test_disabled_telemetry_records_nothing():
+    telemetry = Telemetry(enabled=False)
+    with telemetry.span("process_message"):
+        telemetry.inc("chatbot_answers_total", source="rule")
+        telemetry.observe("chatbot_llm_seconds", 0.1)
+    assert telemetry.snapshot()["counters"] == telemetry.snapshot()["histograms"] == []
+    assert telemetry.snapshot()["traces"] == []
+
+
+def test_export_writes_a_snapshot(tmp_path):
+    path = str(tmp_path / "metrics.json")
+    telemetry = Telemetry(export_path=path, export_interval_seconds=3600)
+    with telemetry.span("process_message"):
+        pass
+    with open(path, encoding="utf-8") as f:
+        assert [trace["name"] for trace in json.load(f)["traces"]] == ["process_message"]
+    with telemetry.span("route"):
+        pass  # within the interval, so not rewritten
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)["traces"]) == 1
+
+    text_path = str(tmp_path / "metrics.prom")
+    telemetry = Telemetry(export_path=text_path, export_format="prometheus")
+    telemetry.inc("chatbot_answers_total", source="llm")
+    telemetry.export()
+    with open(text_path, encoding="utf-8") as f:
+        assert f.read() == telemetry.prometheus_text()
+    assert not os.path.exists(text_path + ".tmp")
+
+
+def test_registry_is_shared_per_config():
+    assert get_telemetry({"recent_traces": 42}) is get_telemetry({"recent_traces": 42, "admin_token": "x"})
+    assert get_telemetry({"recent_traces": 42}) is not get_telemetry({"recent_traces": 43})
+    assert not get_telemetry({"enabled": False, "recent_traces": 42}).enabled
+
+
+def test_chat_turns_are_traced_and_counted():
+    config = replay_config(CONFIG_FILE)
+    config["telemetry"] = {"recent_traces": 41}  # a registry of its own
+    bot = VehicleFinanceChatbot("offline", config=config, model=FakeGenerativeModel("Yanıt"))
+    bot.telemetry.reset()
+    bot.process_message("merhaba")
+    bot.process_message("kredi kartı aidatı ne kadar?")
+    bot.process_message("faiz oranı nedir?")
+
+    snapshot = bot.telemetry.snapshot()
+    greeting, llm_turn, rule_turn = snapshot["traces"]
+    assert greeting["labels"] == {"step": "greeting"}
+    assert [child["name"] for child in greeting["children"]] == ["route", "handle"]
+    assert llm_turn["children"][1]["labels"] == {"step": "determine_type"}
+    assert [child["name"] for child in llm_turn["children"][1]["children"]] == ["llm"]
+    assert "children" not in rule_turn["children"][1]
+    assert counter(snapshot, "chatbot_answers_total", source="llm") == 1
+    assert counter(snapshot, "chatbot_answers_total", source="rule") == 1
+    assert counter(snapshot, "chatbot_llm_requests_total", outcome="ok") == 1
+    assert counter(snapshot, "chatbot_llm_tokens_total", kind="response") > 0
+    assert histogram(snapshot, "chatbot_llm_seconds")["count"] == 1
+    assert histogram(snapshot, "chatbot_span_seconds", span="process_message", step="determine_type")["count"] == 2
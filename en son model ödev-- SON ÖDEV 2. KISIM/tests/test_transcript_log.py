@@ -0,0 +1,41 @@
+import os
+
+from transcript_log import TranscriptLog, get_transcript_log, read_turns
+
+
+def turn(user):
+    return {"time": 1760000000.0, "session": "abc", "step_before": "greeting", "step": "determine_type",
+            "application_type": None, "user": user, "bot": "Merhaba!", "ms": 1.0}
+
+
+def test_segments_stay_in_the_directory_given_at_start(tmp_path, monkeypatch):
+    start, elsewhere = tmp_path / "app", tmp_path / "elsewhere"
+    start.mkdir()
+    elsewhere.mkdir()
+    monkeypatch.chdir(start)
+    transcript_log = TranscriptLog("transcripts", background=False)
+    assert transcript_log.path == os.path.join(str(start), "transcripts")
+
+    monkeypatch.chdir(elsewhere)  # Streamlit's test runner changes directory between runs
+    transcript_log.log(turn("merhaba"))
+    transcript_log.close()
+    assert transcript_log.stats()["write_errors"] == 0
+    assert [t["user"] for t in read_turns(str(start / "transcripts"))] == ["merhaba"]
+    assert not os.path.exists(elsewhere / "transcripts")
+
+
+def test_config_path_is_resolved_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    transcript_log = get_transcript_log({"path": "relative-transcripts", "flush_seconds": 60})
+    try:
+        assert os.path.isabs(transcript_log.path)
+        assert get_transcript_log({"path": str(tmp_path / "relative-transcripts")}) is transcript_log
+    finally:
+        transcript_log.close()
+
+
+def test_tckns_are_masked_by_default(tmp_path):
+    transcript_log = TranscriptLog(str(tmp_path), background=False)
+    transcript_log.log(turn("TCKN: 69387784002"))
+    transcript_log.close()
+    assert [t["user"] for t in read_turns(str(tmp_path))] == ["TCKN: 69*********"]
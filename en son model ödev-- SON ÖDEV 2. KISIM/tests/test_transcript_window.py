@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from replay_conversations import replay_config
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.path.join(APP_DIR, "chatbot_config.json")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # The app reads chatbot_config.json from the working directory
+    config = replay_config(CONFIG_FILE)
+    config["transcript"] = {"window": 4, "page_size": 3, "max_history": 10}
+    config["sessions"] = {**config["sessions"], "path": str(tmp_path / "sessions.db")}
+    (tmp_path / "chatbot_config.json").write_text(json.dumps(config), encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    app = AppTest.from_file(os.path.join(APP_DIR, "chatbot.py"), default_timeout=30)
+    app.session_state.api_key_validated = True
+    app.session_state.api_key = "offline"
+    return app
+
+
+def history(count):
+    return [{"role": "user" if i % 2 == 0 else "bot", "content": f"mesaj {i}"} for i in range(count)]
+
+
+def transcript(app):
+    return [m.value for m in app.markdown if "mesaj " in m.value]
+
+
+def test_only_the_window_is_rendered_until_earlier_messages_are_loaded(app):
+    app.run()
+    app.session_state.messages = history(9)
+    app.run()
+    assert app.button[0].label == "⬆️ Önceki mesajları yükle (5)"
+    rendered = transcript(app)[0]
+    assert "mesaj 5" in rendered and "mesaj 8" in rendered and "mesaj 4" not in rendered
+
+    app.button[0].click().run()
+    assert app.session_state.transcript_window == 7
+    assert app.button[0].label == "⬆️ Önceki mesajları yükle (2)"
+    assert "mesaj 2" in transcript(app)[0]
+
+    app.button[0].click().run()
+    assert not [b for b in app.button if b.label.startswith("⬆️")]
+    assert "mesaj 0" in transcript(app)[0]
+
+
+def test_history_is_capped_and_the_dropped_messages_counted(app):
+    app.run()
+    app.session_state.messages = history(9)
+    app.session_state.transcript_window = 10
+    app.chat_input[0].set_value("merhaba").run()
+    messages = app.session_state.messages
+    assert len(messages) == 10 and app.session_state.dropped_messages == 1
+    assert messages[0]["content"] == "mesaj 1" and messages[-2]["content"] == "merhaba"
+    assert [c.value for c in app.caption if "artık saklanmıyor" in c.value] == [
+        "Daha eski 1 mesaj artık saklanmıyor."]
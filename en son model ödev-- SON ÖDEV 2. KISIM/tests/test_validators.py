@@ -0,0 +1,121 @@
+import random
+
+import numpy as np
+import pytest
+
+from application_store import MemoryApplicationStore
+from validators import ApplicationValidator, tckn_checksum_ok
+
+VALID_TCKNS = ["10000000146", "69387784002", "12345678950"]
+
+
+@pytest.fixture
+def validator():
+    return ApplicationValidator({}, {})
+
+
+@pytest.mark.parametrize("tckn", VALID_TCKNS)
+def test_valid_check_digits(tckn):
+    assert tckn_checksum_ok(tckn)
+
+
+@pytest.mark.parametrize("tckn", ["12345678901", "11111111111", "10000000147", "10000000156", "02345678950"])
+def test_invalid_check_digits(tckn):
+    assert not tckn_checksum_ok(tckn)
+
+
+def test_tckn_errors(validator):
+    assert validator.tckn_error("10000000146") is None
+    assert validator.tckn_error(10000000146) is None
+    assert validator.tckn_error("1234567890") == "TCKN 11 haneli olmalıdır"
+    assert validator.tckn_error("1234567890a") == "TCKN 11 haneli olmalıdır"
+    assert validator.tckn_error("12345678901") == "Geçersiz TCKN, lütfen kontrol ediniz"
+    assert ApplicationValidator({}, {"tckn_checksum": False}).tckn_error("12345678901") is None
+
+
+def test_new_vehicle_limits(validator):
+    assert validator.validate_field("vehicle_value", 7000000, "new") == (True, "")
+    assert validator.validate_field("vehicle_value", 7000001, "new") == (
+        False, "7M TL üzeri araçlar için başvuru yapılamaz")
+    assert validator.validate_field("loan_amount", 600000, "new", {"vehicle_value": 1000000}) == (True, "")
+    assert validator.validate_field("loan_amount", 600001, "new", {"vehicle_value": 1000000}) == (
+        False, "Araç fiyatının en fazla %60'ı (600,000 TL) talep edilebilir")
+    assert not validator.guarantor_required("new", 4999999)
+    assert validator.guarantor_required("new", 5000000)
+
+
+def test_used_vehicle_limits(validator):
+    assert validator.validate_field("vehicle_age", 5, "used") == (True, "")
+    assert validator.validate_field("vehicle_age", 6, "used") == (False, "5 yaş üstü araçlar için başvuru oluşturulamaz")
+    assert validator.max_loan("used", 1000000) == 400000
+    assert validator.max_loan("used", 10000000) == 3000000  # the amount cap wins
+    assert validator.validate_field("loan_amount", 3000001, "used", {"vehicle_value": 10000000}) == (
+        False, "Araç kasko değerinin en fazla %40'ı veya 3M TL (3,000,000 TL) talep edilebilir")
+    assert not validator.guarantor_required("used", 10000000)
+
+
+def test_configured_rules_and_aliases_override_the_defaults():
+    validator = ApplicationValidator.from_config({"finance_rules": {
+        "new": {"max_financing_ratio": 0.5, "guarantor_threshold": 2000000, "max_vehicle_value": 3000000}}})
+    assert validator.max_loan("new", 1000000) == 500000
+    assert validator.guarantor_required("new", 2000000)
+    assert not validator.validate_field("vehicle_value", 3500000, "new")[0]
+    assert validator.rules["used"]["max_vehicle_age"] == 5
+
+
+def application(number, app_type="new", **data):
+    fields = {"vehicle_value": 1000000, "vehicle_model": "Renault Clio", "loan_amount": 500000}
+    return {"id": f"APP_{number}", "type": app_type, "status": "pending", "timestamp": "2025-01-01T10:00:00",
+            "data": {**fields, **data}}
+
+
+def test_revalidation_reports_each_rule():
+    store = MemoryApplicationStore()
+    for app in [
+        application(1),
+        application(2, vehicle_value=8000000, loan_amount=1000000, guarantor_tckn="10000000146"),
+        application(3, loan_amount=700000),
+        application(4, vehicle_value=6000000, loan_amount=1000000),
+        application(5, vehicle_model="Ford Transit Ticari"),
+        application(6, vehicle_value=6000000, loan_amount=1000000, guarantor_tckn="12345678901"),
+        application(7, "used", vehicle_age=7, loan_amount=300000, seller_tckn="69387784002"),
+        application(8, "used", vehicle_age=2, loan_amount=300000, seller_tckn="1234"),
+        application(9, "used", loan_amount=300000),
+        application(10, "leasing"),
+    ]:
+        store.append(app)
+
+    report = ApplicationValidator({}, {}).revalidate(store)
+    assert (report["total"], report["violating"], report["valid"]) == (10, 9, 1)
+    assert report["examples"] == {
+        "unknown_type": ["APP_10"],
+        "missing_fields": ["APP_9"],
+        "vehicle_value_over_max": ["APP_2"],
+        "vehicle_age_over_max": ["APP_7"],
+        "loan_over_limit": ["APP_3"],
+        "guarantor_missing": ["APP_4"],
+        "guarantor_tckn_invalid": ["APP_6"],
+        "seller_tckn_invalid": ["APP_8"],
+        "excluded_model": ["APP_5"],
+    }
+
+
+def test_vectorized_tckn_check_matches_the_single_check():
+    rng = random.Random(7)
+    tckns = VALID_TCKNS + ["".join(rng.choice("0123456789") for _ in range(11)) for _ in range(2000)]
+    tckns += ["123", "1234567890a", "０１２３４５６７８９０"]
+    for validator in (ApplicationValidator({}, {}), ApplicationValidator({}, {"tckn_checksum": False}),
+                      ApplicationValidator({}, {"tckn_pattern": r"^[1-5]\d{10}$"})):
+        expected = [validator.tckn_error(tckn) is None for tckn in tckns]
+        assert validator._tckns_valid(np.array(tckns, dtype=str)).tolist() == expected
+
+
+def test_cached_columns_pick_up_new_applications(tmp_path):
+    cache = str(tmp_path / "columns.npz")
+    store = MemoryApplicationStore()
+    store.append(application(1))
+    validator = ApplicationValidator({}, {})
+    assert validator.revalidate(store, cache_path=cache)["violating"] == 0
+    store.append(application(2, loan_amount=900000))
+    report = validator.revalidate(store, cache_path=cache)
+    assert (report["total"], report["examples"]) == (2, {"loan_over_limit": ["APP_2"]})
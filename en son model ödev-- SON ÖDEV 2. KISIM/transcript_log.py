@@ -0,0 +1,421 @@
+"""
+Conversation transcript log: every chat turn, batched into compressed JSONL segments.
+
+VehicleFinanceChatbot.process_message() hands each finished turn to
+TranscriptLog.log(), which only appends it to an in-memory buffer. A writer
+thread takes the buffer every ``flush_seconds`` (or as soon as
+``batch_size`` turns are waiting), serializes it and appends it to the
+current segment with a single write(); nothing on the request path touches
+the disk or calls fsync. At most ``max_buffer`` turns wait in memory: when
+the disk cannot keep up, further turns are dropped and counted instead of
+blocking the chat (chatbot_transcript_turns_total{result="dropped"}).
+
+Segments live in ``path`` as <start time>-<pid>-<n>.jsonl.gz. Each batch is
+its own gzip member, so a segment can be read while it is written and a
+crash loses at most the batch being written. A segment is closed after
+``segment_max_bytes`` or ``segment_max_seconds``; segments older than
+``retention_days`` (0: keep all) are deleted when a new one starts. With
+"compression": "none" segments are plain .jsonl. ``fsync`` makes the
+writer thread fsync after every batch.
+
+A turn is one line:
+
+    {"time": 1760000000.123, "session": "k3Jx...", "step_before": "greeting",
+     "step": "determine_type", "application_type": null, "user": "merhaba",
+     "bot": "Merhaba! ...", "ms": 1.8}
+
+plus "exit": true on the turn that ended a conversation. 11-digit numbers
+(TCKNs) are masked as in the prompt history; set "redact_tckn" to false to
+log messages exactly as typed, e.g. to replay exported conversations that
+enter a TCKN.
+
+``path`` is made absolute when the log is created, so a later chdir (as
+Streamlit's test runner does) does not move the segments.
+
+Reading:
+    read_turns(path, session=..., since=..., until=...) streams turns back,
+    conversations(turns) groups them into replay_conversations.py input.
+
+Usage:
+    python transcript_log.py stats
+    python transcript_log.py show --session k3Jx... --since 2025-06-01
+    python transcript_log.py export --out conversations.jsonl --since 2025-06-01
+"""
+import argparse
+import atexit
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from prompt_builder import mask_tckns
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSCRIPT_LOG_CONFIG = {
+    "enabled": True,
+    "path": "transcripts",
+    "compression": "gzip",
+    "compression_level": 6,
+    "batch_size": 500,
+    "flush_seconds": 2.0,
+    "max_buffer": 20000,
+    "segment_max_bytes": 32_000_000,
+    "segment_max_seconds": 3600,
+    "retention_days": 0,
+    "fsync": False,
+    "redact_tckn": True
+}
+
+_SEGMENT_SUFFIXES = (".jsonl.gz", ".jsonl")
+
+
+class TranscriptLog:
+    """Bounded in-memory buffer of turns and the thread that writes it out in batches"""
+
+    def __init__(self, path: str, compression: str = "gzip", compression_level: int = 6, batch_size: int = 500,
+                 flush_seconds: float = 2.0, max_buffer: int = 20000, segment_max_bytes: int = 32_000_000,
+                 segment_max_seconds: float = 3600, retention_days: float = 0, fsync: bool = False,
+                 redact_tckn: bool = True, background: bool = True):
+        if compression not in ("gzip", "none"):
+            raise ValueError(f"Unknown transcript compression: {compression} (use gzip or none)")
+        self.path = os.path.abspath(path)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.max_buffer = max(1, max_buffer)
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_seconds = segment_max_seconds
+        self.retention_days = retention_days
+        self.fsync = fsync
+        self.redact_tckn = redact_tckn
+        os.makedirs(self.path, exist_ok=True)
+
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()  # one batch at a time goes to the segment
+        self._closed = False
+        self._segment = None  # (fd, file name, start time, bytes written)
+        self._segments_started = 0
+        self._counts = {"logged": 0, "dropped": 0, "written": 0, "batches": 0, "bytes": 0, "write_errors": 0}
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+            self._thread.start()
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "TranscriptLog":
+        return cls(settings["path"], settings["compression"], settings["compression_level"], settings["batch_size"],
+                   settings["flush_seconds"], settings["max_buffer"], settings["segment_max_bytes"],
+                   settings["segment_max_seconds"], settings["retention_days"], settings["fsync"],
+                   settings["redact_tckn"])
+
+    # --- request path ---
+
+    def log(self, turn: Dict[str, Any]) -> bool:
+        """Queue one turn for writing; False when the buffer is full and the turn was dropped"""
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer or self._closed:
+                self._counts["dropped"] += 1
+                return False
+            self._buffer.append(turn)
+            self._counts["logged"] += 1
+            if len(self._buffer) == self.batch_size:
+                self._wake.notify()
+        return True
+
+    # --- writer ---
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if len(self._buffer) < self.batch_size and not self._closed:
+                    self._wake.wait(self.flush_seconds)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything buffered so far (on the caller's thread); returns the number of turns written"""
+        written = 0
+        with self._write_lock:
+            while True:
+                with self._lock:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                if not batch:
+                    return written
+                self._write_batch(batch)
+                written += len(batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(turn, ensure_ascii=False, separators=(",", ":")) + "\n" for turn in batch)
+        if self.redact_tckn:
+            lines = mask_tckns(lines)
+        data = lines.encode("utf-8")
+        if self.compression == "gzip":
+            data = gzip.compress(data, compresslevel=self.compression_level, mtime=0)
+        try:
+            fd = self._current_segment(len(data))
+            os.write(fd, data)
+            if self.fsync:
+                os.fsync(fd)
+        except OSError:
+            logger.exception("Could not write %d transcript turns to %s", len(batch), self.path)
+            self._close_segment()
+            with self._lock:
+                self._counts["write_errors"] += 1
+                self._counts["dropped"] += len(batch)
+            return
+        fd, name, started, size = self._segment
+        self._segment = (fd, name, started, size + len(data))
+        with self._lock:
+            self._counts["written"] += len(batch)
+            self._counts["batches"] += 1
+            self._counts["bytes"] += len(data)
+
+    def _current_segment(self, incoming: int) -> int:
+        now = time.time()
+        if self._segment is not None:
+            fd, _, started, size = self._segment
+            if (size and size + incoming > self.segment_max_bytes) or now - started >= self.segment_max_seconds:
+                self._close_segment()
+        if self._segment is None:
+            self._segments_started += 1
+            suffix = ".jsonl.gz" if self.compression == "gzip" else ".jsonl"
+            name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{os.getpid()}-{self._segments_started:04d}{suffix}"
+            fd = os.open(os.path.join(self.path, name), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            self._segment = (fd, name, now, 0)
+            self._remove_expired(now)
+        return self._segment[0]
+
+    def _close_segment(self) -> None:
+        if self._segment is not None:
+            fd = self._segment[0]
+            self._segment = None
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            os.close(fd)
+
+    def _remove_expired(self, now: float) -> None:
+        if not self.retention_days:
+            return
+        cutoff = now - self.retention_days * 86400
+        for segment in segment_paths(self.path):
+            try:
+                if os.path.getmtime(segment) < cutoff:
+                    os.remove(segment)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        """Stop the writer thread, write what is left and close the segment"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        with self._write_lock:
+            self._close_segment()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            segment = self._segment[1] if self._segment is not None else None
+            return {"buffered": len(self._buffer), "segment": segment, **self._counts}
+
+
+# --- reading ---
+
+def segment_paths(path: str) -> List[str]:
+    """Segment files under ``path``, oldest first"""
+    if not os.path.isdir(path):
+        return []
+    return [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(_SEGMENT_SUFFIXES)]
+
+
+def read_segment(segment: str) -> Iterator[Dict[str, Any]]:
+    """
+    Turns of one segment, streamed. A batch cut short (the segment is being
+    written, or the process died during a write) ends the segment early.
+    """
+    opener = gzip.open if segment.endswith(".gz") else open
+    with opener(segment, "rb") as f:
+        try:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                yield json.loads(line)
+        except (EOFError, OSError, zlib.error) as e:
+            logger.warning("Transcript segment %s ends with an incomplete batch: %s", segment, e)
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(value).timestamp()
+
+
+def read_turns(path: str, session: Optional[str] = None, since: Any = None, until: Any = None
+               ) -> Iterator[Dict[str, Any]]:
+    """
+    Turns of every segment under ``path`` in order, optionally of one session
+    and between ``since`` and ``until`` (epoch seconds or ISO dates). Segments
+    last written before ``since`` are not opened.
+    """
+    since, until = _timestamp(since), _timestamp(until)
+    for segment in segment_paths(path):
+        if since is not None and os.path.getmtime(segment) < since:
+            continue
+        for turn in read_segment(segment):
+            if session is not None and turn.get("session") != session:
+                continue
+            if since is not None and turn["time"] < since:
+                continue
+            if until is not None and turn["time"] >= until:
+                continue
+            yield turn
+
+
+def conversations(turns: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Group turns into conversations in the replay_conversations.py format:
+    a session's turns up to (and including) an exit, with the steps seen as
+    the expected result. Conversations still open at the end are included.
+    """
+    open_conversations = {}
+    counters = {}
+    for turn in turns:
+        session = turn.get("session") or "-"
+        conversation = open_conversations.get(session)
+        if conversation is None:
+            counters[session] = counters.get(session, 0) + 1
+            conversation = open_conversations[session] = {
+                "id": f"{session}-{counters[session]}", "messages": [], "expected": {"steps": []}}
+        conversation["messages"].append(turn["user"])
+        conversation["expected"]["steps"].append(turn["step"])
+        if turn.get("exit"):
+            yield open_conversations.pop(session)
+    for conversation in open_conversations.values():
+        conversation["expected"]["step"] = conversation["expected"]["steps"][-1]
+        yield conversation
+
+
+# --- process-wide logs ---
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    # The writer thread does not survive fork(); children start their own log
+    global _logs, _logs_lock
+    _logs = {}
+    _logs_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _close_all() -> None:
+    for transcript_log in list(_logs.values()):
+        transcript_log.close()
+
+
+atexit.register(_close_all)
+
+
+def transcript_log_settings(transcript_log_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {**DEFAULT_TRANSCRIPT_LOG_CONFIG, **(transcript_log_config or {})}
+
+
+def get_transcript_log(transcript_log_config: Optional[Dict[str, Any]] = None) -> Optional[TranscriptLog]:
+    """Process-wide log for the "transcript_log" config section, or None when disabled"""
+    settings = transcript_log_settings(transcript_log_config)
+    if not settings["enabled"]:
+        return None
+    key = os.path.abspath(settings["path"])
+    with _logs_lock:
+        transcript_log = _logs.get(key)
+        if transcript_log is None:
+            transcript_log = _logs[key] = TranscriptLog.from_settings(settings)
+        return transcript_log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read the conversation transcript log")
+    parser.add_argument("--path", help="Segment directory (default: transcript_log.path of the config)")
+    parser.add_argument("--config", default="chatbot_config.json")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, text in [("stats", "Segments, turns and sessions"), ("show", "Print turns"),
+                       ("export", "Write conversations in replay_conversations.py format")]:
+        command = commands.add_parser(name, help=text)
+        command.add_argument("--session")
+        command.add_argument("--since", help="ISO date or time")
+        command.add_argument("--until", help="ISO date or time")
+        if name == "show":
+            command.add_argument("--json", action="store_true", help="One JSON turn per line")
+        if name == "export":
+            command.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    path = args.path
+    if path is None:
+        from resources import get_config
+
+        path = transcript_log_settings(get_config(args.config).get("transcript_log"))["path"]
+    if not segment_paths(path):
+        parser.exit(1, f"No transcript segments in {path}\n")
+    turns = read_turns(path, args.session, args.since, args.until)
+
+    if args.command == "stats":
+        start = time.perf_counter()
+        count, sessions, exits = 0, set(), 0
+        first = last = None
+        for turn in turns:
+            count += 1
+            sessions.add(turn.get("session"))
+            exits += bool(turn.get("exit"))
+            first = turn["time"] if first is None else first
+            last = turn["time"]
+        segments = segment_paths(path)
+        size = sum(os.path.getsize(segment) for segment in segments)
+        print(f"{len(segments)} segments, {size / 1e6:.1f} MB, {count:,} turns, {len(sessions):,} sessions, "
+              f"{exits:,} exits")
+        if count:
+            print(f"from {datetime.fromtimestamp(first).isoformat(timespec='seconds')} "
+                  f"to {datetime.fromtimestamp(last).isoformat(timespec='seconds')} "
+                  f"(read in {time.perf_counter() - start:.2f}s)")
+    elif args.command == "show":
+        for turn in turns:
+            if args.json:
+                print(json.dumps(turn, ensure_ascii=False))
+            else:
+                moment = datetime.fromtimestamp(turn["time"]).isoformat(sep=" ", timespec="seconds")
+                print(f"{moment} {turn.get('session')} [{turn['step_before']} -> {turn['step']}]")
+                print(f"  > {turn['user']}")
+                print(f"  < {turn['bot']}")
+    else:
+        written = 0
+        with open(args.out, "w", encoding="utf-8") as f:
+            for conversation in conversations(turns):
+                f.write(json.dumps(conversation, ensure_ascii=False) + "\n")
+                written += 1
+        print(f"{written:,} conversations written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
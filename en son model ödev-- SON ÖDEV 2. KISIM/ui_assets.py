@@ -0,0 +1,285 @@
+"""
+Static CSS and HTML of the Streamlit UI (chatbot.py).
+
+Streamlit re-executes chatbot.py on every rerun, but imported modules stay
+loaded. The page CSS, the fixed HTML cards and the info texts are therefore
+built here once per process: dedented (st.markdown would otherwise dedent
+them on every rerun) and, for the CSS, minified, which also shrinks what is
+sent to the browser on each rerun. chat_message_html lives here for the
+same reason; its cache would start empty on every rerun inside chatbot.py.
+"""
+import re
+import textwrap
+from functools import lru_cache
+
+
+_CSS_COMMENTS = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCTUATION = re.compile(r"\s*([{}:;,>])\s*")
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and the whitespace CSS does not need"""
+    css = _CSS_SPACE.sub(" ", _CSS_COMMENTS.sub("", css))
+    return _CSS_PUNCTUATION.sub(r"\1", css).replace(";}", "}").strip()
+
+
+def dedent(text: str) -> str:
+    """What st.markdown does to every block, done once"""
+    return textwrap.dedent(text).strip()
+
+
+PAGE_CSS = "<style>" + minify_css("""
+    .main-header {
+        background: #2c3e50;
+        padding: 2rem;
+        border-radius: 10px;
+        color: #ffffff;
+        text-align: center;
+        margin-bottom: 2rem;
+        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
+        font-weight: 600;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    }
+
+    .main-header h1 {
+        color: #ffffff;
+        margin-bottom: 0.5rem;
+        font-size: 2.5rem;
+    }
+
+    .main-header p {
+        color: #ecf0f1;
+        font-size: 1.1rem;
+        margin: 0;
+    }
+
+    .chat-message {
+        padding: 1rem 1.5rem;
+        border-radius: 10px;
+        margin: 1rem 0;
+        border-left: 4px solid #3498db;
+        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
+        font-size: 1rem;
+        line-height: 1.5;
+        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
+    }
+
+    .user-message {
+        background-color: #ffffff;
+        border-left-color: #3498db;
+        color: #2c3e50;
+    }
+
+    .user-message strong {
+        color: #2980b9;
+    }
+
+    .bot-message {
+        background-color: #f8f9fa;
+        border-left-color: #27ae60;
+        color: #2c3e50;
+    }
+
+    .bot-message strong {
+        color: #27ae60;
+    }
+
+    .info-card {
+        background: #ffffff;
+        padding: 2rem;
+        border-radius: 10px;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+        margin: 1rem 0;
+        border: 1px solid #e9ecef;
+    }
+
+    .info-card h3 {
+        color: #2c3e50;
+        margin-bottom: 1rem;
+        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
+    }
+
+    .info-card ul {
+        color: #495057;
+        line-height: 1.6;
+    }
+
+    .info-card li {
+        margin-bottom: 0.5rem;
+    }
+
+    .status-success {
+        background-color: #d4edda;
+        border: 1px solid #c3e6cb;
+        color: #155724;
+        padding: 1rem;
+        border-radius: 8px;
+        margin: 1rem 0;
+        font-weight: 500;
+    }
+
+    .status-error {
+        background-color: #f8d7da;
+        border: 1px solid #f5c6cb;
+        color: #721c24;
+        padding: 1rem;
+        border-radius: 8px;
+        margin: 1rem 0;
+        font-weight: 500;
+    }
+
+    .metric-card {
+        background: #3498db;
+        color: #ffffff;
+        padding: 1rem;
+        border-radius: 8px;
+        text-align: center;
+        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
+        font-weight: 600;
+    }
+
+    /* Streamlit component styling */
+    .stButton > button {
+        background-color: #3498db;
+        color: #ffffff;
+        border: none;
+        border-radius: 6px;
+        padding: 0.5rem 1rem;
+        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
+        font-weight: 500;
+        transition: all 0.3s ease;
+    }
+
+    .stButton > button:hover {
+        background-color: #2980b9;
+        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.2);
+    }
+
+    .stTextInput > div > div > input {
+        border-radius: 6px;
+        border: 2px solid #e9ecef;
+        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
+    }
+
+    .stTextInput > div > div > input:focus {
+        border-color: #3498db;
+        box-shadow: 0 0 0 0.2rem rgba(52, 152, 219, 0.25);
+    }
+
+    /* Sidebar styling */
+    .css-1d391kg {
+        background-color: #f8f9fa;
+    }
+
+    /* Main content area */
+    .css-18e3th9 {
+        padding-top: 2rem;
+    }
+
+    /* Chat input styling */
+    .stChatInput > div {
+        background-color: #ffffff;
+        border: 2px solid #e9ecef;
+        border-radius: 25px;
+    }
+
+    .stChatInput > div:focus-within {
+        border-color: #3498db;
+        box-shadow: 0 0 0 0.2rem rgba(52, 152, 219, 0.25);
+    }
+
+    .stChatInput input {
+        color: #2c3e50 !important;
+        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif !important;
+        background-color: #ffffff !important;
+        font-size: 16px !important;
+    }
+
+    .stChatInput input::placeholder {
+        color: #6c757d !important;
+    }
+
+    .stChatInput textarea {
+        color: #2c3e50 !important;
+        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif !important;
+        background-color: #ffffff !important;
+        font-size: 16px !important;
+    }
+
+    .stChatInput textarea::placeholder {
+        color: #6c757d !important;
+    }
+""") + "</style>"
+
+HEADER_HTML = dedent("""
+    <div class="main-header">
+        <h1>🚗 Araç Finansmanı Chatbot</h1>
+        <p>Yeni ve ikinci el araç finansmanı başvuruları için akıllı asistan</p>
+    </div>
+""")
+
+API_KEY_HELP = dedent("""
+    #### 📖 API Key Nasıl Alınır?
+    1. [Google AI Studio](https://aistudio.google.com/app/apikey) adresine gidin
+    2. "Create API Key" butonuna tıklayın
+    3. API Key'i kopyalayın ve yukarıya yapıştırın
+
+    **Not**: Gemini 1.5 Flash modeli ücretsizdir!
+""")
+
+FEATURES_HTML = dedent("""
+    <div class="info-card">
+        <h3>🎯 Chatbot Özellikleri</h3>
+        <ul>
+            <li>✅ Yeni ve ikinci el araç finansmanı</li>
+            <li>✅ Otomatik veri doğrulama</li>
+            <li>✅ Türkçe doğal dil işleme</li>
+            <li>✅ Adım adım başvuru süreci</li>
+            <li>✅ Çapraz satış fırsatları</li>
+            <li>✅ Güvenli veri saklama</li>
+        </ul>
+        <p><strong>👈 Başlamak için soldaki panelden API Key giriniz!</strong></p>
+    </div>
+""")
+
+NEW_VEHICLE_INFO = dedent("""
+    **Yeni Araç Finansmanı:**
+    - Maksimum araç değeri: 7M TL
+    - Finansman oranı: %60'a kadar
+    - 5M TL üzeri için kefil gerekli
+    - Ticari araçlar hariç
+""")
+
+USED_VEHICLE_INFO = dedent("""
+    **İkinci El Araç Finansmanı:**
+    - Maksimum araç yaşı: 5 yıl
+    - Finansman oranı: %40'a kadar
+    - Maksimum tutar: 3M TL
+    - Kasko değeri baz alınır
+""")
+
+COMMANDS_INFO = dedent("""
+    **Komutlar:**
+    - `çık` - Uygulamadan çıkış
+    - `iptal` - Başvuruyu sıfırla
+    - `yeniden başla` - Baştan başla
+""")
+
+
+@lru_cache(maxsize=4096)
+def chat_message_html(role: str, content: str) -> str:
+    """Build the styled HTML block for a chat message (memoized: history repeats on every rerun)"""
+    if role == "user":
+        return f"""
+        <div class="chat-message user-message">
+            <strong>👤 Siz:</strong><br>
+            {content}
+        </div>
+        """
+    return f"""
+        <div class="chat-message bot-message">
+            <strong>🤖 Bot:</strong><br>
+            {content}
+        </div>
+        """
@@ -0,0 +1,388 @@
+"""
+Application validators compiled from chatbot_config.json.
+
+Limits come from "finance_rules" (one block per application type) and the
+TCKN format from "validation_rules". With "tckn_checksum" the two check
+digits of the Turkish identity number are verified as well:
+
+    d1 != 0
+    d10 = (7 * (d1 + d3 + d5 + d7 + d9) - (d2 + d4 + d6 + d8)) mod 10
+    d11 = (d1 + d2 + ... + d10) mod 10
+
+ApplicationValidator.validate_field() checks one answer during the dialog.
+ApplicationValidator.revalidate() checks every stored application against
+the current rules, for example after the bank changes a limit. The columns are
+read with ApplicationStore.iter_fields (so SQLite does the JSON decoding) into
+NumPy arrays, optionally cached between runs. Each rule is then one
+vectorized comparison over all records.
+The result is a violations report with counts per rule and example ids.
+
+Usage:
+    python validators.py
+    python validators.py --config chatbot_config.json --json violations.json --ids violations.csv
+    python validators.py --cache applications.columns.npz
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from intent_router import turkish_lower
+
+
+DEFAULT_FINANCE_RULES = {
+    "new": {
+        "max_vehicle_value": 7000000,
+        "max_loan_percentage": 0.6,
+        "guarantor_required_threshold": 5000000,
+        "excluded_models": ["ticari", "kamyon", "minibüs", "otobüs"],
+        "required_fields": ["vehicle_value", "vehicle_model", "loan_amount"],
+        "optional_fields": ["guarantor_tckn"]
+    },
+    "used": {
+        "max_vehicle_age": 5,
+        "max_loan_percentage": 0.4,
+        "max_loan_amount": 3000000,
+        "required_fields": ["vehicle_value", "vehicle_age", "loan_amount"],
+        "optional_fields": ["seller_tckn"]
+    }
+}
+
+DEFAULT_VALIDATION_RULES = {
+    "tckn_pattern": r"^\d{11}$",
+    "tckn_checksum": True
+}
+
+# Key names used by the generated default config
+RULE_ALIASES = {
+    "max_financing_ratio": "max_loan_percentage",
+    "guarantor_threshold": "guarantor_required_threshold"
+}
+
+VIOLATION_RULES = {
+    "unknown_type": "Başvuru türü yeni/ikinci el değil",
+    "missing_fields": "Zorunlu alan eksik",
+    "vehicle_value_over_max": "Araç değeri üst sınırın üzerinde",
+    "vehicle_age_over_max": "Araç yaşı üst sınırın üzerinde",
+    "loan_over_limit": "Finansman tutarı izin verilen sınırın üzerinde",
+    "guarantor_missing": "Kefil gerekli ama kefil TCKN yok",
+    "guarantor_tckn_invalid": "Kefil TCKN geçersiz",
+    "seller_tckn_invalid": "Satıcı TCKN geçersiz",
+    "excluded_model": "Finansmanı yapılmayan (ticari) model"
+}
+
+COLUMN_PATHS = {
+    "type": "type",
+    "vehicle_value": "data.vehicle_value",
+    "vehicle_age": "data.vehicle_age",
+    "loan_amount": "data.loan_amount",
+    "vehicle_model": "data.vehicle_model",
+    "guarantor_tckn": "data.guarantor_tckn",
+    "seller_tckn": "data.seller_tckn"
+}
+NUMERIC_COLUMNS = ("vehicle_value", "vehicle_age", "loan_amount")
+
+
+def tckn_checksum_ok(tckn: str) -> bool:
+    """Check digits of an 11-digit TCKN"""
+    digits = [int(char) for char in tckn]
+    if digits[0] == 0:
+        return False
+    if (sum(digits[0:9:2]) * 7 - sum(digits[1:8:2])) % 10 != digits[9]:
+        return False
+    return sum(digits[:10]) % 10 == digits[10]
+
+
+def _short_amount(amount: float) -> str:
+    """Limit as shown in messages: 7M, 750,000"""
+    return f"{amount / 1_000_000:g}M" if amount >= 1_000_000 else f"{amount:,.0f}"
+
+
+class ApplicationValidator:
+    """Finance rules and the TCKN check of one config, compiled once"""
+
+    def __init__(self, finance_rules: Dict[str, Dict[str, Any]], validation_rules: Dict[str, Any]):
+        self.rules = {}
+        for app_type, defaults in DEFAULT_FINANCE_RULES.items():
+            configured = {RULE_ALIASES.get(key, key): value
+                          for key, value in (finance_rules.get(app_type) or {}).items()}
+            self.rules[app_type] = {**defaults, **configured}
+        for app_type, configured in finance_rules.items():
+            self.rules.setdefault(app_type, {RULE_ALIASES.get(key, key): value for key, value in configured.items()})
+        settings = {**DEFAULT_VALIDATION_RULES, **validation_rules}
+        self.tckn_pattern = re.compile(settings["tckn_pattern"])
+        self.tckn_checksum = settings["tckn_checksum"]
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ApplicationValidator":
+        return cls(config.get("finance_rules") or {}, config.get("validation_rules") or {})
+
+    # --- rules ---
+
+    def max_loan(self, app_type: str, vehicle_value: float) -> float:
+        rules = self.rules[app_type]
+        max_amount = vehicle_value * rules["max_loan_percentage"]
+        if rules.get("max_loan_amount") is not None:
+            max_amount = min(max_amount, rules["max_loan_amount"])
+        return max_amount
+
+    def guarantor_threshold(self, app_type: str) -> Optional[float]:
+        return self.rules[app_type].get("guarantor_required_threshold")
+
+    def guarantor_required(self, app_type: str, vehicle_value: float) -> bool:
+        threshold = self.guarantor_threshold(app_type)
+        return threshold is not None and vehicle_value >= threshold
+
+    def tckn_error(self, tckn: Any) -> Optional[str]:
+        """Why ``tckn`` is not a valid TCKN, or None"""
+        tckn = str(tckn)
+        if not self.tckn_pattern.match(tckn):
+            return "TCKN 11 haneli olmalıdır"
+        if self.tckn_checksum and not (len(tckn) == 11 and tckn.isdigit() and tckn_checksum_ok(tckn)):
+            return "Geçersiz TCKN, lütfen kontrol ediniz"
+        return None
+
+    def validate_field(self, field: str, value: Any, app_type: str,
+                       user_data: Optional[Dict[str, Any]] = None) -> Tuple[bool, str]:
+        """Check one answer; ``user_data`` holds the fields collected before it"""
+        rules = self.rules[app_type]
+
+        if field == "vehicle_value":
+            limit = rules.get("max_vehicle_value")
+            if limit is not None and value > limit:
+                return False, f"{_short_amount(limit)} TL üzeri araçlar için başvuru yapılamaz"
+
+        elif field == "vehicle_age":
+            limit = rules.get("max_vehicle_age")
+            if limit is not None and value > limit:
+                return False, f"{limit} yaş üstü araçlar için başvuru oluşturulamaz"
+
+        elif field == "loan_amount":
+            max_amount = self.max_loan(app_type, (user_data or {}).get('vehicle_value', 0))
+            if value > max_amount:
+                percentage = f"%{rules['max_loan_percentage'] * 100:g}'ı"
+                if app_type == "new":
+                    return False, f"Araç fiyatının en fazla {percentage} ({max_amount:,.0f} TL) talep edilebilir"
+                cap = rules.get("max_loan_amount")
+                cap_text = f" veya {_short_amount(cap)} TL" if cap is not None else ""
+                return False, (f"Araç kasko değerinin en fazla {percentage}{cap_text} ({max_amount:,.0f} TL) "
+                               f"talep edilebilir")
+
+        elif field == "tckn":
+            error = self.tckn_error(value)
+            if error:
+                return False, error
+
+        return True, ""
+
+    # --- bulk re-validation ---
+
+    def check_columns(self, columns: Dict[str, Any]) -> Dict[str, Any]:
+        """Boolean NumPy mask per violated rule (see VIOLATION_RULES) over the loaded columns"""
+        import numpy as np
+
+        size = len(columns["id"])
+        types = columns["type"]
+        masks = {rule: np.zeros(size, dtype=bool) for rule in VIOLATION_RULES}
+        known = np.zeros(size, dtype=bool)
+        present = {name: ~np.isnan(columns[name]) for name in NUMERIC_COLUMNS}
+        for name in ("vehicle_model", "guarantor_tckn", "seller_tckn"):
+            present[name] = columns[name] != ""
+
+        for app_type, rules in self.rules.items():
+            of_type = types == app_type
+            known |= of_type
+            for field in rules.get("required_fields", ()):
+                if field in present:
+                    masks["missing_fields"] |= of_type & ~present[field]
+            if rules.get("max_vehicle_value") is not None:
+                masks["vehicle_value_over_max"] |= of_type & (columns["vehicle_value"] > rules["max_vehicle_value"])
+            if rules.get("max_vehicle_age") is not None:
+                masks["vehicle_age_over_max"] |= of_type & (columns["vehicle_age"] > rules["max_vehicle_age"])
+            if rules.get("max_loan_percentage") is not None:
+                max_loan = columns["vehicle_value"] * rules["max_loan_percentage"]
+                if rules.get("max_loan_amount") is not None:
+                    max_loan = np.minimum(max_loan, rules["max_loan_amount"])
+                masks["loan_over_limit"] |= of_type & (columns["loan_amount"] > max_loan)
+            if rules.get("guarantor_required_threshold") is not None:
+                masks["guarantor_missing"] |= (of_type & (columns["vehicle_value"] >= rules["guarantor_required_threshold"])
+                                               & ~present["guarantor_tckn"])
+            excluded = [turkish_lower(word) for word in rules.get("excluded_models", ())]
+            if excluded:
+                models = columns["vehicle_model"]
+                for word in excluded:
+                    masks["excluded_model"] |= of_type & (np.char.find(models, word) >= 0)
+        masks["unknown_type"] = ~known
+
+        for field in ("guarantor_tckn", "seller_tckn"):
+            masks[f"{field}_invalid"] = present[field] & ~self._tckns_valid(columns[field])
+        return masks
+
+    def _tckns_valid(self, tckns: Any) -> Any:
+        """Vectorized tckn_error(...) is None over a string array ("" = absent)"""
+        import numpy as np
+
+        valid = np.zeros(len(tckns), dtype=bool)
+        candidates = np.flatnonzero((np.char.str_len(tckns) == 11) & np.char.isdigit(tckns))
+        if self.tckn_pattern.pattern != DEFAULT_VALIDATION_RULES["tckn_pattern"]:
+            # A custom format cannot be vectorized; match it on the candidates only
+            matches = [bool(self.tckn_pattern.match(tckn)) for tckn in tckns[candidates]]
+            candidates = candidates[np.array(matches, dtype=bool)] if len(candidates) else candidates
+        if not self.tckn_checksum:
+            valid[candidates] = True
+            return valid
+        digits = tckns[candidates].astype("U11").view(np.uint32).reshape(-1, 11).astype(np.int64) - ord("0")
+        ok = digits[:, 0] != 0
+        ok &= (digits[:, 0:9:2].sum(axis=1) * 7 - digits[:, 1:8:2].sum(axis=1)) % 10 == digits[:, 9]
+        ok &= digits[:, :10].sum(axis=1) % 10 == digits[:, 10]
+        valid[candidates] = ok
+        return valid
+
+    def revalidate(self, store: Any, examples: int = 10, cache_path: Optional[str] = None) -> Dict[str, Any]:
+        """Re-check every application in ``store``; returns the violations report"""
+        return self._revalidate(store, examples, cache_path)[0]
+
+    def _revalidate(self, store: Any, examples: int,
+                    cache_path: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+        start = time.perf_counter()
+        columns = load_columns(store, cache_path)
+        loaded = time.perf_counter()
+        masks = self.check_columns(columns)
+        checked = time.perf_counter()
+        report = violations_report(columns, masks, examples)
+        report["load_seconds"] = loaded - start
+        report["check_seconds"] = checked - loaded
+        report["rules"] = self.rules
+        return report, columns, masks
+
+
+def load_columns(store: Any, cache_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Stored applications as NumPy columns: floats (NaN = missing) and strings
+    ("" = missing)
+
+    Decoding the stored JSON is most of the cost, so with ``cache_path`` the
+    columns are kept in a .npz file. Stores only ever append, so the next run
+    reads just the applications added since.
+    """
+    import numpy as np
+
+    cached = _read_cached_columns(store, cache_path)
+    start = len(cached["id"]) if cached else 0
+    rows = list(store.iter_fields(COLUMN_PATHS.values(), start))
+    names = ["id", *COLUMN_PATHS]
+    raw = dict(zip(names, zip(*rows))) if rows else {name: () for name in names}
+    columns = {}
+    for name in names:
+        values = raw[name]
+        if name in NUMERIC_COLUMNS:
+            column = np.fromiter((_as_float(value) for value in values), dtype=float, count=len(values))
+        elif name == "vehicle_model":
+            column = np.array([turkish_lower(value) if isinstance(value, str) else "" for value in values], dtype=str)
+        else:
+            column = np.array([value if isinstance(value, str) else "" for value in values], dtype=str)
+        columns[name] = np.concatenate([cached[name], column]) if cached else column
+    if cache_path and (rows or not cached):
+        with open(cache_path, "wb") as f:
+            np.savez(f, **columns)
+    return columns
+
+
+def _read_cached_columns(store: Any, cache_path: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Columns saved by an earlier load_columns, if they are a prefix of this store"""
+    import numpy as np
+
+    if not cache_path or not os.path.exists(cache_path):
+        return None
+    try:
+        with np.load(cache_path, allow_pickle=False) as saved:
+            cached = {name: saved[name] for name in ["id", *COLUMN_PATHS]}
+    except (OSError, KeyError, ValueError):
+        return None
+    if not len(cached["id"]):
+        return None
+    last = next(store.iter_fields((), len(cached["id"]) - 1), None)
+    if last is None or last[0] != cached["id"][-1]:
+        return None  # a different or rebuilt store
+    return cached
+
+
+def _as_float(value: Any) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return float("nan")
+
+
+def violations_report(columns: Dict[str, Any], masks: Dict[str, Any], examples: int = 10) -> Dict[str, Any]:
+    import numpy as np
+
+    size = len(columns["id"])
+    violating = np.zeros(size, dtype=bool)
+    for mask in masks.values():
+        violating |= mask
+    return {
+        "total": size,
+        "violating": int(violating.sum()),
+        "valid": size - int(violating.sum()),
+        "by_rule": {rule: int(mask.sum()) for rule, mask in masks.items() if mask.any()},
+        "examples": {rule: columns["id"][mask][:examples].tolist() for rule, mask in masks.items() if mask.any()}
+    }
+
+
+def iter_violations(columns: Dict[str, Any], masks: Dict[str, Any]) -> Iterable[Tuple[str, str]]:
+    """(application id, rule) for every violation"""
+    import numpy as np
+
+    for rule, mask in masks.items():
+        for index in np.flatnonzero(mask):
+            yield columns["id"][index], rule
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['total']:,} applications, {report['violating']:,} violate the current rules "
+          f"(loaded in {report['load_seconds']:.2f}s, checked in {report['check_seconds']:.3f}s)")
+    for rule, count in sorted(report["by_rule"].items(), key=lambda item: -item[1]):
+        print(f"  {rule:<24} {count:>10,}  {VIOLATION_RULES[rule]}")
+        print(f"  {'':<24} {'':>10}  e.g. {', '.join(report['examples'][rule][:3])}")
+
+
+def main():
+    from application_store import create_application_store
+    from resources import get_config
+
+    parser = argparse.ArgumentParser(description="Re-validate stored applications against the current rules")
+    parser.add_argument("--config", default="chatbot_config.json")
+    parser.add_argument("--backend", help="Application store backend (default: from config)")
+    parser.add_argument("--path", help="Application store path (default: from config)")
+    parser.add_argument("--examples", type=int, default=10, help="Example ids per rule in the report")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--ids", help="Write every (id, rule) violation to this CSV file")
+    parser.add_argument("--cache", help="Keep the loaded columns in this .npz file for the next run")
+    args = parser.parse_args()
+
+    config = get_config(args.config)
+    storage = dict(config.get("storage") or {})
+    if args.backend:
+        storage["backend"] = args.backend
+    if args.path:
+        storage["path"] = args.path
+    store = create_application_store(storage)
+    validator = ApplicationValidator.from_config(config)
+
+    report, columns, masks = validator._revalidate(store, args.examples, args.cache)
+    print_report(report)
+    if args.ids:
+        with open(args.ids, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "rule"])
+            writer.writerows(iter_violations(columns, masks))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()